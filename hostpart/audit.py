@@ -0,0 +1,431 @@
+"""
+Audit Stream Module
+감사 스트림 모듈
+
+Carries unlock and rejection events from the doors to the host. A door
+records events into a bounded ring buffer; a background flusher publishes
+them as zlib-compressed batches once a batch fills up or a delay passes.
+Batches that cannot be published go to a size-capped spool file and are
+sent first once publishing works again. On the host, serve() bulk-inserts
+each batch into the key registry. Shared by the host and the door, like
+keysync.py.
+도어에서 호스트로 잠금 해제 및 거부 이벤트를 전달합니다. 도어는 이벤트를 크기가
+제한된 링 버퍼에 기록하고, 백그라운드 플러셔가 배치가 차거나 지연 시간이 지나면
+zlib으로 압축된 배치로 게시합니다. 게시할 수 없는 배치는 크기가 제한된 스풀
+파일에 저장되었다가 게시가 다시 가능해지면 먼저 전송됩니다. 호스트에서는
+serve()가 각 배치를 키 레지스트리에 일괄 삽입합니다. keysync.py처럼 호스트와
+도어가 함께 사용합니다.
+
+Batch / 배치:
+    "DLAU" + zlib-compressed JSON {"door", "events": [[at, event, passwd], ...]}
+
+at is epoch seconds; event is "unlock" or "reject"; passwd may be null.
+at은 epoch 초, event는 "unlock" 또는 "reject"이며 passwd는 null일 수 있습니다.
+
+Usage / 사용법:
+    python3 audit.py --serve         # store door audit batches in the registry (host)
+"""
+
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+
+MAGIC = b"DLAU"
+SPOOL_PATH = "audit.spool"
+
+# Event kinds
+# 이벤트 종류
+UNLOCK = "unlock"
+REJECT = "reject"
+
+_LENGTH = struct.Struct(">I")
+
+
+def encode_batch(door_id, events):
+    """
+    Encode events of one door as a compressed batch.
+    한 도어의 이벤트를 압축된 배치로 인코딩합니다.
+
+    Args:
+        door_id (str): Door that recorded the events
+                      이벤트를 기록한 도어
+        events (list): (at, event, passwd) tuples
+                      (at, event, passwd) 튜플
+
+    Returns:
+        bytes: Batch message
+              배치 메시지
+    """
+    body = json.dumps({'door': door_id, 'events': [list(e) for e in events]},
+                      separators=(',', ':'))
+    return MAGIC + zlib.compress(body.encode('utf-8'))
+
+
+def is_batch(data):
+    """
+    Return True if data is an audit batch.
+    데이터가 감사 배치이면 True를 반환합니다.
+    """
+    return data[:len(MAGIC)] == MAGIC
+
+
+def decode_batch(data):
+    """
+    Decode an audit batch.
+    감사 배치를 디코딩합니다.
+
+    Returns:
+        tuple: (door_id, [(at, event, passwd), ...])
+              (door_id, [(at, event, passwd), ...])
+
+    Raises:
+        ValueError: If data is not a valid batch
+                   데이터가 유효한 배치가 아닌 경우
+    """
+    if not is_batch(data):
+        raise ValueError("Not an audit batch")
+    try:
+        body = json.loads(zlib.decompress(data[len(MAGIC):]))
+    except zlib.error as e:
+        raise ValueError(f"Corrupt audit batch: {e}")
+    try:
+        return body['door'], [tuple(e) for e in body['events']]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Malformed audit batch: {e!r}")
+
+
+class AuditStream:
+    """
+    Door-side audit buffer with batched, spooled publishing.
+    배치 게시와 스풀링을 갖춘 도어 측 감사 버퍼입니다.
+
+    record() is cheap and never blocks on the network. Repeats of the same
+    event for the same key within dedupe_seconds are dropped, since a code
+    held in front of the camera is seen on every frame.
+    record()는 가볍고 네트워크 때문에 차단되지 않습니다. 카메라 앞에 놓인 코드는
+    매 프레임마다 보이므로, dedupe_seconds 안에 같은 키로 반복된 같은 이벤트는
+    버립니다.
+
+    Attributes:
+        recorded (int): Events recorded
+                       기록된 이벤트 수
+        overflowed (int): Events lost because the ring buffer was full
+                         링 버퍼가 가득 차서 잃어버린 이벤트 수
+        published (int): Batches published
+                        게시된 배치 수
+        spooled (int): Batches written to the spool
+                      스풀에 기록된 배치 수
+        spool_dropped (int): Batches lost because the spool was full
+                            스풀이 가득 차서 잃어버린 배치 수
+    """
+
+    def __init__(self, door_id, publish, spool_path=SPOOL_PATH, capacity=10000,
+                 batch_size=200, max_delay=5.0, dedupe_seconds=5.0,
+                 max_spool_bytes=8 * 1024 * 1024):
+        """
+        Initialize AuditStream instance.
+        AuditStream 인스턴스를 초기화합니다.
+
+        Args:
+            door_id (str): Door recording the events
+                          이벤트를 기록하는 도어
+            publish (callable): publish(data) sends one batch, raising on failure
+                               publish(data)는 배치 하나를 전송하며, 실패 시 예외 발생
+            spool_path (str): File for batches kept while offline
+                             오프라인 동안 배치를 보관할 파일
+            capacity (int): Events held in memory (defaults to 10000)
+                           메모리에 보관할 이벤트 수 (기본값: 10000)
+            batch_size (int): Events per batch (defaults to 200)
+                             배치당 이벤트 수 (기본값: 200)
+            max_delay (float): Seconds an event may wait for a full batch
+                              이벤트가 배치가 차기를 기다리는 최대 시간 (초)
+            dedupe_seconds (float): Window for dropping repeated events
+                                   반복 이벤트를 버리는 시간 범위
+            max_spool_bytes (int): Spool size cap (defaults to 8 MB)
+                                  스풀 크기 상한 (기본값: 8MB)
+        """
+        self.door_id = door_id
+        self.publish = publish
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.dedupe_seconds = dedupe_seconds
+        self.max_spool_bytes = max_spool_bytes
+
+        self.recorded = 0
+        self.overflowed = 0
+        self.published = 0
+        self.spooled = 0
+        self.spool_dropped = 0
+
+        self._events = deque(maxlen=capacity)
+        self._last_seen = {}
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def record(self, event, passwd=None, at=None):
+        """
+        Record one event.
+        이벤트 하나를 기록합니다.
+
+        Args:
+            event (str): UNLOCK or REJECT
+                        UNLOCK 또는 REJECT
+            passwd (str): Key involved, if known
+                         관련된 키, 알려진 경우
+            at (float): Epoch seconds (defaults to now)
+                       epoch 초 (기본값: 현재)
+
+        Returns:
+            bool: False if the event repeated a recent one and was dropped
+                 최근 이벤트의 반복이라 버려졌으면 False
+        """
+        now = time.monotonic()
+        with self._cond:
+            seen = self._last_seen.get((event, passwd))
+            if seen is not None and now - seen < self.dedupe_seconds:
+                return False
+            if len(self._last_seen) > 1024:
+                self._last_seen = {k: t for k, t in self._last_seen.items()
+                                   if now - t < self.dedupe_seconds}
+            self._last_seen[(event, passwd)] = now
+
+            if len(self._events) == self._events.maxlen:
+                self.overflowed += 1
+            self._events.append((round(time.time() if at is None else at, 3), event, passwd))
+            self.recorded += 1
+            if len(self._events) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def _spool(self, batch):
+        """
+        Append a batch to the spool file, unless the spool is full.
+        스풀이 가득 차지 않았으면 배치를 스풀 파일에 추가합니다.
+        """
+        try:
+            size = os.path.getsize(self.spool_path)
+        except OSError:
+            size = 0
+        if size + _LENGTH.size + len(batch) > self.max_spool_bytes:
+            self.spool_dropped += 1
+            return
+        with open(self.spool_path, 'ab') as f:
+            f.write(_LENGTH.pack(len(batch)) + batch)
+        self.spooled += 1
+
+    def _drain_spool(self):
+        """
+        Publish spooled batches oldest first, keeping any that still fail.
+        스풀된 배치를 오래된 것부터 게시하며, 여전히 실패하는 배치는 남겨 둡니다.
+
+        Returns:
+            bool: True if the spool is empty afterwards
+                 이후 스풀이 비어 있으면 True
+        """
+        try:
+            with open(self.spool_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return True
+
+        offset = 0
+        try:
+            while offset + _LENGTH.size <= len(data):
+                length, = _LENGTH.unpack_from(data, offset)
+                batch = data[offset + _LENGTH.size:offset + _LENGTH.size + length]
+                if len(batch) < length:
+                    break
+                self.publish(batch)
+                self.published += 1
+                offset += _LENGTH.size + length
+        except Exception:
+            # Keep the unsent tail for the next attempt
+            # 전송되지 않은 나머지는 다음 시도를 위해 보관
+            tmp_path = self.spool_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data[offset:])
+            os.replace(tmp_path, self.spool_path)
+            return False
+
+        os.remove(self.spool_path)
+        return True
+
+    def flush(self):
+        """
+        Publish every buffered event now, spooling batches that fail.
+        버퍼된 모든 이벤트를 지금 게시하며, 실패한 배치는 스풀에 저장합니다.
+
+        Returns:
+            int: Number of events flushed
+                내보낸 이벤트 수
+        """
+        with self._cond:
+            events = list(self._events)
+            self._events.clear()
+
+        online = self._drain_spool()
+        for start in range(0, len(events), self.batch_size):
+            batch = encode_batch(self.door_id, events[start:start + self.batch_size])
+            if online:
+                try:
+                    self.publish(batch)
+                    self.published += 1
+                    continue
+                except Exception:
+                    online = False
+            self._spool(batch)
+        return len(events)
+
+    def start(self):
+        """
+        Start the background flusher thread.
+        백그라운드 플러셔 스레드를 시작합니다.
+        """
+        self._running = True
+
+        def run():
+            while True:
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: not self._running or len(self._events) >= self.batch_size,
+                        self.max_delay,
+                    )
+                    running = self._running
+                self.flush()
+                if not running:
+                    break
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """
+        Stop the flusher after a last flush.
+        마지막으로 내보낸 뒤 플러셔를 중지합니다.
+        """
+        if self._thread is not None:
+            with self._cond:
+                self._running = False
+                self._cond.notify()
+            self._thread.join()
+            self._thread = None
+        else:
+            self.flush()
+
+    def stats(self):
+        """
+        Summarize the stream's counters.
+        스트림의 카운터를 요약합니다.
+
+        Returns:
+            dict: recorded, buffered, overflowed, published, spooled, spool_dropped
+                 기록, 버퍼, 넘침, 게시, 스풀, 스풀 손실 수
+        """
+        with self._cond:
+            buffered = len(self._events)
+        return {
+            'recorded': self.recorded,
+            'buffered': buffered,
+            'overflowed': self.overflowed,
+            'published': self.published,
+            'spooled': self.spooled,
+            'spool_dropped': self.spool_dropped,
+        }
+
+
+def open_stream(project_id, topic_name, door_id, spool_path=SPOOL_PATH, publisher=None):
+    """
+    Start an audit stream that publishes to a Pub/Sub topic.
+    Pub/Sub 토픽에 게시하는 감사 스트림을 시작합니다.
+
+    Args:
+        publisher (PublisherClient): Client to share between doors (optional)
+                                    도어 간에 공유할 클라이언트 (선택 사항)
+
+    Returns:
+        AuditStream: Started stream
+                    시작된 스트림
+    """
+    if publisher is None:
+        from google.cloud import pubsub_v1
+        publisher = pubsub_v1.PublisherClient()
+    topic_path = publisher.topic_path(project_id, topic_name)
+
+    def publish(data):
+        publisher.publish(topic_path, data=data).result(timeout=30)
+
+    return AuditStream(door_id, publish, spool_path).start()
+
+
+def store_batch(registry, data):
+    """
+    Bulk-insert one audit batch into the registry.
+    감사 배치 하나를 레지스트리에 일괄 삽입합니다.
+
+    Returns:
+        int: Number of events stored
+            저장된 이벤트 수
+    """
+    door_id, events = decode_batch(data)
+    registry.add_events((at, door_id, event, passwd) for at, event, passwd in events)
+    return len(events)
+
+
+def serve(project_id, subscription_name, registry):
+    """
+    Store door audit batches from a Pub/Sub subscription until interrupted.
+    중단될 때까지 Pub/Sub 구독의 도어 감사 배치를 저장합니다.
+
+    Args:
+        project_id (str): Google Cloud project ID
+                         Google Cloud 프로젝트 ID
+        subscription_name (str): Subscription on the doors' audit topic
+                                도어 감사 토픽의 구독
+        registry (KeyRegistry): Registry to store events in
+                               이벤트를 저장할 레지스트리
+    """
+    from google.cloud import pubsub_v1
+
+    subscriber_client = pubsub_v1.SubscriberClient()
+    subscription_path = subscriber_client.subscription_path(project_id, subscription_name)
+
+    def callback(message):
+        try:
+            stored = store_batch(registry, message.data)
+            print(f"Stored {stored} audit event(s)")
+        except ValueError as e:
+            print(f"Dropped audit message {message.message_id}: {e}")
+        message.ack()
+
+    streaming_pull_future = subscriber_client.subscribe(subscription_path, callback=callback)
+    print("Storing audit events from {}..".format(subscription_path))
+    try:
+        streaming_pull_future.result()
+    except KeyboardInterrupt:
+        streaming_pull_future.cancel()
+    subscriber_client.close()
+
+
+if __name__ == "__main__":
+    import config as cfg
+    import registry as reg
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--serve", action="store_true", help="Store door audit batches")
+    args = parser.parse_args()
+
+    if args.serve:
+        registry = reg.KeyRegistry(getattr(cfg, 'registry_path', reg.REGISTRY_PATH))
+        try:
+            serve(cfg.project_id, cfg.audit_subscription, registry)
+        finally:
+            registry.close()
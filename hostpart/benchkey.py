@@ -0,0 +1,120 @@
+"""
+Key Payload Benchmark
+키 페이로드 벤치마크
+
+Compares the JSON and compact key payloads: QR version, payload length,
+QR decode time and payload parse time.
+JSON 키 페이로드와 간결한 키 페이로드의 QR 버전, 페이로드 길이,
+QR 디코딩 시간 및 페이로드 파싱 시간을 비교합니다.
+
+Usage / 사용법:
+    python3 benchkey.py [--rounds N]
+"""
+
+import argparse
+import datetime
+import io
+import json
+import timeit
+import numpy as np
+import qrcode
+from bson import ObjectId
+from PIL import Image
+import keycodec
+
+
+def sample_key():
+    """
+    Build a key dictionary shaped like DoorKey's output.
+    DoorKey 출력과 같은 형태의 키 딕셔너리를 생성합니다.
+    """
+    start = datetime.datetime.now()
+    end = start + datetime.timedelta(minutes=10)
+    return {
+        'doorID': 'doorlens-main-entrance',
+        'passwd': str(ObjectId()),
+        'start': start.strftime(keycodec.TIME_FORMAT),
+        'end': end.strftime(keycodec.TIME_FORMAT)
+    }
+
+
+def load_decoder():
+    """
+    Return the door's QR decoder, or OpenCV's when zbar is unavailable.
+    도어의 QR 디코더를 반환하며, zbar를 사용할 수 없으면 OpenCV 디코더를 반환합니다.
+
+    Returns:
+        tuple: (name, decode) where decode(gray_array) returns the text
+              (이름, decode) - decode(gray_array)는 텍스트를 반환
+    """
+    try:
+        import pyzbar.pyzbar as pyzbar
+        return "pyzbar", lambda gray: pyzbar.decode(gray)[0].data.decode("utf-8")
+    except ImportError:
+        import cv2
+        detector = cv2.QRCodeDetector()
+        return "cv2.QRCodeDetector", lambda gray: detector.detectAndDecode(gray)[0]
+
+
+def measure(label, payload, parse, decode, rounds):
+    """
+    Render one payload and time decoding and parsing it.
+    페이로드 하나를 렌더링하고 디코딩 및 파싱 시간을 측정합니다.
+
+    Returns:
+        dict: Benchmark results for the payload
+             페이로드의 벤치마크 결과
+    """
+    qr = qrcode.QRCode(border=4)
+    qr.add_data(payload)
+    qr.make(fit=True)
+
+    buffer = io.BytesIO()
+    qr.make_image().save(buffer, format="PNG")
+    gray = np.array(Image.open(io.BytesIO(buffer.getvalue())).convert("L"))
+
+    if decode(gray) != payload:
+        raise RuntimeError(f"{label}: decoded payload does not match")
+
+    decode_s = timeit.timeit(lambda: decode(gray), number=rounds) / rounds
+    parse_s = timeit.timeit(lambda: parse(payload), number=rounds * 10) / (rounds * 10)
+
+    return {
+        'format': label,
+        'chars': len(payload),
+        'version': qr.version,
+        'modules': qr.modules_count,
+        'decode_ms': decode_s * 1000,
+        'parse_us': parse_s * 1e6,
+    }
+
+
+def main(rounds=50):
+    """
+    Run the benchmark and print a comparison table.
+    벤치마크를 실행하고 비교 표를 출력합니다.
+    """
+    key = sample_key()
+    name, decode = load_decoder()
+
+    results = [
+        measure("json", json.dumps(key), keycodec.decode_payload, decode, rounds),
+        measure("compact", keycodec.encode_compact(key), keycodec.decode_payload, decode, rounds),
+    ]
+
+    print(f"QR decoder: {name}, rounds: {rounds}")
+    print(f"{'format':<8} {'chars':>6} {'version':>8} {'modules':>8} {'decode ms':>10} {'parse us':>9}")
+    for r in results:
+        print(f"{r['format']:<8} {r['chars']:>6} {r['version']:>8} {r['modules']:>8} "
+              f"{r['decode_ms']:>10.3f} {r['parse_us']:>9.2f}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=50, help="Decode rounds per format")
+    args = parser.parse_args()
+
+    main(args.rounds)
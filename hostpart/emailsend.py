@@ -2,11 +2,16 @@
 Email Sender Module
 이메일 전송 모듈
 
-Sends QR code key images to users via Gmail SMTP.
-Gmail SMTP를 통해 사용자에게 QR 코드 키 이미지를 전송합니다.
+Sends QR code key images to users via Gmail SMTP. Bulk senders share an
+SMTPPool so one authenticated session carries many messages.
+Gmail SMTP를 통해 사용자에게 QR 코드 키 이미지를 전송합니다. 대량 전송 시
+SMTPPool을 공유하여 인증된 세션 하나로 여러 메시지를 보냅니다.
 """
 
 import smtplib
+import queue
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email.mime.image import MIMEImage
@@ -14,35 +19,306 @@ from email import encoders
 import io
 import config as cfg
 
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
 
-def key_sender(key_path, owner_address):
+
+def _reply_codes(error):
     """
-    Send QR code key image to user via email.
-    이메일을 통해 사용자에게 QR 코드 키 이미지를 전송합니다.
+    Return the SMTP reply codes carried by an error, or () if it has none.
+    오류에 담긴 SMTP 응답 코드를 반환하며, 없으면 ()를 반환합니다.
+    """
+    if isinstance(error, smtplib.SMTPResponseException):
+        return (error.smtp_code,)
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return tuple(code for code, _ in error.recipients.values())
+    return ()
 
-    Args:
-        key_path (str): Path to the QR code image file
-                       QR 코드 이미지 파일 경로
-        owner_address (str): Email address of the recipient
-                            수신자의 이메일 주소
 
-    Raises:
-        SMTPException: If email sending fails
-                      이메일 전송이 실패할 경우
+def is_permanent(error):
     """
-    # Connect to Gmail SMTP server
-    # Gmail SMTP 서버에 연결
-    server = smtplib.SMTP(host="smtp.gmail.com", port=587)
-    server.ehlo()
+    Return True if the server refused the message with a 5xx reply.
+    서버가 5xx 응답으로 메시지를 거부했으면 True를 반환합니다.
+
+    Sending it again (bad recipient, rejected message) cannot succeed.
+    다시 전송해도(잘못된 수신자, 거부된 메시지) 성공할 수 없습니다.
+    """
+    codes = _reply_codes(error)
+    return bool(codes) and all(code >= 500 for code in codes)
+
+
+def is_transient(error):
+    """
+    Return True if a send may succeed on a fresh session.
+    새 세션에서 전송이 성공할 수 있으면 True를 반환합니다.
+
+    That is a dropped connection, a socket error or a 4xx reply.
+    끊긴 연결, 소켓 오류 또는 4xx 응답이 해당합니다.
+    """
+    codes = _reply_codes(error)
+    if codes:
+        return all(400 <= code < 500 for code in codes)
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # smtplib errors are OSErrors too; only plain socket errors count here
+    # smtplib 오류도 OSError이므로, 여기서는 순수 소켓 오류만 해당
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPPool:
+    """
+    Pool of reusable, authenticated SMTP sessions.
+    재사용 가능한 인증된 SMTP 세션 풀입니다.
+
+    Each session runs ehlo/starttls/login once and then sends many messages.
+    After a transient failure (is_transient) the session is discarded and
+    the message is retried once on a fresh connection; a 5xx refusal is
+    raised at once. Sessions are retired after max_messages sends, since
+    providers cap messages per connection.
+    각 세션은 ehlo/starttls/login을 한 번만 수행한 뒤 여러 메시지를 전송합니다.
+    일시적인 실패(is_transient) 후에는 세션을 버리고 새 연결에서 메시지를 한 번
+    재시도하며, 5xx 거부는 즉시 예외로 전달합니다. 제공자가 연결당 메시지 수를
+    제한하므로 max_messages번 전송한 세션은 교체합니다.
+
+    Attributes:
+        host (str): SMTP server address
+                   SMTP 서버 주소
+        port (int): SMTP server port
+                   SMTP 서버 포트
+        size (int): Maximum number of open sessions
+                   최대 열린 세션 수
+        sent (int): Messages sent successfully
+                   성공적으로 전송된 메시지 수
+        failed (int): Messages that could not be sent
+                     전송하지 못한 메시지 수
+        connects (int): Sessions opened so far
+                       지금까지 연 세션 수
+        reconnects (int): Sends retried on a fresh session
+                         새 세션에서 재시도한 전송 수
+    """
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, username=None, password=None,
+                 starttls=True, size=4, max_messages=100):
+        """
+        Initialize SMTPPool instance.
+        SMTPPool 인스턴스를 초기화합니다.
+
+        Args:
+            host (str): SMTP server address (defaults to Gmail)
+                       SMTP 서버 주소 (기본값: Gmail)
+            port (int): SMTP server port (defaults to 587)
+                       SMTP 서버 포트 (기본값: 587)
+            username (str): Login name; no login when None
+                           로그인 이름, None이면 로그인하지 않음
+            password (str): Login password
+                           로그인 비밀번호
+            starttls (bool): Upgrade to TLS before login (defaults to True)
+                            로그인 전 TLS로 전환할지 여부 (기본값: True)
+            size (int): Maximum open sessions (defaults to 4)
+                       최대 열린 세션 수 (기본값: 4)
+            max_messages (int): Messages per session before it is replaced
+                               교체 전 세션당 메시지 수
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.max_messages = max_messages
+
+        self.sent = 0
+        self.failed = 0
+        self.connects = 0
+        self.reconnects = 0
+
+        # Idle sessions as [server, messages_sent]; most recently used first
+        # 유휴 세션 [server, 전송한 메시지 수], 가장 최근 사용한 것이 먼저
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._first_send = None
+        self._last_send = None
+
+    def _connect(self):
+        """
+        Open one authenticated session.
+        인증된 세션 하나를 엽니다.
+        """
+        server = smtplib.SMTP(host=self.host, port=self.port)
+        server.ehlo()
+
+        # Start TLS encryption and log in
+        # TLS 암호화 시작 및 로그인
+        if self.starttls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+
+        with self._lock:
+            self.connects += 1
+        return [server, 0]
+
+    @staticmethod
+    def _discard(session):
+        try:
+            session[0].quit()
+        except (smtplib.SMTPException, OSError):
+            session[0].close()
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, session):
+        if session is not None:
+            if session[1] >= self.max_messages:
+                self._discard(session)
+            else:
+                self._idle.put(session)
+        self._slots.release()
+
+    def send(self, from_addr, to_addrs, msg):
+        """
+        Send one message over a pooled session.
+        풀의 세션으로 메시지 하나를 전송합니다.
+
+        Args:
+            from_addr (str): Sender address
+                            발신자 주소
+            to_addrs (str): Recipient address(es)
+                           수신자 주소
+            msg (str): Full message text
+                      전체 메시지 텍스트
+
+        Raises:
+            SMTPException: If the server refuses the message (5xx), or if
+                           sending fails on a fresh session too
+                          서버가 메시지를 거부하거나(5xx), 새 세션에서도 전송이
+                          실패할 경우
+        """
+        started = time.monotonic()
+        session = self._acquire()
+        try:
+            try:
+                session[0].sendmail(from_addr=from_addr, to_addrs=to_addrs, msg=msg)
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                # Stale or broken session: replace it and retry once
+                # 오래되었거나 끊긴 세션: 교체 후 한 번 재시도
+                self._discard(session)
+                session = None
+                with self._lock:
+                    self.reconnects += 1
+                session = self._connect()
+                session[0].sendmail(from_addr=from_addr, to_addrs=to_addrs, msg=msg)
+            session[1] += 1
+        except Exception as e:
+            # A refused message leaves the session usable
+            # 거부된 메시지는 세션을 사용 가능한 상태로 남김
+            if session is not None and not is_permanent(e):
+                self._discard(session)
+                session = None
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            self._release(session)
+
+        with self._lock:
+            self.sent += 1
+            if self._first_send is None:
+                self._first_send = started
+            self._last_send = time.monotonic()
 
-    # Start TLS encryption
-    # TLS 암호화 시작
-    server.starttls()
+    def stats(self):
+        """
+        Summarize sends, sessions and throughput.
+        전송, 세션 및 처리량을 요약합니다.
 
-    # Login with Gmail credentials from config
-    # config의 Gmail 인증 정보로 로그인
-    server.login(cfg.email_id, cfg.email_passwd)
+        Returns:
+            dict: sent, failed, connects, reconnects, idle, messages_per_sec
+                 전송, 실패, 연결, 재연결, 유휴 세션 수, 초당 메시지 수
+        """
+        with self._lock:
+            elapsed = (self._last_send - self._first_send) if self.sent else 0.0
+            return {
+                'sent': self.sent,
+                'failed': self.failed,
+                'connects': self.connects,
+                'reconnects': self.reconnects,
+                'idle': self._idle.qsize(),
+                'messages_per_sec': self.sent / elapsed if elapsed > 0 else 0.0,
+            }
 
+    def close(self):
+        """
+        Close every idle session.
+        모든 유휴 세션을 닫습니다.
+        """
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Pool shared by bulk senders, created on first use
+# 대량 전송자가 공유하는 풀, 처음 사용할 때 생성
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return the shared Gmail SMTPPool built from config.
+    config로 생성한 공유 Gmail SMTPPool을 반환합니다.
+
+    Returns:
+        SMTPPool: Pool logged in with cfg.email_id
+                 cfg.email_id로 로그인하는 풀
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPPool(username=cfg.email_id, password=cfg.email_passwd)
+        return _pool
+
+
+def build_message(key_path, owner_address, key_bytes=None):
+    """
+    Build the key email with the QR code attached.
+    QR 코드를 첨부한 키 이메일을 생성합니다.
+
+    Args:
+        key_path (str): Path to the QR code image file, or only the
+                        attachment file name when key_bytes is given
+                       QR 코드 이미지 파일 경로, key_bytes가 주어지면
+                       첨부 파일 이름으로만 사용
+        owner_address (str): Email address of the recipient
+                            수신자의 이메일 주소
+        key_bytes (bytes): In-memory PNG data; skips reading key_path
+                          메모리의 PNG 데이터, key_path 읽기를 생략
+
+    Returns:
+        MIMEBase: Multipart message ready to send
+                 전송할 준비가 된 멀티파트 메시지
+    """
     # Create multipart message
     # 멀티파트 메시지 생성
     msg = MIMEBase('multipart', 'mixed')
@@ -54,23 +330,53 @@ def key_sender(key_path, owner_address):
     # 메시지에 텍스트 본문 추가
     msg.attach(MIMEText("Please use below key."))
 
-    # Attach QR code image file
-    # QR 코드 이미지 파일 첨부
-    with open(key_path, 'rb') as f:
-        part = MIMEBase("application", "octet-stream")
-        part.set_payload(f.read())
-        encoders.encode_base64(part)
-        part.add_header("Content-Disposition", 'attachment', filename=key_path)
-        msg.attach(part)
-
-    # Send email
-    # 이메일 전송
-    server.sendmail(
-        from_addr=msg['From'],
-        to_addrs=msg['To'],
-        msg=msg.as_string()
-    )
-
-    # Close server connection
-    # 서버 연결 종료
-    server.quit()
+    # Read QR code image file unless it was rendered in memory
+    # 메모리에서 렌더링되지 않은 경우 QR 코드 이미지 파일 읽기
+    if key_bytes is None:
+        with open(key_path, 'rb') as f:
+            key_bytes = f.read()
+
+    # Attach QR code image
+    # QR 코드 이미지 첨부
+    part = MIMEBase("application", "octet-stream")
+    part.set_payload(key_bytes)
+    encoders.encode_base64(part)
+    part.add_header("Content-Disposition", 'attachment', filename=key_path)
+    msg.attach(part)
+
+    return msg
+
+
+def key_sender(key_path, owner_address, key_bytes=None, pool=None):
+    """
+    Send QR code key image to user via email.
+    이메일을 통해 사용자에게 QR 코드 키 이미지를 전송합니다.
+
+    Args:
+        key_path (str): Path to the QR code image file, or only the
+                        attachment file name when key_bytes is given
+                       QR 코드 이미지 파일 경로, key_bytes가 주어지면
+                       첨부 파일 이름으로만 사용
+        owner_address (str): Email address of the recipient
+                            수신자의 이메일 주소
+        key_bytes (bytes): In-memory PNG data; skips reading key_path
+                          메모리의 PNG 데이터, key_path 읽기를 생략
+        pool (SMTPPool): Session pool to send through; without one a
+                         single-use Gmail session is opened and closed
+                        전송에 사용할 세션 풀, 없으면 일회용 Gmail 세션을
+                        열고 닫음
+
+    Raises:
+        SMTPException: If email sending fails
+                      이메일 전송이 실패할 경우
+    """
+    msg = build_message(key_path, owner_address, key_bytes)
+
+    if pool is not None:
+        pool.send(msg['From'], msg['To'], msg.as_string())
+        return
+
+    # Single message: connect, send and close
+    # 단일 메시지: 연결, 전송 후 종료
+    with SMTPPool(username=cfg.email_id, password=cfg.email_passwd, size=1) as single:
+        single.send(msg['From'], msg['To'], msg.as_string())
@@ -0,0 +1,487 @@
+"""
+Key Payload Codec Module
+키 페이로드 코덱 모듈
+
+Compact, versioned encoding of door keys for QR codes. Shared by the host
+(DoorKey) and the door (rasberryQR.validate_key), like logger.py.
+QR 코드용 도어 키의 간결한 버전 관리 인코딩입니다. logger.py처럼 호스트
+(DoorKey)와 도어(rasberryQR.validate_key)가 함께 사용합니다.
+
+Layout of version 1 before base45 text encoding:
+base45 텍스트 인코딩 전 버전 1의 구조:
+
+    version (1) | flags (1) | start (4) | end (4) | door_len (1) | door_id
+    | passwd (12 raw ObjectId bytes, or 1 byte length + UTF-8)
+
+start and end are the door's wall-clock window counted as if it were UTC
+(see to_epoch()), so they do not depend on the host's or door's time zone.
+start와 end는 도어의 벽시계 유효 기간을 UTC로 간주하여 센 값이므로(to_epoch()
+참고) 호스트나 도어의 시간대에 좌우되지 않습니다.
+
+Pre-minted keys set FLAG_UNBOUND and leave start and end at zero; their
+window comes from the activation message the door stores in keyinfo.json.
+미리 발급된 키는 FLAG_UNBOUND를 설정하고 시작과 종료를 0으로 둡니다. 유효
+기간은 도어가 keyinfo.json에 저장하는 활성화 메시지에서 가져옵니다.
+
+Version 2 is the same layout followed by a 16 byte HMAC-SHA256 tag over
+everything before it. A door holding the shared secret can verify such a
+key on its own, without the key ever being published to it.
+버전 2는 같은 구조 뒤에 앞부분 전체에 대한 16바이트 HMAC-SHA256 태그가
+붙습니다. 공유 비밀 키를 가진 도어는 키를 전달받지 않고도 스스로 검증할 수
+있습니다.
+
+Base45 output only uses the QR alphanumeric character set, so the QR
+encoder picks alphanumeric mode and a lower version than for JSON.
+Base45 출력은 QR 영숫자 문자 집합만 사용하므로 QR 인코더가 영숫자 모드를
+선택하며 JSON보다 낮은 버전이 사용됩니다.
+"""
+
+import calendar
+import hashlib
+import hmac
+import json
+import struct
+import time
+from datetime import datetime, timezone
+
+# Time format used by keyinfo.json and JSON keys
+# keyinfo.json과 JSON 키에서 사용하는 시간 형식
+TIME_FORMAT = "%Y-%m-%d, %H:%M:%S"
+
+# Prefix marking a compact payload; itself valid base45 text
+# 간결한 페이로드를 나타내는 접두사, 그 자체도 유효한 base45 텍스트
+PREFIX = "DL"
+
+VERSION = 1
+SIGNED_VERSION = 2
+
+# Length of the truncated HMAC-SHA256 tag on signed keys
+# 서명된 키의 잘린 HMAC-SHA256 태그 길이
+TAG_SIZE = 16
+
+# Flag bit: passwd is stored as 12 raw ObjectId bytes
+# 플래그 비트: passwd가 12바이트 ObjectId 원시 바이트로 저장됨
+FLAG_OBJECTID = 0x01
+
+# Flag bit: pre-minted key whose window is bound later by activation
+# 플래그 비트: 유효 기간이 나중에 활성화로 정해지는 미리 발급된 키
+FLAG_UNBOUND = 0x02
+
+_HEADER = struct.Struct(">BBII")
+
+# RFC 9285 base45 alphabet
+# RFC 9285 base45 알파벳
+BASE45_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+_BASE45_INDEX = {c: i for i, c in enumerate(BASE45_ALPHABET)}
+
+
+def b45encode(data):
+    """
+    Encode bytes as base45 text.
+    바이트를 base45 텍스트로 인코딩합니다.
+
+    Args:
+        data (bytes): Raw bytes
+                     원시 바이트
+
+    Returns:
+        str: Base45 text
+            Base45 텍스트
+    """
+    out = []
+    for i in range(0, len(data) - 1, 2):
+        n = data[i] * 256 + data[i + 1]
+        n, c = divmod(n, 45)
+        e, d = divmod(n, 45)
+        out.append(BASE45_ALPHABET[c] + BASE45_ALPHABET[d] + BASE45_ALPHABET[e])
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        out.append(BASE45_ALPHABET[c] + BASE45_ALPHABET[d])
+    return "".join(out)
+
+
+def b45decode(text):
+    """
+    Decode base45 text to bytes.
+    base45 텍스트를 바이트로 디코딩합니다.
+
+    Raises:
+        ValueError: If the text is not valid base45
+                   텍스트가 유효한 base45가 아닐 경우
+    """
+    try:
+        values = [_BASE45_INDEX[c] for c in text]
+    except KeyError:
+        raise ValueError("Invalid base45 character")
+
+    out = bytearray()
+    for i in range(0, len(values), 3):
+        chunk = values[i:i + 3]
+        if len(chunk) == 3:
+            n = chunk[0] + chunk[1] * 45 + chunk[2] * 45 * 45
+            if n > 0xFFFF:
+                raise ValueError("Invalid base45 chunk")
+            out += n.to_bytes(2, "big")
+        elif len(chunk) == 2:
+            n = chunk[0] + chunk[1] * 45
+            if n > 0xFF:
+                raise ValueError("Invalid base45 chunk")
+            out.append(n)
+        else:
+            raise ValueError("Invalid base45 length")
+    return bytes(out)
+
+
+def to_epoch(time_string):
+    """
+    Convert a TIME_FORMAT time to the seconds stored in compact payloads.
+    TIME_FORMAT 시간을 간결한 페이로드에 저장되는 초로 변환합니다.
+
+    Key windows are wall-clock times at the door, with no time zone. They are
+    counted as if that wall clock were UTC, so the same text gives the same
+    seconds on a host and a door in different time zones.
+    키 유효 기간은 시간대 없는 도어의 벽시계 시간입니다. 이 벽시계를 UTC로
+    간주하여 세므로, 시간대가 다른 호스트와 도어에서도 같은 텍스트는 같은 초가
+    됩니다.
+
+    Args:
+        time_string (str): Time in TIME_FORMAT
+                          TIME_FORMAT 형식의 시간
+
+    Returns:
+        int: Wall-clock seconds
+            벽시계 초
+
+    Raises:
+        ValueError: If the time is not in TIME_FORMAT
+                   시간이 TIME_FORMAT 형식이 아닐 경우
+    """
+    return calendar.timegm(datetime.strptime(time_string, TIME_FORMAT).timetuple())
+
+
+def from_epoch(seconds):
+    """
+    Convert wall-clock seconds from to_epoch() back to TIME_FORMAT text.
+    to_epoch()의 벽시계 초를 TIME_FORMAT 텍스트로 되돌립니다.
+    """
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime(TIME_FORMAT)
+
+
+def wall_clock(now=None):
+    """
+    Return the local wall-clock time in the seconds of to_epoch().
+    to_epoch()와 같은 초 단위로 현재 지역 벽시계 시간을 반환합니다.
+
+    Args:
+        now (float): Epoch time (defaults to time.time())
+                    에포크 시간 (기본값: time.time())
+
+    Returns:
+        float: Wall-clock seconds, comparable with a key's start and end
+              키의 시작 및 종료와 비교할 수 있는 벽시계 초
+    """
+    if now is None:
+        now = time.time()
+    return calendar.timegm(time.localtime(now)) + now % 1
+
+
+def _length_prefixed(data, field):
+    # One length byte, so fields are limited to 255 bytes
+    # 길이 바이트가 하나이므로 필드는 255바이트로 제한됨
+    if len(data) > 0xFF:
+        raise ValueError(f"{field} is longer than 255 bytes")
+    return bytes([len(data)]) + data
+
+
+def _pack(version, key_info, flags=0):
+    """
+    Pack key fields into the binary layout shared by versions 1 and 2.
+    버전 1과 2가 공유하는 바이너리 구조로 키 필드를 패킹합니다.
+
+    Raises:
+        ValueError: If doorID or a non-ObjectId passwd is over 255 bytes
+                   doorID 또는 ObjectId가 아닌 passwd가 255바이트를 넘을 경우
+    """
+    door_id = key_info['doorID'].encode("utf-8")
+    passwd = key_info['passwd']
+
+    if flags & FLAG_UNBOUND:
+        start = end = 0
+    else:
+        start, end = to_epoch(key_info['start']), to_epoch(key_info['end'])
+
+    try:
+        # ObjectId strings are 24 hex digits: store the 12 raw bytes
+        # ObjectId 문자열은 16진수 24자리: 12바이트 원시 값으로 저장
+        if len(passwd) != 24:
+            raise ValueError
+        passwd_bytes = bytes.fromhex(passwd)
+        if passwd_bytes.hex() != passwd:
+            raise ValueError
+        flags |= FLAG_OBJECTID
+    except ValueError:
+        passwd_bytes = _length_prefixed(passwd.encode("utf-8"), "passwd")
+
+    return (
+        _HEADER.pack(version, flags, start, end)
+        + _length_prefixed(door_id, "doorID")
+        + passwd_bytes
+    )
+
+
+def _unpack(payload):
+    """
+    Unpack the binary layout shared by versions 1 and 2.
+    버전 1과 2가 공유하는 바이너리 구조를 언패킹합니다.
+
+    Returns:
+        tuple: (version, flags, start, end, door_id, passwd, offset) where
+               offset is the number of bytes consumed
+              (버전, 플래그, 시작, 종료, 도어 ID, 비밀번호, 소비된 바이트 수)
+
+    Raises:
+        ValueError: If the payload is truncated
+                   페이로드가 잘렸을 경우
+    """
+    try:
+        version, flags, start, end = _HEADER.unpack_from(payload)
+
+        offset = _HEADER.size
+        door_len = payload[offset]
+        door_id = payload[offset + 1:offset + 1 + door_len].decode("utf-8")
+        offset += 1 + door_len
+
+        if flags & FLAG_OBJECTID:
+            passwd = payload[offset:offset + 12].hex()
+            offset += 12
+        else:
+            passwd_len = payload[offset]
+            passwd = payload[offset + 1:offset + 1 + passwd_len].decode("utf-8")
+            offset += 1 + passwd_len
+    except (struct.error, IndexError, UnicodeDecodeError):
+        raise ValueError("Truncated key payload")
+
+    return version, flags, start, end, door_id, passwd, offset
+
+
+def _key_dict(door_id, passwd, start, end, flags=0, epochs=False):
+    if flags & FLAG_UNBOUND:
+        start = end = None
+    elif not epochs:
+        start, end = from_epoch(start), from_epoch(end)
+    return {
+        'doorID': door_id,
+        'passwd': passwd,
+        'start': start,
+        'end': end
+    }
+
+
+def encode_compact(key_info):
+    """
+    Encode a key dictionary as a compact QR payload.
+    키 딕셔너리를 간결한 QR 페이로드로 인코딩합니다.
+
+    Args:
+        key_info (dict): Key with doorID, passwd, start and end
+                        doorID, passwd, start, end를 가진 키
+
+    Returns:
+        str: Base45 payload starting with PREFIX
+            PREFIX로 시작하는 base45 페이로드
+
+    Raises:
+        ValueError: If doorID or a non-ObjectId passwd is over 255 bytes
+                   doorID 또는 ObjectId가 아닌 passwd가 255바이트를 넘을 경우
+    """
+    return PREFIX + b45encode(_pack(VERSION, key_info))
+
+
+def decode_compact(text, epochs=False):
+    """
+    Decode a compact QR payload back into a key dictionary.
+    간결한 QR 페이로드를 키 딕셔너리로 디코딩합니다.
+
+    Args:
+        text (str): Payload produced by encode_compact()
+                   encode_compact()가 만든 페이로드
+        epochs (bool): Leave start and end as the integer seconds of
+                       to_epoch() instead of formatting them as TIME_FORMAT text
+                      start와 end를 TIME_FORMAT 텍스트로 변환하지 않고
+                      to_epoch()의 정수 초로 둠
+
+    Returns:
+        dict: Key with doorID, passwd, start and end as in keyinfo.json
+             keyinfo.json과 같은 doorID, passwd, start, end 키
+
+    Raises:
+        ValueError: If the payload is malformed, signed or of an unknown version
+                   페이로드 형식이 잘못되었거나, 서명되었거나, 알 수 없는 버전일 경우
+    """
+    if not text.startswith(PREFIX):
+        raise ValueError("Not a compact key payload")
+
+    payload = b45decode(text[len(PREFIX):])
+    version, flags, start, end, door_id, passwd, offset = _unpack(payload)
+
+    if version == SIGNED_VERSION:
+        raise ValueError("Signed key payload must be checked with verify_signed")
+    if version != VERSION:
+        raise ValueError(f"Unsupported key payload version: {version}")
+    if offset != len(payload):
+        raise ValueError("Malformed key payload")
+
+    return _key_dict(door_id, passwd, start, end, flags, epochs)
+
+
+def encode_unbound(door_id, passwd):
+    """
+    Encode a pre-minted key that carries no validity window.
+    유효 기간이 없는 미리 발급된 키를 인코딩합니다.
+
+    The door takes the window from the activation message in keyinfo.json.
+    도어는 keyinfo.json의 활성화 메시지에서 유효 기간을 가져옵니다.
+
+    Args:
+        door_id (str): Door identifier
+                      도어 식별자
+        passwd (str): Key password
+                     키 비밀번호
+
+    Returns:
+        str: Base45 payload starting with PREFIX
+            PREFIX로 시작하는 base45 페이로드
+    """
+    key_info = {'doorID': door_id, 'passwd': passwd}
+    return PREFIX + b45encode(_pack(VERSION, key_info, FLAG_UNBOUND))
+
+
+def is_unbound(key_info):
+    """
+    Check whether a decoded key is a pre-minted key without a window.
+    디코딩된 키가 유효 기간이 없는 미리 발급된 키인지 확인합니다.
+    """
+    return key_info.get('start', '') is None and key_info.get('end', '') is None
+
+
+def encode_signed(key_info, secret):
+    """
+    Encode a key as a signed, self-validating QR payload.
+    키를 서명된 자체 검증 QR 페이로드로 인코딩합니다.
+
+    Args:
+        key_info (dict): Key with doorID, passwd, start and end
+                        doorID, passwd, start, end를 가진 키
+        secret (bytes): Secret shared with the door
+                       도어와 공유하는 비밀 키
+
+    Returns:
+        str: Base45 payload starting with PREFIX
+            PREFIX로 시작하는 base45 페이로드
+    """
+    body = _pack(SIGNED_VERSION, key_info)
+    tag = hmac.new(secret, body, hashlib.sha256).digest()[:TAG_SIZE]
+    return PREFIX + b45encode(body + tag)
+
+
+def is_signed(text):
+    """
+    Check whether a scanned payload is a signed key, without verifying it.
+    스캔된 페이로드가 서명된 키인지 검증 없이 확인합니다.
+    """
+    # The first three base45 characters hold the version and flags bytes
+    # 처음 세 개의 base45 문자에 버전과 플래그 바이트가 들어 있음
+    if not text.startswith(PREFIX) or len(text) < len(PREFIX) + 3:
+        return False
+    try:
+        return b45decode(text[len(PREFIX):len(PREFIX) + 3])[0] == SIGNED_VERSION
+    except ValueError:
+        return False
+
+
+def verify_signed(text, secret, door_id, now=None):
+    """
+    Verify a signed key for this door and its validity window.
+    이 도어와 유효 기간에 대해 서명된 키를 검증합니다.
+
+    The tag is compared in constant time before any field is trusted.
+    필드를 신뢰하기 전에 태그를 상수 시간으로 비교합니다.
+
+    Args:
+        text (str): Payload produced by encode_signed()
+                   encode_signed()가 만든 페이로드
+        secret (bytes): Secret shared with the host
+                       호스트와 공유하는 비밀 키
+        door_id (str): ID of the door checking the key
+                      키를 확인하는 도어의 ID
+        now (float): Current epoch time (defaults to time.time())
+                    현재 에포크 시간 (기본값: time.time())
+
+    Returns:
+        dict: Verified key with doorID, passwd, start and end
+             검증된 doorID, passwd, start, end 키
+
+    Raises:
+        ValueError: If the tag, door or validity window does not match
+                   태그, 도어 또는 유효 기간이 일치하지 않을 경우
+    """
+    if not text.startswith(PREFIX):
+        raise ValueError("Not a compact key payload")
+
+    payload = b45decode(text[len(PREFIX):])
+    body, tag = payload[:-TAG_SIZE], payload[-TAG_SIZE:]
+    expected = hmac.new(secret, body, hashlib.sha256).digest()[:TAG_SIZE]
+    if len(payload) <= TAG_SIZE or not hmac.compare_digest(tag, expected):
+        raise ValueError("Key signature mismatch")
+
+    version, flags, start, end, key_door, passwd, offset = _unpack(body)
+    if version != SIGNED_VERSION or flags & FLAG_UNBOUND or offset != len(body):
+        raise ValueError("Malformed signed key payload")
+    if key_door != door_id:
+        raise ValueError(f"Key is for door {key_door}, not {door_id}")
+
+    now = wall_clock(now)
+    if not start < now < end:
+        raise ValueError("Key is outside its validity window")
+
+    return _key_dict(key_door, passwd, start, end)
+
+
+def decode_payload(text, epochs=False):
+    """
+    Decode a scanned QR payload in either compact or JSON format.
+    간결한 형식 또는 JSON 형식의 스캔된 QR 페이로드를 디코딩합니다.
+
+    Args:
+        text (str): Decoded QR code text
+                   디코딩된 QR 코드 텍스트
+        epochs (bool): Leave a compact payload's start and end as the
+                       integer seconds of to_epoch(); JSON keys keep their text
+                      간결한 페이로드의 start와 end를 to_epoch()의 정수 초로
+                      둠, JSON 키는 텍스트를 유지
+
+    Returns:
+        dict: Key dictionary
+             키 딕셔너리
+
+    Raises:
+        ValueError: If the payload is in neither format, is a signed key
+                    (use verify_signed for those), or is JSON whose doorID or
+                    passwd is not a string
+                   페이로드가 어느 형식도 아니거나, 서명된 키이거나(서명된
+                   키는 verify_signed 사용), doorID 또는 passwd가 문자열이 아닌
+                   JSON일 경우
+    """
+    if text.startswith(PREFIX):
+        return decode_compact(text, epochs)
+
+    key_info = json.loads(text)
+    if not isinstance(key_info, dict):
+        raise ValueError("Key payload is not an object")
+
+    # Scanned JSON is untrusted; the door hashes and compares these as text
+    # 스캔된 JSON은 신뢰할 수 없으며, 도어는 이 값을 텍스트로 해싱하고 비교함
+    for field in ('doorID', 'passwd'):
+        if not isinstance(key_info.get(field), str):
+            raise ValueError(f"Key payload {field} is not a string")
+    return key_info
@@ -0,0 +1,268 @@
+"""
+Pre-minted Key Pool Module
+미리 발급된 키 풀 모듈
+
+Keeps a pool of pre-rendered, not-yet-activated keys per door so that
+issuing a key only binds a validity window and publishes the activation.
+도어별로 미리 렌더링되었지만 아직 활성화되지 않은 키 풀을 유지하여, 키 발급 시
+유효 기간 지정과 활성화 게시만 하면 되도록 합니다.
+
+Pooled QR codes carry only the door ID and password (keycodec.encode_unbound);
+the window travels in the activation message published to the door.
+풀의 QR 코드는 도어 ID와 비밀번호만 담고 있으며 (keycodec.encode_unbound),
+유효 기간은 도어에 게시되는 활성화 메시지로 전달됩니다.
+"""
+
+import datetime
+import json
+import threading
+import time
+from collections import deque
+from bson import ObjectId
+import keycodec
+import testpart
+
+
+def mint_key(door_id):
+    """
+    Render one unbound key for a door.
+    도어를 위한 유효 기간 없는 키 하나를 렌더링합니다.
+
+    Returns:
+        tuple: (key_name, key_png, passwd)
+              (키 이름, PNG 바이트, 비밀번호)
+    """
+    passwd = str(ObjectId())
+    key_png = testpart.render_key(keycodec.encode_unbound(door_id, passwd))
+    return f"{passwd}.png", key_png, passwd
+
+
+class KeyMinter:
+    """
+    Background minter keeping per-door pools of pre-rendered keys.
+    도어별로 미리 렌더링된 키 풀을 유지하는 백그라운드 발급기입니다.
+
+    Attributes:
+        pool_size (int): Target number of pooled keys per door
+                        도어당 목표 풀 키 수
+        low_water (int): Refill starts when a pool drops below this
+                        풀이 이 값 아래로 떨어지면 보충 시작
+        pools (dict): door_id -> deque of (key_name, key_png, passwd)
+                     door_id -> (키 이름, PNG 바이트, 비밀번호) deque
+        hits (int): Issuances served from the pool
+                   풀에서 처리된 발급 수
+        misses (int): Issuances that had to mint inline
+                     즉시 발급해야 했던 발급 수
+        refill_latencies (deque): Seconds from a pool running low to full
+                                 풀 부족에서 가득 찰 때까지 걸린 시간 (초)
+        refill_errors (int): Background renders that failed
+                            실패한 백그라운드 렌더링 수
+    """
+
+    def __init__(self, door_ids, pool_size=20, low_water=None, history=1000):
+        """
+        Initialize KeyMinter instance.
+        KeyMinter 인스턴스를 초기화합니다.
+
+        Args:
+            door_ids (list): Doors to keep pools for
+                            풀을 유지할 도어 목록
+            pool_size (int): Target keys per door (defaults to 20)
+                            도어당 목표 키 수 (기본값: 20)
+            low_water (int): Refill threshold (defaults to half of pool_size)
+                            보충 기준 (기본값: pool_size의 절반)
+            history (int): Number of refill latency samples to keep
+                          보관할 보충 지연 시간 샘플 수
+        """
+        self.pool_size = pool_size
+        self.low_water = pool_size // 2 if low_water is None else low_water
+        self.pools = {door_id: deque() for door_id in door_ids}
+        self.hits = 0
+        self.misses = 0
+        self.refill_latencies = deque(maxlen=history)
+        self.refill_errors = 0
+
+        # Pool state is shared with the refill thread
+        # 풀 상태는 보충 스레드와 공유됨
+        self._cond = threading.Condition()
+        self._low_since = {door_id: time.monotonic() for door_id in door_ids}
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """
+        Start the background refill thread.
+        백그라운드 보충 스레드를 시작합니다.
+        """
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the refill thread.
+        보충 스레드를 중지합니다.
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _next_low_door(self):
+        for door_id, pool in self.pools.items():
+            if door_id in self._low_since and len(pool) < self.pool_size:
+                return door_id
+        return None
+
+    def _run(self):
+        """
+        Refill loop: top up any pool that ran low, one key at a time.
+        보충 루프: 부족해진 풀을 한 번에 키 하나씩 채웁니다.
+        """
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: not self._running or self._next_low_door() is not None
+                )
+                if not self._running:
+                    return
+                door_id = self._next_low_door()
+
+            # Render outside the lock so issuance never waits on it
+            # 발급이 기다리지 않도록 잠금 밖에서 렌더링
+            try:
+                minted = mint_key(door_id)
+            except Exception as e:
+                # Leave this door until an issuance finds it low again,
+                # so one failing door neither stops nor spins the refill
+                # 발급이 다시 부족함을 발견할 때까지 이 도어를 미뤄, 실패하는 도어
+                # 하나가 보충을 멈추거나 헛돌게 하지 않음
+                print(f"Refilling the key pool for {door_id} failed: {e}")
+                with self._cond:
+                    self.refill_errors += 1
+                    self._low_since.pop(door_id, None)
+                continue
+
+            with self._cond:
+                pool = self.pools[door_id]
+                pool.append(minted)
+                if len(pool) >= self.pool_size:
+                    self.refill_latencies.append(time.monotonic() - self._low_since.pop(door_id))
+                    self._cond.notify_all()
+
+    def wait_full(self, timeout=None):
+        """
+        Block until every pool is full.
+        모든 풀이 가득 찰 때까지 대기합니다.
+
+        Returns:
+            bool: True if full, False on timeout
+                 가득 차면 True, 시간 초과 시 False
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: all(len(p) >= self.pool_size for p in self.pools.values()), timeout
+            )
+
+    def issue(self, door_id, expire_minutes=10):
+        """
+        Take a pooled key for a door and bind its validity window.
+        도어의 풀에서 키를 꺼내 유효 기간을 지정합니다.
+
+        Falls back to minting inline when the pool is empty.
+        풀이 비어 있으면 즉시 발급합니다.
+
+        Args:
+            door_id (str): Door identifier
+                          도어 식별자
+            expire_minutes (int): Expiration time in minutes (defaults to 10)
+                                만료 시간 (분) (기본값: 10)
+
+        Returns:
+            tuple: (key_name, key_png, qr_info) where qr_info is the JSON
+                   activation message to publish to the door
+                  (키 이름, PNG 바이트, qr_info) - qr_info는 도어에 게시할
+                  JSON 활성화 메시지
+        """
+        with self._cond:
+            pool = self.pools.setdefault(door_id, deque())
+            minted = pool.popleft() if pool else None
+            if minted is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            # Wake the refill thread once a pool runs low
+            # 풀이 부족해지면 보충 스레드를 깨움
+            if len(pool) < self.low_water and door_id not in self._low_since:
+                self._low_since[door_id] = time.monotonic()
+                self._cond.notify_all()
+
+        if minted is None:
+            minted = mint_key(door_id)
+        key_name, key_png, passwd = minted
+
+        # Bind the validity window at issuance time
+        # 발급 시점에 유효 기간 지정
+        start = datetime.datetime.now()
+        end = start + datetime.timedelta(minutes=expire_minutes)
+        qr_info = json.dumps({
+            'doorID': door_id,
+            'passwd': passwd,
+            'start': start.strftime(keycodec.TIME_FORMAT),
+            'end': end.strftime(keycodec.TIME_FORMAT)
+        })
+
+        return key_name, key_png, qr_info
+
+    def stats(self):
+        """
+        Summarize pool hit rate and refill latency.
+        풀 적중률과 보충 지연 시간을 요약합니다.
+
+        Returns:
+            dict: hits, misses, hit_rate, refill_avg_ms, refill_max_ms,
+                  refill_errors, pooled
+                 적중, 실패, 적중률, 평균/최대 보충 시간 (ms), 보충 오류 수, 풀 크기
+        """
+        with self._cond:
+            samples = list(self.refill_latencies)
+            issued = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / issued if issued else 0.0,
+                'refill_avg_ms': 1000 * sum(samples) / len(samples) if samples else 0.0,
+                'refill_max_ms': 1000 * max(samples) if samples else 0.0,
+                'refill_errors': self.refill_errors,
+                'pooled': {door_id: len(pool) for door_id, pool in self.pools.items()},
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+    import config as cfg
+    import emailsend as em
+
+    # Parse command line arguments
+    # 명령줄 인자 파싱
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1, help="Number of keys to issue")
+    parser.add_argument("--pool-size", type=int, default=20, help="Pooled keys per door")
+    args = parser.parse_args()
+
+    minter = KeyMinter([cfg.topic_name], pool_size=args.pool_size).start()
+    minter.wait_full()
+
+    # Issue from the warm pool: bind window, publish activation, email QR code
+    # 준비된 풀에서 발급: 유효 기간 지정, 활성화 게시, QR 코드 이메일 전송
+    for _ in range(args.count):
+        testpart.distribute(*minter.issue(cfg.topic_name), pool=em.get_pool())
+
+    minter.stop()
+    em.get_pool().close()
+    print(f"Key pool stats: {minter.stats()}")
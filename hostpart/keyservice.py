@@ -0,0 +1,309 @@
+"""
+Key Issuance Service Module
+키 발급 서비스 모듈
+
+Resident asyncio HTTP service that issues keys on request. The heavy
+imports, the Pub/Sub publisher client, the SMTP sessions and the pre-minted
+key pool are set up once instead of once per key.
+요청 시 키를 발급하는 상주 asyncio HTTP 서비스입니다. 무거운 임포트, Pub/Sub
+게시자 클라이언트, SMTP 세션, 미리 발급된 키 풀을 키마다가 아니라 한 번만
+준비합니다.
+
+Endpoints / 엔드포인트:
+    POST /keys   {"door_id": ..., "expire_minutes": ..., "email": ...}
+    GET  /stats
+
+Usage / 사용법:
+    python3 keyservice.py --port 8080
+    python3 keyservice.py --unix /tmp/doorlens-keys.sock
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+import config as cfg
+import emailsend as em
+import keypool
+import outbox as ob
+import pub
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 502: "Bad Gateway"}
+
+
+def percentile(samples, q):
+    """
+    Return the q-th percentile (0-100) of samples by nearest rank.
+    최근접 순위 방식으로 샘플의 q 백분위수(0-100)를 반환합니다.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class KeyService:
+    """
+    Key issuance service with warm clients.
+    클라이언트를 미리 준비해 둔 키 발급 서비스입니다.
+
+    Attributes:
+        minter (KeyMinter): Pre-minted key pool
+                           미리 발급된 키 풀
+        publish (callable): publish(door_id, data) -> blocks until published
+                           publish(door_id, data) -> 게시될 때까지 대기
+        send_email (callable): send_email(key_name, key_png, address)
+                              send_email(키 이름, PNG 바이트, 주소)
+        mail_pool (SMTPPool): Shared SMTP sessions used by the default sender
+                             기본 전송자가 사용하는 공유 SMTP 세션
+        latencies (deque): Recent issuance latencies in seconds
+                          최근 발급 지연 시간 (초)
+        issued (int): Keys issued successfully
+                     성공적으로 발급된 키 수
+        failed (int): Issuances that failed
+                     실패한 발급 수
+        doors (frozenset): Door IDs keys may be issued for
+                          키를 발급할 수 있는 도어 ID
+    """
+
+    def __init__(self, minter, publish=None, send_email=None, history=10000, doors=None):
+        """
+        Initialize KeyService instance.
+        KeyService 인스턴스를 초기화합니다.
+
+        Args:
+            minter (KeyMinter): Started key pool
+                               시작된 키 풀
+            publish (callable): Publisher (defaults to a warm Pub/Sub client)
+                               게시자 (기본값: 미리 준비된 Pub/Sub 클라이언트)
+            send_email (callable): Email sender (defaults to emailsend with
+                                   the shared SMTP pool)
+                                  이메일 전송자 (기본값: 공유 SMTP 풀을 사용하는
+                                  emailsend)
+            history (int): Number of latency samples to keep
+                          보관할 지연 시간 샘플 수
+            doors (iterable): Door IDs to accept (defaults to the minter's doors)
+                             허용할 도어 ID (기본값: 발급기의 도어)
+        """
+        self.minter = minter
+        self.doors = frozenset(minter.pools if doors is None else doors)
+        self.publish = publish or self._pubsub_publisher()
+        self.mail_pool = None
+        if send_email is None:
+            self.mail_pool = em.get_pool()
+            send_email = lambda key_name, key_png, address: em.key_sender(
+                key_name, address, key_bytes=key_png, pool=self.mail_pool
+            )
+        self.send_email = send_email
+        self.latencies = deque(maxlen=history)
+        self.issued = 0
+        self.failed = 0
+
+    @staticmethod
+    def _pubsub_publisher():
+        """
+        Publish through the shared batching publisher of each door's topic.
+        각 도어 토픽의 공유 배치 게시자를 통해 게시합니다.
+        """
+        def publish(door_id, data):
+            return pub.get_publisher(cfg.project_id, door_id).publish(data).result()
+
+        return publish
+
+    async def issue(self, door_id, expire_minutes=10, email=None):
+        """
+        Issue one key: bind a pooled key, publish it and email it.
+        키 하나를 발급합니다: 풀의 키에 기간을 지정하고 게시 및 이메일 전송합니다.
+
+        Publishing and email run concurrently on the default executor.
+        게시와 이메일 전송은 기본 실행기에서 동시에 실행됩니다.
+
+        Returns:
+            dict: Issued key information and issuance time in ms
+                 발급된 키 정보와 발급 시간 (ms)
+        """
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+
+        key_name, key_png, qr_info = self.minter.issue(door_id, expire_minutes)
+        await asyncio.gather(
+            loop.run_in_executor(None, self.publish, door_id, qr_info.encode('utf-8')),
+            loop.run_in_executor(None, self.send_email, key_name, key_png, email or cfg.email_to),
+        )
+
+        elapsed = time.monotonic() - started
+        self.latencies.append(elapsed)
+        self.issued += 1
+
+        result = json.loads(qr_info)
+        result['issue_ms'] = elapsed * 1000
+        return result
+
+    def stats(self):
+        """
+        Summarize issuance counts, latency percentiles and pool state.
+        발급 수, 지연 시간 백분위수 및 풀 상태를 요약합니다.
+        """
+        samples = list(self.latencies)
+        stats = {
+            'issued': self.issued,
+            'failed': self.failed,
+            'p50_ms': 1000 * percentile(samples, 50),
+            'p99_ms': 1000 * percentile(samples, 99),
+            'pool': self.minter.stats(),
+        }
+        if self.mail_pool is not None:
+            stats['email'] = self.mail_pool.stats()
+        return stats
+
+    async def _route(self, method, path, body):
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+
+        if method != "POST" or path != "/keys":
+            return 404, {'error': f"No route for {method} {path}"}
+
+        try:
+            request = json.loads(body or b"{}")
+            door_id = request.get('door_id', cfg.topic_name)
+            expire_minutes = int(request.get('expire_minutes', 10))
+        except (ValueError, AttributeError, TypeError):
+            return 400, {'error': "Request body must be a JSON object"}
+
+        # Unknown doors would get a new pool and topic each
+        # 알 수 없는 도어마다 새 풀과 토픽이 생기게 됨
+        if not isinstance(door_id, str) or door_id not in self.doors:
+            return 400, {'error': f"Unknown door: {door_id!r}"}
+        if expire_minutes <= 0:
+            return 400, {'error': "expire_minutes must be positive"}
+
+        try:
+            return 200, await self.issue(door_id, expire_minutes, request.get('email'))
+        except Exception as e:
+            self.failed += 1
+            return 502, {'error': str(e)}
+
+    async def handle(self, reader, writer):
+        """
+        Serve HTTP/1.1 requests on one connection, with keep-alive.
+        하나의 연결에서 keep-alive로 HTTP/1.1 요청을 처리합니다.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                # Read headers up to the blank line
+                # 빈 줄까지 헤더 읽기
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, payload = await self._route(method, path, body)
+
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8080, unix_path=None):
+        """
+        Start listening on TCP localhost or a Unix socket.
+        TCP localhost 또는 유닉스 소켓에서 수신 대기를 시작합니다.
+
+        Returns:
+            asyncio.Server: The listening server
+                           수신 대기 중인 서버
+        """
+        if unix_path:
+            return await asyncio.start_unix_server(self.handle, path=unix_path)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+def report_drainer(task):
+    """
+    Print why the outbox workers stopped, unless they were cancelled.
+    취소된 경우가 아니면 아웃박스 작업자가 멈춘 이유를 출력합니다.
+    """
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Outbox workers stopped: {task.exception()!r}")
+
+
+async def main(host, port, unix_path, pool_size):
+    """
+    Run the key service until interrupted.
+    중단될 때까지 키 서비스를 실행합니다.
+
+    When outbox_path is set in config.py, issuance only queues the email and
+    outbox workers in the same event loop send it.
+    config.py에 outbox_path가 설정되어 있으면 발급은 이메일을 큐에 넣기만 하고,
+    같은 이벤트 루프의 아웃박스 작업자가 전송합니다.
+    """
+    loop = asyncio.get_running_loop()
+    door_ids = getattr(cfg, 'service_doors', None) or [cfg.topic_name]
+    minter = keypool.KeyMinter(door_ids, pool_size=pool_size).start()
+
+    outbox, drainer, drain_task, send_email = None, None, None, None
+    if getattr(cfg, 'outbox_path', None):
+        outbox = ob.Outbox(cfg.outbox_path)
+        drainer = ob.OutboxWorkers(outbox)
+        drain_task = loop.create_task(drainer.run())
+        drain_task.add_done_callback(report_drainer)
+
+        def send_email(key_name, key_png, address):
+            outbox.enqueue(key_name, key_png, address)
+            loop.call_soon_threadsafe(drainer.notify)
+
+    service = KeyService(minter, send_email=send_email)
+    server = await service.start(host, port, unix_path)
+
+    print(f"Key service listening on {unix_path or f'{host}:{port}'}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        minter.stop()
+        if drain_task is not None:
+            drain_task.cancel()
+            await asyncio.gather(drain_task, return_exceptions=True)
+        if service.mail_pool is not None:
+            service.mail_pool.close()
+        print(f"Key service stats: {service.stats()}")
+        if drainer is not None:
+            print(f"Outbox stats: {drainer.stats()}")
+            em.get_pool().close()
+            outbox.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="TCP address to bind")
+    parser.add_argument("--port", type=int, default=8080, help="TCP port to bind")
+    parser.add_argument("--unix", default=None, help="Unix socket path instead of TCP")
+    parser.add_argument("--pool-size", type=int, default=20, help="Pooled keys per door")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args.host, args.port, args.unix, args.pool_size))
+    except KeyboardInterrupt:
+        pass
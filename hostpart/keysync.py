@@ -0,0 +1,638 @@
+"""
+Keyring Sync Module
+키링 동기화 모듈
+
+Incremental key sync between the host and the doors. Each door holds a
+keyring of many keys with a sequence number. The host publishes small
+add/revoke deltas, one sequence number each; a door that sees a gap asks for
+a resync and gets the missing deltas, or a compressed snapshot when the host
+no longer has them. Shared by the host and the door, like keycodec.py.
+호스트와 도어 간의 증분 키 동기화입니다. 각 도어는 순서 번호를 가진 여러 키의
+키링을 보관합니다. 호스트는 순서 번호가 하나씩 붙은 작은 추가/폐기 델타를
+게시하며, 누락을 감지한 도어는 재동기화를 요청하여 빠진 델타를 받거나, 호스트에
+더 이상 없으면 압축된 스냅샷을 받습니다. keycodec.py처럼 호스트와 도어가 함께
+사용합니다.
+
+Messages / 메시지:
+    delta     JSON {"door", "seq", "add": [[passwd, start, end], ...], "revoke": [passwd, ...]}
+    snapshot  zlib-compressed JSON {"door", "seq", "keys": [[passwd, start, end], ...]}
+    resync    JSON {"door", "have"}, sent by a door to the host's resync topic
+
+Start and end are integer epoch seconds.
+start와 end는 정수 epoch 초입니다.
+
+Usage / 사용법:
+    python3 keysync.py --serve       # answer door resync requests (host)
+"""
+
+import argparse
+import contextlib
+import fcntl
+import json
+import os
+import time
+import zlib
+from collections import deque
+
+KEYRING_PATH = "keyring.json"
+SYNC_STATE_PATH = "keysync.json"
+
+# apply() results
+# apply() 결과
+APPLIED = "applied"
+DUPLICATE = "duplicate"
+GAP = "gap"
+
+
+def encode_delta(door_id, seq, adds=(), revokes=()):
+    """
+    Encode one delta message.
+    델타 메시지 하나를 인코딩합니다.
+
+    Args:
+        door_id (str): Door identifier
+                      도어 식별자
+        seq (int): Sequence number of this delta
+                  이 델타의 순서 번호
+        adds (iterable): (passwd, start, end) keys to add
+                        추가할 (passwd, start, end) 키
+        revokes (iterable): Passwords to revoke
+                           폐기할 비밀번호
+
+    Returns:
+        bytes: Message data
+              메시지 데이터
+    """
+    return json.dumps({
+        'door': door_id,
+        'seq': seq,
+        'add': [[p, int(s), int(e)] for p, s, e in adds],
+        'revoke': list(revokes),
+    }, separators=(',', ':')).encode('utf-8')
+
+
+def encode_snapshot(door_id, seq, keys):
+    """
+    Encode a compressed snapshot of a whole keyring.
+    키링 전체의 압축된 스냅샷을 인코딩합니다.
+
+    Args:
+        door_id (str): Door identifier
+                      도어 식별자
+        seq (int): Sequence number the snapshot is current at
+                  스냅샷이 반영하는 순서 번호
+        keys (dict): passwd -> (start, end)
+                    passwd -> (시작, 종료)
+
+    Returns:
+        bytes: zlib-compressed message data
+              zlib으로 압축된 메시지 데이터
+    """
+    return zlib.compress(json.dumps({
+        'door': door_id,
+        'seq': seq,
+        'keys': [[p, int(s), int(e)] for p, (s, e) in keys.items()],
+    }, separators=(',', ':')).encode('utf-8'), 9)
+
+
+def encode_resync(door_id, have_seq):
+    """
+    Encode a door's resync request.
+    도어의 재동기화 요청을 인코딩합니다.
+    """
+    return json.dumps({'door': door_id, 'have': have_seq}).encode('utf-8')
+
+
+def _key_entries(entries):
+    """
+    Check a list of [passwd, start, end] entries.
+    [passwd, start, end] 항목 목록을 확인합니다.
+
+    Raises:
+        ValueError: If an entry is not a text password with integer times
+                   항목이 정수 시각을 가진 텍스트 비밀번호가 아닐 경우
+    """
+    if not isinstance(entries, list):
+        raise ValueError("Keys must be a list")
+    for entry in entries:
+        if (not isinstance(entry, list) or len(entry) != 3 or not isinstance(entry[0], str)
+                or not all(isinstance(t, int) for t in entry[1:])):
+            raise ValueError(f"Malformed key entry: {entry!r}")
+    return entries
+
+
+def _checked(message, kind):
+    """
+    Check the fields of a decoded sync message and set its kind.
+    디코딩된 동기화 메시지의 필드를 확인하고 종류를 설정합니다.
+
+    Raises:
+        ValueError: If a field is missing or has the wrong type
+                   필드가 없거나 형식이 잘못된 경우
+    """
+    if not isinstance(message.get('door'), str):
+        raise ValueError("Sync message without a door ID")
+    number = message.get('have' if kind == 'resync' else 'seq')
+    if not isinstance(number, int):
+        raise ValueError("Sync message without a sequence number")
+    if kind == 'delta':
+        _key_entries(message.setdefault('add', []))
+        revokes = message.setdefault('revoke', [])
+        if not isinstance(revokes, list) or not all(isinstance(p, str) for p in revokes):
+            raise ValueError("Revokes must be a list of passwords")
+    elif kind == 'snapshot':
+        _key_entries(message.get('keys'))
+    message['kind'] = kind
+    return message
+
+
+def decode_message(data):
+    """
+    Decode a sync message.
+    동기화 메시지를 디코딩합니다.
+
+    Args:
+        data (bytes): Delta, snapshot or resync message data
+                     델타, 스냅샷 또는 재동기화 메시지 데이터
+
+    Returns:
+        dict: Message with 'kind' set to 'delta', 'snapshot' or 'resync',
+              or None for data that is not a sync message (e.g. a plain key)
+             'kind'가 'delta', 'snapshot', 'resync'로 설정된 메시지,
+             동기화 메시지가 아니면 (예: 일반 키) None
+
+    Raises:
+        ValueError: If data looks like a sync message but is malformed
+                   데이터가 동기화 메시지처럼 보이지만 형식이 잘못된 경우
+    """
+    if data[:1] == b'{':
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return None
+        if 'seq' in message and 'door' in message:
+            return _checked(message, 'delta')
+        if 'have' in message and 'door' in message:
+            return _checked(message, 'resync')
+        return None
+
+    try:
+        text = zlib.decompress(data)
+    except zlib.error:
+        return None
+    message = json.loads(text)
+    if not isinstance(message, dict):
+        raise ValueError("Snapshot is not a JSON object")
+    return _checked(message, 'snapshot')
+
+
+def is_sync_message(data):
+    """
+    Return True if data is a delta or snapshot message.
+    데이터가 델타 또는 스냅샷 메시지이면 True를 반환합니다.
+    """
+    message = decode_message(data)
+    return message is not None and message['kind'] in ('delta', 'snapshot')
+
+
+class Keyring:
+    """
+    A door's set of keys at a sequence number.
+    순서 번호 시점의 도어 키 집합입니다.
+
+    Attributes:
+        door_id (str): Door identifier
+                      도어 식별자
+        seq (int): Last applied sequence number (0 when empty)
+                  마지막으로 적용된 순서 번호 (비어 있으면 0)
+        keys (dict): passwd -> (start, end) in epoch seconds
+                    passwd -> epoch 초 단위 (시작, 종료)
+    """
+
+    def __init__(self, door_id, seq=0, keys=None):
+        self.door_id = door_id
+        self.seq = seq
+        self.keys = dict(keys or {})
+
+    def apply_delta(self, message):
+        """
+        Apply a delta if it is the next one in sequence.
+        다음 순서의 델타이면 적용합니다.
+
+        Args:
+            message (dict): Decoded delta
+                           디코딩된 델타
+
+        Returns:
+            str: APPLIED, DUPLICATE (already applied) or GAP (deltas missing)
+                APPLIED, DUPLICATE (이미 적용됨) 또는 GAP (델타 누락)
+        """
+        if message['seq'] <= self.seq:
+            return DUPLICATE
+        if message['seq'] != self.seq + 1:
+            return GAP
+
+        for passwd, start, end in message.get('add', ()):
+            self.keys[passwd] = (start, end)
+        for passwd in message.get('revoke', ()):
+            self.keys.pop(passwd, None)
+        self.seq = message['seq']
+        return APPLIED
+
+    def apply_snapshot(self, message):
+        """
+        Replace the keyring with a snapshot unless it is older.
+        스냅샷이 더 오래되지 않았다면 키링을 스냅샷으로 교체합니다.
+
+        Returns:
+            str: APPLIED or DUPLICATE
+                APPLIED 또는 DUPLICATE
+        """
+        if message['seq'] < self.seq:
+            return DUPLICATE
+        self.keys = {p: (s, e) for p, s, e in message['keys']}
+        self.seq = message['seq']
+        return APPLIED
+
+    def apply(self, message):
+        """
+        Apply a decoded delta or snapshot.
+        디코딩된 델타 또는 스냅샷을 적용합니다.
+        """
+        if message['kind'] == 'snapshot':
+            return self.apply_snapshot(message)
+        return self.apply_delta(message)
+
+    def valid(self, passwd, now=None):
+        """
+        Return True if passwd is in the keyring and inside its window.
+        passwd가 키링에 있고 유효 기간 내이면 True를 반환합니다.
+        """
+        window = self.keys.get(passwd)
+        if window is None:
+            return False
+        now = time.time() if now is None else now
+        return window[0] <= now < window[1]
+
+    def prune(self, now=None):
+        """
+        Drop keys whose window has ended.
+        유효 기간이 끝난 키를 제거합니다.
+
+        Returns:
+            int: Number of keys dropped
+                제거된 키 수
+        """
+        now = time.time() if now is None else now
+        ended = [p for p, (_, end) in self.keys.items() if end <= now]
+        for passwd in ended:
+            del self.keys[passwd]
+        return len(ended)
+
+    def save(self, path=KEYRING_PATH):
+        """
+        Write the keyring atomically to a JSON file.
+        키링을 JSON 파일에 원자적으로 기록합니다.
+        """
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'door': self.door_id, 'seq': self.seq,
+                       'keys': [[p, s, e] for p, (s, e) in self.keys.items()]}, f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path=KEYRING_PATH, door_id=None):
+        """
+        Read a keyring file, or return an empty keyring if there is none.
+        키링 파일을 읽으며, 없으면 빈 키링을 반환합니다.
+        """
+        if not os.path.isfile(path):
+            return cls(door_id)
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data['door'], data['seq'], {p: (s, e) for p, s, e in data['keys']})
+
+
+class DoorLog:
+    """
+    Host-side keyring and recent delta history for one door.
+    한 도어에 대한 호스트 측 키링과 최근 델타 기록입니다.
+
+    Attributes:
+        keyring (Keyring): The door's current keyring
+                          도어의 현재 키링
+        history (deque): Recent (seq, delta bytes), oldest first
+                        최근 (순서 번호, 델타 바이트), 오래된 것부터
+    """
+
+    def __init__(self, door_id, history=1000, keyring=None, deltas=()):
+        self.keyring = keyring or Keyring(door_id)
+        self.history = deque(deltas, maxlen=history)
+
+    def change(self, adds=(), revokes=()):
+        """
+        Record one change and return its delta message.
+        변경 하나를 기록하고 델타 메시지를 반환합니다.
+
+        Args:
+            adds (iterable): (passwd, start, end) keys to add
+                            추가할 (passwd, start, end) 키
+            revokes (iterable): Passwords to revoke
+                               폐기할 비밀번호
+
+        Returns:
+            bytes: Delta message data
+                  델타 메시지 데이터
+        """
+        data = encode_delta(self.keyring.door_id, self.keyring.seq + 1, adds, revokes)
+        self.keyring.apply_delta(decode_message(data))
+        self.keyring.prune()
+        self.history.append((self.keyring.seq, data))
+        return data
+
+    def since(self, have_seq):
+        """
+        Return the messages a door at have_seq needs to catch up.
+        have_seq 시점의 도어가 따라잡는 데 필요한 메시지를 반환합니다.
+
+        Deltas are returned while the history still covers the gap;
+        otherwise a single compressed snapshot.
+        기록이 누락 구간을 포함하면 델타를, 그렇지 않으면 압축된 스냅샷
+        하나를 반환합니다.
+
+        Returns:
+            list: Message data (bytes) to publish, oldest first
+                 게시할 메시지 데이터 (바이트), 오래된 것부터
+        """
+        seq = self.keyring.seq
+        if have_seq >= seq:
+            return []
+        if self.history and self.history[0][0] <= have_seq + 1:
+            return [data for s, data in self.history if s > have_seq]
+        return [self.snapshot()]
+
+    def snapshot(self, now=None):
+        """
+        Compressed snapshot of the keys that have not ended yet.
+        아직 종료되지 않은 키의 압축된 스냅샷입니다.
+        """
+        now = time.time() if now is None else now
+        live = {p: w for p, w in self.keyring.keys.items() if w[1] > now}
+        return encode_snapshot(self.keyring.door_id, self.keyring.seq, live)
+
+
+class SyncHost:
+    """
+    Host-side sync state for every door, persisted to a JSON file.
+    모든 도어에 대한 호스트 측 동기화 상태이며, JSON 파일에 저장됩니다.
+
+    Processes that change it (issuance, registry.py --revoke) do so inside
+    transaction(), so two of them never publish the same sequence number.
+    이를 변경하는 프로세스(발급, registry.py --revoke)는 transaction() 안에서
+    변경하므로, 두 프로세스가 같은 순서 번호를 게시하지 않습니다.
+
+    Attributes:
+        path (str): State file
+                   상태 파일
+        doors (dict): door_id -> DoorLog
+                     door_id -> DoorLog
+        publish (callable): publish(door_id, data) sends to the door in order,
+                            returning a future or None
+                           publish(door_id, data)는 도어에 순서대로 전송하며,
+                           future 또는 None을 반환
+    """
+
+    def __init__(self, path=SYNC_STATE_PATH, publish=None, history=1000):
+        """
+        Initialize SyncHost instance and load saved state.
+        SyncHost 인스턴스를 초기화하고 저장된 상태를 불러옵니다.
+
+        Args:
+            path (str): State file (defaults to "keysync.json")
+                       상태 파일 (기본값: "keysync.json")
+            publish (callable): Sender (defaults to ordered Pub/Sub per door)
+                               전송자 (기본값: 도어별 순서 보장 Pub/Sub)
+            history (int): Deltas kept per door for resync (defaults to 1000)
+                          재동기화를 위해 도어별로 보관할 델타 수 (기본값: 1000)
+        """
+        self.path = path
+        self.history = history
+        self.publish = publish or self._pubsub_publish
+        self.doors = {}
+        self._futures = []
+        self._stamp = None
+        self._load()
+
+    def _file_stamp(self):
+        """
+        Return (inode, mtime_ns, size) of the state file, or None if there is none.
+        상태 파일의 (inode, mtime_ns, 크기)를 반환하며, 없으면 None을 반환합니다.
+
+        save() replaces the file, so every save gets a new inode.
+        save()는 파일을 교체하므로 저장할 때마다 새 inode가 생깁니다.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        """
+        Replace the in-memory state with the state file, if there is one.
+        메모리의 상태를 상태 파일의 내용으로 바꿉니다 (파일이 있는 경우).
+
+        The file is not parsed again if it is unchanged since this instance
+        last loaded or saved it.
+        이 인스턴스가 마지막으로 읽거나 저장한 후 파일이 바뀌지 않았으면 다시
+        파싱하지 않습니다.
+        """
+        stamp = self._file_stamp()
+        if stamp is not None and stamp == self._stamp:
+            return
+        self.doors = {}
+        self._stamp = stamp
+        if stamp is not None:
+            with open(self.path) as f:
+                state = json.load(f)
+            for door_id, door in state.items():
+                keyring = Keyring(door_id, door['seq'],
+                                  {p: (s, e) for p, s, e in door['keys']})
+                deltas = [(s, d.encode('utf-8')) for s, d in door['history']]
+                self.doors[door_id] = DoorLog(door_id, self.history, keyring, deltas)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Hold the state file's lock while changes are made, then save them.
+        변경하는 동안 상태 파일의 잠금을 유지한 후 변경 사항을 저장합니다.
+
+        The state is re-read under the lock, so changes saved by another
+        process in the meantime are continued rather than overwritten.
+        Nothing is saved if the block raises.
+        상태는 잠금을 잡은 상태에서 다시 읽으므로, 그 사이 다른 프로세스가 저장한
+        변경은 덮어쓰지 않고 이어집니다. 블록에서 예외가 발생하면 저장하지 않습니다.
+
+        Yields:
+            SyncHost: This instance
+                     이 인스턴스
+        """
+        with open(self.path + ".lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._load()
+                try:
+                    yield self
+                except BaseException:
+                    # Unsaved changes must not survive into the next transaction
+                    # 저장되지 않은 변경이 다음 트랜잭션에 남지 않아야 함
+                    self._stamp = None
+                    raise
+                self.save()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _pubsub_publish(door_id, data):
+        import config as cfg
+        import pub
+        publisher = pub.get_publisher(cfg.project_id, door_id, ordered=True)
+        return publisher.publish(data, door_id)
+
+    def door(self, door_id):
+        """
+        Return the DoorLog for a door, creating it on first use.
+        도어의 DoorLog를 반환하며, 처음 사용할 때 생성합니다.
+        """
+        if door_id not in self.doors:
+            self.doors[door_id] = DoorLog(door_id, self.history)
+        return self.doors[door_id]
+
+    def change(self, door_id, adds=(), revokes=()):
+        """
+        Record and publish one delta for a door.
+        도어에 대한 델타 하나를 기록하고 게시합니다.
+
+        Returns:
+            int: Sequence number of the delta
+                델타의 순서 번호
+        """
+        log = self.door(door_id)
+        self._futures.append(self.publish(door_id, log.change(adds, revokes)))
+        return log.keyring.seq
+
+    def resync(self, door_id, have_seq):
+        """
+        Answer a door's resync request with deltas or a snapshot.
+        도어의 재동기화 요청에 델타 또는 스냅샷으로 응답합니다.
+
+        Returns:
+            int: Bytes published
+                게시된 바이트 수
+        """
+        messages = self.door(door_id).since(have_seq)
+        for data in messages:
+            self._futures.append(self.publish(door_id, data))
+        self.wait()
+        return sum(len(data) for data in messages)
+
+    def wait(self):
+        """
+        Wait until every delta published so far has been sent.
+        지금까지 게시된 모든 델타가 전송될 때까지 기다립니다.
+
+        Pub/Sub sends from a daemon thread, so a short CLI run could exit
+        before its deltas leave.
+        Pub/Sub는 데몬 스레드에서 전송하므로, 짧은 CLI 실행은 델타가 나가기 전에
+        종료될 수 있습니다.
+
+        Raises:
+            Exception: The first publish error
+                      첫 번째 게시 오류
+        """
+        futures, self._futures = self._futures, []
+        for future in futures:
+            if future is not None:
+                future.result()
+
+    def save(self):
+        """
+        Wait for published deltas, then write sync state atomically.
+        게시된 델타를 기다린 후 동기화 상태를 원자적으로 기록합니다.
+
+        Keys whose window has ended are dropped first, so the file only
+        grows with the keys that are still valid.
+        유효 기간이 끝난 키는 먼저 제거하므로, 파일은 아직 유효한 키만큼만
+        커집니다.
+
+        A failed publish raises before the state is written, so its sequence
+        number is not recorded as sent.
+        게시가 실패하면 상태를 기록하기 전에 예외가 발생하므로, 그 순서 번호는
+        전송된 것으로 기록되지 않습니다.
+        """
+        self.wait()
+        for log in self.doors.values():
+            log.keyring.prune()
+        state = {
+            door_id: {
+                'seq': log.keyring.seq,
+                'keys': [[p, s, e] for p, (s, e) in log.keyring.keys.items()],
+                'history': [[s, d.decode('utf-8')] for s, d in log.history],
+            }
+            for door_id, log in self.doors.items()
+        }
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.path)
+        self._stamp = self._file_stamp()
+
+
+def serve(project_id, subscription_name, state_path=SYNC_STATE_PATH):
+    """
+    Answer door resync requests from a Pub/Sub subscription until interrupted.
+    중단될 때까지 Pub/Sub 구독에서 도어 재동기화 요청에 응답합니다.
+
+    The state file is re-read for each request so changes made by issuance
+    in other processes are included.
+    다른 프로세스의 발급으로 인한 변경이 포함되도록 요청마다 상태 파일을 다시 읽습니다.
+    """
+    from google.cloud import pubsub_v1
+
+    subscriber_client = pubsub_v1.SubscriberClient()
+    subscription_path = subscriber_client.subscription_path(project_id, subscription_name)
+
+    def callback(message):
+        try:
+            request = decode_message(message.data)
+        except ValueError as e:
+            # Redelivering a malformed request would never succeed
+            # 잘못된 요청은 다시 전달되어도 성공하지 않음
+            print(f"Dropping malformed message {message.message_id}: {e}")
+            message.ack()
+            return
+        if request is not None and request['kind'] == 'resync':
+            sent = SyncHost(state_path).resync(request['door'], request['have'])
+            print(f"Resync {request['door']} from seq {request['have']}: {sent} bytes")
+        message.ack()
+
+    streaming_pull_future = subscriber_client.subscribe(subscription_path, callback=callback)
+    print("Answering resync requests on {}..".format(subscription_path))
+    try:
+        streaming_pull_future.result()
+    except KeyboardInterrupt:
+        streaming_pull_future.cancel()
+    subscriber_client.close()
+
+
+if __name__ == "__main__":
+    import config as cfg
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--serve", action="store_true", help="Answer door resync requests")
+    parser.add_argument("--state", default=SYNC_STATE_PATH, help="Sync state file")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(cfg.project_id, cfg.resync_subscription, args.state)
@@ -0,0 +1,129 @@
+"""
+Key Service Load Test
+키 서비스 부하 테스트
+
+Sends concurrent key issuance requests to keyservice.py over keep-alive
+connections and reports requests/sec and latency percentiles.
+keep-alive 연결로 keyservice.py에 동시 키 발급 요청을 보내고 초당 요청 수와
+지연 시간 백분위수를 보고합니다.
+
+Usage / 사용법:
+    python3 loadtest.py --requests 1000 --concurrency 20
+    python3 loadtest.py --unix /tmp/doorlens-keys.sock
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from keyservice import percentile
+
+
+async def open_connection(host, port, unix_path):
+    """
+    Connect to the key service over TCP or a Unix socket.
+    TCP 또는 유닉스 소켓으로 키 서비스에 연결합니다.
+    """
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def request(reader, writer, method, path, payload=None):
+    """
+    Send one HTTP/1.1 request on an open connection and read the reply.
+    열린 연결에서 HTTP/1.1 요청 하나를 보내고 응답을 읽습니다.
+
+    Returns:
+        tuple: (status, body) where body is the decoded JSON
+              (상태 코드, 디코딩된 JSON 본문)
+    """
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\n"
+        f"Host: doorlens\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def worker(host, port, unix_path, count, payload, latencies, errors):
+    """
+    Issue `count` keys sequentially over one keep-alive connection.
+    하나의 keep-alive 연결로 `count`개의 키를 순차적으로 발급합니다.
+    """
+    reader, writer = await open_connection(host, port, unix_path)
+    try:
+        for _ in range(count):
+            started = time.monotonic()
+            status, _ = await request(reader, writer, "POST", "/keys", payload)
+            if status == 200:
+                latencies.append(time.monotonic() - started)
+            else:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(host="127.0.0.1", port=8080, unix_path=None, requests=1000,
+              concurrency=20, door_id=None):
+    """
+    Run the load test and return a summary.
+    부하 테스트를 실행하고 요약을 반환합니다.
+
+    Returns:
+        dict: requests, errors, seconds, rps, p50_ms, p99_ms
+             요청 수, 오류 수, 소요 시간, 초당 요청 수, p50/p99 지연 시간 (ms)
+    """
+    payload = {'door_id': door_id} if door_id else {}
+    latencies, errors = [], []
+
+    # Spread requests evenly over the connections
+    # 요청을 연결에 고르게 분배
+    shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+
+    started = time.monotonic()
+    await asyncio.gather(*(
+        worker(host, port, unix_path, share, payload, latencies, errors)
+        for share in shares if share
+    ))
+    elapsed = time.monotonic() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': 1000 * percentile(latencies, 50),
+        'p99_ms': 1000 * percentile(latencies, 99),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="Key service address")
+    parser.add_argument("--port", type=int, default=8080, help="Key service port")
+    parser.add_argument("--unix", default=None, help="Key service Unix socket")
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests")
+    parser.add_argument("--concurrency", type=int, default=20, help="Parallel connections")
+    parser.add_argument("--door-id", default=None, help="Door to issue keys for")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.host, args.port, args.unix, args.requests,
+                             args.concurrency, args.door_id))
+    print(f"{result['requests']} requests ({result['errors']} errors) in {result['seconds']:.2f}s")
+    print(f"{result['rps']:.1f} req/s, p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
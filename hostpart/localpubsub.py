@@ -0,0 +1,305 @@
+"""
+Local Pub/Sub Module
+로컬 Pub/Sub 모듈
+
+In-process stand-in for the parts of google.cloud.pubsub_v1 used by DoorLens,
+so the host's publishers and the door's subscribers can run together in one
+process without Google Cloud. install() swaps the publisher and subscriber
+clients for ones bound to a Broker. The broker delivers each message to
+every subscription of its topic and records publish-to-ack latency.
+DoorLens가 사용하는 google.cloud.pubsub_v1 기능을 프로세스 안에서 대신하여,
+Google Cloud 없이 호스트의 게시자와 도어의 구독자를 하나의 프로세스에서 함께
+실행할 수 있게 합니다. install()은 게시자 및 구독자 클라이언트를 Broker에 연결된
+클라이언트로 바꿉니다. 브로커는 각 메시지를 토픽의 모든 구독에 전달하고 게시부터
+확인까지의 지연 시간을 기록합니다.
+
+Messages are delivered in publish order on one thread per subscribe() call;
+a nacked message is delivered again.
+메시지는 subscribe() 호출마다 하나의 스레드에서 게시 순서대로 전달되며, nack된
+메시지는 다시 전달됩니다.
+"""
+
+import concurrent.futures
+import contextlib
+import functools
+import itertools
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from google.cloud import pubsub_v1
+import pub
+
+
+class Message:
+    """
+    Received message, shaped like pubsub_v1.subscriber.message.Message.
+    pubsub_v1.subscriber.message.Message와 같은 형태의 수신 메시지입니다.
+
+    Attributes:
+        data (bytes): Message data
+                     메시지 데이터
+        attributes (dict): Message attributes
+                          메시지 속성
+        message_id (str): Broker-assigned ID
+                         브로커가 부여한 ID
+        ordering_key (str): Ordering key, or ""
+                           순서 키, 없으면 ""
+        publish_time (datetime): When the message was published
+                                메시지가 게시된 시각
+    """
+
+    def __init__(self, subscription, message_id, data, attributes, ordering_key, published_at):
+        self.data = data
+        self.attributes = attributes
+        self.message_id = message_id
+        self.ordering_key = ordering_key
+        self.publish_time = datetime.now(timezone.utc)
+        self._subscription = subscription
+        self._published_at = published_at
+
+    def ack(self):
+        """
+        Acknowledge the message.
+        메시지를 확인합니다.
+        """
+        self._subscription.acked(self)
+
+    def nack(self):
+        """
+        Ask for the message to be delivered again.
+        메시지를 다시 전달하도록 요청합니다.
+        """
+        self._subscription.queue.put(self)
+
+
+class Subscription:
+    """
+    Queue of messages for one subscription.
+    하나의 구독에 대한 메시지 큐입니다.
+    """
+
+    def __init__(self, broker, path):
+        self.broker = broker
+        self.path = path
+        self.queue = queue.Queue()
+
+    def acked(self, message):
+        self.broker.record_ack(self.path, time.monotonic() - message._published_at)
+
+
+class Broker:
+    """
+    Topics and subscriptions of one simulated Pub/Sub project.
+    시뮬레이션된 Pub/Sub 프로젝트의 토픽과 구독입니다.
+
+    Attributes:
+        published (int): Messages published
+                        게시된 메시지 수
+        ack_latencies (list): Seconds from publish to ack, per delivered message
+                             전달된 메시지별 게시부터 확인까지의 초
+    """
+
+    def __init__(self):
+        """
+        Initialize Broker instance.
+        Broker 인스턴스를 초기화합니다.
+        """
+        self.published = 0
+        self.ack_latencies = []
+        self._topics = {}
+        self._subscriptions = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create_topic(self, topic_path):
+        """
+        Create a topic; publishing to an unknown topic fails as on Pub/Sub.
+        토픽을 생성합니다. Pub/Sub와 같이 없는 토픽에 게시하면 실패합니다.
+        """
+        with self._lock:
+            self._topics.setdefault(topic_path, [])
+
+    def create_subscription(self, subscription_path, topic_path):
+        """
+        Attach a subscription to a topic, creating the topic if needed.
+        토픽에 구독을 연결하며, 필요하면 토픽을 생성합니다.
+        """
+        with self._lock:
+            subscription = Subscription(self, subscription_path)
+            self._subscriptions[subscription_path] = subscription
+            self._topics.setdefault(topic_path, []).append(subscription)
+
+    def subscription(self, subscription_path):
+        """
+        Return a subscription by path.
+        경로로 구독을 반환합니다.
+
+        Raises:
+            KeyError: If the subscription does not exist
+                     구독이 존재하지 않을 경우
+        """
+        return self._subscriptions[subscription_path]
+
+    def publish(self, topic_path, data, ordering_key="", attributes=None):
+        """
+        Put a message on every subscription of a topic.
+        토픽의 모든 구독에 메시지를 넣습니다.
+
+        Returns:
+            str: Message ID
+                메시지 ID
+
+        Raises:
+            KeyError: If the topic does not exist
+                     토픽이 존재하지 않을 경우
+        """
+        if not isinstance(data, bytes):
+            raise TypeError("Data being published to Pub/Sub must be sent as a bytestring.")
+        published_at = time.monotonic()
+        with self._lock:
+            subscriptions = self._topics[topic_path]
+            message_id = str(next(self._ids))
+            self.published += 1
+        for subscription in subscriptions:
+            subscription.queue.put(Message(subscription, message_id, data, dict(attributes or {}),
+                                           ordering_key, published_at))
+        return message_id
+
+    def record_ack(self, subscription_path, latency):
+        with self._lock:
+            self.ack_latencies.append(latency)
+
+
+class PublisherClient:
+    """
+    Publisher client bound to a Broker.
+    Broker에 연결된 게시자 클라이언트입니다.
+    """
+
+    def __init__(self, batch_settings=None, publisher_options=None, broker=None):
+        self.broker = broker
+
+    @staticmethod
+    def topic_path(project_id, topic_name):
+        return f"projects/{project_id}/topics/{topic_name}"
+
+    def publish(self, topic, data, ordering_key="", **attributes):
+        """
+        Publish at once and return a resolved future.
+        즉시 게시하고 완료된 future를 반환합니다.
+        """
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(self.broker.publish(topic, data, ordering_key, attributes))
+        except (KeyError, TypeError) as e:
+            future.set_exception(e)
+        return future
+
+    def resume_publish(self, topic, ordering_key):
+        """
+        Accepted for API compatibility; keys are never paused.
+        API 호환성을 위해 받으며, 키는 멈추지 않습니다.
+        """
+
+    def stop(self):
+        """
+        Accepted for API compatibility; nothing is buffered.
+        API 호환성을 위해 받으며, 버퍼된 것이 없습니다.
+        """
+
+
+class StreamingPullFuture(concurrent.futures.Future):
+    """
+    Future of one subscribe() call; cancel() stops its delivery thread.
+    subscribe() 호출 하나의 future이며, cancel()은 전달 스레드를 중지합니다.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.stopped = threading.Event()
+
+    def cancel(self):
+        self.stopped.set()
+        if not self.done():
+            self.set_result(None)
+        return True
+
+
+class SubscriberClient:
+    """
+    Subscriber client bound to a Broker.
+    Broker에 연결된 구독자 클라이언트입니다.
+    """
+
+    def __init__(self, broker=None):
+        self.broker = broker
+        self._futures = []
+
+    @staticmethod
+    def subscription_path(project_id, subscription_name):
+        return f"projects/{project_id}/subscriptions/{subscription_name}"
+
+    def subscribe(self, subscription, callback):
+        """
+        Deliver the subscription's messages to callback on a new thread.
+        새 스레드에서 구독의 메시지를 callback에 전달합니다.
+        """
+        source = self.broker.subscription(subscription)
+        future = StreamingPullFuture()
+
+        def deliver():
+            while not future.stopped.is_set():
+                try:
+                    message = source.queue.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                # Leave a message taken after cancel() for the next subscriber
+                # cancel() 이후 가져온 메시지는 다음 구독자를 위해 남겨 둠
+                if future.stopped.is_set():
+                    source.queue.put(message)
+                    return
+                try:
+                    callback(message)
+                except Exception as e:
+                    future.set_exception(e)
+                    return
+
+        threading.Thread(target=deliver, daemon=True, name=f"subscriber-{subscription}").start()
+        self._futures.append(future)
+        return future
+
+    def close(self):
+        for future in self._futures:
+            future.cancel()
+
+
+@contextlib.contextmanager
+def install(broker):
+    """
+    Route pubsub_v1 publisher and subscriber clients to a Broker.
+    pubsub_v1 게시자 및 구독자 클라이언트를 Broker로 연결합니다.
+
+    Clients created inside the block, by pub.py, keysync.py, audit.py or
+    doord.py, use the broker. Afterwards the real clients are restored and
+    the publishers pub.get_publisher() cached inside the block are dropped.
+    블록 안에서 pub.py, keysync.py, audit.py, doord.py가 생성하는 클라이언트는
+    브로커를 사용합니다. 이후 실제 클라이언트가 복원되고 블록 안에서
+    pub.get_publisher()가 캐시한 게시자는 제거됩니다.
+
+    Args:
+        broker (Broker): Broker the clients publish to and pull from
+                        클라이언트가 게시하고 가져오는 브로커
+    """
+    real = pubsub_v1.PublisherClient, pubsub_v1.SubscriberClient
+    with pub._publishers_lock:
+        cached = dict(pub._publishers)
+    pubsub_v1.PublisherClient = functools.partial(PublisherClient, broker=broker)
+    pubsub_v1.SubscriberClient = functools.partial(SubscriberClient, broker=broker)
+    try:
+        yield broker
+    finally:
+        pubsub_v1.PublisherClient, pubsub_v1.SubscriberClient = real
+        with pub._publishers_lock:
+            pub._publishers.clear()
+            pub._publishers.update(cached)
@@ -8,6 +8,7 @@ DoorLens 애플리케이션을 위한 설정된 로거 인스턴스를 제공합
 
 import logging
 import logging.handlers
+import os
 
 
 def logger(log_path):
@@ -32,22 +33,28 @@ def logger(log_path):
     # 로그 형식 정의: [레벨] (파일명:줄) > 메시지
     formatter = logging.Formatter('[%(levelname)s] (%(filename)s:%(lineno)d) > %(message)s')
 
+    # The logger is shared, so repeated calls (one per DoorKey in bulk
+    # issuance) must not add handlers again: one file handler per path and
+    # a single console handler
+    # 로거는 공유되므로 반복 호출(대량 발급 시 DoorKey마다)에서 핸들러를 다시
+    # 추가하지 않음: 경로당 하나의 파일 핸들러와 하나의 콘솔 핸들러
+    file_path = os.path.abspath(log_path)
+    has_file = any(isinstance(h, logging.FileHandler) and h.baseFilename == file_path
+                   for h in log.handlers)
+    has_stream = any(type(h) is logging.StreamHandler for h in log.handlers)
+
     # File handler: writes logs to file
     # 파일 핸들러: 로그를 파일에 기록
-    fileHandler = logging.FileHandler(log_path)
+    if not has_file:
+        fileHandler = logging.FileHandler(log_path)
+        fileHandler.setFormatter(formatter)
+        log.addHandler(fileHandler)
 
     # Stream handler: writes logs to console
     # 스트림 핸들러: 로그를 콘솔에 출력
-    streamHandler = logging.StreamHandler()
-
-    # Apply formatter to both handlers
-    # 두 핸들러에 포맷터 적용
-    fileHandler.setFormatter(formatter)
-    streamHandler.setFormatter(formatter)
-
-    # Add handlers to logger
-    # 로거에 핸들러 추가
-    log.addHandler(fileHandler)
-    log.addHandler(streamHandler)
+    if not has_stream:
+        streamHandler = logging.StreamHandler()
+        streamHandler.setFormatter(formatter)
+        log.addHandler(streamHandler)
 
     return log
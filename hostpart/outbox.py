@@ -0,0 +1,507 @@
+"""
+Email Outbox Module
+이메일 아웃박스 모듈
+
+Durable SQLite queue between key issuance and email. Issuance only inserts a
+row; async workers send the emails with exponential backoff and move
+messages that keep failing to a dead-letter state.
+키 발급과 이메일 사이의 영구 SQLite 큐입니다. 키 발급은 행 하나만 삽입하며,
+비동기 작업자가 지수 백오프로 이메일을 전송하고 계속 실패하는 메시지는
+데드 레터 상태로 옮깁니다.
+
+Usage / 사용법:
+    python3 outbox.py --workers 4          # drain until interrupted
+    python3 outbox.py --stats
+    python3 outbox.py --retry-dead
+"""
+
+import argparse
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+import emailsend as em
+
+OUTBOX_PATH = "outbox.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    key_name TEXT NOT NULL,
+    address TEXT NOT NULL,
+    key_png BLOB NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    created REAL NOT NULL,
+    last_error TEXT,
+    claimed_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (state, next_attempt);
+"""
+
+
+class Outbox:
+    """
+    SQLite-backed email queue.
+    SQLite 기반 이메일 큐입니다.
+
+    Rows move pending -> sending -> deleted on success, or back to pending
+    with a later next_attempt on failure, and to dead after max_attempts.
+    A claim is a lease: a row still sending lease seconds after it was
+    claimed belongs to a crashed worker and is claimed again.
+    행은 성공 시 pending -> sending -> 삭제로, 실패 시 더 늦은 next_attempt와
+    함께 pending으로 돌아가며, max_attempts 후에는 dead가 됩니다. 가져가기는
+    임대이며, 가져간 지 lease초가 지나도 전송 중인 행은 중단된 작업자의 것이므로
+    다시 가져갑니다.
+
+    Attributes:
+        path (str): SQLite database file
+                   SQLite 데이터베이스 파일
+        max_attempts (int): Sends tried before dead-lettering
+                           데드 레터 처리 전 시도할 전송 횟수
+        base_delay (float): First retry delay in seconds, doubled each time
+                           첫 재시도 지연 (초), 매번 두 배로 증가
+        max_delay (float): Upper bound on the retry delay in seconds
+                          재시도 지연의 상한 (초)
+        lease (float): Seconds a claimed message stays with its worker
+                      가져간 메시지가 작업자에게 머무는 시간 (초)
+    """
+
+    def __init__(self, path=OUTBOX_PATH, max_attempts=6, base_delay=2.0, max_delay=300.0,
+                 lease=600.0):
+        """
+        Initialize Outbox instance.
+        Outbox 인스턴스를 초기화합니다.
+
+        Opening an outbox leaves messages other workers are sending alone;
+        ones left in 'sending' by a crashed worker are claimed again once
+        their lease expires.
+        아웃박스를 열어도 다른 작업자가 전송 중인 메시지는 건드리지 않으며, 중단된
+        작업자가 'sending' 상태로 남긴 메시지는 임대가 만료되면 다시 가져갑니다.
+
+        Args:
+            path (str): SQLite database file (defaults to "outbox.db")
+                       SQLite 데이터베이스 파일 (기본값: "outbox.db")
+            max_attempts (int): Sends before dead-lettering (defaults to 6)
+                               데드 레터 전 전송 횟수 (기본값: 6)
+            base_delay (float): First retry delay in seconds (defaults to 2)
+                               첫 재시도 지연 (초) (기본값: 2)
+            max_delay (float): Retry delay cap in seconds (defaults to 300)
+                              재시도 지연 상한 (초) (기본값: 300)
+            lease (float): Claim lease in seconds (defaults to 600)
+                          가져가기 임대 시간 (초) (기본값: 600)
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+
+        # One connection shared by issuance threads and workers
+        # 발급 스레드와 작업자가 공유하는 하나의 연결
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+        # Outboxes created before leases have no claimed_at column
+        # 임대 이전에 만든 아웃박스에는 claimed_at 열이 없음
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(outbox)")]
+        if 'claimed_at' not in columns:
+            self._db.execute("ALTER TABLE outbox ADD COLUMN claimed_at REAL")
+
+    def enqueue(self, key_name, key_png, address):
+        """
+        Queue one key email.
+        키 이메일 하나를 큐에 넣습니다.
+
+        Args:
+            key_name (str): Attachment file name of the QR code
+                           QR 코드 첨부 파일 이름
+            key_png (bytes): PNG image data
+                            PNG 이미지 데이터
+            address (str): Recipient email address
+                          수신자 이메일 주소
+
+        Returns:
+            int: Outbox message ID
+                아웃박스 메시지 ID
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO outbox (key_name, address, key_png, next_attempt, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key_name, address, key_png, now, now),
+            )
+        return cursor.lastrowid
+
+    def claim(self):
+        """
+        Take the oldest due message and mark it as sending.
+        기한이 된 가장 오래된 메시지를 꺼내 전송 중으로 표시합니다.
+
+        Due messages are pending ones whose next_attempt has passed and
+        sending ones whose lease has expired. The claim runs in an immediate
+        transaction, so drainers in other processes never take the same row.
+        기한이 된 메시지는 next_attempt가 지난 대기 메시지와 임대가 만료된 전송 중
+        메시지입니다. 가져가기는 즉시 트랜잭션에서 실행되므로 다른 프로세스의
+        드레이너가 같은 행을 가져가지 않습니다.
+
+        Returns:
+            tuple: (id, key_name, key_png, address), or None when nothing is due
+                  (ID, 키 이름, PNG 바이트, 주소), 기한이 된 메시지가 없으면 None
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id, key_name, key_png, address FROM outbox "
+                    "WHERE (state = 'pending' AND next_attempt <= ?) "
+                    "OR (state = 'sending' AND (claimed_at IS NULL OR claimed_at <= ?)) "
+                    "ORDER BY next_attempt LIMIT 1",
+                    (now, now - self.lease),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE outbox SET state = 'sending', claimed_at = ? "
+                                     "WHERE id = ?", (now, row[0]))
+            finally:
+                self._db.execute("COMMIT")
+        return row
+
+    def complete(self, message_id):
+        """
+        Remove a message that was sent.
+        전송된 메시지를 제거합니다.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM outbox WHERE id = ?", (message_id,))
+
+    def retry_delay(self, attempts):
+        """
+        Backoff before the next try: base_delay * 2^(attempts-1), capped, with jitter.
+        다음 시도 전 백오프: base_delay * 2^(attempts-1), 상한 및 지터 적용.
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.0)
+
+    def fail(self, message_id, error, permanent=False):
+        """
+        Record a failed send and schedule a retry or dead-letter the message.
+        전송 실패를 기록하고 재시도를 예약하거나 메시지를 데드 레터로 옮깁니다.
+
+        Args:
+            message_id (int): Outbox message ID
+                             아웃박스 메시지 ID
+            error (Exception): Error raised by the sender
+                              전송자가 발생시킨 오류
+            permanent (bool): Dead-letter at once, e.g. on a 5xx refusal
+                             5xx 거부처럼 즉시 데드 레터로 옮김
+
+        Returns:
+            bool: True if the message was dead-lettered, False if it was
+                  rescheduled or is no longer in the outbox
+                 메시지가 데드 레터로 옮겨졌으면 True, 재예약되었거나 더 이상
+                 아웃박스에 없으면 False
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT attempts FROM outbox WHERE id = ?", (message_id,)
+            ).fetchone()
+            if row is None:
+                # Removed meanwhile, e.g. by another drainer after its lease
+                # 그 사이 제거됨, 예: 임대 후 다른 드레이너가 처리
+                return False
+            attempts = row[0] + 1
+            dead = permanent or attempts >= self.max_attempts
+            self._db.execute(
+                "UPDATE outbox SET state = ?, attempts = ?, next_attempt = ?, last_error = ? "
+                "WHERE id = ?",
+                ('dead' if dead else 'pending', attempts,
+                 time.time() + (0 if dead else self.retry_delay(attempts)),
+                 repr(error), message_id),
+            )
+        return dead
+
+    def dead_letters(self):
+        """
+        List dead-lettered messages.
+        데드 레터 메시지 목록을 반환합니다.
+
+        Returns:
+            list: (id, key_name, address, attempts, last_error) tuples
+                 (ID, 키 이름, 주소, 시도 횟수, 마지막 오류) 튜플
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, key_name, address, attempts, last_error FROM outbox "
+                "WHERE state = 'dead' ORDER BY id"
+            ).fetchall()
+
+    def retry_dead(self):
+        """
+        Return every dead-lettered message to the queue.
+        모든 데드 레터 메시지를 큐로 되돌립니다.
+
+        Returns:
+            int: Number of messages requeued
+                다시 큐에 넣은 메시지 수
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE outbox SET state = 'pending', attempts = 0, next_attempt = ? "
+                "WHERE state = 'dead'",
+                (time.time(),),
+            )
+        return cursor.rowcount
+
+    def depth(self):
+        """
+        Report queue depth by state and the age of the oldest pending message.
+        상태별 큐 깊이와 가장 오래된 대기 메시지의 경과 시간을 보고합니다.
+
+        Returns:
+            dict: pending, sending, dead, oldest_pending_s
+                 대기, 전송 중, 데드 레터 수, 가장 오래된 대기 메시지 경과 시간 (초)
+        """
+        with self._lock:
+            counts = dict(self._db.execute(
+                "SELECT state, COUNT(*) FROM outbox GROUP BY state"
+            ).fetchall())
+            oldest = self._db.execute(
+                "SELECT MIN(created) FROM outbox WHERE state = 'pending'"
+            ).fetchone()[0]
+        return {
+            'pending': counts.get('pending', 0),
+            'sending': counts.get('sending', 0),
+            'dead': counts.get('dead', 0),
+            'oldest_pending_s': time.time() - oldest if oldest is not None else 0.0,
+        }
+
+    def close(self):
+        """
+        Close the database connection.
+        데이터베이스 연결을 닫습니다.
+        """
+        with self._lock:
+            self._db.close()
+
+
+def pooled_sender(pool=None):
+    """
+    Return a send(key_name, key_png, address) function using an SMTPPool.
+    SMTPPool을 사용하는 send(key_name, key_png, address) 함수를 반환합니다.
+    """
+    pool = pool or em.get_pool()
+
+    def send(key_name, key_png, address):
+        em.key_sender(key_name, address, key_bytes=key_png, pool=pool)
+
+    return send
+
+
+class OutboxWorkers:
+    """
+    Pool of asyncio workers draining an Outbox.
+    Outbox를 비우는 asyncio 작업자 풀입니다.
+
+    Blocking SMTP sends and SQLite calls run on the default executor, so the
+    workers overlap and a busy database never stalls the event loop.
+    블로킹 SMTP 전송과 SQLite 호출은 기본 실행기에서 실행되므로 작업자들이 동시에
+    진행되며, 바쁜 데이터베이스가 이벤트 루프를 멈추지 않습니다.
+
+    Attributes:
+        outbox (Outbox): Queue to drain
+                        비울 큐
+        send (callable): send(key_name, key_png, address); raises on failure
+                        send(키 이름, PNG 바이트, 주소), 실패 시 예외 발생
+        workers (int): Number of concurrent workers
+                      동시 작업자 수
+        poll_interval (float): Seconds to wait when nothing is due
+                              기한이 된 메시지가 없을 때 대기 시간 (초)
+        sent (int): Messages sent
+                   전송된 메시지 수
+        retried (int): Failed sends scheduled for retry
+                      재시도가 예약된 실패 전송 수
+        dead (int): Messages dead-lettered
+                   데드 레터로 옮겨진 메시지 수
+        errors (int): Outbox errors the workers recovered from
+                     작업자가 복구한 아웃박스 오류 수
+    """
+
+    def __init__(self, outbox, send=None, workers=4, poll_interval=0.5):
+        """
+        Initialize OutboxWorkers instance.
+        OutboxWorkers 인스턴스를 초기화합니다.
+
+        Args:
+            outbox (Outbox): Queue to drain
+                            비울 큐
+            send (callable): Sender (defaults to the shared SMTP pool)
+                            전송자 (기본값: 공유 SMTP 풀)
+            workers (int): Concurrent workers (defaults to 4)
+                          동시 작업자 수 (기본값: 4)
+            poll_interval (float): Idle wait in seconds (defaults to 0.5)
+                                  유휴 대기 시간 (초) (기본값: 0.5)
+        """
+        self.outbox = outbox
+        self.send = send or pooled_sender()
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.errors = 0
+        self._wake = None
+
+    def notify(self):
+        """
+        Wake idle workers after an enqueue from the event loop thread.
+        이벤트 루프 스레드에서 큐에 넣은 후 유휴 작업자를 깨웁니다.
+        """
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _worker(self):
+        while True:
+            try:
+                await self._step()
+            except Exception as e:
+                # e.g. "database is locked": keep the worker and try again later
+                # 예: "database is locked", 작업자를 유지하고 나중에 다시 시도
+                self.errors += 1
+                print(f"Outbox worker error: {e!r}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _step(self):
+        """
+        Claim and send one due message, or wait when nothing is due.
+        기한이 된 메시지 하나를 가져와 전송하거나, 없으면 대기합니다.
+        """
+        loop = asyncio.get_running_loop()
+        message = await loop.run_in_executor(None, self.outbox.claim)
+        if message is None:
+            # Nothing due: sleep until notified or the next poll
+            # 기한이 된 메시지 없음: 알림 또는 다음 폴링까지 대기
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            return
+
+        message_id, key_name, key_png, address = message
+        try:
+            await loop.run_in_executor(None, self.send, key_name, key_png, address)
+        except Exception as e:
+            if await loop.run_in_executor(None, self.outbox.fail, message_id, e,
+                                          em.is_permanent(e)):
+                self.dead += 1
+                print(f"Dead-lettered email for {key_name} to {address}: {e}")
+            else:
+                self.retried += 1
+        else:
+            await loop.run_in_executor(None, self.outbox.complete, message_id)
+            self.sent += 1
+
+    async def run(self):
+        """
+        Run the workers until cancelled.
+        취소될 때까지 작업자를 실행합니다.
+        """
+        self._wake = asyncio.Event()
+        await asyncio.gather(*(self._worker() for _ in range(self.workers)))
+
+    async def drain(self, timeout=None):
+        """
+        Run the workers until nothing is pending or sending, then stop.
+        대기 중이거나 전송 중인 메시지가 없을 때까지 작업자를 실행한 뒤 중지합니다.
+
+        Messages waiting on a backoff count as pending, so this also waits
+        for retries.
+        백오프 대기 중인 메시지도 대기 중으로 간주하므로 재시도도 기다립니다.
+
+        Returns:
+            dict: Worker stats when done
+                 완료 시 작업자 통계
+        """
+        task = asyncio.ensure_future(self.run())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                depth = self.outbox.depth()
+                if not depth['pending'] and not depth['sending']:
+                    break
+                if deadline is not None and time.monotonic() > deadline:
+                    break
+                await asyncio.sleep(min(self.poll_interval, 0.05))
+        finally:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        return self.stats()
+
+    def stats(self):
+        """
+        Summarize worker counts and queue depth.
+        작업자 처리 수와 큐 깊이를 요약합니다.
+
+        Returns:
+            dict: sent, retried, dead_lettered, errors and the queue depth
+                 전송, 재시도, 데드 레터, 오류 수와 큐 깊이
+        """
+        return {
+            'sent': self.sent,
+            'retried': self.retried,
+            'dead_lettered': self.dead,
+            'errors': self.errors,
+            'queue': self.outbox.depth(),
+        }
+
+
+async def main(path, workers):
+    """
+    Drain the outbox until interrupted, printing queue depth periodically.
+    중단될 때까지 아웃박스를 비우며 주기적으로 큐 깊이를 출력합니다.
+    """
+    outbox = Outbox(path)
+    drainer = OutboxWorkers(outbox, workers=workers)
+    task = asyncio.ensure_future(drainer.run())
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(f"Outbox stats: {drainer.stats()}")
+    finally:
+        task.cancel()
+        em.get_pool().close()
+        outbox.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=OUTBOX_PATH, help="Outbox database file")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent send workers")
+    parser.add_argument("--stats", action="store_true", help="Print queue depth and exit")
+    parser.add_argument("--retry-dead", action="store_true",
+                        help="Requeue dead-lettered messages and exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        box = Outbox(args.path)
+        print(box.depth())
+        for letter in box.dead_letters():
+            print(letter)
+    elif args.retry_dead:
+        print(f"Requeued {Outbox(args.path).retry_dead()} message(s)")
+    else:
+        try:
+            asyncio.run(main(args.path, args.workers))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,237 @@
+"""
+Profiler Module
+프로파일러 모듈
+
+Samples the stacks of every thread of a running process for a bounded
+window and writes them in the collapsed ("folded") format read by
+flamegraph.pl, speedscope and similar tools. Nothing runs until a profile is
+started, either at launch with --profile or at any time with SIGUSR1, which
+starts a profile or ends the one in progress. Shared by the host and the
+door, like keysync.py.
+실행 중인 프로세스의 모든 스레드 스택을 정해진 시간 동안 샘플링하여
+flamegraph.pl, speedscope 등이 읽는 축약(folded) 형식으로 기록합니다.
+프로파일이 시작되기 전에는 아무것도 실행되지 않으며, 실행 시 --profile로 시작하거나
+언제든 SIGUSR1로 프로파일을 시작하거나 진행 중인 프로파일을 끝낼 수 있습니다.
+keysync.py처럼 호스트와 도어가 함께 사용합니다.
+
+Output / 출력:
+    profiles/<name>-<YYYYmmdd-HHMMSS>.folded, one "thread;outer;...;inner count" line per stack
+
+Usage / 사용법:
+    python3 rasberryQR.py --profile 60    # profile the first 60 seconds
+    kill -USR1 <pid>                      # start or stop a profile
+"""
+
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+PROFILE_DIR = "profiles"
+
+
+def collapse(frame, thread_name):
+    """
+    Collapse a frame's stack into one folded line prefix.
+    프레임의 스택을 하나의 축약 줄 접두사로 만듭니다.
+
+    Args:
+        frame: Innermost frame of a thread
+              스레드의 가장 안쪽 프레임
+        thread_name (str): Thread name used as the root of the stack
+                          스택의 루트로 사용되는 스레드 이름
+
+    Returns:
+        str: "thread;file:function;...", outermost call first
+            "thread;file:function;...", 가장 바깥 호출부터
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    """
+    Bounded-window sampling profiler.
+    정해진 시간 동안 동작하는 샘플링 프로파일러입니다.
+
+    A sampler thread reads every other thread's stack each interval, so a
+    profile sees the scan loop, Pub/Sub callbacks and writer threads alike.
+    When off, no thread runs and nothing is hooked.
+    샘플러 스레드가 매 간격마다 다른 모든 스레드의 스택을 읽으므로, 프로파일에는
+    스캔 루프, Pub/Sub 콜백, 작성기 스레드가 모두 나타납니다. 꺼져 있으면 실행되는
+    스레드도, 연결된 훅도 없습니다.
+
+    Attributes:
+        name (str): Profile file name prefix
+                   프로파일 파일 이름 접두사
+        directory (str): Directory profiles are written to
+                        프로파일이 기록되는 디렉터리
+        window (float): Seconds a profile runs before it ends by itself
+                       프로파일이 스스로 끝나기 전까지 실행되는 초
+        interval (float): Seconds between samples
+                         샘플 사이의 초
+        path (str): Last profile written, or None
+                   마지막으로 기록된 프로파일, 없으면 None
+    """
+
+    def __init__(self, name, directory=PROFILE_DIR, window=30.0, interval=0.005):
+        """
+        Initialize Profiler instance.
+        Profiler 인스턴스를 초기화합니다.
+
+        Args:
+            name (str): Profile file name prefix
+                       프로파일 파일 이름 접두사
+            directory (str): Directory profiles are written to (defaults to "profiles")
+                            프로파일이 기록되는 디렉터리 (기본값: "profiles")
+            window (float): Seconds a profile runs at most (defaults to 30)
+                           프로파일의 최대 실행 초 (기본값: 30)
+            interval (float): Seconds between samples (defaults to 0.005)
+                             샘플 사이의 초 (기본값: 0.005)
+        """
+        self.name = name
+        self.directory = directory
+        self.window = window
+        self.interval = interval
+        self.path = None
+
+        self._stacks = None
+        self._samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.RLock()
+
+    @property
+    def running(self):
+        """
+        Whether a profile is in progress.
+        프로파일이 진행 중인지 여부입니다.
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, window=None):
+        """
+        Start a profile.
+        프로파일을 시작합니다.
+
+        Args:
+            window (float): Seconds to profile (defaults to self.window)
+                           프로파일할 초 (기본값: self.window)
+
+        Returns:
+            bool: False if a profile was already running
+                 프로파일이 이미 실행 중이었으면 False
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks = Counter()
+            self._samples = 0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(window or self.window,),
+                                            name="profiler", daemon=True)
+            self._thread.start()
+        print(f"Profiling {self.name} for up to {window or self.window:g} seconds")
+        return True
+
+    def _run(self, window):
+        """
+        Sample until stopped or the window ends, then write the profile.
+        중지되거나 시간이 끝날 때까지 샘플링한 뒤 프로파일을 기록합니다.
+        """
+        deadline = time.monotonic() + window
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self._stacks[collapse(frame, names.get(ident, str(ident)))] += 1
+            self._samples += 1
+        self._write()
+
+    def _write(self):
+        """
+        Write the collected stacks as a folded profile.
+        수집된 스택을 축약 프로파일로 기록합니다.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory,
+                            f"{self.name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, 'w') as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.path = path
+        print(f"Profile of {self._samples} samples written to {path}")
+
+    def stop(self):
+        """
+        End the profile in progress and wait for it to be written.
+        진행 중인 프로파일을 끝내고 기록될 때까지 대기합니다.
+
+        Returns:
+            str: Path of the profile, or None if none was running
+                프로파일 경로, 실행 중인 것이 없었으면 None
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return None
+        self._stop.set()
+        thread.join()
+        return self.path
+
+    def toggle(self, *args):
+        """
+        Start a profile, or end the one in progress (signal handler).
+        프로파일을 시작하거나 진행 중인 프로파일을 끝냅니다 (시그널 핸들러).
+        """
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+
+def add_argument(parser):
+    """
+    Add the --profile option to a command line parser.
+    명령줄 파서에 --profile 옵션을 추가합니다.
+    """
+    parser.add_argument("--profile", type=float, nargs='?', const=30.0, default=None,
+                        metavar="SECONDS",
+                        help="Profile from startup for SECONDS (default 30); SIGUSR1 toggles at any time")
+
+
+def install(name, window=None, directory=PROFILE_DIR):
+    """
+    Create a profiler toggled by SIGUSR1, optionally starting it now.
+    SIGUSR1로 전환되는 프로파일러를 만들고, 선택적으로 바로 시작합니다.
+
+    Must be called from the main thread.
+    메인 스레드에서 호출해야 합니다.
+
+    Args:
+        name (str): Profile file name prefix
+                   프로파일 파일 이름 접두사
+        window (float): Start a profile of this many seconds now (optional)
+                       이 초만큼의 프로파일을 바로 시작 (선택 사항)
+        directory (str): Directory profiles are written to
+                        프로파일이 기록되는 디렉터리
+
+    Returns:
+        Profiler: The installed profiler
+                 설치된 프로파일러
+    """
+    profiler = Profiler(name, directory, window or 30.0)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, profiler.toggle)
+    if window:
+        profiler.start()
+    return profiler
@@ -23,8 +23,47 @@ QR 코드 키 데이터를 Google Cloud Pub/Sub 토픽에 게시합니다.
 """
 
 import argparse
-import time
-from google.cloud import pubsub_v1
+import concurrent.futures
+import functools
+import itertools
+import threading
+from collections import defaultdict
+import startup
+
+# Imported on first publish; issuing signed keys or only emailing never loads it
+# 처음 게시할 때 임포트됨, 서명된 키 발급이나 이메일만 보낼 때는 불러오지 않음
+pubsub_v1 = startup.lazy_import("google.cloud.pubsub_v1")
+
+# Batch limits for key issuance: send after 100 keys, 1 MB or 10 ms
+# 키 발급용 배치 제한: 키 100개, 1MB 또는 10ms 후 전송
+BATCH_LIMITS = {
+    'max_messages': 100,
+    'max_bytes': 1024 * 1024,
+    'max_latency': 0.01,
+}
+
+# BatchSettings built from BATCH_LIMITS on first use
+# 처음 사용할 때 BATCH_LIMITS로 생성되는 BatchSettings
+_batch_settings = None
+
+
+def default_batch_settings():
+    """
+    Return the key issuance BatchSettings, building them on first use.
+    키 발급용 BatchSettings를 반환하며, 처음 사용할 때 생성합니다.
+    """
+    global _batch_settings
+    if _batch_settings is None:
+        _batch_settings = pubsub_v1.types.BatchSettings(**BATCH_LIMITS)
+    return _batch_settings
+
+
+def __getattr__(name):
+    # pub.BATCH_SETTINGS stays available without importing Pub/Sub up front
+    # Pub/Sub를 미리 임포트하지 않고도 pub.BATCH_SETTINGS를 사용할 수 있게 함
+    if name == 'BATCH_SETTINGS':
+        return default_batch_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_callback(api_future, data, ref):
@@ -54,6 +93,7 @@ def get_callback(api_future, data, ref):
                 )
             )
             ref["num_messages"] += 1
+            startup.mark(startup.FIRST_PUBLISH)
         except Exception:
             # Log any errors during publication
             # 게시 중 발생한 오류 로그
@@ -67,10 +107,316 @@ def get_callback(api_future, data, ref):
     return callback
 
 
+def _settle(held, api_future):
+    """
+    Pass the outcome of a resent message on to the future its caller holds.
+    다시 보낸 메시지의 결과를 호출자가 가진 future로 전달합니다.
+    """
+    if api_future.exception() is not None:
+        held.set_exception(api_future.exception())
+    else:
+        held.set_result(api_future.result())
+
+
+class Publisher:
+    """
+    Reusable publisher for one Pub/Sub topic.
+    하나의 Pub/Sub 토픽을 위한 재사용 가능한 게시자입니다.
+
+    The client is created once and batches messages in the background;
+    completion is tracked with futures instead of polling.
+    클라이언트는 한 번만 생성되어 백그라운드에서 메시지를 배치로 묶으며,
+    완료는 폴링 대신 future로 추적합니다.
+
+    Attributes:
+        client (PublisherClient): Batching Pub/Sub client
+                                 배치 처리 Pub/Sub 클라이언트
+        topic_path (str): Fully qualified topic path
+                         완전한 형식의 토픽 경로
+        ref (dict): Number of messages published so far
+                   지금까지 게시된 메시지 수
+        ordered (bool): Messages with the same ordering key keep their order
+                       같은 순서 키를 가진 메시지의 순서 유지 여부
+        paused (dict): Ordering key -> failed and held messages, sent again
+                       in order when the key resumes
+                      순서 키 -> 실패하거나 보류된 메시지, 키가 재개되면 순서대로
+                      다시 전송
+    """
+
+    def __init__(self, project_id, topic_name, batch_settings=None, client=None,
+                 ordered=False):
+        """
+        Initialize Publisher instance.
+        Publisher 인스턴스를 초기화합니다.
+
+        Args:
+            project_id (str): Google Cloud project ID
+                             Google Cloud 프로젝트 ID
+            topic_name (str): Name of the Pub/Sub topic
+                             Pub/Sub 토픽 이름
+            batch_settings (BatchSettings): Client batching limits (defaults to
+                                            BATCH_SETTINGS)
+                                           클라이언트 배치 제한 (기본값: BATCH_SETTINGS)
+            client (PublisherClient): Existing client to reuse
+                                     재사용할 기존 클라이언트
+            ordered (bool): Enable message ordering (defaults to False)
+                           메시지 순서 보장 사용 여부 (기본값: False)
+        """
+        self.ordered = ordered
+        if batch_settings is None:
+            batch_settings = default_batch_settings()
+        if client is None and ordered:
+            client = pubsub_v1.PublisherClient(
+                batch_settings=batch_settings,
+                publisher_options=pubsub_v1.types.PublisherOptions(enable_message_ordering=True),
+            )
+        self.client = client or pubsub_v1.PublisherClient(batch_settings=batch_settings)
+
+        # Format: projects/{project_id}/topics/{topic_name}
+        self.topic_path = self.client.topic_path(project_id, topic_name)
+        self.ref = dict({"num_messages": 0})
+        self.paused = {}
+        self._inflight = {}
+        self._sequence = itertools.count()
+        self._lock = threading.RLock()
+
+    def publish(self, data, ordering_key="", **attributes):
+        """
+        Queue one message and return its future without waiting.
+        메시지 하나를 큐에 넣고 기다리지 않고 future를 반환합니다.
+
+        A failed message pauses its ordering key. The key is resumed by the
+        next publish for it, once every message still in flight on the key
+        has settled: the failed messages are then sent again in their
+        original order ahead of the new one, so nothing overtakes a message
+        that failed. Until then the new message is held back.
+        실패한 메시지는 순서 키를 멈춥니다. 키는 다음 게시 때, 그 키로 전송 중인
+        모든 메시지가 끝난 후에 재개됩니다. 그때 실패한 메시지를 원래 순서대로 새
+        메시지보다 먼저 다시 보내므로 실패한 메시지를 앞지르는 메시지는 없습니다.
+        그 전까지 새 메시지는 보류됩니다.
+
+        Args:
+            data (bytes): Message data to publish
+                         게시할 메시지 데이터
+            ordering_key (str): Messages sharing a key are delivered in order
+                               같은 키의 메시지는 순서대로 전달됨
+            **attributes: Message attributes, e.g. door_id for filtering
+                         메시지 속성, 예: 필터링용 door_id
+
+        Returns:
+            Future: Resolves to the message ID
+                   메시지 ID로 완료되는 future
+        """
+        if not ordering_key:
+            api_future = self.client.publish(self.topic_path, data=data, **attributes)
+            api_future.add_done_callback(get_callback(api_future, data, self.ref))
+            return api_future
+
+        with self._lock:
+            sequence = next(self._sequence)
+            if ordering_key not in self.paused:
+                return self._publish_ordered(sequence, data, ordering_key, attributes)
+
+            # Hold the message until the failed ones are sent again
+            # 실패한 메시지가 다시 전송될 때까지 메시지를 보류
+            held = concurrent.futures.Future()
+            self.paused[ordering_key].append((sequence, data, attributes, held))
+            self._resume(ordering_key)
+            return held
+
+    def _resume(self, ordering_key):
+        """
+        Resume a paused key and resend its messages, once none is in flight.
+        전송 중인 메시지가 없으면 멈춘 키를 재개하고 메시지를 다시 보냅니다.
+
+        Only a held publish triggers this; failed messages alone wait for
+        the next publish. Call with _lock held.
+        보류된 게시만 이를 실행하며, 실패한 메시지만 있으면 다음 게시를
+        기다립니다. _lock을 잡은 채 호출합니다.
+        """
+        waiting = self.paused.get(ordering_key)
+        if self._inflight.get(ordering_key) or not any(m[3] for m in waiting or ()):
+            return
+        del self.paused[ordering_key]
+        self.client.resume_publish(self.topic_path, ordering_key)
+        for sequence, data, attributes, held in sorted(waiting, key=lambda m: m[0]):
+            api_future = self._publish_ordered(sequence, data, ordering_key, attributes)
+            if held is not None:
+                api_future.add_done_callback(functools.partial(_settle, held))
+
+    def _publish_ordered(self, sequence, data, ordering_key, attributes):
+        """
+        Queue one ordered message and keep it for resending if it fails.
+        순서가 있는 메시지 하나를 큐에 넣고, 실패하면 재전송을 위해 보관합니다.
+        """
+        self._inflight[ordering_key] = self._inflight.get(ordering_key, 0) + 1
+
+        def settled(api_future):
+            with self._lock:
+                self._inflight[ordering_key] -= 1
+                if api_future.exception() is not None:
+                    self.paused.setdefault(ordering_key, []).append(
+                        (sequence, data, attributes, None))
+                if ordering_key in self.paused:
+                    self._resume(ordering_key)
+
+        api_future = self.client.publish(self.topic_path, data=data,
+                                         ordering_key=ordering_key, **attributes)
+        api_future.add_done_callback(settled)
+        api_future.add_done_callback(get_callback(api_future, data, self.ref))
+        return api_future
+
+    def publish_many(self, messages):
+        """
+        Queue a batch of messages; the client sends them in batches.
+        메시지 묶음을 큐에 넣으며, 클라이언트가 배치로 전송합니다.
+
+        Args:
+            messages (iterable): Message data (bytes) to publish
+                                게시할 메시지 데이터 (바이트)
+
+        Returns:
+            list: One future per message
+                 메시지마다 하나의 future
+        """
+        return [self.publish(data) for data in messages]
+
+    def flush(self, futures, timeout=None):
+        """
+        Wait for published messages to complete.
+        게시된 메시지가 완료될 때까지 대기합니다.
+
+        Args:
+            futures (list): Futures from publish() or publish_many()
+                           publish() 또는 publish_many()의 future 목록
+            timeout (float): Seconds to wait (defaults to no limit)
+                            대기 시간 (초) (기본값: 제한 없음)
+
+        Returns:
+            int: Number of messages published
+                게시된 메시지 수
+
+        Raises:
+            TimeoutError: If some messages are still pending after timeout
+                         시간 초과 후에도 대기 중인 메시지가 있을 경우
+            Exception: The first publish error, if any
+                      게시 오류가 있으면 첫 번째 오류
+        """
+        done, not_done = concurrent.futures.wait(futures, timeout=timeout)
+        if not_done:
+            raise TimeoutError(f"{len(not_done)} message(s) still pending")
+
+        for api_future in done:
+            if api_future.exception() is not None:
+                raise api_future.exception()
+
+        return len(done)
+
+    def close(self):
+        """
+        Send any queued messages and stop the client.
+        큐에 있는 메시지를 전송하고 클라이언트를 중지합니다.
+        """
+        self.client.stop()
+
+
+# Publishers reused across calls, keyed by (project_id, topic_name)
+# 호출 간에 재사용되는 게시자, (project_id, topic_name)을 키로 사용
+_publishers = {}
+_publishers_lock = threading.Lock()
+
+
+def get_publisher(project_id, topic_name, ordered=False):
+    """
+    Return the shared Publisher for a topic, creating it on first use.
+    토픽의 공유 Publisher를 반환하며, 처음 사용할 때 생성합니다.
+
+    Args:
+        project_id (str): Google Cloud project ID
+                         Google Cloud 프로젝트 ID
+        topic_name (str): Name of the Pub/Sub topic
+                         Pub/Sub 토픽 이름
+        ordered (bool): Enable message ordering (defaults to False)
+                       메시지 순서 보장 사용 여부 (기본값: False)
+
+    Returns:
+        Publisher: Reusable publisher for the topic
+                  토픽의 재사용 가능한 게시자
+    """
+    key = (project_id, topic_name, ordered)
+    with _publishers_lock:
+        publisher = _publishers.get(key)
+        if publisher is None:
+            publisher = Publisher(project_id, topic_name, ordered=ordered)
+            _publishers[key] = publisher
+        return publisher
+
+
+def fan_out(project_id, messages, topic_name=None, timeout=None):
+    """
+    Publish keys for many doors in one pass, in order per door.
+    여러 도어의 키를 한 번에, 도어별 순서대로 게시합니다.
+
+    Messages are grouped by door and published with the door ID as ordering
+    key, either to each door's own topic (the default, as sub.py expects) or
+    to one shared topic with a door_id attribute for subscription filters.
+    All doors are flushed together; messages that fail are reported and sent
+    again before the door's next message.
+    메시지는 도어별로 묶여 도어 ID를 순서 키로 하여 게시되며, 각 도어의 토픽
+    (기본값, sub.py가 기대하는 방식) 또는 구독 필터용 door_id 속성을 가진 하나의
+    공유 토픽으로 전송됩니다. 모든 도어는 함께 완료를 기다리며, 실패한 메시지는
+    보고되고 해당 도어의 다음 메시지보다 먼저 다시 전송됩니다.
+
+    Args:
+        project_id (str): Google Cloud project ID
+                         Google Cloud 프로젝트 ID
+        messages (iterable): (door_id, data) pairs, data as bytes
+                            (door_id, 데이터) 쌍, 데이터는 바이트
+        topic_name (str): Shared topic (defaults to one topic per door)
+                         공유 토픽 (기본값: 도어마다 하나의 토픽)
+        timeout (float): Seconds to wait (defaults to no limit)
+                        대기 시간 (초) (기본값: 제한 없음)
+
+    Returns:
+        tuple: (published, failed)
+            - published (dict): door_id -> number of messages published
+                               door_id -> 게시된 메시지 수
+            - failed (dict): door_id -> first error for that door
+                            door_id -> 해당 도어의 첫 번째 오류
+    """
+    groups = defaultdict(list)
+    for door_id, data in messages:
+        groups[door_id].append(data)
+
+    futures = {}
+    for door_id, batch in groups.items():
+        if topic_name:
+            publisher = get_publisher(project_id, topic_name, ordered=True)
+            futures[door_id] = [publisher.publish(data, door_id, door_id=door_id) for data in batch]
+        else:
+            publisher = get_publisher(project_id, door_id, ordered=True)
+            futures[door_id] = [publisher.publish(data, door_id) for data in batch]
+
+    concurrent.futures.wait([f for door in futures.values() for f in door], timeout=timeout)
+
+    published, failed = {}, {}
+    for door_id, door_futures in futures.items():
+        published[door_id] = 0
+        for api_future in door_futures:
+            if not api_future.done():
+                failed.setdefault(door_id, TimeoutError("message still pending"))
+            elif api_future.exception() is not None:
+                failed.setdefault(door_id, api_future.exception())
+            else:
+                published[door_id] += 1
+
+    return published, failed
+
+
 def pub(project_id, topic_name, data):
     """
-    Publishes a message to a Pub/Sub topic.
-    Pub/Sub 토픽에 메시지를 게시합니다.
+    Publishes a message to a Pub/Sub topic and waits for it.
+    Pub/Sub 토픽에 메시지를 게시하고 완료를 기다립니다.
 
     Args:
         project_id (str): Google Cloud project ID
@@ -80,33 +426,28 @@ def pub(project_id, topic_name, data):
         data (bytes): Message data to publish (must be bytes)
                      게시할 메시지 데이터 (바이트여야 함)
     """
-    # Initialize a Publisher client
-    # Publisher 클라이언트 초기화
-    client = pubsub_v1.PublisherClient()
+    pub_many(project_id, topic_name, [data])
 
-    # Create fully qualified topic path
-    # 완전한 형식의 토픽 경로 생성
-    # Format: projects/{project_id}/topics/{topic_name}
-    topic_path = client.topic_path(project_id, topic_name)
 
-    # Track the number of published messages
-    # 게시된 메시지 수 추적
-    ref = dict({"num_messages": 0})
+def pub_many(project_id, topic_name, messages):
+    """
+    Publishes a batch of messages and flushes once.
+    메시지 묶음을 게시하고 한 번에 완료를 기다립니다.
 
-    # Publish the message
-    # When you publish a message, the client returns a future
-    # 메시지 게시
-    # 메시지를 게시하면 클라이언트가 future를 반환합니다
-    api_future = client.publish(topic_path, data=data)
-    api_future.add_done_callback(get_callback(api_future, data, ref))
+    Args:
+        project_id (str): Google Cloud project ID
+                         Google Cloud 프로젝트 ID
+        topic_name (str): Name of the Pub/Sub topic
+                         Pub/Sub 토픽 이름
+        messages (iterable): Message data (bytes) to publish
+                            게시할 메시지 데이터 (바이트)
 
-    # Keep the main thread from exiting while the message future
-    # gets resolved in the background
-    # 백그라운드에서 메시지 future가 해결되는 동안
-    # 메인 스레드가 종료되지 않도록 유지
-    while api_future.running():
-        time.sleep(0.5)
-        print("Published {} message(s).".format(ref["num_messages"]))
+    Returns:
+        int: Number of messages published
+            게시된 메시지 수
+    """
+    publisher = get_publisher(project_id, topic_name)
+    return publisher.flush(publisher.publish_many(messages))
 
 
 if __name__ == "__main__":
@@ -118,7 +459,9 @@ if __name__ == "__main__":
     )
     parser.add_argument("project_id", help="Google Cloud project ID")
     parser.add_argument("topic_name", help="Pub/Sub topic name")
+    parser.add_argument("message", nargs="+", help="Message(s) to publish")
 
     args = parser.parse_args()
 
-    pub(args.project_id, args.topic_name)
+    count = pub_many(args.project_id, args.topic_name, [m.encode("utf-8") for m in args.message])
+    print("Published {} message(s).".format(count))
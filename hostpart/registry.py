@@ -0,0 +1,568 @@
+"""
+Key Registry Module
+키 레지스트리 모듈
+
+Tracks every issued key on the host: in memory for lookups, in SQLite for
+persistence. Keys are indexed by password, by door and by end time; a
+heap-driven sweeper expires keys and deletes their QR code files in bulk.
+호스트에서 발급된 모든 키를 추적합니다. 조회는 메모리에서, 영구 저장은
+SQLite에서 합니다. 키는 비밀번호, 도어, 종료 시간으로 인덱싱되며, 힙 기반
+정리기가 만료된 키를 일괄 처리하고 QR 코드 파일을 삭제합니다.
+
+Usage / 사용법:
+    python3 registry.py --active [--door DOOR_ID]
+    python3 registry.py --expiring 20
+    python3 registry.py --revoke PASSWD
+    python3 registry.py --sweep      # e.g. every minute from cron
+    python3 registry.py --events 50 [--door DOOR_ID]
+
+The in-memory index is built only when a lookup or the background sweeper
+needs it, so one-shot commands and the tools that only add keys or read
+events work on SQLite alone.
+메모리 인덱스는 조회나 백그라운드 정리기가 필요로 할 때만 만들어지므로, 일회성
+명령과 키 추가나 이벤트 조회만 하는 도구는 SQLite만으로 동작합니다.
+"""
+
+import argparse
+import datetime
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+import keycodec
+
+REGISTRY_PATH = "keys.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS keys (
+    passwd TEXT PRIMARY KEY,
+    door_id TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    key_name TEXT,
+    state TEXT NOT NULL DEFAULT 'active'
+);
+CREATE INDEX IF NOT EXISTS keys_door ON keys (door_id, state);
+CREATE INDEX IF NOT EXISTS keys_end ON keys (state, end);
+CREATE TABLE IF NOT EXISTS audit (
+    at REAL NOT NULL,
+    door_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    passwd TEXT
+);
+CREATE INDEX IF NOT EXISTS audit_door ON audit (door_id, at);
+"""
+
+# One issued key; start and end are epoch seconds
+# 발급된 키 하나, start와 end는 epoch 초
+KeyRecord = namedtuple('KeyRecord', ['passwd', 'door_id', 'start', 'end', 'key_name'])
+
+
+def to_epoch(time_string):
+    """
+    Convert a key time string to epoch seconds.
+    키 시간 문자열을 epoch 초로 변환합니다.
+    """
+    return datetime.datetime.strptime(time_string, keycodec.TIME_FORMAT).timestamp()
+
+
+def record_from_info(qr_info, key_name=None):
+    """
+    Build a KeyRecord from DoorKey key information.
+    DoorKey 키 정보로 KeyRecord를 생성합니다.
+
+    Args:
+        qr_info (str or dict): Key information (JSON string or dictionary)
+                              키 정보 (JSON 문자열 또는 딕셔너리)
+        key_name (str): QR code file of the key, if one was saved
+                       저장된 경우 키의 QR 코드 파일
+
+    Returns:
+        KeyRecord: Record for the registry
+                  레지스트리용 레코드
+    """
+    if isinstance(qr_info, str):
+        qr_info = json.loads(qr_info)
+    return KeyRecord(qr_info['passwd'], qr_info['doorID'], to_epoch(qr_info['start']),
+                     to_epoch(qr_info['end']), key_name)
+
+
+class KeyRegistry:
+    """
+    Registry of issued keys with an expiry heap and background sweeper.
+    만료 힙과 백그라운드 정리기를 가진 발급 키 레지스트리입니다.
+
+    Lookups by password are O(1) and by door O(keys of that door); adding a
+    key and expiring the next one are O(log n). Revoked keys stay in the
+    heap and are skipped when they reach the top.
+    비밀번호 조회는 O(1), 도어 조회는 O(해당 도어의 키 수)이며 키 추가와 다음
+    키 만료는 O(log n)입니다. 폐기된 키는 힙에 남아 있다가 맨 위에 오면 건너뜁니다.
+
+    Attributes:
+        path (str): SQLite database file
+                   SQLite 데이터베이스 파일
+        keys (dict): passwd -> KeyRecord for active keys, once indexed
+                    인덱스가 만들어진 후 활성 키의 passwd -> KeyRecord
+        doors (dict): door_id -> set of active passwords
+                     door_id -> 활성 비밀번호 집합
+        expired (int): Keys expired by the sweeper
+                      정리기가 만료 처리한 키 수
+        revoked (int): Keys revoked
+                      폐기된 키 수
+    """
+
+    def __init__(self, path=REGISTRY_PATH):
+        """
+        Initialize KeyRegistry instance; active keys are loaded on first lookup.
+        KeyRegistry 인스턴스를 초기화하며, 활성 키는 첫 조회 때 불러옵니다.
+
+        Args:
+            path (str): SQLite database file (defaults to "keys.db")
+                       SQLite 데이터베이스 파일 (기본값: "keys.db")
+        """
+        self.path = path
+        self.keys = {}
+        self.doors = {}
+        self.expired = 0
+        self.revoked = 0
+
+        # Expiry heap of (end, passwd); guarded together with the dicts
+        # (end, passwd) 만료 힙, 딕셔너리와 함께 보호됨
+        self._heap = []
+        self._indexed = False
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def _ensure_index(self):
+        """
+        Load active keys into memory on first use; call with _cond held.
+        처음 사용할 때 활성 키를 메모리에 불러옵니다. _cond를 잡은 채 호출합니다.
+        """
+        if self._indexed:
+            return
+        for row in self._db.execute(
+            "SELECT passwd, door_id, start, end, key_name FROM keys WHERE state = 'active'"
+        ):
+            self._index(KeyRecord(*row))
+        heapq.heapify(self._heap)
+        self._indexed = True
+
+    def _index(self, record):
+        self.keys[record.passwd] = record
+        self.doors.setdefault(record.door_id, set()).add(record.passwd)
+        self._heap.append((record.end, record.passwd))
+
+    def _unindex(self, passwd):
+        record = self.keys.pop(passwd)
+        door = self.doors[record.door_id]
+        door.discard(passwd)
+        if not door:
+            del self.doors[record.door_id]
+        return record
+
+    def add_many(self, records):
+        """
+        Register many keys in one transaction.
+        여러 키를 하나의 트랜잭션으로 등록합니다.
+
+        Args:
+            records (iterable): KeyRecord entries
+                               KeyRecord 항목
+        """
+        records = list(records)
+        with self._cond:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO keys (passwd, door_id, start, end, key_name, state) "
+                    "VALUES (?, ?, ?, ?, ?, 'active')",
+                    records,
+                )
+            if not self._indexed:
+                return
+            for record in records:
+                if record.passwd in self.keys:
+                    self._unindex(record.passwd)
+                self.keys[record.passwd] = record
+                self.doors.setdefault(record.door_id, set()).add(record.passwd)
+                heapq.heappush(self._heap, (record.end, record.passwd))
+
+            # The sweeper may need to wake earlier for a new first expiry
+            # 새로운 첫 만료를 위해 정리기가 더 일찍 깨어나야 할 수 있음
+            self._cond.notify_all()
+
+    def add(self, qr_info, key_name=None):
+        """
+        Register one issued key.
+        발급된 키 하나를 등록합니다.
+
+        Args:
+            qr_info (str or dict): Key information from DoorKey
+                                  DoorKey의 키 정보
+            key_name (str): QR code file of the key, if one was saved
+                           저장된 경우 키의 QR 코드 파일
+
+        Returns:
+            KeyRecord: The registered key
+                      등록된 키
+        """
+        record = record_from_info(qr_info, key_name)
+        self.add_many([record])
+        return record
+
+    def get(self, passwd):
+        """
+        Return the active key with this password, or None.
+        이 비밀번호를 가진 활성 키를 반환하며, 없으면 None을 반환합니다.
+        """
+        with self._cond:
+            self._ensure_index()
+            return self.keys.get(passwd)
+
+    def active(self, door_id=None):
+        """
+        List active keys, optionally for one door, by end time.
+        활성 키 목록을 종료 시간 순으로 반환하며, 선택적으로 한 도어만 반환합니다.
+
+        Args:
+            door_id (str): Only keys for this door (defaults to all doors)
+                          이 도어의 키만 (기본값: 모든 도어)
+
+        Returns:
+            list: KeyRecord entries
+                 KeyRecord 항목
+        """
+        with self._cond:
+            self._ensure_index()
+            if door_id is None:
+                records = list(self.keys.values())
+            else:
+                records = [self.keys[p] for p in self.doors.get(door_id, ())]
+        return sorted(records, key=lambda r: r.end)
+
+    def expiring(self, limit=20):
+        """
+        List the next keys to expire.
+        다음에 만료될 키 목록을 반환합니다.
+
+        Args:
+            limit (int): Maximum number of keys (defaults to 20)
+                        최대 키 수 (기본값: 20)
+
+        Returns:
+            list: KeyRecord entries, soonest first
+                 KeyRecord 항목, 가장 빠른 것부터
+        """
+        with self._cond:
+            rows = self._db.execute(
+                "SELECT passwd, door_id, start, end, key_name FROM keys "
+                "WHERE state = 'active' ORDER BY end LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [KeyRecord(*row) for row in rows]
+
+    def revoke(self, passwd):
+        """
+        Revoke an active key and delete its QR code file.
+        활성 키를 폐기하고 QR 코드 파일을 삭제합니다.
+
+        Args:
+            passwd (str): Password of the key to revoke
+                         폐기할 키의 비밀번호
+
+        Returns:
+            KeyRecord: The revoked key, or None if it was not active
+                      폐기된 키, 활성 상태가 아니었으면 None
+        """
+        with self._cond:
+            if self._indexed:
+                if passwd not in self.keys:
+                    return None
+                record = self._unindex(passwd)
+            else:
+                row = self._db.execute(
+                    "SELECT passwd, door_id, start, end, key_name FROM keys "
+                    "WHERE passwd = ? AND state = 'active'",
+                    (passwd,),
+                ).fetchone()
+                if row is None:
+                    return None
+                record = KeyRecord(*row)
+            with self._db:
+                self._db.execute("UPDATE keys SET state = 'revoked' WHERE passwd = ?", (passwd,))
+            self.revoked += 1
+
+        self._remove_artifacts([record])
+        return record
+
+    def revoked_keys(self, now=None):
+        """
+        Group the passwords of revoked keys that have not ended yet by door.
+        아직 종료되지 않은 폐기된 키의 비밀번호를 도어별로 묶어 반환합니다.
+
+        Keys past their end time are left out, since doors reject them anyway.
+        종료 시간이 지난 키는 도어가 어차피 거부하므로 제외합니다.
+
+        Returns:
+            dict: door_id -> list of passwords
+                 door_id -> 비밀번호 목록
+        """
+        now = time.time() if now is None else now
+        with self._cond:
+            rows = self._db.execute(
+                "SELECT door_id, passwd FROM keys WHERE state = 'revoked' AND end > ?",
+                (now,),
+            ).fetchall()
+        revoked = {}
+        for door_id, passwd in rows:
+            revoked.setdefault(door_id, []).append(passwd)
+        return revoked
+
+    def add_events(self, events):
+        """
+        Store door audit events in one transaction.
+        도어 감사 이벤트를 하나의 트랜잭션으로 저장합니다.
+
+        Args:
+            events (iterable): (at, door_id, event, passwd) tuples, at in epoch seconds
+                              (at, door_id, event, passwd) 튜플, at은 epoch 초
+        """
+        with self._cond:
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO audit (at, door_id, event, passwd) VALUES (?, ?, ?, ?)",
+                    events,
+                )
+
+    def events(self, door_id=None, limit=100):
+        """
+        List the latest door audit events.
+        최근 도어 감사 이벤트 목록을 반환합니다.
+
+        Args:
+            door_id (str): Only events of this door (defaults to all doors)
+                          이 도어의 이벤트만 (기본값: 모든 도어)
+            limit (int): Maximum number of events (defaults to 100)
+                        최대 이벤트 수 (기본값: 100)
+
+        Returns:
+            list: (at, door_id, event, passwd) tuples, newest first
+                 (at, door_id, event, passwd) 튜플, 최신 순
+        """
+        query = "SELECT at, door_id, event, passwd FROM audit"
+        params = ()
+        if door_id is not None:
+            query += " WHERE door_id = ?"
+            params = (door_id,)
+        with self._cond:
+            return self._db.execute(query + " ORDER BY at DESC LIMIT ?", params + (limit,)).fetchall()
+
+    @staticmethod
+    def _remove_artifacts(records):
+        for record in records:
+            if record.key_name:
+                try:
+                    os.remove(record.key_name)
+                except FileNotFoundError:
+                    pass
+
+    def sweep(self, now=None):
+        """
+        Expire every key whose end time has passed.
+        종료 시간이 지난 모든 키를 만료 처리합니다.
+
+        Keys are popped from the heap (or, before the index is built, read
+        from SQLite by end time), marked expired in one transaction and
+        their QR code files are deleted.
+        키를 힙에서 꺼내 (인덱스가 만들어지기 전에는 SQLite에서 종료 시간으로 읽어)
+        하나의 트랜잭션으로 만료 표시하고 QR 코드 파일을 삭제합니다.
+
+        Args:
+            now (float): Current epoch seconds (defaults to time.time())
+                        현재 epoch 초 (기본값: time.time())
+
+        Returns:
+            list: KeyRecord entries that expired
+                 만료된 KeyRecord 항목
+        """
+        now = time.time() if now is None else now
+        expired = []
+        with self._cond:
+            if not self._indexed:
+                expired = [KeyRecord(*row) for row in self._db.execute(
+                    "SELECT passwd, door_id, start, end, key_name FROM keys "
+                    "WHERE state = 'active' AND end <= ?",
+                    (now,),
+                )]
+            while self._heap and self._heap[0][0] <= now:
+                end, passwd = heapq.heappop(self._heap)
+
+                # Skip entries for revoked or replaced keys
+                # 폐기되었거나 교체된 키의 항목은 건너뜀
+                record = self.keys.get(passwd)
+                if record is None or record.end != end:
+                    continue
+                expired.append(self._unindex(passwd))
+
+            if expired:
+                with self._db:
+                    self._db.executemany(
+                        "UPDATE keys SET state = 'expired' WHERE passwd = ?",
+                        [(r.passwd,) for r in expired],
+                    )
+                self.expired += len(expired)
+
+        self._remove_artifacts(expired)
+        return expired
+
+    def next_expiry(self):
+        """
+        Return the end time of the next key to expire, or None.
+        다음에 만료될 키의 종료 시간을 반환하며, 없으면 None을 반환합니다.
+        """
+        with self._cond:
+            if not self._indexed:
+                return self._db.execute(
+                    "SELECT MIN(end) FROM keys WHERE state = 'active'"
+                ).fetchone()[0]
+            while self._heap and self._heap[0][1] not in self.keys:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def start(self, max_interval=60.0):
+        """
+        Start the background sweeper.
+        백그라운드 정리기를 시작합니다.
+
+        The sweeper sleeps until the next expiry, waking at least every
+        max_interval seconds.
+        정리기는 다음 만료까지 대기하며, 최소 max_interval초마다 깨어납니다.
+
+        Args:
+            max_interval (float): Longest sleep in seconds (defaults to 60)
+                                 최대 대기 시간 (초) (기본값: 60)
+        """
+        def run():
+            while True:
+                self.sweep()
+                with self._cond:
+                    if not self._running:
+                        return
+                    next_end = self.next_expiry()
+                    delay = max_interval if next_end is None else next_end - time.time()
+                    self._cond.wait(min(max(delay, 0.0), max_interval))
+                    if not self._running:
+                        return
+
+        with self._cond:
+            self._ensure_index()
+        self._running = True
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the background sweeper.
+        백그라운드 정리기를 중지합니다.
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        """
+        Summarize active, expired and revoked keys.
+        활성, 만료, 폐기된 키를 요약합니다.
+
+        Returns:
+            dict: active, doors, expired, revoked, next_expiry_s
+                 활성 키 수, 도어 수, 만료 수, 폐기 수, 다음 만료까지 남은 시간 (초)
+        """
+        next_end = self.next_expiry()
+        with self._cond:
+            if self._indexed:
+                active, doors = len(self.keys), len(self.doors)
+            else:
+                active, doors = self._db.execute(
+                    "SELECT COUNT(*), COUNT(DISTINCT door_id) FROM keys WHERE state = 'active'"
+                ).fetchone()
+            return {
+                'active': active,
+                'doors': doors,
+                'expired': self.expired,
+                'revoked': self.revoked,
+                'next_expiry_s': next_end - time.time() if next_end is not None else None,
+            }
+
+    def close(self):
+        """
+        Stop the sweeper and close the database.
+        정리기를 중지하고 데이터베이스를 닫습니다.
+        """
+        self.stop()
+        with self._cond:
+            self._db.close()
+
+
+if __name__ == "__main__":
+    import config as cfg
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=REGISTRY_PATH, help="Registry database file")
+    parser.add_argument("--active", action="store_true", help="List active keys")
+    parser.add_argument("--door", default=None, help="Limit --active or --events to one door")
+    parser.add_argument("--expiring", type=int, default=None, help="List the next N expiries")
+    parser.add_argument("--revoke", default=None, help="Revoke the key with this password")
+    parser.add_argument("--sweep", action="store_true", help="Expire keys that have ended")
+    parser.add_argument("--events", type=int, default=None, help="List the last N door events")
+    args = parser.parse_args()
+
+    registry = KeyRegistry(args.path)
+
+    def show(record):
+        end = datetime.datetime.fromtimestamp(record.end).strftime(keycodec.TIME_FORMAT)
+        print(f"{record.door_id}\t{record.passwd}\tends {end}\t{record.key_name or ''}")
+
+    if args.revoke:
+        revoked = registry.revoke(args.revoke)
+        print("Revoked" if revoked else "No active key", args.revoke)
+
+        # Tell the door when it receives keys as a synced keyring
+        # 도어가 키를 동기화된 키링으로 받는 경우 도어에 알림
+        if revoked and getattr(cfg, 'keysync_path', None):
+            import keysync
+            with keysync.SyncHost(cfg.keysync_path).transaction() as sync:
+                sync.change(revoked.door_id, revokes=[revoked.passwd])
+
+        # Push the door a fresh revocation list
+        # 도어에 새 폐기 목록 전송
+        if revoked and getattr(cfg, 'revocation_lists', False):
+            import revocation
+            revocation.publish_lists(registry, [revoked.door_id])
+    if args.sweep:
+        print(f"Expired {len(registry.sweep())} key(s)")
+    if args.active:
+        for record in registry.active(args.door):
+            show(record)
+    if args.expiring:
+        for record in registry.expiring(args.expiring):
+            show(record)
+    if args.events:
+        for at, door_id, event, passwd in registry.events(args.door, args.events):
+            at = datetime.datetime.fromtimestamp(at).strftime(keycodec.TIME_FORMAT)
+            print(f"{at}\t{door_id}\t{event}\t{passwd or ''}")
+    print(registry.stats())
+    registry.close()
@@ -0,0 +1,223 @@
+"""
+Key Revocation List Module
+키 폐기 목록 모듈
+
+Compact revocation list that doors check before accepting a key. It is a
+Bloom filter followed by a sorted table of 8 byte key digests: the filter
+answers "not revoked" for almost every key with a few bit lookups, and only
+its rare positives are confirmed against the exact table. Shared by the
+host and the door, like keycodec.py.
+도어가 키를 허용하기 전에 확인하는 간결한 폐기 목록입니다. 블룸 필터와 정렬된
+8바이트 키 다이제스트 표로 구성됩니다. 필터는 거의 모든 키에 대해 몇 번의 비트
+조회만으로 "폐기되지 않음"을 답하며, 드문 양성 결과만 정확한 표로 확인합니다.
+keycodec.py처럼 호스트와 도어가 함께 사용합니다.
+
+Blob layout / 바이너리 구조:
+
+    magic "DLRV" (4) | version (1) | hashes (1) | bits (4) | count (4)
+    | filter (bits / 8) | digests (count x 8, sorted)
+
+At a 1% false positive rate the filter needs about 1.2 bytes per revoked
+key, so 20,000 revocations take about 24 KB of filter and 160 KB of table.
+거짓 양성률 1%에서 필터는 폐기된 키당 약 1.2바이트가 필요하므로, 폐기 20,000건은
+필터 약 24KB와 표 160KB를 차지합니다.
+
+Usage / 사용법:
+    python3 revocation.py --publish            # one list per door, from the registry
+    python3 revocation.py --publish --door lobby
+"""
+
+import argparse
+import hashlib
+import math
+import struct
+
+MAGIC = b"DLRV"
+VERSION = 1
+REVOCATION_PATH = "revoked.bin"
+
+_HEADER = struct.Struct(">4sBBII")
+_DIGEST = struct.Struct(">Q")
+
+
+def _hashes(passwd):
+    """
+    Two 64-bit hashes of a password; the first is also its table digest.
+    비밀번호의 64비트 해시 두 개이며, 첫 번째는 표 다이제스트로도 사용됩니다.
+    """
+    digest = hashlib.blake2b(passwd.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+
+
+def build(passwords, fp_rate=0.01):
+    """
+    Build a revocation list blob.
+    폐기 목록 바이너리를 생성합니다.
+
+    Args:
+        passwords (iterable): Passwords of revoked keys
+                             폐기된 키의 비밀번호
+        fp_rate (float): Filter false positive rate (defaults to 1%)
+                        필터 거짓 양성률 (기본값: 1%)
+
+    Returns:
+        bytes: Revocation list blob
+              폐기 목록 바이너리
+    """
+    hashed = sorted({_hashes(p) for p in passwords})
+    count = len(hashed)
+
+    # Standard Bloom filter sizing, rounded up to whole bytes
+    # 표준 블룸 필터 크기 계산, 바이트 단위로 올림
+    bits = max(8, math.ceil(-count * math.log(fp_rate) / math.log(2) ** 2 / 8) * 8)
+    hashes = max(1, round(bits / max(count, 1) * math.log(2)))
+
+    bloom = bytearray(bits // 8)
+    for h1, h2 in hashed:
+        for i in range(hashes):
+            bit = (h1 + i * h2) % bits
+            bloom[bit >> 3] |= 1 << (bit & 7)
+
+    digests = b"".join(_DIGEST.pack(h1) for h1, _ in hashed)
+    return _HEADER.pack(MAGIC, VERSION, hashes, bits, count) + bytes(bloom) + digests
+
+
+def is_revocation_list(data):
+    """
+    Return True if data is a revocation list blob.
+    데이터가 폐기 목록 바이너리이면 True를 반환합니다.
+    """
+    return data[:len(MAGIC)] == MAGIC
+
+
+class RevocationList:
+    """
+    Read-only revocation list loaded from a blob.
+    바이너리에서 불러온 읽기 전용 폐기 목록입니다.
+
+    `passwd in revocations` costs a few bit lookups, plus a binary search
+    over the digest table when the filter says "maybe".
+    `passwd in revocations`는 몇 번의 비트 조회가 필요하며, 필터가 "아마도"라고
+    답하면 다이제스트 표에서 이진 탐색을 추가로 수행합니다.
+
+    Attributes:
+        count (int): Number of revoked keys
+                    폐기된 키 수
+        size (int): Blob size in bytes
+                   바이너리 크기 (바이트)
+    """
+
+    def __init__(self, data):
+        """
+        Parse a revocation list blob.
+        폐기 목록 바이너리를 파싱합니다.
+
+        Raises:
+            ValueError: If the blob is malformed
+                       바이너리 형식이 잘못된 경우
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("Revocation list is truncated")
+        magic, version, hashes, bits, count = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a revocation list")
+        if len(data) != _HEADER.size + bits // 8 + count * _DIGEST.size:
+            raise ValueError("Revocation list is truncated")
+
+        self._data = memoryview(data)
+        self._hashes = hashes
+        self._bits = bits
+        self._table = _HEADER.size + bits // 8
+        self.count = count
+        self.size = len(data)
+
+    def _digest(self, index):
+        return _DIGEST.unpack_from(self._data, self._table + index * _DIGEST.size)[0]
+
+    def __contains__(self, passwd):
+        # Only text passwords are ever revoked
+        # 텍스트 비밀번호만 폐기될 수 있음
+        if not isinstance(passwd, str):
+            return False
+        h1, h2 = _hashes(passwd)
+        for i in range(self._hashes):
+            bit = (h1 + i * h2) % self._bits
+            if not self._data[_HEADER.size + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+
+        # Filter positive: confirm against the sorted digest table
+        # 필터 양성: 정렬된 다이제스트 표로 확인
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._digest(mid) < h1:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < self.count and self._digest(lo) == h1
+
+    def __len__(self):
+        return self.count
+
+    @classmethod
+    def load(cls, path=REVOCATION_PATH):
+        """
+        Read a revocation list file, or return an empty list if there is none.
+        폐기 목록 파일을 읽으며, 없으면 빈 목록을 반환합니다.
+        """
+        try:
+            with open(path, 'rb') as f:
+                return cls(f.read())
+        except FileNotFoundError:
+            return cls(build([]))
+
+
+def publish_lists(registry, door_ids=None, publish=None):
+    """
+    Build and publish one revocation list per door from the registry.
+    레지스트리로 도어마다 폐기 목록 하나를 생성하여 게시합니다.
+
+    Args:
+        registry (KeyRegistry): Registry holding revoked keys
+                               폐기된 키를 가진 레지스트리
+        door_ids (list): Doors to publish for (defaults to every door with
+                         unexpired revocations)
+                        게시할 도어 (기본값: 만료되지 않은 폐기가 있는 모든 도어)
+        publish (callable): publish(door_id, data) (defaults to Pub/Sub)
+                           publish(door_id, data) (기본값: Pub/Sub)
+
+    Returns:
+        dict: door_id -> blob size in bytes
+             door_id -> 바이너리 크기 (바이트)
+    """
+    if publish is None:
+        import config as cfg
+        import pub
+
+        def publish(door_id, data):
+            pub.get_publisher(cfg.project_id, door_id).publish(data).result()
+
+    revoked = registry.revoked_keys()
+    sizes = {}
+    for door_id in (door_ids or sorted(revoked)):
+        blob = build(revoked.get(door_id, ()))
+        publish(door_id, blob)
+        sizes[door_id] = len(blob)
+    return sizes
+
+
+if __name__ == "__main__":
+    import config as cfg
+    import registry as reg
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--publish", action="store_true", help="Publish revocation lists")
+    parser.add_argument("--door", action="append", default=None, help="Door to publish for")
+    args = parser.parse_args()
+
+    if args.publish:
+        registry = reg.KeyRegistry(getattr(cfg, 'registry_path', reg.REGISTRY_PATH))
+        for door_id, size in publish_lists(registry, args.door).items():
+            print(f"{door_id}: {size} bytes")
+        registry.close()
@@ -0,0 +1,247 @@
+"""
+Startup Timing Module
+시작 시간 측정 모듈
+
+Cold-start tools for the entry points. lazy_import() stands in for a heavy
+module (cv2, pyzbar, google.cloud.pubsub_v1, qrcode, bson) and imports it on
+first use, so a process pays only for what it touches. Every deferred import
+is timed. mark() records milestones such as the first camera frame or the
+first publish, measured from process start. report() prints both in the
+spirit of python -X importtime and checks milestones against a budget.
+진입점을 위한 콜드 스타트 도구입니다. lazy_import()는 무거운 모듈(cv2, pyzbar,
+google.cloud.pubsub_v1, qrcode, bson)을 대신하다가 처음 사용할 때 임포트하므로,
+프로세스는 실제로 사용하는 것에 대해서만 비용을 치릅니다. 지연된 모든 임포트는
+시간이 측정됩니다. mark()는 첫 카메라 프레임이나 첫 게시 같은 이정표를 프로세스
+시작부터 측정하여 기록합니다. report()는 python -X importtime처럼 둘을 출력하고
+이정표를 예산과 비교합니다.
+
+Shared with the Raspberry Pi; copy it next to rasberryQR.py.
+라즈베리파이와 공유되며, rasberryQR.py 옆에 복사합니다.
+"""
+
+import importlib
+import os
+import threading
+import time
+import types
+
+# Milestones of the entry points
+# 진입점의 이정표
+FIRST_FRAME = "first_frame"
+FIRST_PUBLISH = "first_publish"
+
+# Deferred imports and milestones, (seconds since start, self seconds, name) in order
+# 지연된 임포트와 이정표, 순서대로 (시작 이후 초, 자체 소요 초, 이름)
+_events = []
+_marks = {}
+
+# Reports waiting for a milestone, name -> callbacks
+# 이정표를 기다리는 보고서, 이름 -> 콜백
+_reports = {}
+
+# Guards the timeline; each LazyModule has its own import lock
+# 타임라인을 보호하며, 각 LazyModule은 자체 임포트 잠금을 가짐
+_lock = threading.Lock()
+
+
+def _process_start():
+    """
+    Return when this process started on the boot clock, or None.
+    부트 클록 기준으로 이 프로세스가 시작된 시각을 반환하며, 없으면 None입니다.
+
+    /proc/self/stat has the start time in clock ticks (usually 10 ms), so
+    interpreter start-up before this module was imported is counted too.
+    /proc/self/stat에 시작 시각이 클록 틱(보통 10ms) 단위로 있으므로, 이 모듈이
+    임포트되기 전의 인터프리터 시작 시간도 포함됩니다.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return int(fields[19]) / os.sysconf("SC_CLK_TCK"), time.CLOCK_BOOTTIME
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+_started = _process_start()
+if _started is None:
+    _started = time.clock_gettime(time.CLOCK_MONOTONIC), time.CLOCK_MONOTONIC
+
+
+def since_start():
+    """
+    Return seconds since the process started.
+    프로세스가 시작된 이후의 초를 반환합니다.
+    """
+    started, clock = _started
+    return time.clock_gettime(clock) - started
+
+
+class LazyModule(types.ModuleType):
+    """
+    Module placeholder that imports the real module on first attribute access.
+    첫 속성 접근 시 실제 모듈을 임포트하는 모듈 자리 표시자입니다.
+
+    Attributes are read through to the real module on every access, so
+    patching the real module (as localpubsub.install() does) is seen here too.
+    Attributes set on the placeholder, as unittest.mock.patch does, shadow the
+    real ones until deleted.
+    속성은 접근할 때마다 실제 모듈에서 읽으므로, 실제 모듈을 패치하면
+    (localpubsub.install()처럼) 여기에도 반영됩니다. unittest.mock.patch처럼 자리
+    표시자에 설정한 속성은 삭제될 때까지 실제 속성을 가립니다.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+        self.__dict__['_import_lock'] = threading.Lock()
+
+    def _load(self):
+        """
+        Import and time the real module once.
+        실제 모듈을 한 번 임포트하고 시간을 측정합니다.
+
+        Raises:
+            ImportError: If the module cannot be imported
+                        모듈을 임포트할 수 없는 경우
+        """
+        module = self.__dict__['_module']
+        if module is not None:
+            return module
+        with self.__dict__['_import_lock']:
+            module = self.__dict__['_module']
+            if module is None:
+                began = time.perf_counter()
+                module = importlib.import_module(self.__name__)
+                with _lock:
+                    _events.append((since_start(), time.perf_counter() - began,
+                                    f"import {self.__name__}"))
+                self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module {self.__name__!r}>"
+
+
+def lazy_import(name):
+    """
+    Return a module that is imported on first use.
+    처음 사용할 때 임포트되는 모듈을 반환합니다.
+
+    Import errors surface at first use instead of at start-up.
+    임포트 오류는 시작 시가 아니라 처음 사용할 때 발생합니다.
+
+    Args:
+        name (str): Full module name, e.g. "pyzbar.pyzbar"
+                   전체 모듈 이름, 예: "pyzbar.pyzbar"
+
+    Returns:
+        LazyModule: Placeholder for the module
+                   모듈의 자리 표시자
+    """
+    return LazyModule(name)
+
+
+def mark(name):
+    """
+    Record the first time a milestone is reached; later calls are ignored.
+    이정표에 처음 도달한 시각을 기록하며, 이후 호출은 무시됩니다.
+
+    A repeated mark is a single dictionary lookup, so it can sit on a hot path.
+    반복된 기록은 딕셔너리 조회 한 번이므로 핫 경로에 둘 수 있습니다.
+
+    Returns:
+        float: Seconds from process start to the first time name was marked
+              프로세스 시작부터 name이 처음 기록된 시각까지의 초
+    """
+    elapsed = _marks.get(name)
+    if elapsed is not None:
+        return elapsed
+    with _lock:
+        if name in _marks:
+            return _marks[name]
+        elapsed = _marks[name] = since_start()
+        _events.append((elapsed, 0.0, name))
+        callbacks = _reports.pop(name, [])
+    for callback in callbacks:
+        callback()
+    return elapsed
+
+
+def report_at(name, budget_ms=None, out=print):
+    """
+    Print the startup report once a milestone is reached.
+    이정표에 도달하면 시작 보고서를 출력합니다.
+
+    Args:
+        name (str): Milestone, e.g. FIRST_FRAME
+                   이정표, 예: FIRST_FRAME
+        budget_ms (float): Allowed milliseconds from process start to name,
+                           or None (or 0) for no budget
+                          프로세스 시작부터 name까지 허용되는 밀리초, 예산이
+                          없으면 None (또는 0)
+        out (callable): Receives each line (defaults to print)
+                       각 줄을 받는 함수 (기본값: print)
+    """
+    budget = {name: budget_ms} if budget_ms else None
+    with _lock:
+        _reports.setdefault(name, []).append(lambda: report(budget, out))
+
+
+def events():
+    """
+    Return deferred imports and milestones in the order they happened.
+    지연된 임포트와 이정표를 발생 순서대로 반환합니다.
+
+    Returns:
+        list: (seconds since start, self seconds, name) tuples
+             (시작 이후 초, 자체 소요 초, 이름) 튜플
+    """
+    with _lock:
+        return sorted(_events)
+
+
+def report(budget=None, out=print):
+    """
+    Print the startup timeline and check milestones against a budget.
+    시작 타임라인을 출력하고 이정표를 예산과 비교합니다.
+
+    Lines follow python -X importtime: time since start, self time and the
+    import or milestone name, in milliseconds.
+    줄은 python -X importtime 형식을 따릅니다: 시작 이후 시간, 자체 시간, 임포트
+    또는 이정표 이름 (밀리초).
+
+    Args:
+        budget (dict): Milestone name -> allowed milliseconds since start (optional)
+                      이정표 이름 -> 시작 이후 허용 밀리초 (선택 사항)
+        out (callable): Receives each line (defaults to print)
+                       각 줄을 받는 함수 (기본값: print)
+
+    Returns:
+        list: Milestones that were reached over budget
+             예산을 넘어 도달한 이정표
+    """
+    budget = budget or {}
+    over = []
+    out("startup: since start [ms] |  self [ms] | name")
+    for elapsed, own, name in events():
+        line = f"startup: {1000 * elapsed:14.1f} | {1000 * own:10.1f} | {name}"
+        allowed = budget.get(name)
+        if allowed is not None and 1000 * elapsed > allowed:
+            over.append(name)
+            line += f" (over budget of {allowed:.0f} ms)"
+        out(line)
+    return over
+
+
+def add_argument(parser, milestone):
+    """
+    Add --startup [BUDGET_MS] to an entry point's argument parser.
+    진입점의 인자 파서에 --startup [BUDGET_MS]를 추가합니다.
+    """
+    parser.add_argument("--startup", type=float, nargs='?', const=0.0, default=None,
+                        metavar="BUDGET_MS",
+                        help=f"Report startup timing at {milestone}, "
+                             "warning when it takes longer than BUDGET_MS")
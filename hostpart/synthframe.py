@@ -0,0 +1,182 @@
+"""
+Synthetic Camera Frame Module
+합성 카메라 프레임 모듈
+
+Renders real keys with DoorKey and composites the QR codes into camera-sized
+frames at varied scale, rotation, blur and noise, so the door's decode and
+validation path can be benchmarked and load-tested without a camera.
+DoorKey로 실제 키를 렌더링하고 QR 코드를 다양한 크기, 회전, 흐림, 노이즈로
+카메라 크기의 프레임에 합성하여, 카메라 없이도 도어의 디코딩 및 검증 경로를
+벤치마크하고 부하 테스트할 수 있게 합니다.
+
+Usage / 사용법:
+    python3 synthframe.py --count 8 --out frames/   # write sample frames as PNG
+"""
+
+import argparse
+import itertools
+import os
+import numpy as np
+import cv2
+import testpart
+
+# Camera frame size (rows, columns), as delivered by cv2.VideoCapture(0)
+# cv2.VideoCapture(0)이 전달하는 카메라 프레임 크기 (행, 열)
+FRAME_SIZE = (480, 640)
+
+# Variations cycled through by variants()
+# variants()가 순환하는 변형
+SCALES = (0.6, 0.8, 1.0)
+ANGLES = (0.0, 8.0, -15.0)
+BLURS = (0, 1)
+NOISES = (0.0, 6.0)
+
+
+def qr_gray(key_png):
+    """
+    Decode rendered QR code PNG bytes to a grayscale array.
+    렌더링된 QR 코드 PNG 바이트를 그레이스케일 배열로 디코딩합니다.
+    """
+    return cv2.imdecode(np.frombuffer(key_png, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+def composite(qr, size=FRAME_SIZE, scale=1.0, angle=0.0, blur=0, noise=0.0, rng=None):
+    """
+    Place a QR code in a synthetic BGR camera frame.
+    QR 코드를 합성 BGR 카메라 프레임에 배치합니다.
+
+    Args:
+        qr (numpy.ndarray): Grayscale QR code image
+                           그레이스케일 QR 코드 이미지
+        size (tuple): Frame (rows, columns) (defaults to 480x640)
+                     프레임 (행, 열) (기본값: 480x640)
+        scale (float): QR code scale factor (defaults to 1.0)
+                      QR 코드 크기 배율 (기본값: 1.0)
+        angle (float): Rotation in degrees (defaults to 0)
+                      회전 각도 (기본값: 0)
+        blur (int): Gaussian blur radius in pixels, 0 for none
+                   가우시안 흐림 반경 (픽셀), 0이면 없음
+        noise (float): Standard deviation of pixel noise, 0 for none
+                      픽셀 노이즈의 표준 편차, 0이면 없음
+        rng (numpy.random.Generator): Noise source (defaults to seed 0)
+                                     노이즈 소스 (기본값: 시드 0)
+
+    Returns:
+        numpy.ndarray: uint8 frame of shape size + (3,)
+                      size + (3,) 형태의 uint8 프레임
+
+    Raises:
+        ValueError: If the scaled code does not fit in the frame
+                   크기를 조정한 코드가 프레임에 들어가지 않는 경우
+    """
+    rng = rng or np.random.default_rng(0)
+    code = cv2.resize(qr, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    # Rotate on a canvas large enough for the corners; white keeps the quiet zone
+    # 모서리가 들어갈 만큼 큰 캔버스에서 회전하며, 흰색으로 여백을 유지
+    if angle:
+        side = int(np.ceil(code.shape[0] * (abs(np.cos(np.radians(angle)))
+                                            + abs(np.sin(np.radians(angle))))))
+        matrix = cv2.getRotationMatrix2D((code.shape[1] / 2, code.shape[0] / 2), angle, 1.0)
+        matrix[:, 2] += (side - code.shape[1]) / 2, (side - code.shape[0]) / 2
+        code = cv2.warpAffine(code, matrix, (side, side), flags=cv2.INTER_LINEAR,
+                              borderValue=255)
+
+    rows, cols = size
+    if code.shape[0] > rows or code.shape[1] > cols:
+        raise ValueError(f"QR code of {code.shape[1]}x{code.shape[0]} does not fit in {cols}x{rows}")
+
+    # A dim, uneven background like an entrance seen by the door camera
+    # 도어 카메라로 본 출입구처럼 어둡고 고르지 않은 배경
+    frame = np.empty(size, dtype=np.float32)
+    frame[:] = np.linspace(70, 130, cols, dtype=np.float32)
+    top, left = (rows - code.shape[0]) // 2, (cols - code.shape[1]) // 2
+    frame[top:top + code.shape[0], left:left + code.shape[1]] = code
+
+    if blur:
+        frame = cv2.GaussianBlur(frame, (2 * blur + 1, 2 * blur + 1), 0)
+    if noise:
+        frame += rng.normal(0, noise, size).astype(np.float32)
+
+    gray = np.clip(frame, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def variants(count):
+    """
+    Iterate over count (scale, angle, blur, noise) tuples, cycling through
+    every combination.
+    모든 조합을 순환하며 count개의 (scale, angle, blur, noise) 튜플을 반환합니다.
+    """
+    return itertools.islice(itertools.cycle(itertools.product(SCALES, ANGLES, BLURS, NOISES)),
+                            count)
+
+
+def key_variants(key_png, count, size=FRAME_SIZE, seed=0):
+    """
+    Composite one key into frames at every variation.
+    하나의 키를 모든 변형으로 프레임에 합성합니다.
+
+    Args:
+        key_png (bytes): Rendered QR code PNG
+                        렌더링된 QR 코드 PNG
+        count (int): Number of frames
+                    프레임 수
+        size (tuple): Frame (rows, columns)
+                     프레임 (행, 열)
+        seed (int): Noise seed
+                   노이즈 시드
+
+    Returns:
+        list: BGR frames
+             BGR 프레임
+    """
+    rng = np.random.default_rng(seed)
+    qr = qr_gray(key_png)
+    return [composite(qr, size, *variation, rng=rng) for variation in variants(count)]
+
+
+def key_frames(count, door_id='default', key_format='compact', size=FRAME_SIZE, seed=0):
+    """
+    Issue keys with DoorKey and composite each into a frame.
+    DoorKey로 키를 발급하고 각각을 프레임에 합성합니다.
+
+    Frames cycle through every combination of SCALES, ANGLES, BLURS and
+    NOISES.
+    프레임은 SCALES, ANGLES, BLURS, NOISES의 모든 조합을 순환합니다.
+
+    Args:
+        count (int): Number of frames
+                    프레임 수
+        door_id (str): Door the keys are issued for
+                      키를 발급할 도어
+        key_format (str): QR payload format passed to DoorKey
+                         DoorKey에 전달하는 QR 페이로드 형식
+        size (tuple): Frame (rows, columns)
+                     프레임 (행, 열)
+        seed (int): Noise seed
+                   노이즈 시드
+
+    Returns:
+        list: (frame, qr_info) pairs, where qr_info is the key's JSON string
+             (frame, qr_info) 쌍, qr_info는 키의 JSON 문자열
+    """
+    rng = np.random.default_rng(seed)
+    frames = []
+    for variation in variants(count):
+        _, key_png, qr_info = testpart.DoorKey(door_id, key_format=key_format).create_key_in_memory()
+        frames.append((composite(qr_gray(key_png), size, *variation, rng=rng), qr_info))
+    return frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=8, help="Frames to generate")
+    parser.add_argument("--out", default="frames", help="Directory for the PNG frames")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for i, (frame, qr_info) in enumerate(key_frames(args.count)):
+        cv2.imwrite(os.path.join(args.out, f"{i:03d}.png"), frame)
+        print(f"{i:03d}.png {qr_info}")
@@ -7,10 +7,18 @@ Tests for key generation, QR code creation, and distribution modules.
 """
 
 import unittest
+import asyncio
+import concurrent.futures
 import json
 import os
 import tempfile
 import shutil
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+import zlib
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 import qrcode
@@ -20,6 +28,20 @@ from bson import ObjectId
 # 테스트할 모듈 임포트
 import testpart
 import logger
+import keycodec
+import keypool
+import keyservice
+import loadtest
+import pub
+import emailsend
+import outbox
+import registry
+import keysync
+import revocation
+import audit
+import profiler
+import localpubsub
+import startup
 
 
 class TestLogger(unittest.TestCase):
@@ -51,6 +73,17 @@ class TestLogger(unittest.TestCase):
         log.info("Test message")
         self.assertTrue(os.path.exists(self.test_log_path))
 
+    def test_logger_does_not_accumulate_handlers(self):
+        """Test that calling logger again for a path adds no handlers."""
+        log = logger.logger(self.test_log_path)
+        count = len(log.handlers)
+        log = logger.logger(self.test_log_path)
+        self.assertEqual(len(log.handlers), count)
+
+        log.info("Logged once")
+        with open(self.test_log_path, 'r') as f:
+            self.assertEqual(f.read().count("Logged once"), 1)
+
     def test_logger_writes_to_file(self):
         """Test that logger writes messages to file."""
         log = logger.logger(self.test_log_path)
@@ -148,6 +181,16 @@ class TestDoorKey(unittest.TestCase):
         self.assertNotEqual(data['passwd'], 'default')
         self.assertTrue(len(data['passwd']) > 0)
 
+    def test_create_key_in_memory_skips_disk(self):
+        """Test that in-memory rendering returns PNG bytes without a file."""
+        key = testpart.DoorKey(door_id='test_door')
+        key_name, key_png, qr_info = key.create_key_in_memory()
+
+        self.assertTrue(key_name.endswith('.png'))
+        self.assertTrue(key_png.startswith(b'\x89PNG'))
+        self.assertFalse(os.path.exists(key_name))
+        self.assertEqual(json.loads(qr_info)['doorID'], 'test_door')
+
     def test_create_key_preserves_custom_password(self):
         """Test that custom password is preserved."""
         custom_pass = 'my_custom_password'
@@ -158,6 +201,464 @@ class TestDoorKey(unittest.TestCase):
         self.assertEqual(data['passwd'], custom_pass)
 
 
+class TestKeyCodec(unittest.TestCase):
+    """
+    Test cases for the compact key payload codec.
+    간결한 키 페이로드 코덱에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.key_info = {
+            'doorID': 'test_door',
+            'passwd': str(ObjectId()),
+            'start': '2025-01-01, 10:00:00',
+            'end': '2025-01-01, 10:10:00'
+        }
+
+    def test_base45_rfc_vectors(self):
+        """Test base45 against the RFC 9285 examples."""
+        self.assertEqual(keycodec.b45encode(b'AB'), 'BB8')
+        self.assertEqual(keycodec.b45encode(b'Hello!!'), '%69 VD92EX0')
+        self.assertEqual(keycodec.b45decode('QED8WEX0'), b'ietf!')
+
+    def test_compact_round_trip(self):
+        """Test that a compact payload decodes to the original key."""
+        payload = keycodec.encode_compact(self.key_info)
+        self.assertEqual(keycodec.decode_payload(payload), self.key_info)
+
+    def test_compact_is_alphanumeric_and_shorter(self):
+        """Test that the payload fits QR alphanumeric mode and beats JSON."""
+        payload = keycodec.encode_compact(self.key_info)
+        self.assertTrue(set(payload) <= set(keycodec.BASE45_ALPHABET))
+        self.assertLess(len(payload), len(json.dumps(self.key_info)))
+
+    def test_compact_custom_password(self):
+        """Test that non-ObjectId passwords survive the round trip."""
+        self.key_info['passwd'] = 'my_custom_password'
+        payload = keycodec.encode_compact(self.key_info)
+        self.assertEqual(keycodec.decode_compact(payload)['passwd'], 'my_custom_password')
+
+    def test_window_independent_of_time_zone(self):
+        """Test that a payload encoded in one time zone decodes to the same text in another."""
+        old_tz = os.environ.get('TZ')
+        try:
+            os.environ['TZ'] = 'Asia/Seoul'
+            time.tzset()
+            payload = keycodec.encode_compact(self.key_info)
+            os.environ['TZ'] = 'America/New_York'
+            time.tzset()
+            self.assertEqual(keycodec.decode_payload(payload), self.key_info)
+            self.assertEqual(keycodec.decode_payload(payload, epochs=True)['start'],
+                             keycodec.to_epoch(self.key_info['start']))
+        finally:
+            if old_tz is None:
+                os.environ.pop('TZ', None)
+            else:
+                os.environ['TZ'] = old_tz
+            time.tzset()
+
+    def test_long_fields_rejected(self):
+        """Test that a doorID or password over 255 bytes raises ValueError."""
+        with self.assertRaises(ValueError):
+            keycodec.encode_compact(dict(self.key_info, doorID='d' * 256))
+        with self.assertRaises(ValueError):
+            keycodec.encode_compact(dict(self.key_info, passwd='p' * 256))
+        payload = keycodec.encode_compact(dict(self.key_info, doorID='d' * 255))
+        self.assertEqual(keycodec.decode_compact(payload)['doorID'], 'd' * 255)
+
+    def test_unknown_version_rejected(self):
+        """Test that an unknown payload version is rejected."""
+        raw = keycodec.b45decode(keycodec.encode_compact(self.key_info)[2:])
+        payload = keycodec.PREFIX + keycodec.b45encode(b'\x09' + raw[1:])
+        with self.assertRaises(ValueError):
+            keycodec.decode_payload(payload)
+
+    def test_json_payload_still_accepted(self):
+        """Test that legacy JSON payloads are still decoded."""
+        self.assertEqual(keycodec.decode_payload(json.dumps(self.key_info)), self.key_info)
+        with self.assertRaises(ValueError):
+            keycodec.decode_payload('not a key')
+
+    def test_json_payload_fields_must_be_text(self):
+        """Test that JSON keys whose doorID or passwd is not a string are rejected."""
+        for payload in ['{"doorID": "door1", "passwd": ["x"]}', '{"doorID": "door1", "passwd": 5}',
+                        '{"doorID": {"a": 1}, "passwd": "p"}', '{"doorID": "door1"}']:
+            with self.assertRaises(ValueError):
+                keycodec.decode_payload(payload)
+
+
+class TestSignedKeys(unittest.TestCase):
+    """
+    Test cases for signed, self-validating keys.
+    서명된 자체 검증 키에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.secret = b'shared-door-secret'
+        self.key_info = {
+            'doorID': 'test_door',
+            'passwd': str(ObjectId()),
+            'start': '2025-01-01, 10:00:00',
+            'end': '2025-01-01, 10:10:00'
+        }
+        self.inside = datetime(2025, 1, 1, 10, 5).timestamp()
+
+    def test_signed_round_trip(self):
+        """Test that a signed key verifies for its door and window."""
+        payload = keycodec.encode_signed(self.key_info, self.secret)
+
+        self.assertTrue(keycodec.is_signed(payload))
+        result = keycodec.verify_signed(payload, self.secret, 'test_door', now=self.inside)
+        self.assertEqual(result, self.key_info)
+
+    def test_wrong_secret_rejected(self):
+        """Test that a key signed with another secret is rejected."""
+        payload = keycodec.encode_signed(self.key_info, b'other-secret')
+        with self.assertRaises(ValueError):
+            keycodec.verify_signed(payload, self.secret, 'test_door', now=self.inside)
+
+    def test_tampered_key_rejected(self):
+        """Test that changing any field invalidates the signature."""
+        raw = keycodec.b45decode(keycodec.encode_signed(self.key_info, self.secret)[2:])
+        tampered = bytearray(raw)
+        tampered[9] ^= 0x01  # move the end time by one second
+        payload = keycodec.PREFIX + keycodec.b45encode(bytes(tampered))
+
+        with self.assertRaises(ValueError):
+            keycodec.verify_signed(payload, self.secret, 'test_door', now=self.inside)
+
+    def test_wrong_door_and_window_rejected(self):
+        """Test that door ID and validity window are enforced."""
+        payload = keycodec.encode_signed(self.key_info, self.secret)
+        after = datetime(2025, 1, 1, 10, 11).timestamp()
+
+        with self.assertRaises(ValueError):
+            keycodec.verify_signed(payload, self.secret, 'other_door', now=self.inside)
+        with self.assertRaises(ValueError):
+            keycodec.verify_signed(payload, self.secret, 'test_door', now=after)
+
+    def test_signed_key_not_decoded_unverified(self):
+        """Test that decode_payload refuses to skip verification."""
+        payload = keycodec.encode_signed(self.key_info, self.secret)
+        self.assertFalse(keycodec.is_signed(keycodec.encode_compact(self.key_info)))
+        with self.assertRaises(ValueError):
+            keycodec.decode_payload(payload)
+
+    def test_doorkey_signed_requires_secret(self):
+        """Test that DoorKey refuses to sign without a secret."""
+        with self.assertRaises(ValueError):
+            testpart.DoorKey(key_format='signed')
+
+    @patch('testpart.render_key')
+    def test_doorkey_issues_verifiable_key(self, mock_render):
+        """Test that DoorKey renders a payload the door can verify."""
+        key = testpart.DoorKey(door_id='test_door', key_format='signed', secret=self.secret)
+        key.create_key_in_memory()
+
+        payload = mock_render.call_args.args[0]
+        result = keycodec.verify_signed(payload, self.secret, 'test_door')
+        self.assertEqual(result['end'], key.end)
+
+    @patch('testpart.pub.pub')
+    @patch('testpart.em.key_sender')
+    def test_signed_keys_are_not_published(self, mock_email, mock_pub):
+        """Test that signed keys are emailed but not sent to the door."""
+        with patch.object(testpart.cfg, 'door_secret', 'shared-door-secret', create=True):
+            key = testpart.new_door_key()
+            self.assertEqual(key.key_format, 'signed')
+            testpart.distribute('k.png', b'png', '{}', publish=key.key_format != 'signed')
+
+        mock_pub.assert_not_called()
+        mock_email.assert_called_once()
+
+
+class TestBulkIssuance(unittest.TestCase):
+    """
+    Test cases for bulk key generation and distribution.
+    대량 키 생성 및 배포에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.test_dir = tempfile.mkdtemp()
+        self.original_dir = os.getcwd()
+        os.chdir(self.test_dir)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        os.chdir(self.original_dir)
+        shutil.rmtree(self.test_dir)
+
+    def test_create_keys_renders_each_key(self):
+        """Test that create_keys renders one distinct key per request."""
+        key = testpart.DoorKey(door_id='test_door')
+        results = list(key.create_keys(5, workers=2))
+
+        self.assertEqual(len(results), 5)
+        passwords = set()
+        for key_name, key_png, qr_info in results:
+            self.assertTrue(key_png.startswith(b'\x89PNG'))
+            self.assertFalse(os.path.exists(key_name))
+            data = json.loads(qr_info)
+            self.assertEqual(data['doorID'], 'test_door')
+            self.assertEqual(data['end'], key.end)
+            passwords.add(data['passwd'])
+        self.assertEqual(len(passwords), 5)
+
+    def test_create_keys_can_persist(self):
+        """Test that create_keys writes PNG files when asked."""
+        key = testpart.DoorKey(door_id='test_door')
+        for key_name, key_png, _ in key.create_keys(2, workers=1, save=True):
+            with open(key_name, 'rb') as f:
+                self.assertEqual(f.read(), key_png)
+
+    def test_bounded_map_limits_in_flight_jobs(self):
+        """Test that bounded_map never submits past its window."""
+        executor = MagicMock()
+        executor.submit.side_effect = lambda fn, *args: MagicMock(**{'result.return_value': args[0]})
+
+        consumed = []
+
+        def jobs():
+            for i in range(10):
+                consumed.append(i)
+                yield (i,)
+
+        results = testpart.bounded_map(executor, None, jobs(), 3)
+        first = next(results)
+
+        self.assertEqual(first, ((0,), 0))
+        self.assertEqual(len(consumed), 3)
+        self.assertEqual([r for _, r in results], list(range(1, 10)))
+
+    @patch('testpart.pub.get_publisher')
+    @patch('testpart.em.key_sender')
+    def test_issue_batch_distributes_every_key(self, mock_email, mock_get_publisher):
+        """Test that issue_batch publishes and emails each key once."""
+        publisher = mock_get_publisher.return_value
+        rate = testpart.issue_batch(4, workers=2)
+
+        self.assertEqual(publisher.publish.call_count, 4)
+        publisher.flush.assert_called_once()
+        self.assertEqual(len(publisher.flush.call_args[0][0]), 4)
+        self.assertEqual(mock_email.call_count, 4)
+        self.assertGreater(rate, 0)
+
+        # No PNG files are left behind in the working directory
+        # 작업 디렉터리에 남는 PNG 파일이 없음
+        self.assertEqual([f for f in os.listdir('.') if f.endswith('.png')], [])
+
+    @patch('testpart.pub.fan_out', return_value=({'door_a': 2, 'door_b': 2}, {}))
+    @patch('testpart.em.key_sender')
+    def test_provision_fans_out_per_door(self, mock_email, mock_fan_out):
+        """Test that provision issues keys for every door and fans them out once."""
+        published, failed = testpart.provision(['door_a', 'door_b'], keys_per_door=2, workers=2)
+
+        self.assertEqual(mock_email.call_count, 4)
+        mock_fan_out.assert_called_once()
+        messages = mock_fan_out.call_args[0][1]
+        self.assertEqual([door_id for door_id, _ in messages],
+                         ['door_a', 'door_a', 'door_b', 'door_b'])
+        self.assertEqual(json.loads(messages[2][1])['doorID'], 'door_b')
+        self.assertEqual(failed, {})
+
+    @patch('testpart.pub.fan_out', return_value=({}, {}))
+    @patch('testpart.em.key_sender')
+    def test_provision_registers_signed_keys(self, mock_email, mock_fan_out):
+        """Test that signed keys are registered even though they are not published."""
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+        path = os.path.join(test_dir, 'keys.db')
+        with patch.object(testpart.cfg, 'door_secret', 'secret', create=True), \
+                patch.object(testpart.cfg, 'registry_path', path, create=True):
+            testpart.provision(['door_a', 'door_b'], keys_per_door=2, workers=1)
+
+        self.assertEqual(mock_fan_out.call_args[0][1], [])
+        keys = registry.KeyRegistry(path)
+        self.assertEqual((len(keys.active('door_a')), len(keys.active('door_b'))), (2, 2))
+        keys.close()
+
+
+class TestKeyPool(unittest.TestCase):
+    """
+    Test cases for the pre-minted key pool.
+    미리 발급된 키 풀에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        """Set up test fixtures."""
+        patcher = patch('keypool.testpart.render_key', return_value=b'png')
+        self.mock_render = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.minter = keypool.KeyMinter(['door_a', 'door_b'], pool_size=4).start()
+        self.addCleanup(self.minter.stop)
+
+    def test_pools_fill_in_background(self):
+        """Test that every door's pool is filled after start."""
+        self.assertTrue(self.minter.wait_full(timeout=5))
+        self.assertEqual(self.minter.stats()['pooled'], {'door_a': 4, 'door_b': 4})
+
+    def test_issue_binds_window_to_pooled_key(self):
+        """Test that issuance activates a pooled, window-less key."""
+        self.minter.wait_full(timeout=5)
+        key_name, key_png, qr_info = self.minter.issue('door_a', expire_minutes=15)
+
+        activation = json.loads(qr_info)
+        self.assertEqual(key_name, activation['passwd'] + '.png')
+        self.assertEqual(activation['doorID'], 'door_a')
+        start = datetime.strptime(activation['start'], keycodec.TIME_FORMAT)
+        end = datetime.strptime(activation['end'], keycodec.TIME_FORMAT)
+        self.assertAlmostEqual((end - start).total_seconds(), 15 * 60, delta=1)
+
+        # The QR payload itself carries no window
+        # QR 페이로드 자체에는 유효 기간이 없음
+        payload = self.mock_render.call_args_list[0].args[0]
+        self.assertTrue(keycodec.is_unbound(keycodec.decode_payload(payload)))
+
+    def test_hit_rate_and_refill(self):
+        """Test that hits, misses and refill latency are reported."""
+        self.minter.wait_full(timeout=5)
+        self.minter.stop()
+
+        for _ in range(5):
+            self.minter.issue('door_a')
+
+        stats = self.minter.stats()
+        self.assertEqual(stats['hits'], 4)
+        self.assertEqual(stats['misses'], 1)
+        self.assertAlmostEqual(stats['hit_rate'], 0.8)
+        self.assertGreater(stats['refill_max_ms'], 0)
+
+    def test_low_pool_is_refilled(self):
+        """Test that draining below low water triggers a refill."""
+        self.minter.wait_full(timeout=5)
+        for _ in range(3):
+            self.minter.issue('door_b')
+
+        self.assertTrue(self.minter.wait_full(timeout=5))
+
+    def test_failed_render_keeps_refill_running(self):
+        """Test that a render error is counted and later refills still happen."""
+        self.minter.stop()
+        self.mock_render.side_effect = [RuntimeError("render failed")] + [b'png'] * 100
+        minter = keypool.KeyMinter(['door_a'], pool_size=4)
+        with patch('builtins.print'):
+            minter.start()
+            self.addCleanup(minter.stop)
+            deadline = time.monotonic() + 5
+            while minter.stats()['refill_errors'] == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            self.assertEqual(minter.stats()['refill_errors'], 1)
+            self.assertTrue(minter._thread.is_alive())
+            minter.issue('door_a')
+            self.assertTrue(minter.wait_full(timeout=5))
+
+
+class TestKeyService(unittest.TestCase):
+    """
+    Test cases for the resident key issuance service.
+    상주 키 발급 서비스에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        """Set up test fixtures."""
+        patcher = patch('keypool.testpart.render_key', return_value=b'png')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.published = []
+        self.emailed = []
+        self.minter = keypool.KeyMinter(['door_a'], pool_size=8).start()
+        self.addCleanup(self.minter.stop)
+        self.service = keyservice.KeyService(
+            self.minter,
+            publish=lambda door_id, data: self.published.append((door_id, data)),
+            send_email=lambda name, png, address: self.emailed.append((name, address)),
+        )
+
+    def run_with_server(self, client):
+        """Start the service on an ephemeral port and run a client against it."""
+        async def scenario():
+            server = await self.service.start(port=0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await client(port)
+        return asyncio.run(scenario())
+
+    def test_issue_over_http(self):
+        """Test that POST /keys publishes and emails one key."""
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            try:
+                return await loadtest.request(reader, writer, 'POST', '/keys',
+                                              {'door_id': 'door_a', 'email': 'a@example.com'})
+            finally:
+                writer.close()
+
+        status, body = self.run_with_server(client)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body['doorID'], 'door_a')
+        self.assertEqual(self.published[0][0], 'door_a')
+        self.assertEqual(json.loads(self.published[0][1])['passwd'], body['passwd'])
+        self.assertEqual(self.emailed, [(body['passwd'] + '.png', 'a@example.com')])
+
+    def test_unknown_route_and_bad_body(self):
+        """Test 404 for unknown routes and 400 for malformed bodies."""
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            try:
+                missing = await loadtest.request(reader, writer, 'GET', '/nope')
+                bad = await loadtest.request(reader, writer, 'POST', '/keys', [1, 2])
+                null = await loadtest.request(reader, writer, 'POST', '/keys',
+                                              {'door_id': 'door_a', 'expire_minutes': None})
+                return missing[0], bad[0], null[0]
+            finally:
+                writer.close()
+
+        self.assertEqual(self.run_with_server(client), (404, 400, 400))
+
+    def test_unknown_doors_and_windows_are_rejected(self):
+        """Test 400 for doors outside the configured set and non-positive windows."""
+        bodies = [{'door_id': 5}, {'door_id': 'door_z'}, {'door_id': ['door_a']},
+                  {'door_id': 'door_a', 'expire_minutes': 0},
+                  {'door_id': 'door_a', 'expire_minutes': -5}]
+
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            try:
+                return [(await loadtest.request(reader, writer, 'POST', '/keys', body))[0]
+                        for body in bodies]
+            finally:
+                writer.close()
+
+        self.assertEqual(self.run_with_server(client), [400] * len(bodies))
+        self.assertEqual(set(self.minter.pools), {'door_a'})
+        self.assertEqual(self.published, [])
+
+    def test_load_test_reports_throughput(self):
+        """Test that the load tester reports rps and p99 latency."""
+        result = self.run_with_server(
+            lambda port: loadtest.run(port=port, requests=20, concurrency=4, door_id='door_a')
+        )
+
+        self.assertEqual(result['requests'], 20)
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['rps'], 0)
+        self.assertGreaterEqual(result['p99_ms'], result['p50_ms'])
+        self.assertEqual(self.service.stats()['issued'], 20)
+
+    def test_percentile_nearest_rank(self):
+        """Test nearest-rank percentiles."""
+        samples = list(range(1, 101))
+        self.assertEqual(keyservice.percentile(samples, 50), 50)
+        self.assertEqual(keyservice.percentile(samples, 99), 99)
+        self.assertEqual(keyservice.percentile([], 99), 0.0)
+
+
 class TestPubIntegration(unittest.TestCase):
     """
     Integration tests for Pub/Sub publishing.
@@ -181,6 +682,143 @@ class TestPubIntegration(unittest.TestCase):
             # pub 및 이메일 함수가 호출될 것인지 확인
             # (Actual test would require more setup)
 
+    def _publisher(self, fail=False):
+        """Build a Publisher whose client resolves futures immediately."""
+        client = MagicMock()
+        client.topic_path.return_value = 'projects/p/topics/t'
+
+        def publish(topic_path, data, **kwargs):
+            future = concurrent.futures.Future()
+            if fail:
+                future.set_exception(RuntimeError("publish failed"))
+            else:
+                future.set_result(f"id-{data.decode()}")
+            return future
+
+        client.publish.side_effect = publish
+        return pub.Publisher('p', 't', client=client), client
+
+    def test_publish_many_flushes_once(self):
+        """Test that a batch is queued on one client and flushed together."""
+        publisher, client = self._publisher()
+        futures = publisher.publish_many([b'1', b'2', b'3'])
+
+        self.assertEqual(publisher.flush(futures, timeout=1), 3)
+        self.assertEqual(client.publish.call_count, 3)
+        self.assertEqual([f.result() for f in futures], ['id-1', 'id-2', 'id-3'])
+        self.assertEqual(publisher.ref['num_messages'], 3)
+
+    def test_flush_raises_publish_error(self):
+        """Test that flush surfaces a failed publish."""
+        publisher, _ = self._publisher(fail=True)
+        with self.assertRaises(RuntimeError):
+            publisher.flush(publisher.publish_many([b'1']), timeout=1)
+
+    def test_flush_times_out_on_pending(self):
+        """Test that flush reports messages still pending."""
+        publisher, _ = self._publisher()
+        with self.assertRaises(TimeoutError):
+            publisher.flush([concurrent.futures.Future()], timeout=0.01)
+
+    def test_fan_out_orders_per_door(self):
+        """Test that fan_out groups by door and publishes with ordering keys."""
+        publishers = {}
+
+        def get_publisher(project_id, topic_name, ordered=False):
+            self.assertTrue(ordered)
+            if topic_name not in publishers:
+                publishers[topic_name] = self._publisher()
+            return publishers[topic_name][0]
+
+        messages = [('door_a', b'a1'), ('door_b', b'b1'), ('door_a', b'a2')]
+        with patch('pub.get_publisher', side_effect=get_publisher):
+            published, failed = pub.fan_out('p', messages, timeout=1)
+
+        self.assertEqual(published, {'door_a': 2, 'door_b': 1})
+        self.assertEqual(failed, {})
+        calls = publishers['door_a'][1].publish.call_args_list
+        self.assertEqual([c.kwargs['data'] for c in calls], [b'a1', b'a2'])
+        self.assertTrue(all(c.kwargs['ordering_key'] == 'door_a' for c in calls))
+
+    def test_fan_out_shared_topic_reports_failures(self):
+        """Test a shared topic tags door_id and keeps failed ordering keys paused."""
+        publisher, client = self._publisher(fail=True)
+        with patch('pub.get_publisher', return_value=publisher):
+            published, failed = pub.fan_out('p', [('door_a', b'a1')], topic_name='site', timeout=1)
+
+        self.assertEqual(published, {'door_a': 0})
+        self.assertIsInstance(failed['door_a'], RuntimeError)
+        self.assertEqual(client.publish.call_args.kwargs['door_id'], 'door_a')
+        client.resume_publish.assert_not_called()
+        self.assertEqual([m[1] for m in publisher.paused['door_a']], [b'a1'])
+
+    def test_failed_ordered_message_is_resent_first(self):
+        """Test that nothing overtakes a failed message on its ordering key."""
+        publisher, client = self._publisher()
+        results = iter([RuntimeError("publish failed"), 'id-1', 'id-2'])
+
+        def publish(topic_path, data, **kwargs):
+            future = concurrent.futures.Future()
+            result = next(results)
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+            return future
+
+        client.publish.side_effect = publish
+        first = publisher.publish(b'1', 'door_a')
+        self.assertIsNotNone(first.exception())
+        client.resume_publish.assert_not_called()
+
+        second = publisher.publish(b'2', 'door_a')
+
+        self.assertEqual(second.result(), 'id-2')
+        self.assertEqual([c.kwargs['data'] for c in client.publish.call_args_list],
+                         [b'1', b'1', b'2'])
+        client.resume_publish.assert_called_once_with('projects/p/topics/t', 'door_a')
+        self.assertEqual(publisher.paused, {})
+
+    def test_resume_waits_for_messages_in_flight(self):
+        """Test that a late failure is still resent before newer messages."""
+        publisher, client = self._publisher()
+        futures = []
+
+        def publish(topic_path, data, **kwargs):
+            futures.append(concurrent.futures.Future())
+            return futures[-1]
+
+        client.publish.side_effect = publish
+        publisher.publish(b'1', 'door_a')
+        publisher.publish(b'2', 'door_a')
+        futures[0].set_exception(RuntimeError("publish failed"))
+
+        # b'2' is still in flight: the new message is held, the key stays paused
+        # b'2'가 아직 전송 중: 새 메시지는 보류되고 키는 멈춘 상태로 유지
+        third = publisher.publish(b'3', 'door_a')
+        client.resume_publish.assert_not_called()
+        self.assertEqual(client.publish.call_count, 2)
+
+        futures[1].set_exception(RuntimeError("ordering key paused"))
+        client.resume_publish.assert_called_once_with('projects/p/topics/t', 'door_a')
+        self.assertEqual([c.kwargs['data'] for c in client.publish.call_args_list],
+                         [b'1', b'2', b'1', b'2', b'3'])
+
+        for i, future in enumerate(futures[2:]):
+            future.set_result(f'id-{i}')
+        self.assertEqual(third.result(timeout=1), 'id-2')
+        self.assertEqual(publisher.paused, {})
+
+    @patch('pub.pubsub_v1.PublisherClient')
+    def test_get_publisher_reuses_client(self, mock_client):
+        """Test that one client is created per topic and reused."""
+        with patch.dict(pub._publishers, clear=True):
+            first = pub.get_publisher('p', 'reuse-topic')
+            second = pub.get_publisher('p', 'reuse-topic')
+
+        self.assertIs(first, second)
+        mock_client.assert_called_once_with(batch_settings=pub.BATCH_SETTINGS)
+
 
 class TestEmailSender(unittest.TestCase):
     """
@@ -222,6 +860,991 @@ class TestEmailSender(unittest.TestCase):
                 if os.path.exists(test_file):
                     os.remove(test_file)
 
+    @patch('emailsend.smtplib.SMTP')
+    def test_key_sender_attaches_in_memory_bytes(self, mock_smtp):
+        """Test that key_sender sends in-memory PNG bytes without a file."""
+        import emailsend
+
+        mock_server = MagicMock()
+        mock_smtp.return_value = mock_server
+
+        with patch('emailsend.cfg') as mock_cfg:
+            mock_cfg.email_id = 'test'
+            mock_cfg.email_passwd = 'password'
+
+            emailsend.key_sender('missing.png', 'recipient@example.com',
+                                 key_bytes=b'in memory image')
+
+            sent = mock_server.sendmail.call_args.kwargs['msg']
+            self.assertIn('filename="missing.png"', sent)
+            self.assertIn('aW4gbWVtb3J5IGltYWdl', sent)
+
+
+class TestOutbox(unittest.TestCase):
+    """
+    Test cases for the durable email outbox.
+    영구 이메일 아웃박스에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'outbox.db')
+        self.box = outbox.Outbox(self.path, max_attempts=3, base_delay=0.01, max_delay=0.05)
+
+    def tearDown(self):
+        self.box.close()
+        shutil.rmtree(self.test_dir)
+
+    def test_enqueue_claim_complete(self):
+        """Test that a queued email is claimed once and removed when sent."""
+        message_id = self.box.enqueue('k.png', b'png', 'guest@example.com')
+
+        self.assertEqual(self.box.claim(), (message_id, 'k.png', b'png', 'guest@example.com'))
+        self.assertIsNone(self.box.claim())
+        self.assertEqual(self.box.depth()['sending'], 1)
+
+        self.box.complete(message_id)
+        self.assertEqual(self.box.depth(), {'pending': 0, 'sending': 0, 'dead': 0,
+                                            'oldest_pending_s': 0.0})
+
+    def test_failures_back_off_then_dead_letter(self):
+        """Test exponential backoff and dead-lettering after max_attempts."""
+        message_id = self.box.enqueue('k.png', b'png', 'guest@example.com')
+
+        self.box.claim()
+        self.assertFalse(self.box.fail(message_id, RuntimeError("smtp down")))
+        self.assertIsNone(self.box.claim())
+
+        self.assertLessEqual(self.box.retry_delay(2), 0.02)
+        self.assertLessEqual(self.box.retry_delay(10), 0.05)
+
+        for _ in range(2):
+            while self.box.claim() is None:
+                pass
+            dead = self.box.fail(message_id, RuntimeError("smtp down"))
+        self.assertTrue(dead)
+
+        letters = self.box.dead_letters()
+        self.assertEqual(letters[0][:4], (message_id, 'k.png', 'guest@example.com', 3))
+        self.assertIn('smtp down', letters[0][4])
+
+        self.assertEqual(self.box.retry_dead(), 1)
+        self.assertEqual(self.box.depth()['pending'], 1)
+
+    def test_expired_lease_requeues_interrupted_sends(self):
+        """Test that a claimed message is retried only after its lease expires."""
+        message_id = self.box.enqueue('k.png', b'png', 'guest@example.com')
+        self.box.claim()
+
+        # Another process opening the outbox must not take the claimed row
+        # 아웃박스를 여는 다른 프로세스가 가져간 행을 가져가서는 안 됨
+        other = outbox.Outbox(self.path)
+        self.assertIsNone(other.claim())
+        self.assertEqual(other.depth()['sending'], 1)
+        other.close()
+
+        # A crashed worker's claim is taken again once the lease is over
+        # 중단된 작업자의 가져가기는 임대가 끝나면 다시 가져감
+        self.box.close()
+        self.box = outbox.Outbox(self.path, lease=0.0)
+        self.assertEqual(self.box.claim()[0], message_id)
+
+    def test_workers_retry_until_sent(self):
+        """Test that async workers retry a flaky sender and drain the queue."""
+        delivered = []
+        failures = {'k1.png': 2}
+
+        def send(key_name, key_png, address):
+            if failures.get(key_name):
+                failures[key_name] -= 1
+                raise ConnectionError("temporary failure")
+            delivered.append(key_name)
+
+        for i in range(5):
+            self.box.enqueue(f'k{i}.png', b'png', 'guest@example.com')
+
+        drainer = outbox.OutboxWorkers(self.box, send=send, workers=3, poll_interval=0.01)
+        stats = asyncio.run(drainer.drain(timeout=5))
+
+        self.assertEqual(sorted(delivered), [f'k{i}.png' for i in range(5)])
+        self.assertEqual(stats['sent'], 5)
+        self.assertEqual(stats['retried'], 2)
+        self.assertEqual(stats['queue']['pending'], 0)
+
+    def test_workers_dead_letter_permanent_failures(self):
+        """Test that an email that keeps failing ends up dead-lettered."""
+        def send(key_name, key_png, address):
+            raise ConnectionError("mailbox unavailable")
+
+        self.box.enqueue('k.png', b'png', 'guest@example.com')
+        drainer = outbox.OutboxWorkers(self.box, send=send, workers=2, poll_interval=0.01)
+        stats = asyncio.run(drainer.drain(timeout=5))
+
+        self.assertEqual(stats['dead_lettered'], 1)
+        self.assertEqual(stats['queue']['dead'], 1)
+
+    def test_workers_dead_letter_5xx_at_once(self):
+        """Test that a 5xx refusal goes straight to dead without retries."""
+        def send(key_name, key_png, address):
+            raise smtplib.SMTPRecipientsRefused({address: (550, b'no such user')})
+
+        self.box.enqueue('k.png', b'png', 'nobody@example.com')
+        drainer = outbox.OutboxWorkers(self.box, send=send, workers=1, poll_interval=0.01)
+        stats = asyncio.run(drainer.drain(timeout=5))
+
+        self.assertEqual((stats['retried'], stats['dead_lettered']), (0, 1))
+        self.assertEqual(self.box.dead_letters()[0][3], 1)
+
+    def test_workers_survive_outbox_errors(self):
+        """Test that a locked database does not end a worker."""
+        import sqlite3
+        claim = self.box.claim
+        errors = [sqlite3.OperationalError("database is locked")] * 2
+
+        def flaky_claim():
+            if errors:
+                raise errors.pop()
+            return claim()
+
+        self.box.enqueue('k.png', b'png', 'guest@example.com')
+        drainer = outbox.OutboxWorkers(self.box, send=lambda *args: None, workers=1,
+                                       poll_interval=0.01)
+        with patch.object(self.box, 'claim', side_effect=flaky_claim), patch('builtins.print'):
+            stats = asyncio.run(drainer.drain(timeout=5))
+
+        self.assertEqual((stats['errors'], stats['sent']), (2, 1))
+
+    def test_fail_on_removed_message(self):
+        """Test that failing a message that is gone is not an error."""
+        message_id = self.box.enqueue('k.png', b'png', 'guest@example.com')
+        self.box.complete(message_id)
+        self.assertFalse(self.box.fail(message_id, RuntimeError("smtp down")))
+
+    @patch('testpart.pub.pub')
+    @patch('testpart.em.key_sender')
+    def test_distribute_queues_email(self, mock_email, mock_pub):
+        """Test that distribute publishes and queues the email without sending it."""
+        testpart.distribute('k.png', b'png', '{}', outbox=self.box)
+
+        mock_pub.assert_called_once()
+        mock_email.assert_not_called()
+        self.assertEqual(self.box.depth()['pending'], 1)
+
+
+class TestKeyRegistry(unittest.TestCase):
+    """
+    Test cases for the host key registry.
+    호스트 키 레지스트리에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'keys.db')
+        self.registry = registry.KeyRegistry(self.path)
+
+    def tearDown(self):
+        self.registry.close()
+        shutil.rmtree(self.test_dir)
+
+    def key_info(self, door_id, minutes):
+        start = datetime.now()
+        return {
+            'doorID': door_id,
+            'passwd': str(ObjectId()),
+            'start': start.strftime(keycodec.TIME_FORMAT),
+            'end': (start + timedelta(minutes=minutes)).strftime(keycodec.TIME_FORMAT),
+        }
+
+    def artifact(self, name):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as f:
+            f.write(b'png')
+        return path
+
+    def test_lookup_by_passwd_and_door(self):
+        """Test that keys are found by password and listed per door."""
+        a1 = self.registry.add(json.dumps(self.key_info('door_a', 30)))
+        a2 = self.registry.add(self.key_info('door_a', 10))
+        b1 = self.registry.add(self.key_info('door_b', 20))
+
+        self.assertEqual(self.registry.get(a1.passwd), a1)
+        self.assertEqual(self.registry.active('door_a'), [a2, a1])
+        self.assertEqual(self.registry.active(), [a2, b1, a1])
+        self.assertEqual(self.registry.expiring(2), [a2, b1])
+
+    def test_revoke_deletes_artifact(self):
+        """Test that revoking a key drops it and deletes its QR code file."""
+        png = self.artifact('k.png')
+        record = self.registry.add(self.key_info('door_a', 10), png)
+
+        self.assertEqual(self.registry.revoke(record.passwd), record)
+        self.assertIsNone(self.registry.get(record.passwd))
+        self.assertIsNone(self.registry.revoke(record.passwd))
+        self.assertFalse(os.path.exists(png))
+        self.assertEqual(self.registry.stats()['revoked'], 1)
+
+    def test_one_shot_use_does_not_load_index(self):
+        """Test that adding, revoking and sweeping work on SQLite without the index."""
+        self.registry.add(self.key_info('door_a', -1), self.artifact('old.png'))
+        live = self.registry.add(self.key_info('door_a', 10))
+
+        cli = registry.KeyRegistry(self.path)
+        self.assertEqual(cli.stats()['active'], 2)
+        self.assertEqual([r.door_id for r in cli.sweep()], ['door_a'])
+        self.assertEqual(cli.revoke(live.passwd), live)
+        self.assertEqual((cli.keys, cli.stats()['active']), ({}, 0))
+        cli.close()
+
+        # A resident registry indexes on first lookup and sees the changes
+        # 상주 레지스트리는 첫 조회 때 인덱스를 만들고 변경을 반영함
+        resident = registry.KeyRegistry(self.path)
+        self.assertIsNone(resident.get(live.passwd))
+        self.assertEqual(resident.active(), [])
+        resident.close()
+
+    def test_sweep_expires_in_bulk(self):
+        """Test that only ended keys are swept, with their files."""
+        expired_png = self.artifact('old.png')
+        old = self.registry.add(self.key_info('door_a', -1), expired_png)
+        revoked = self.registry.add(self.key_info('door_a', -2))
+        self.registry.revoke(revoked.passwd)
+        live = self.registry.add(self.key_info('door_a', 10))
+
+        self.assertEqual(self.registry.sweep(), [old])
+        self.assertFalse(os.path.exists(expired_png))
+        self.assertEqual(self.registry.active(), [live])
+        self.assertEqual(self.registry.stats()['expired'], 1)
+
+    def test_state_persists_across_reopen(self):
+        """Test that active keys are reloaded from SQLite."""
+        live = self.registry.add(self.key_info('door_a', 10))
+        gone = self.registry.add(self.key_info('door_b', 10))
+        self.registry.revoke(gone.passwd)
+        self.registry.close()
+
+        self.registry = registry.KeyRegistry(self.path)
+        self.assertEqual(self.registry.active(), [live])
+
+    def test_background_sweeper_wakes_for_next_expiry(self):
+        """Test that the sweeper expires a key shortly after its end time."""
+        self.registry.start(max_interval=5)
+        info = self.key_info('door_a', 10)
+        record = registry.record_from_info(info)._replace(end=time.time() + 0.1)
+        self.registry.add_many([record])
+
+        deadline = time.time() + 3
+        while self.registry.get(record.passwd) is not None and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertIsNone(self.registry.get(record.passwd))
+
+    def test_large_registry_sweeps_only_expired(self):
+        """Test that a large registry expires a small due subset quickly."""
+        now = time.time()
+        records = [registry.KeyRecord(str(i), f'door_{i % 500}', now, now + 600 + i, None)
+                   for i in range(100000)]
+        records += [registry.KeyRecord(f'old{i}', 'door_0', now - 60, now - 1, None)
+                    for i in range(1000)]
+        self.registry.add_many(records)
+
+        started = time.perf_counter()
+        expired = self.registry.sweep(now)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(expired), 1000)
+        self.assertEqual(len(self.registry.active('door_7')), 200)
+        self.assertEqual(self.registry.get('99999').door_id, 'door_499')
+        self.assertLess(elapsed, 1.0)
+
+    @patch('testpart.pub.get_publisher')
+    @patch('testpart.em.key_sender')
+    def test_issue_batch_registers_keys(self, mock_email, mock_get_publisher):
+        """Test that bulk issuance records every key when a registry is configured."""
+        self.registry.close()
+        with patch.object(testpart.cfg, 'registry_path', self.path, create=True):
+            testpart.issue_batch(3, workers=1)
+
+        self.registry = registry.KeyRegistry(self.path)
+        self.assertEqual(len(self.registry.active()), 3)
+
+
+class TestRevocation(unittest.TestCase):
+    """
+    Test cases for compact revocation lists.
+    간결한 폐기 목록에 대한 테스트 케이스입니다.
+    """
+
+    def test_membership_is_exact(self):
+        """Test that revoked keys are found and filter false positives are not reported."""
+        revoked = [str(ObjectId()) for _ in range(2000)]
+        blob = revocation.build(revoked)
+        rl = revocation.RevocationList(blob)
+
+        self.assertEqual(len(rl), 2000)
+        self.assertTrue(all(p in rl for p in revoked))
+        self.assertFalse(any(str(ObjectId()) in rl for _ in range(20000)))
+
+    def test_blob_is_compact(self):
+        """Test that 20,000 revocations fit in about 10 bytes each."""
+        blob = revocation.build(str(i) for i in range(20000))
+        self.assertLess(len(blob), 20000 * 10)
+
+    def test_malformed_blob_is_rejected(self):
+        """Test that truncated or foreign data is rejected."""
+        blob = revocation.build(['a', 'b'])
+        self.assertTrue(revocation.is_revocation_list(blob))
+        self.assertFalse(revocation.is_revocation_list(b'{"doorID": "x"}'))
+        with self.assertRaises(ValueError):
+            revocation.RevocationList(blob[:-1])
+        with self.assertRaises(ValueError):
+            revocation.RevocationList(b'XXXX' + blob[4:])
+
+    def test_publish_lists_from_registry(self):
+        """Test that each door gets the list of its unexpired revoked keys."""
+        test_dir = tempfile.mkdtemp()
+        keys = registry.KeyRegistry(os.path.join(test_dir, 'keys.db'))
+        try:
+            start = datetime.now()
+            records = [registry.record_from_info({
+                'doorID': door_id, 'passwd': str(ObjectId()),
+                'start': start.strftime(keycodec.TIME_FORMAT),
+                'end': (start + timedelta(minutes=30)).strftime(keycodec.TIME_FORMAT),
+            }) for door_id in ('door_a', 'door_a', 'door_b')]
+            keys.add_many(records)
+            keys.revoke(records[0].passwd)
+            keys.revoke(records[2].passwd)
+
+            sent = {}
+            sizes = revocation.publish_lists(keys, publish=sent.__setitem__)
+            self.assertEqual(sorted(sizes), ['door_a', 'door_b'])
+
+            door_a = revocation.RevocationList(sent['door_a'])
+            self.assertIn(records[0].passwd, door_a)
+            self.assertNotIn(records[1].passwd, door_a)
+            self.assertNotIn(records[2].passwd, door_a)
+            self.assertEqual(keys.revoked_keys(now=time.time() + 3600), {})
+        finally:
+            keys.close()
+            shutil.rmtree(test_dir)
+
+
+class TestAuditStream(unittest.TestCase):
+    """
+    Test cases for the batched door audit stream.
+    일괄 처리되는 도어 감사 스트림에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.spool = os.path.join(self.test_dir, 'audit.spool')
+        self.sent = []
+        self.online = True
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def publish(self, data):
+        if not self.online:
+            raise ConnectionError("offline")
+        self.sent.append(data)
+
+    def stream(self, **kwargs):
+        return audit.AuditStream('door_a', self.publish, self.spool, **kwargs)
+
+    def events(self):
+        return [e for data in self.sent for e in audit.decode_batch(data)[1]]
+
+    def test_batches_are_compressed_and_round_trip(self):
+        """Test that a batch decodes to its events and is smaller than plain JSON."""
+        events = [(1700000000.0 + i, audit.REJECT, str(ObjectId())) for i in range(200)]
+        data = audit.encode_batch('door_a', events)
+
+        self.assertEqual(audit.decode_batch(data), ('door_a', events))
+        self.assertLess(len(data), len(json.dumps(events)))
+        with self.assertRaises(ValueError):
+            audit.decode_batch(b'{"doorID": "door_a"}')
+
+        # Valid compressed JSON that is not a batch is rejected the same way
+        # 배치가 아닌 유효한 압축 JSON도 같은 방식으로 거부됨
+        for body in [{'door': 'door_a'}, {'events': []}, [1, 2], 'door_a',
+                     {'door': 'door_a', 'events': 5}, {'door': 'door_a', 'events': [5]}]:
+            with self.assertRaises(ValueError):
+                audit.decode_batch(audit.MAGIC + zlib.compress(json.dumps(body).encode()))
+
+    def test_flusher_sends_full_batches(self):
+        """Test that the background flusher publishes once a batch fills up."""
+        stream = self.stream(batch_size=10, max_delay=60, dedupe_seconds=0).start()
+        for i in range(25):
+            stream.record(audit.UNLOCK, f'p{i}')
+        deadline = time.monotonic() + 2
+        while len(self.sent) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stream.close()
+
+        self.assertEqual([e[2] for e in self.events()], [f'p{i}' for i in range(25)])
+        self.assertEqual(stream.stats()['published'], 3)
+
+    def test_repeated_events_are_deduplicated(self):
+        """Test that the same code seen on consecutive frames is recorded once."""
+        stream = self.stream()
+        self.assertTrue(stream.record(audit.REJECT, 'p'))
+        self.assertFalse(stream.record(audit.REJECT, 'p'))
+        self.assertTrue(stream.record(audit.UNLOCK, 'p'))
+        self.assertEqual(stream.flush(), 2)
+
+    def test_offline_batches_are_spooled_and_sent_in_order(self):
+        """Test that batches spooled while offline go out first when back online."""
+        stream = self.stream(batch_size=2, dedupe_seconds=0)
+        self.online = False
+        for i in range(3):
+            stream.record(audit.REJECT, f'p{i}')
+        stream.flush()
+        self.assertEqual(stream.stats()['spooled'], 2)
+        self.assertTrue(os.path.exists(self.spool))
+
+        self.online = True
+        stream.record(audit.UNLOCK, 'p3')
+        stream.flush()
+        self.assertEqual([e[2] for e in self.events()], ['p0', 'p1', 'p2', 'p3'])
+        self.assertFalse(os.path.exists(self.spool))
+
+    def test_spool_is_capped(self):
+        """Test that the spool stops growing at its size cap."""
+        stream = self.stream(batch_size=1, dedupe_seconds=0, max_spool_bytes=200)
+        self.online = False
+        for i in range(20):
+            stream.record(audit.REJECT, str(ObjectId()))
+        stream.flush()
+
+        self.assertLessEqual(os.path.getsize(self.spool), 200)
+        self.assertGreater(stream.stats()['spool_dropped'], 0)
+
+    def test_host_stores_batches_in_registry(self):
+        """Test that the host consumer bulk-inserts events into the registry."""
+        keys = registry.KeyRegistry(os.path.join(self.test_dir, 'keys.db'))
+        try:
+            batch = audit.encode_batch('door_a', [(1.0, audit.REJECT, None),
+                                                  (2.0, audit.UNLOCK, 'p')])
+            self.assertEqual(audit.store_batch(keys, batch), 2)
+            audit.store_batch(keys, audit.encode_batch('door_b', [(3.0, audit.UNLOCK, 'q')]))
+
+            self.assertEqual(keys.events('door_a'), [(2.0, 'door_a', 'unlock', 'p'),
+                                                     (1.0, 'door_a', 'reject', None)])
+            self.assertEqual(len(keys.events()), 3)
+        finally:
+            keys.close()
+
+
+class TestProfiler(unittest.TestCase):
+    """
+    Test cases for the sampling profiler.
+    샘플링 프로파일러에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.profiler = profiler.Profiler('test', self.test_dir, interval=0.001)
+
+    def tearDown(self):
+        self.profiler.stop()
+        shutil.rmtree(self.test_dir)
+
+    def stacks(self, path):
+        with open(path) as f:
+            return [line.rsplit(' ', 1) for line in f.read().splitlines()]
+
+    def test_profile_is_written_as_collapsed_stacks(self):
+        """Test that a profile holds thread;caller;callee count lines of other threads."""
+        done = threading.Event()
+
+        def spin_for_profile():
+            while not done.is_set():
+                sum(range(1000))
+
+        worker = threading.Thread(target=spin_for_profile, name='spinner')
+        worker.start()
+        self.assertTrue(self.profiler.start())
+        self.assertFalse(self.profiler.start())
+        time.sleep(0.2)
+        path = self.profiler.stop()
+        done.set()
+        worker.join()
+
+        stacks = self.stacks(path)
+        spinner = [stack for stack, count in stacks if stack.startswith('spinner;')]
+        self.assertTrue(spinner)
+        self.assertTrue(all(';test_hostpart.py:spin_for_profile' in s for s in spinner))
+        self.assertTrue(all(int(count) > 0 for stack, count in stacks))
+        self.assertFalse(any(stack.startswith('profiler;') for stack, count in stacks))
+
+    def test_profile_ends_after_window(self):
+        """Test that a profile stops and is written by itself once its window passes."""
+        self.profiler.start(window=0.05)
+        deadline = time.time() + 5
+        while self.profiler.running and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertFalse(self.profiler.running)
+        self.assertTrue(os.path.exists(self.profiler.path))
+
+    def test_toggle_starts_and_stops(self):
+        """Test that the signal handler starts a profile, then ends it."""
+        self.profiler.toggle()
+        self.assertTrue(self.profiler.running)
+        self.profiler.toggle()
+        self.assertFalse(self.profiler.running)
+        self.assertTrue(os.path.exists(self.profiler.path))
+        self.assertIsNone(self.profiler.stop())
+
+
+class TestLocalPubSub(unittest.TestCase):
+    """
+    Test cases for the in-process Pub/Sub stand-in.
+    프로세스 내 Pub/Sub 대체 모듈에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        self.broker = localpubsub.Broker()
+        self.topic = localpubsub.PublisherClient.topic_path('proj', 'keys')
+        self.subscription = localpubsub.SubscriberClient.subscription_path('proj', 'doors')
+        self.broker.create_subscription(self.subscription, self.topic)
+
+    def receive(self, client, count, ack=True):
+        received = []
+        done = threading.Event()
+
+        def callback(message):
+            received.append(message)
+            if ack:
+                message.ack()
+            if len(received) >= count:
+                done.set()
+
+        future = client.subscribe(self.subscription, callback=callback)
+        done.wait(2)
+        future.cancel()
+        return received
+
+    def test_fan_out_reaches_subscriber_in_order(self):
+        """Test that pub.fan_out on the stand-in delivers in order with door_id attributes."""
+        real = pub.pubsub_v1.PublisherClient
+        with localpubsub.install(self.broker):
+            published, failed = pub.fan_out('proj', [('door_a', b'k1'), ('door_b', b'k2'),
+                                                     ('door_a', b'k3')], 'keys')
+            received = self.receive(pub.pubsub_v1.SubscriberClient(), 3)
+
+        self.assertEqual((published, failed), ({'door_a': 2, 'door_b': 1}, {}))
+        self.assertEqual([(m.attributes['door_id'], m.data) for m in received],
+                         [('door_a', b'k1'), ('door_a', b'k3'), ('door_b', b'k2')])
+        self.assertEqual(len(self.broker.ack_latencies), 3)
+        self.assertIs(pub.pubsub_v1.PublisherClient, real)
+        self.assertFalse(any(key[0] == 'proj' for key in pub._publishers))
+
+    def test_unknown_topic_fails_and_nack_redelivers(self):
+        """Test that publishing to a missing topic fails and a nacked message comes back."""
+        client = localpubsub.PublisherClient(broker=self.broker)
+        with self.assertRaises(KeyError):
+            client.publish(client.topic_path('proj', 'missing'), b'x').result()
+
+        client.publish(self.topic, b'x').result()
+        subscriber = localpubsub.SubscriberClient(broker=self.broker)
+        first = self.receive(subscriber, 1, ack=False)
+        first[0].nack()
+        again = self.receive(subscriber, 1)
+        self.assertEqual((again[0].message_id, again[0].data), (first[0].message_id, b'x'))
+        self.assertEqual(len(self.broker.ack_latencies), 1)
+
+
+class TestStartup(unittest.TestCase):
+    """
+    Test cases for lazy imports and startup milestones.
+    지연 임포트와 시작 이정표에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        self.timeline = patch.multiple(startup, _events=[], _marks={}, _reports={})
+        self.timeline.start()
+        self.module_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.module_dir, 'heavy_for_startup.py'), 'w') as f:
+            f.write("LOADED = True\n\ndef value():\n    return 1\n")
+        sys.path.insert(0, self.module_dir)
+
+    def tearDown(self):
+        self.timeline.stop()
+        sys.path.remove(self.module_dir)
+        sys.modules.pop('heavy_for_startup', None)
+        shutil.rmtree(self.module_dir)
+
+    def test_lazy_import_loads_on_first_use(self):
+        """Test that a lazy module is imported on first access, timed once and patchable."""
+        heavy = startup.lazy_import('heavy_for_startup')
+        self.assertNotIn('heavy_for_startup', sys.modules)
+
+        with patch.object(heavy, 'value', return_value=2):
+            self.assertEqual(heavy.value(), 2)
+        self.assertEqual(heavy.value(), 1)
+        self.assertTrue(heavy.LOADED)
+        self.assertIn('heavy_for_startup', sys.modules)
+        self.assertEqual([name for _, _, name in startup.events()], ['import heavy_for_startup'])
+
+    def test_milestone_reports_once_against_budget(self):
+        """Test that a milestone is recorded once and its report flags an exceeded budget."""
+        lines = []
+        startup.report_at(startup.FIRST_FRAME, 0.001, lines.append)
+        first = startup.mark(startup.FIRST_FRAME)
+        self.assertEqual(startup.mark(startup.FIRST_FRAME), first)
+
+        self.assertGreater(first, 0)
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith("first_frame (over budget of 0 ms)"))
+        self.assertEqual(startup.report({startup.FIRST_FRAME: 1e9}, lines.append), [])
+
+
+class TestKeySync(unittest.TestCase):
+    """
+    Test cases for incremental keyring sync.
+    증분 키링 동기화에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.now = int(time.time())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def key(self, passwd, minutes=10):
+        return (passwd, self.now, self.now + minutes * 60)
+
+    def test_message_roundtrip(self):
+        """Test that deltas, snapshots and resync requests decode to their kind."""
+        delta = keysync.decode_message(keysync.encode_delta('door_a', 3, [self.key('p1')], ['p0']))
+        snapshot = keysync.decode_message(
+            keysync.encode_snapshot('door_a', 3, {'p1': (self.now, self.now + 60)}))
+        resync = keysync.decode_message(keysync.encode_resync('door_a', 2))
+
+        self.assertEqual((delta['kind'], delta['seq'], delta['revoke']), ('delta', 3, ['p0']))
+        self.assertEqual((snapshot['kind'], snapshot['keys']),
+                         ('snapshot', [['p1', self.now, self.now + 60]]))
+        self.assertEqual((resync['kind'], resync['have']), ('resync', 2))
+
+        # A plain key message is not a sync message
+        # 일반 키 메시지는 동기화 메시지가 아님
+        self.assertIsNone(keysync.decode_message(b'{"doorID": "a", "passwd": "p"}'))
+
+    def test_malformed_sync_messages_raise_value_error(self):
+        """Test that broken deltas and snapshots raise ValueError, not KeyError."""
+        malformed = [
+            zlib.compress(b'[]'),
+            zlib.compress(b'{"a": 1}'),
+            zlib.compress(b'{"door": "a", "seq": 1}'),
+            zlib.compress(b'{"door": "a", "seq": 1, "keys": [["p", 1]]}'),
+            zlib.compress(b'\xff\xfe'),
+            b'{"door": "a", "seq": "1"}',
+            b'{"door": "a", "seq": 1, "add": [[1, 2, 3]]}',
+            b'{"door": "a", "seq": 1, "revoke": "p"}',
+            b'{"door": 5, "have": 1}',
+        ]
+        for data in malformed:
+            with self.assertRaises(ValueError, msg=data):
+                keysync.decode_message(data)
+
+    def test_ended_keys_are_pruned_from_host_state(self):
+        """Test that keysync.json keeps only keys that have not ended."""
+        path = os.path.join(self.test_dir, 'keysync.json')
+        host = keysync.SyncHost(path, publish=lambda door_id, data: None)
+        with host.transaction():
+            host.change('door_a', adds=[('old', self.now - 120, self.now - 60), self.key('p1')])
+            host.change('door_a', adds=[self.key('p2')])
+
+        self.assertEqual(sorted(keysync.SyncHost(path).door('door_a').keyring.keys), ['p1', 'p2'])
+
+    def test_keyring_applies_in_sequence(self):
+        """Test in-order, duplicate and out-of-order deltas."""
+        log = keysync.DoorLog('door_a')
+        first = log.change(adds=[self.key('p1'), self.key('p2')])
+        second = log.change(revokes=['p1'])
+        third = log.change(adds=[self.key('p3')])
+
+        ring = keysync.Keyring('door_a')
+        self.assertEqual(ring.apply(keysync.decode_message(first)), keysync.APPLIED)
+        self.assertEqual(ring.apply(keysync.decode_message(first)), keysync.DUPLICATE)
+        self.assertEqual(ring.apply(keysync.decode_message(third)), keysync.GAP)
+        self.assertEqual(ring.seq, 1)
+
+        for data in log.since(ring.seq):
+            ring.apply(keysync.decode_message(data))
+        self.assertEqual(ring.seq, 3)
+        self.assertEqual(sorted(ring.keys), ['p2', 'p3'])
+        self.assertTrue(ring.valid('p2'))
+        self.assertFalse(ring.valid('p1'))
+
+    def test_resync_traffic_scales_with_changes(self):
+        """Test that a small gap costs deltas, and an old one a compressed snapshot."""
+        log = keysync.DoorLog('door_a', history=10)
+        log.change(adds=[self.key(str(ObjectId())) for _ in range(5000)])
+        for i in range(12):
+            log.change(adds=[self.key(f'new{i}')])
+
+        catch_up = log.since(log.keyring.seq - 2)
+        self.assertEqual(len(catch_up), 2)
+        self.assertLess(sum(len(d) for d in catch_up), 200)
+
+        # Deltas 1-3 fell out of the history: one snapshot instead
+        # 델타 1-3은 기록에서 빠짐: 대신 스냅샷 하나
+        full = log.since(0)
+        self.assertEqual(len(full), 1)
+        ring = keysync.Keyring('door_a')
+        ring.apply(keysync.decode_message(full[0]))
+        self.assertEqual(ring.keys, log.keyring.keys)
+        self.assertEqual(ring.seq, log.keyring.seq)
+
+        raw = len(json.dumps([[p, s, e] for p, (s, e) in log.keyring.keys.items()]))
+        self.assertLess(len(full[0]), raw / 2)
+
+    def test_sync_host_persists_and_resyncs(self):
+        """Test that host state survives a restart and answers resync requests."""
+        path = os.path.join(self.test_dir, 'keysync.json')
+        sent = []
+        host = keysync.SyncHost(path, publish=lambda door_id, data: sent.append((door_id, data)))
+        host.change('door_a', adds=[self.key('p1')])
+        host.change('door_a', revokes=['p1'])
+        host.save()
+
+        host = keysync.SyncHost(path, publish=lambda door_id, data: sent.append((door_id, data)))
+        self.assertEqual(host.door('door_a').keyring.seq, 2)
+        del sent[:]
+        self.assertGreater(host.resync('door_a', 1), 0)
+        self.assertEqual([keysync.decode_message(d)['seq'] for _, d in sent], [2])
+        self.assertEqual(host.resync('door_a', 2), 0)
+
+    def test_transactions_continue_each_others_sequence(self):
+        """Test that two hosts opened at once never publish the same seq."""
+        path = os.path.join(self.test_dir, 'keysync.json')
+        sent = []
+        issuer = keysync.SyncHost(path, publish=lambda door_id, data: sent.append(data))
+        revoker = keysync.SyncHost(path, publish=lambda door_id, data: sent.append(data))
+
+        with issuer.transaction():
+            issuer.change('door_a', adds=[self.key('p1')])
+        with revoker.transaction():
+            revoker.change('door_a', revokes=['p1'])
+
+        self.assertEqual([keysync.decode_message(d)['seq'] for d in sent], [1, 2])
+        self.assertEqual(keysync.SyncHost(path).door('door_a').keyring.seq, 2)
+
+    def test_save_waits_for_published_deltas(self):
+        """Test that save() waits for every publish and skips a failed one."""
+        import concurrent.futures
+        path = os.path.join(self.test_dir, 'keysync.json')
+        futures = []
+
+        def publish(door_id, data):
+            futures.append(concurrent.futures.Future())
+            return futures[-1]
+
+        host = keysync.SyncHost(path, publish=publish)
+        host.change('door_a', adds=[self.key('p1')])
+        saver = threading.Thread(target=host.save)
+        saver.start()
+        saver.join(0.05)
+        self.assertTrue(saver.is_alive())
+        self.assertFalse(os.path.exists(path))
+
+        futures[0].set_result('1')
+        saver.join(5)
+        self.assertEqual(keysync.SyncHost(path).door('door_a').keyring.seq, 1)
+
+        host.change('door_a', revokes=['p1'])
+        futures[1].set_exception(RuntimeError("publish failed"))
+        with self.assertRaises(RuntimeError):
+            host.save()
+        self.assertEqual(keysync.SyncHost(path).door('door_a').keyring.seq, 1)
+
+    def test_keyring_file_roundtrip(self):
+        """Test that a keyring saved to disk loads back the same."""
+        path = os.path.join(self.test_dir, 'keyring.json')
+        ring = keysync.Keyring('door_a', 4, {'p1': (self.now, self.now + 60)})
+        ring.save(path)
+
+        loaded = keysync.Keyring.load(path)
+        self.assertEqual((loaded.door_id, loaded.seq, loaded.keys), ('door_a', 4, ring.keys))
+        self.assertEqual(keysync.Keyring.load(path + '.missing', 'door_b').seq, 0)
+
+    @patch('testpart.pub.get_publisher')
+    @patch('testpart.em.key_sender')
+    def test_issue_batch_sends_one_delta(self, mock_email, mock_get_publisher):
+        """Test that bulk issuance with keyring sync publishes one add delta."""
+        path = os.path.join(self.test_dir, 'keysync.json')
+        sent = []
+        with patch.object(testpart.cfg, 'keysync_path', path, create=True), \
+                patch('keysync.SyncHost._pubsub_publish',
+                      staticmethod(lambda door_id, data: sent.append((door_id, data)))):
+            testpart.issue_batch(3, workers=1)
+
+        mock_get_publisher.return_value.publish.assert_not_called()
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(len(keysync.decode_message(sent[0][1])['add']), 3)
+        self.assertEqual(keysync.SyncHost(path).door(sent[0][0]).keyring.seq, 1)
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal local SMTP stand-in that records messages.
+    메시지를 기록하는 최소한의 로컬 SMTP 대체 서버입니다.
+
+    drop_after closes a connection after that many messages, like a
+    provider ending a long session. rcpt_reply answers every RCPT TO.
+    drop_after는 제공자가 긴 세션을 끊는 것처럼 그만큼의 메시지 후 연결을 닫습니다.
+    rcpt_reply는 모든 RCPT TO에 대한 응답입니다.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, drop_after=None, rcpt_reply='250 ok'):
+        self.drop_after = drop_after
+        self.rcpt_reply = rcpt_reply
+        self.messages = []
+        self.connections = 0
+        super().__init__(('127.0.0.1', 0), self.Handler)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def reply(self, line):
+            self.wfile.write(line.encode('ascii') + b'\r\n')
+
+        def handle(self):
+            server = self.server
+            server.connections += 1
+            received = 0
+            self.reply('220 localhost ready')
+            for raw in self.rfile:
+                command = raw.decode('ascii').strip().upper()
+                if command.startswith(('EHLO', 'HELO')):
+                    self.reply('250 localhost')
+                elif command == 'DATA':
+                    self.reply('354 end with .')
+                    lines = []
+                    for data in self.rfile:
+                        if data in (b'.\r\n', b'.\n'):
+                            break
+                        lines.append(data)
+                    server.messages.append(b''.join(lines).decode('utf-8'))
+                    received += 1
+                    self.reply('250 queued')
+                    if server.drop_after and received >= server.drop_after:
+                        return
+                elif command.startswith('RCPT'):
+                    self.reply(server.rcpt_reply)
+                elif command == 'QUIT':
+                    self.reply('221 bye')
+                    return
+                else:
+                    self.reply('250 ok')
+
+
+class TestSMTPPool(unittest.TestCase):
+    """
+    Test cases for pooled SMTP sessions against a local stand-in server.
+    로컬 대체 서버를 상대로 한 SMTP 세션 풀 테스트 케이스입니다.
+    """
+
+    def start_server(self, drop_after=None, rcpt_reply='250 ok'):
+        server = LocalSMTPServer(drop_after, rcpt_reply)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def make_pool(self, server, **kwargs):
+        pool = emailsend.SMTPPool('127.0.0.1', server.server_address[1], starttls=False, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_many_messages_share_one_session(self):
+        """Test that one authenticated session carries many messages."""
+        server = self.start_server()
+        pool = self.make_pool(server)
+
+        for i in range(10):
+            pool.send('host@example.com', 'guest@example.com', f'Subject: {i}\r\n\r\nkey {i}')
+
+        stats = pool.stats()
+        self.assertEqual(len(server.messages), 10)
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(stats['sent'], 10)
+        self.assertEqual(stats['connects'], 1)
+        self.assertGreater(stats['messages_per_sec'], 0)
+
+    def test_reconnects_after_server_drops_session(self):
+        """Test that a dropped session is replaced and the message retried."""
+        server = self.start_server(drop_after=3)
+        pool = self.make_pool(server)
+
+        for i in range(7):
+            pool.send('host@example.com', 'guest@example.com', f'key {i}')
+
+        self.assertEqual(len(server.messages), 7)
+        self.assertEqual(pool.stats()['reconnects'], 2)
+        self.assertEqual(pool.stats()['failed'], 0)
+
+    def test_only_transient_refusals_are_retried(self):
+        """Test that a 5xx refusal is not resent while a 4xx one is retried once."""
+        server = self.start_server(rcpt_reply='550 no such user')
+        pool = self.make_pool(server)
+        with self.assertRaises(smtplib.SMTPRecipientsRefused) as refused:
+            pool.send('host@example.com', 'nobody@example.com', 'key')
+        self.assertTrue(emailsend.is_permanent(refused.exception))
+        self.assertEqual((server.connections, pool.stats()['reconnects']), (1, 0))
+
+        server.rcpt_reply = '451 try again later'
+        with self.assertRaises(smtplib.SMTPRecipientsRefused) as refused:
+            pool.send('host@example.com', 'guest@example.com', 'key')
+        self.assertTrue(emailsend.is_transient(refused.exception))
+        self.assertEqual((server.connections, pool.stats()['reconnects']), (2, 1))
+        self.assertEqual(pool.stats()['failed'], 2)
+
+    def test_sessions_are_retired_after_max_messages(self):
+        """Test that sessions are replaced after max_messages sends."""
+        server = self.start_server()
+        pool = self.make_pool(server, max_messages=2)
+
+        for i in range(5):
+            pool.send('host@example.com', 'guest@example.com', f'key {i}')
+
+        self.assertEqual(pool.stats()['connects'], 3)
+        self.assertEqual(pool.stats()['reconnects'], 0)
+
+    def test_concurrent_senders_stay_within_pool_size(self):
+        """Test that concurrent sends open at most `size` sessions."""
+        server = self.start_server()
+        pool = self.make_pool(server, size=2)
+
+        threads = [
+            threading.Thread(target=lambda: [pool.send('h@example.com', 'g@example.com', 'k')
+                                             for _ in range(5)])
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(server.messages), 20)
+        self.assertLessEqual(pool.stats()['connects'], 2)
+
+    def test_key_sender_uses_pool(self):
+        """Test that key_sender delivers the QR attachment through a pool."""
+        server = self.start_server()
+        pool = self.make_pool(server)
+
+        with patch('emailsend.cfg') as mock_cfg:
+            mock_cfg.email_id = 'test'
+            emailsend.key_sender('k.png', 'guest@example.com', key_bytes=b'in memory image',
+                                 pool=pool)
+
+        self.assertIn('filename="k.png"', server.messages[0])
+        self.assertIn('aW4gbWVtb3J5IGltYWdl', server.messages[0])
+
 
 def run_tests():
     """
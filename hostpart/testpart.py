@@ -7,14 +7,110 @@ via Pub/Sub and email.
 QR 코드 키를 생성하고 Pub/Sub와 이메일로 배포하는 메인 진입점입니다.
 """
 
-import qrcode
 import json
 import datetime
-from bson import ObjectId
+import argparse
+import io
+import os
+import time
+import functools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import logger as log
 import pub
 import config as cfg
 import emailsend as em
+import keycodec
+import outbox as ob
+import registry as reg
+import keysync
+import profiler
+import startup
+
+# Imported on first use; render workers load qrcode, the issuer loads bson
+# 처음 사용할 때 임포트됨, 렌더링 작업자는 qrcode를, 발급자는 bson을 불러옴
+qrcode = startup.lazy_import("qrcode")
+bson = startup.lazy_import("bson")
+
+# Concurrent publish/email deliveries in bulk mode
+# 대량 모드에서 동시에 처리하는 게시/이메일 전송 수
+DISPATCH_WORKERS = 8
+
+
+def render_key(qr_payload):
+    """
+    Render a key payload as QR code PNG bytes in memory.
+    키 페이로드를 메모리에서 QR 코드 PNG 바이트로 렌더링합니다.
+
+    Kept at module level so it can run on a process pool.
+    프로세스 풀에서 실행될 수 있도록 모듈 수준에 둡니다.
+
+    Args:
+        qr_payload (str): Compact or JSON key payload
+                         간결한 형식 또는 JSON 키 페이로드
+
+    Returns:
+        bytes: PNG image data
+              PNG 이미지 데이터
+    """
+    buffer = io.BytesIO()
+    qrcode.make(qr_payload).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def save_key(key_png, key_path):
+    """
+    Persist rendered QR code PNG bytes to disk.
+    렌더링된 QR 코드 PNG 바이트를 디스크에 저장합니다.
+
+    Args:
+        key_png (bytes): PNG image data
+                        PNG 이미지 데이터
+        key_path (str): Path to save the QR code image
+                       QR 코드 이미지를 저장할 경로
+
+    Returns:
+        str: Path to saved QR code image
+            저장된 QR 코드 이미지 경로
+    """
+    with open(key_path, 'wb') as f:
+        f.write(key_png)
+    return key_path
+
+
+def bounded_map(executor, fn, jobs, window):
+    """
+    Run jobs on an executor with at most `window` of them in flight.
+    최대 `window`개의 작업만 동시에 진행하도록 실행기에서 작업을 실행합니다.
+
+    Results are yielded in submission order, so memory stays bounded no
+    matter how many jobs there are.
+    결과는 제출 순서대로 반환되므로 작업 수와 관계없이 메모리가 제한됩니다.
+
+    Args:
+        executor (Executor): Thread or process pool
+                            스레드 또는 프로세스 풀
+        fn (callable): Function called as fn(*job)
+                      fn(*job) 형태로 호출되는 함수
+        jobs (iterable): Argument tuples, consumed lazily
+                        지연 소비되는 인자 튜플
+        window (int): Maximum number of pending futures
+                     대기 중인 future의 최대 수
+
+    Yields:
+        tuple: (job, result) pairs
+              (작업, 결과) 쌍
+    """
+    pending = deque()
+    for job in jobs:
+        pending.append((job, executor.submit(fn, *job)))
+        if len(pending) >= window:
+            job, future = pending.popleft()
+            yield job, future.result()
+
+    while pending:
+        job, future = pending.popleft()
+        yield job, future.result()
 
 
 class DoorKey:
@@ -37,11 +133,16 @@ class DoorKey:
                                  키 유효 종료 시간
         end (str): Formatted end time string
                   포맷된 종료 시간 문자열
+        key_format (str): QR payload format, 'compact', 'json' or 'signed'
+                         QR 페이로드 형식, 'compact', 'json' 또는 'signed'
+        secret (bytes): Secret shared with the door for signed keys
+                       서명된 키를 위해 도어와 공유하는 비밀 키
         log_writter (Logger): Logger instance for logging
                              로깅을 위한 로거 인스턴스
     """
 
-    def __init__(self, door_id='default', passwd='default', expire_minutes=10):
+    def __init__(self, door_id='default', passwd='default', expire_minutes=10,
+                 key_format='compact', secret=None):
         """
         Initialize DoorKey instance.
         DoorKey 인스턴스를 초기화합니다.
@@ -53,7 +154,18 @@ class DoorKey:
                          비밀번호 (기본값: 'default', 자동 생성됨)
             expire_minutes (int): Expiration time in minutes (defaults to 10)
                                 만료 시간 (분) (기본값: 10)
+            key_format (str): QR payload format (defaults to 'compact')
+                             QR 페이로드 형식 (기본값: 'compact')
+            secret (bytes): Door secret, required for 'signed' keys
+                           도어 비밀 키, 'signed' 키에 필요
+
+        Raises:
+            ValueError: If a signed key is requested without a secret
+                       비밀 키 없이 서명된 키를 요청한 경우
         """
+        if key_format == 'signed' and not secret:
+            raise ValueError("Signed keys require a door secret")
+
         self.door_id = door_id
         self.passwd = passwd
 
@@ -66,21 +178,26 @@ class DoorKey:
         self.end_time_type = datetime.datetime.now() + datetime.timedelta(minutes=self.expire_time)
         self.end = self.end_time_type.strftime("%Y-%m-%d, %H:%M:%S")
 
+        self.key_format = key_format
+        self.secret = secret
+
         # Initialize logger
         # 로거 초기화
         self.log_writter = log.logger("./log.txt")
 
-    def create_key(self):
+    def _key_info(self):
         """
-        Generate QR code key image and return key information.
-        QR 코드 키 이미지를 생성하고 키 정보를 반환합니다.
+        Build key information for one new key.
+        새 키 하나에 대한 키 정보를 생성합니다.
 
         Returns:
-            tuple: (key_path, qr_info)
-                - key_path (str): Path to saved QR code image
-                                 저장된 QR 코드 이미지 경로
-                - qr_info (str): JSON string of key information
-                                키 정보의 JSON 문자열
+            tuple: (file_id, qr_info_json, qr_payload)
+                - file_id (ObjectId): Unique ID of this key
+                                     이 키의 고유 ID
+                - qr_info_json (str): JSON string of key information
+                                     키 정보의 JSON 문자열
+                - qr_payload (str): Text encoded into the QR code
+                                   QR 코드에 인코딩되는 텍스트
         """
         # Create key information dictionary
         # 키 정보 딕셔너리 생성
@@ -93,7 +210,7 @@ class DoorKey:
 
         # Generate unique ObjectID for this key
         # 이 키에 대한 고유 ObjectID 생성
-        file_id = ObjectId()
+        file_id = bson.ObjectId()
         self.log_writter.info(f"Generated key with ID: {file_id}")
 
         # Auto-generate password if default
@@ -101,25 +218,392 @@ class DoorKey:
         if self.passwd == 'default':
             qr_info['passwd'] = str(file_id)
 
-        # Convert to JSON string
-        # JSON 문자열로 변환
+        # Convert to JSON string for Pub/Sub and to the QR payload format
+        # Pub/Sub용 JSON 문자열과 QR 페이로드 형식으로 변환
         qr_info_json = json.dumps(qr_info)
+        if self.key_format == 'compact':
+            qr_payload = keycodec.encode_compact(qr_info)
+        elif self.key_format == 'signed':
+            qr_payload = keycodec.encode_signed(qr_info, self.secret)
+        else:
+            qr_payload = qr_info_json
 
-        # Generate QR code image
-        # QR 코드 이미지 생성
-        img = qrcode.make(qr_info_json)
+        return file_id, qr_info_json, qr_payload
+
+    def create_key(self):
+        """
+        Generate QR code key image and return key information.
+        QR 코드 키 이미지를 생성하고 키 정보를 반환합니다.
+
+        Returns:
+            tuple: (key_path, qr_info)
+                - key_path (str): Path to saved QR code image
+                                 저장된 QR 코드 이미지 경로
+                - qr_info (str): JSON string of key information
+                                키 정보의 JSON 문자열
+        """
+        key_name, key_png, qr_info_json = self.create_key_in_memory()
 
         # Save QR code image with ObjectID as filename
         # ObjectID를 파일명으로 하여 QR 코드 이미지 저장
-        key_path = f"{file_id}.png"
-        img.save(key_path)
+        key_path = save_key(key_png, key_name)
 
         self.log_writter.info(f"QR code saved to: {key_path}")
 
         return key_path, qr_info_json
 
+    def create_key_in_memory(self):
+        """
+        Generate QR code key as PNG bytes without touching the disk.
+        디스크를 거치지 않고 QR 코드 키를 PNG 바이트로 생성합니다.
+
+        Returns:
+            tuple: (key_name, key_png, qr_info)
+                - key_name (str): "<ObjectID>.png" file name for the key
+                                 키의 "<ObjectID>.png" 파일 이름
+                - key_png (bytes): PNG image data
+                                  PNG 이미지 데이터
+                - qr_info (str): JSON string of key information
+                                키 정보의 JSON 문자열
+        """
+        file_id, qr_info_json, qr_payload = self._key_info()
+        return f"{file_id}.png", render_key(qr_payload), qr_info_json
+
+    def create_keys(self, count, workers=None, save=False, pool=None):
+        """
+        Generate many keys sharing this key's door and validity window.
+        이 키의 도어와 유효 기간을 공유하는 여러 키를 생성합니다.
+
+        QR codes are rendered in memory on a process pool with a bounded
+        number of keys in flight. Keys are yielded as they finish, in order.
+        QR 코드는 진행 중인 키 수가 제한된 프로세스 풀의 메모리에서
+        렌더링되며, 완료되는 대로 순서대로 반환됩니다.
+
+        Args:
+            count (int): Number of keys to generate
+                        생성할 키 수
+            workers (int): Render processes (defaults to CPU count)
+                          렌더링 프로세스 수 (기본값: CPU 수)
+            save (bool): Also write each PNG to "<ObjectID>.png"
+                        각 PNG를 "<ObjectID>.png"에도 저장할지 여부
+            pool (ProcessPoolExecutor): Existing render pool to share
+                                       공유할 기존 렌더링 풀
+
+        Yields:
+            tuple: (key_name, key_png, qr_info) as returned by
+                   create_key_in_memory()
+                  create_key_in_memory()와 같은 (key_name, key_png, qr_info)
+        """
+        workers = workers or os.cpu_count() or 1
+
+        if pool is None:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                yield from self.create_keys(count, workers, save, pool)
+            return
+
+        # Names and key info in submission order; results come back in the same order
+        # 제출 순서대로의 이름과 키 정보, 결과도 같은 순서로 반환됨
+        submitted = deque()
+
+        def jobs():
+            for _ in range(count):
+                file_id, qr_info_json, qr_payload = self._key_info()
+                submitted.append((f"{file_id}.png", qr_info_json))
+                yield (qr_payload,)
+
+        for _, key_png in bounded_map(pool, render_key, jobs(), workers * 2):
+            key_name, qr_info_json = submitted.popleft()
+            if save:
+                save_key(key_png, key_name)
+            yield key_name, key_png, qr_info_json
+
+        self.log_writter.info(f"Rendered {count} QR codes")
+
+
+def new_door_key(door_id=None):
+    """
+    Create a DoorKey for a door, by default this host's door.
+    도어를 위한 DoorKey를 생성하며, 기본값은 이 호스트의 도어입니다.
+
+    Keys are signed when door_secret is set in config.py, so the door can
+    verify them without receiving them over Pub/Sub.
+    config.py에 door_secret이 설정되어 있으면 키가 서명되므로, 도어는
+    Pub/Sub으로 키를 받지 않고도 검증할 수 있습니다.
+
+    Args:
+        door_id (str): Door identifier (defaults to the topic name)
+                      도어 식별자 (기본값: 토픽 이름)
+
+    Returns:
+        DoorKey: Key for the door
+                도어를 위한 키
+    """
+    door_id = door_id or cfg.topic_name
+    secret = getattr(cfg, 'door_secret', None)
+    if secret:
+        return DoorKey(door_id=door_id, key_format='signed',
+                       secret=secret.encode('utf-8'))
+    return DoorKey(door_id=door_id)
+
+
+def open_outbox():
+    """
+    Open the email outbox when outbox_path is set in config.py.
+    config.py에 outbox_path가 설정되어 있으면 이메일 아웃박스를 엽니다.
+
+    Returns:
+        Outbox: Durable email queue, or None to send email inline
+               영구 이메일 큐, 이메일을 직접 전송하려면 None
+    """
+    path = getattr(cfg, 'outbox_path', None)
+    return ob.Outbox(path) if path else None
+
+
+def open_registry():
+    """
+    Open the key registry when registry_path is set in config.py.
+    config.py에 registry_path가 설정되어 있으면 키 레지스트리를 엽니다.
+
+    Returns:
+        KeyRegistry: Registry of issued keys, or None when not configured
+                    발급된 키 레지스트리, 설정되지 않았으면 None
+    """
+    path = getattr(cfg, 'registry_path', None)
+    return reg.KeyRegistry(path) if path else None
+
+
+def open_keysync():
+    """
+    Open the keyring sync state when keysync_path is set in config.py.
+    config.py에 keysync_path가 설정되어 있으면 키링 동기화 상태를 엽니다.
+
+    With keyring sync, keys reach doors as add deltas instead of one
+    full-key message each.
+    키링 동기화를 사용하면 키는 키마다 전체 키 메시지 대신 추가 델타로 도어에
+    전달됩니다.
+
+    Returns:
+        SyncHost: Sync state, or None when not configured
+                 동기화 상태, 설정되지 않았으면 None
+    """
+    path = getattr(cfg, 'keysync_path', None)
+    return keysync.SyncHost(path) if path else None
+
+
+def sync_keys(sync, records):
+    """
+    Publish one add delta per door for newly issued keys and save the state.
+    새로 발급된 키에 대해 도어마다 추가 델타 하나를 게시하고 상태를 저장합니다.
+
+    Args:
+        sync (SyncHost): Sync state
+                        동기화 상태
+        records (list): KeyRecord entries
+                       KeyRecord 항목
+    """
+    by_door = {}
+    for record in records:
+        by_door.setdefault(record.door_id, []).append((record.passwd, record.start, record.end))
+    with sync.transaction():
+        for door_id, adds in by_door.items():
+            sync.change(door_id, adds=adds)
+
+
+def distribute(key_name, key_png, qr_info, publish=True, pool=None, outbox=None):
+    """
+    Publish one key to Pub/Sub and email its QR code.
+    키 하나를 Pub/Sub에 게시하고 QR 코드를 이메일로 전송합니다.
+
+    Args:
+        key_name (str): Attachment file name of the QR code
+                       QR 코드 첨부 파일 이름
+        key_png (bytes): PNG image data
+                        PNG 이미지 데이터
+        qr_info (str): JSON string of key information
+                      키 정보의 JSON 문자열
+        publish (bool): Publish to the door; signed keys skip this
+                       도어에 게시할지 여부, 서명된 키는 생략
+        pool (SMTPPool): Shared SMTP sessions (defaults to a one-off session)
+                        공유 SMTP 세션 (기본값: 일회용 세션)
+        outbox (Outbox): Queue the email here instead of sending it
+                        이메일을 직접 전송하는 대신 넣을 큐
+
+    Returns:
+        str: key_name, once delivered
+            전송이 끝난 key_name
+    """
+    if publish:
+        # Convert string to bytes for Pub/Sub
+        # Pub/Sub를 위해 문자열을 바이트로 변환
+        qr_info_bytes = bytes(qr_info, 'utf-8')
+
+        # Publish to Pub/Sub
+        # Pub/Sub에 게시
+        pub.pub(cfg.project_id, cfg.topic_name, qr_info_bytes)
+
+    # Queue the email so an SMTP failure cannot fail an issued key
+    # SMTP 실패가 발급된 키를 실패시키지 않도록 이메일을 큐에 넣음
+    if outbox is not None:
+        outbox.enqueue(key_name, key_png, cfg.email_to)
+        return key_name
+
+    # Send email with in-memory QR code image
+    # 메모리의 QR 코드 이미지를 이메일로 전송
+    em.key_sender(key_path=key_name, owner_address=cfg.email_to, key_bytes=key_png, pool=pool)
 
-def main():
+    return key_name
+
+
+def issue_batch(count, workers=None, save=False):
+    """
+    Generate and distribute many keys concurrently.
+    여러 키를 동시에 생성하고 배포합니다.
+
+    Rendering runs on a process pool and email runs on a thread pool, both
+    with a bounded number of keys in flight. Keys are queued on one batching
+    Pub/Sub publisher as they are rendered and flushed once at the end.
+    렌더링은 프로세스 풀에서, 이메일은 스레드 풀에서 실행되며 둘 다 진행
+    중인 키 수를 제한합니다. 키는 렌더링되는 대로 하나의 배치 Pub/Sub
+    게시자 큐에 넣고 마지막에 한 번만 완료를 기다립니다.
+
+    Args:
+        count (int): Number of keys to issue
+                    발급할 키 수
+        workers (int): Render processes (defaults to CPU count)
+                      렌더링 프로세스 수 (기본값: CPU 수)
+        save (bool): Also write each QR code to disk
+                    각 QR 코드를 디스크에도 저장할지 여부
+
+    Returns:
+        float: Issuance throughput in keys per second
+              초당 키 발급 처리량
+    """
+    batch_key = new_door_key()
+    sync = open_keysync()
+    publish = batch_key.key_format != 'signed' and sync is None
+    publisher = pub.get_publisher(cfg.project_id, cfg.topic_name) if publish else None
+    mail_pool = em.get_pool()
+    deliver = functools.partial(distribute, publish=False, pool=mail_pool, outbox=open_outbox())
+    futures = []
+    started = time.monotonic()
+    issued = 0
+
+    registry = open_registry()
+    records = []
+
+    def rendered():
+        for key_name, key_png, qr_info in batch_key.create_keys(count, workers, save):
+            if publish:
+                futures.append(publisher.publish(bytes(qr_info, 'utf-8')))
+            records.append(reg.record_from_info(qr_info, key_name if save else None))
+            yield key_name, key_png, qr_info
+
+    with ThreadPoolExecutor(max_workers=DISPATCH_WORKERS) as dispatch:
+        for _ in bounded_map(dispatch, deliver, rendered(), DISPATCH_WORKERS * 2):
+            issued += 1
+    mail_pool.close()
+
+    # Wait once for every queued message
+    # 큐에 넣은 모든 메시지를 한 번에 대기
+    if publish:
+        publisher.flush(futures)
+
+    # With keyring sync the whole batch is one delta
+    # 키링 동기화를 사용하면 배치 전체가 하나의 델타
+    if sync is not None and batch_key.key_format != 'signed':
+        sync_keys(sync, records)
+
+    # Register the whole batch in one transaction
+    # 배치 전체를 하나의 트랜잭션으로 등록
+    if registry is not None:
+        registry.add_many(records)
+        registry.close()
+
+    elapsed = time.monotonic() - started
+    rate = issued / elapsed if elapsed > 0 else float(issued)
+    print(f"Issued {issued} keys in {elapsed:.2f}s ({rate:.1f} keys/sec)")
+    print(f"Email: {mail_pool.stats()['messages_per_sec']:.1f} messages/sec")
+
+    return rate
+
+
+def provision(door_ids, keys_per_door=1, workers=None, save=False, topic_name=None):
+    """
+    Issue keys for many doors in one pass.
+    여러 도어의 키를 한 번에 발급합니다.
+
+    All doors share one render pool and one email pool. Activations are
+    grouped per door and fanned out with per-door ordering (pub.fan_out).
+    모든 도어가 하나의 렌더링 풀과 이메일 풀을 공유합니다. 활성화 메시지는
+    도어별로 묶여 도어별 순서를 보장하며 전송됩니다 (pub.fan_out).
+
+    Args:
+        door_ids (list): Doors to issue keys for
+                        키를 발급할 도어 목록
+        keys_per_door (int): Keys to issue per door (defaults to 1)
+                            도어당 발급할 키 수 (기본값: 1)
+        workers (int): Render processes (defaults to CPU count)
+                      렌더링 프로세스 수 (기본값: CPU 수)
+        save (bool): Also write each QR code to disk
+                    각 QR 코드를 디스크에도 저장할지 여부
+        topic_name (str): Shared topic (defaults to one topic per door)
+                         공유 토픽 (기본값: 도어마다 하나의 토픽)
+
+    Returns:
+        tuple: (published, failed) as returned by pub.fan_out()
+              pub.fan_out()이 반환하는 (published, failed)
+    """
+    workers = workers or os.cpu_count() or 1
+    mail_pool = em.get_pool()
+    deliver = functools.partial(distribute, publish=False, pool=mail_pool, outbox=open_outbox())
+    messages = []
+    registry = open_registry()
+    sync = open_keysync()
+    records, synced = [], []
+    started = time.monotonic()
+    issued = 0
+
+    def rendered(pool):
+        for door_id in door_ids:
+            door_key = new_door_key(door_id)
+            for key_name, key_png, qr_info in door_key.create_keys(keys_per_door, workers,
+                                                                   save, pool):
+                record = reg.record_from_info(qr_info, key_name if save else None)
+                records.append(record)
+                # Signed keys are verified by the door and are not published
+                # 서명된 키는 도어가 검증하므로 게시하지 않음
+                if door_key.key_format != 'signed':
+                    messages.append((door_id, bytes(qr_info, 'utf-8')))
+                    synced.append(record)
+                yield key_name, key_png, qr_info
+
+    with ProcessPoolExecutor(max_workers=workers) as pool, \
+            ThreadPoolExecutor(max_workers=DISPATCH_WORKERS) as dispatch:
+        for _ in bounded_map(dispatch, deliver, rendered(pool), DISPATCH_WORKERS * 2):
+            issued += 1
+    mail_pool.close()
+
+    if sync is not None:
+        # One add delta per door instead of one message per key
+        # 키마다 메시지 하나 대신 도어마다 추가 델타 하나
+        messages = []
+        sync_keys(sync, synced)
+    published, failed = pub.fan_out(cfg.project_id, messages, topic_name)
+
+    if registry is not None:
+        registry.add_many(records)
+        registry.close()
+
+    elapsed = time.monotonic() - started
+    print(f"Issued {issued} keys for {len(door_ids)} doors in {elapsed:.2f}s, "
+          f"{sum(published.values())} published, {len(failed)} doors failed")
+    for door_id, error in failed.items():
+        print(f"  {door_id}: {error}")
+
+    return published, failed
+
+
+def main(save=False):
     """
     Main function to generate and distribute QR code key.
     QR 코드 키를 생성하고 배포하는 메인 함수입니다.
@@ -127,37 +611,90 @@ def main():
     Process:
     1. Create a new DoorKey instance
     2. Generate QR code image and key info
-    3. Publish key info to Pub/Sub
+    3. Publish key info to Pub/Sub (skipped for signed keys)
     4. Send QR code image via email
 
+    Args:
+        save (bool): Also write the QR code to "<ObjectID>.png"
+                    QR 코드를 "<ObjectID>.png"에도 저장할지 여부
+
     처리 과정:
     1. 새 DoorKey 인스턴스 생성
     2. QR 코드 이미지 및 키 정보 생성
-    3. Pub/Sub에 키 정보 게시
+    3. Pub/Sub에 키 정보 게시 (서명된 키는 생략)
     4. 이메일로 QR 코드 이미지 전송
     """
     # Create door key instance with topic name as door ID
     # 토픽 이름을 도어 ID로 하여 도어 키 인스턴스 생성
-    one_key = DoorKey(door_id=cfg.topic_name)
+    one_key = new_door_key()
 
-    # Generate QR code and key information
-    # QR 코드 및 키 정보 생성
-    qr_image, qr_info = one_key.create_key()
+    # Generate QR code in memory and key information
+    # 메모리에서 QR 코드 및 키 정보 생성
+    qr_image, qr_png, qr_info = one_key.create_key_in_memory()
 
-    # Convert string to bytes for Pub/Sub
-    # Pub/Sub를 위해 문자열을 바이트로 변환
-    qr_info_bytes = bytes(qr_info, 'utf-8')
+    # Optionally keep a copy on disk
+    # 선택적으로 디스크에 사본 저장
+    if save:
+        save_key(qr_png, qr_image)
 
-    # Publish to Pub/Sub
-    # Pub/Sub에 게시
-    pub.pub(cfg.project_id, cfg.topic_name, qr_info_bytes)
+    # Publish to Pub/Sub and send email with QR code image
+    # Signed keys are verified by the door itself and are not published
+    # Pub/Sub에 게시하고 QR 코드 이미지를 이메일로 전송
+    # 서명된 키는 도어가 직접 검증하므로 게시하지 않음
+    # With an outbox configured the email is queued for outbox.py to send
+    # 아웃박스가 설정되어 있으면 이메일은 outbox.py가 전송하도록 큐에 들어감
+    # With keyring sync the key goes out as an add delta instead
+    # 키링 동기화를 사용하면 키는 대신 추가 델타로 전송됨
+    sync = open_keysync()
+    publish = one_key.key_format != 'signed'
+    distribute(qr_image, qr_png, qr_info, publish=publish and sync is None,
+               outbox=open_outbox())
+    if publish and sync is not None:
+        sync_keys(sync, [reg.record_from_info(qr_info)])
 
-    # Send email with QR code image
-    # QR 코드 이미지를 이메일로 전송
-    em.key_sender(key_path=qr_image, owner_address=cfg.email_to)
+    # Record the key so it can be listed, revoked and expired later
+    # 나중에 조회, 폐기, 만료 처리할 수 있도록 키를 기록
+    registry = open_registry()
+    if registry is not None:
+        registry.add(qr_info, qr_image if save else None)
+        registry.close()
 
     print(f"Key generated and distributed successfully: {qr_image}")
 
 
 if __name__ == "__main__":
-    main()
+    # Parse command line arguments
+    # 명령줄 인자 파싱
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1,
+                        help="Number of keys to issue (bulk mode when > 1)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="QR render processes for bulk mode")
+    parser.add_argument("--save", action="store_true",
+                        help="Also write each QR code to <ObjectID>.png")
+    parser.add_argument("--doors", default=None,
+                        help="Comma-separated door IDs to provision (count keys each)")
+    parser.add_argument("--shared-topic", default=None,
+                        help="Publish all doors to one ordered topic instead of per-door topics")
+    profiler.add_argument(parser)
+    startup.add_argument(parser, "the first published key")
+    args = parser.parse_args()
+
+    # Bulk QR rendering runs in worker processes; the profile shows the
+    # issuing process (publishing, registry, email) and its waits on workers
+    # 대량 QR 렌더링은 작업자 프로세스에서 실행되며, 프로파일은 발급 프로세스
+    # (게시, 레지스트리, 이메일)와 작업자 대기를 보여줌
+    session = profiler.install("testpart", args.profile)
+
+    # Time-to-first-publish and the imports it waited for
+    # 첫 게시까지의 시간과 그동안 기다린 임포트
+    if args.startup is not None:
+        startup.report_at(startup.FIRST_PUBLISH, args.startup)
+
+    if args.doors:
+        provision(args.doors.split(','), args.count, args.workers, args.save, args.shared_topic)
+    elif args.count > 1:
+        issue_batch(args.count, args.workers, args.save)
+    else:
+        main(args.save)
+    session.stop()
@@ -0,0 +1,391 @@
+"""
+Door Actuator Service Module
+도어 액추에이터 서비스 모듈
+
+Long-lived owner of the door lock GPIO pin. Unlock commands arrive over a
+local queue or a Unix datagram socket, overlapping holds are coalesced into
+one open period and command-to-pin latency is recorded.
+도어락 GPIO 핀을 계속 소유하는 상주 서비스입니다. 잠금 해제 명령은 로컬 큐나
+유닉스 데이터그램 소켓으로 전달되며, 겹치는 유지 요청은 하나의 열림 구간으로
+병합되고 명령-핀 지연 시간이 기록됩니다.
+"""
+
+import importlib
+import math
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+import config as cfg
+import startup
+
+# GPIO pin wired to the door lock
+# 도어락에 연결된 GPIO 핀
+LOCK_PIN = 17
+
+# Unix socket the resident service listens on
+# 상주 서비스가 수신 대기하는 유닉스 소켓
+SOCKET_PATH = "/tmp/doorlens-actuator.sock"
+
+# Longest hold a single command may ask for, in seconds
+# 명령 하나가 요청할 수 있는 최대 유지 시간 (초)
+MAX_HOLD_SECONDS = getattr(cfg, "max_hold_seconds", 30)
+
+
+def gpio_backend():
+    """
+    Return the name of the configured GPIO backend.
+    설정된 GPIO 백엔드의 이름을 반환합니다.
+    """
+    return os.environ.get("DOORLENS_GPIO") or getattr(cfg, "gpio_backend", "RPi.GPIO")
+
+
+def load_gpio(name=None):
+    """
+    Import the configured GPIO backend.
+    설정된 GPIO 백엔드를 임포트합니다.
+
+    The DOORLENS_GPIO environment variable wins over gpio_backend in
+    config.py; both default to the real RPi.GPIO module.
+    DOORLENS_GPIO 환경 변수가 config.py의 gpio_backend보다 우선하며,
+    기본값은 실제 RPi.GPIO 모듈입니다.
+
+    Args:
+        name (str): Module name to import (e.g. "RPi.GPIO", "simgpio")
+                   임포트할 모듈 이름 (예: "RPi.GPIO", "simgpio")
+
+    Returns:
+        module: RPi.GPIO compatible module
+               RPi.GPIO 호환 모듈
+    """
+    return importlib.import_module(name or gpio_backend())
+
+
+# Imported when a lock is first driven, not when the scanner starts
+# 스캐너가 시작될 때가 아니라 잠금 장치를 처음 구동할 때 임포트됨
+GPIO = startup.lazy_import(gpio_backend())
+
+
+def clamp_hold(hold_seconds, max_hold=MAX_HOLD_SECONDS):
+    """
+    Check a requested hold and cap it at the configured maximum.
+    요청된 유지 시간을 확인하고 설정된 최대값으로 제한합니다.
+
+    Args:
+        hold_seconds (float): Requested hold in seconds
+                             요청된 유지 시간 (초)
+        max_hold (float): Longest hold allowed
+                         허용되는 최대 유지 시간
+
+    Returns:
+        float: Hold to apply
+              적용할 유지 시간
+
+    Raises:
+        ValueError: If the hold is not a finite positive number
+                   유지 시간이 유한한 양수가 아닐 경우
+    """
+    hold_seconds = float(hold_seconds)
+    if not math.isfinite(hold_seconds) or hold_seconds <= 0:
+        raise ValueError(f"Invalid hold: {hold_seconds}")
+    return min(hold_seconds, max_hold)
+
+
+class DoorActuator:
+    """
+    Single owner of the lock pin, driven by a command queue.
+    명령 큐로 구동되는 잠금 핀의 단일 소유자입니다.
+
+    Attributes:
+        pin (int): BCM pin number of the lock
+                  잠금 장치의 BCM 핀 번호
+        gpio (module): GPIO backend (RPi.GPIO compatible)
+                      GPIO 백엔드 (RPi.GPIO 호환)
+        commands (queue.Queue): Pending (issued_at, hold_seconds) commands
+                               대기 중인 (발행 시각, 유지 시간) 명령
+        latencies (deque): Recent command-to-pin latencies in seconds
+                          최근 명령-핀 지연 시간 (초)
+        unlock_count (int): Number of times the pin was raised
+                           핀이 HIGH로 설정된 횟수
+        coalesced_count (int): Commands merged into an already open hold
+                              이미 열린 유지 구간에 병합된 명령 수
+        max_hold (float): Longest hold a command may ask for
+                         명령이 요청할 수 있는 최대 유지 시간
+    """
+
+    def __init__(self, pin=LOCK_PIN, gpio=GPIO, history=1000, max_hold=MAX_HOLD_SECONDS):
+        """
+        Initialize DoorActuator instance.
+        DoorActuator 인스턴스를 초기화합니다.
+
+        Args:
+            pin (int): BCM pin number (defaults to 17)
+                      BCM 핀 번호 (기본값: 17)
+            gpio (module): GPIO backend (defaults to the configured one)
+                          GPIO 백엔드 (기본값: 설정된 백엔드)
+            history (int): Number of latency samples to keep
+                          보관할 지연 시간 샘플 수
+            max_hold (float): Longest hold in seconds (defaults to MAX_HOLD_SECONDS)
+                             최대 유지 시간 (초) (기본값: MAX_HOLD_SECONDS)
+        """
+        self.pin = pin
+        self.max_hold = max_hold
+        self.gpio = gpio
+        self.commands = queue.Queue()
+        self.latencies = deque(maxlen=history)
+        self.unlock_count = 0
+        self.coalesced_count = 0
+
+        # Pending commands and hold state, guarded by one condition
+        # 대기 명령 수와 유지 상태를 하나의 조건 변수로 보호
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._holding = False
+        self._thread = None
+
+    def start(self):
+        """
+        Configure the pin once and start the worker thread.
+        핀을 한 번 설정하고 작업 스레드를 시작합니다.
+        """
+        self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setup(self.pin, self.gpio.OUT)
+        self.gpio.output(self.pin, False)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def unlock(self, hold_seconds, issued_at=None):
+        """
+        Queue an unlock command and return immediately.
+        잠금 해제 명령을 큐에 넣고 즉시 반환합니다.
+
+        Args:
+            hold_seconds (float): How long the door stays unlocked
+                                 도어가 잠금 해제 상태로 유지되는 시간
+            issued_at (float): time.monotonic() when the command was issued
+                              명령이 발행된 time.monotonic() 값
+
+        Raises:
+            ValueError: If the hold is not a finite positive number
+                       유지 시간이 유한한 양수가 아닐 경우
+        """
+        hold_seconds = clamp_hold(hold_seconds, self.max_hold)
+        if issued_at is None:
+            issued_at = time.monotonic()
+
+        with self._cond:
+            self._pending += 1
+        self.commands.put((issued_at, hold_seconds))
+
+    def _run(self):
+        """
+        Worker loop: raise the pin, extend the deadline, release on expiry.
+        작업 루프: 핀을 올리고, 마감 시간을 연장하고, 만료 시 해제합니다.
+        """
+        try:
+            self._serve_commands()
+        finally:
+            # Whatever ends the worker, the door is left locked
+            # 작업 스레드가 어떻게 끝나든 도어는 잠긴 상태로 남음
+            self.gpio.output(self.pin, False)
+            with self._cond:
+                self._holding = False
+                self._cond.notify_all()
+
+    def _serve_commands(self):
+        """
+        Apply queued commands until the stop sentinel arrives.
+        중지 신호가 올 때까지 큐의 명령을 적용합니다.
+        """
+        deadline = None
+
+        while True:
+            timeout = None
+            if deadline is not None:
+                timeout = max(0.0, deadline - time.monotonic())
+
+            try:
+                command = self.commands.get(timeout=timeout)
+            except queue.Empty:
+                # Hold expired with no new command: lock the door
+                # 새 명령 없이 유지 시간 만료: 도어 잠금
+                self.gpio.output(self.pin, False)
+                deadline = None
+                with self._cond:
+                    self._holding = False
+                    self._cond.notify_all()
+                continue
+
+            if command is None:
+                break
+
+            issued_at, hold_seconds = command
+            now = time.monotonic()
+
+            if deadline is None:
+                # Door is locked: raise the pin and record latency
+                # 도어가 잠긴 상태: 핀을 올리고 지연 시간 기록
+                self.gpio.output(self.pin, True)
+                self.latencies.append(time.monotonic() - issued_at)
+                self.unlock_count += 1
+                deadline = now + hold_seconds
+            else:
+                # Door already open: extend the hold instead of re-toggling
+                # 이미 열린 상태: 다시 토글하지 않고 유지 시간 연장
+                self.coalesced_count += 1
+                deadline = max(deadline, now + hold_seconds)
+
+            with self._cond:
+                self._holding = True
+                self._pending -= 1
+
+    def wait_idle(self, timeout=None):
+        """
+        Block until no command is pending and the door is locked again.
+        대기 명령이 없고 도어가 다시 잠길 때까지 대기합니다.
+
+        Returns:
+            bool: True if idle, False on timeout
+                 유휴 상태이면 True, 시간 초과 시 False
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._pending == 0 and not self._holding, timeout
+            )
+
+    def stop(self):
+        """
+        Finish the current hold, stop the worker and release the GPIO.
+        현재 유지 구간을 마치고 작업 스레드를 중지한 뒤 GPIO를 해제합니다.
+        """
+        if self._thread is not None:
+            self.wait_idle()
+            self.commands.put(None)
+            self._thread.join()
+            self._thread = None
+        self.gpio.cleanup()
+
+    def stats(self):
+        """
+        Summarize actuation counters and latency.
+        작동 횟수와 지연 시간을 요약합니다.
+
+        Returns:
+            dict: unlocks, coalesced, latency_avg_ms, latency_max_ms
+                 잠금 해제 수, 병합 수, 평균/최대 지연 시간 (ms)
+        """
+        samples = list(self.latencies)
+        return {
+            'unlocks': self.unlock_count,
+            'coalesced': self.coalesced_count,
+            'latency_avg_ms': 1000 * sum(samples) / len(samples) if samples else 0.0,
+            'latency_max_ms': 1000 * max(samples) if samples else 0.0,
+        }
+
+
+def serve(door, path=SOCKET_PATH):
+    """
+    Accept unlock commands on a Unix datagram socket until interrupted.
+    중단될 때까지 유닉스 데이터그램 소켓에서 잠금 해제 명령을 받습니다.
+
+    Message format: b"unlock <hold_seconds> <monotonic_sent>"
+    메시지 형식: b"unlock <유지 시간> <전송 시 monotonic 값>"
+
+    Args:
+        door (DoorActuator): Started actuator to drive
+                            구동할 시작된 액추에이터
+        path (str): Socket path
+                   소켓 경로
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+
+    try:
+        while True:
+            data = sock.recv(128)
+            try:
+                verb, hold, sent = data.decode("ascii").split()
+                if verb != "unlock":
+                    continue
+                sent = float(sent)
+                if not math.isfinite(sent):
+                    raise ValueError(f"Invalid send time: {sent}")
+                # CLOCK_MONOTONIC is shared by processes on the same host
+                # CLOCK_MONOTONIC은 같은 호스트의 프로세스 간에 공유됨
+                door.unlock(clamp_hold(hold, door.max_hold), issued_at=sent)
+            except (ValueError, OverflowError):
+                print(f"Ignoring malformed command: {data!r}")
+    finally:
+        sock.close()
+        os.remove(path)
+
+
+def send_unlock(hold_seconds, path=SOCKET_PATH):
+    """
+    Ask the resident actuator service to unlock the door.
+    상주 액추에이터 서비스에 도어 잠금 해제를 요청합니다.
+
+    Raises:
+        OSError: If the service is not running
+                서비스가 실행 중이 아닐 경우
+    """
+    message = f"unlock {hold_seconds} {time.monotonic()}".encode("ascii")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.sendto(message, path)
+
+
+# In-process actuator used when no service is running
+# 서비스가 실행 중이지 않을 때 사용하는 프로세스 내 액추에이터
+_local_door = None
+
+
+def request_unlock(hold_seconds, path=SOCKET_PATH):
+    """
+    Unlock via the service, falling back to an in-process actuator.
+    서비스를 통해 잠금 해제하고, 없으면 프로세스 내 액추에이터를 사용합니다.
+
+    Args:
+        hold_seconds (float): How long the door stays unlocked
+                             도어가 잠금 해제 상태로 유지되는 시간
+        path (str): Service socket path
+                   서비스 소켓 경로
+    """
+    global _local_door
+
+    try:
+        send_unlock(hold_seconds, path)
+    except OSError:
+        if _local_door is None:
+            _local_door = DoorActuator().start()
+        _local_door.unlock(hold_seconds)
+
+
+def shutdown_local():
+    """
+    Stop the in-process fallback actuator if one was started.
+    프로세스 내 대체 액추에이터가 시작되었다면 중지합니다.
+    """
+    global _local_door
+
+    if _local_door is not None:
+        _local_door.stop()
+        _local_door = None
+
+
+if __name__ == "__main__":
+    door = DoorActuator().start()
+    print(f"Actuator listening on {SOCKET_PATH}")
+    try:
+        serve(door)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        door.stop()
+        print(f"Actuator stats: {door.stats()}")
@@ -0,0 +1,166 @@
+"""
+Scanner Benchmarks
+스캐너 벤치마크
+
+pytest-benchmark suite for the door's hot path on synthetic camera frames
+(synthframe.py): pyzbar.decode, validate_key against the compiled StoredKey
+and the full scan loop body.
+Unlike test_raspart.py it runs the real cv2 and pyzbar, so it is not
+collected by the default test run; pass the file explicitly. It is skipped
+when pytest-benchmark or the zbar library is missing.
+합성 카메라 프레임(synthframe.py)에서 도어의 핵심 경로(pyzbar.decode,
+validate_key와 컴파일된 StoredKey 비교, 전체 스캔 루프 본문)를 측정하는 pytest-benchmark 모음입니다.
+test_raspart.py와 달리 실제 cv2와 pyzbar를 실행하므로 기본 테스트 실행에서는
+수집되지 않으며, 파일을 직접 지정해야 합니다. pytest-benchmark나 zbar
+라이브러리가 없으면 건너뜁니다.
+
+Usage / 사용법:
+    python3 -m pytest raspart/bench_scanner.py --benchmark-autosave      # record a baseline
+    python3 -m pytest raspart/bench_scanner.py --benchmark-compare \\
+        --benchmark-compare-fail=mean:15%                                 # fail on a >15% slowdown
+"""
+
+import json
+import os
+import sys
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pyzbar = pytest.importorskip("pyzbar.pyzbar", exc_type=ImportError)  # also without libzbar
+
+import cv2
+
+# test_raspart.py replaces cv2 with a mock for the whole session
+# test_raspart.py는 세션 전체에서 cv2를 모의 객체로 대체함
+if type(cv2).__module__ == 'unittest.mock':
+    pytest.skip("cv2 is mocked; run the benchmarks on their own", allow_module_level=True)
+
+# Keys are rendered by the host's DoorKey; nothing here drives the lock pin
+# 키는 호스트의 DoorKey로 렌더링되며, 여기서는 잠금 핀을 구동하지 않음
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'hostpart'))
+os.environ.setdefault("DOORLENS_GPIO", "simgpio")
+
+import keycodec
+import rasberryQR
+import synthframe
+import testpart
+
+# Frames per benchmark round, covering every synthframe variation
+# 벤치마크 라운드당 프레임 수, 모든 synthframe 변형을 포함
+FRAMES = len(synthframe.SCALES) * len(synthframe.ANGLES) * len(synthframe.BLURS) * len(synthframe.NOISES)
+
+# Share of frames that must decode, so a "faster" path that stopped finding
+# codes (e.g. a broken color conversion) cannot pass; the measured rate is
+# saved in extra_info
+# 디코딩되어야 하는 프레임 비율로, 코드를 찾지 못하게 된 "더 빠른" 경로(예: 잘못된
+# 색 변환)가 통과하지 못하게 함, 측정된 비율은 extra_info에 저장됨
+MIN_DECODE_RATE = 0.5
+
+
+def throughput(benchmark, count):
+    """
+    Record frames (or keys) per second of the mean round in extra_info.
+    평균 라운드의 초당 프레임(또는 키) 수를 extra_info에 기록합니다.
+    """
+    benchmark.extra_info['per_round'] = count
+    if benchmark.stats is not None:  # None with --benchmark-disable
+        benchmark.extra_info['per_second'] = round(count / benchmark.stats.stats.mean, 1)
+
+
+@pytest.fixture(scope="module")
+def frames():
+    """One DoorKey per frame, at every scale, rotation, blur and noise."""
+    return synthframe.key_frames(FRAMES, door_id='bench-door')
+
+
+@pytest.fixture(scope="module")
+def grays(frames):
+    return [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame, _ in frames]
+
+
+@pytest.fixture(scope="module")
+def door_keys(tmp_path_factory):
+    """A door holding one stored key, and that key composited into frames."""
+    directory = tmp_path_factory.mktemp("door")
+    _, key_png, qr_info = testpart.DoorKey('bench-door').create_key_in_memory()
+    (directory / "keyinfo.json").write_text(qr_info)
+
+    keys = rasberryQR.DoorKeys(key_path=str(directory / "keyinfo.json"),
+                               keyring_path=str(directory / "keyring.json"),
+                               revocation_path=str(directory / "revoked.bin"))
+    return keys, synthframe.key_variants(key_png, FRAMES)
+
+
+def loop_body(img, gray, keys):
+    """
+    One pass of rasberryQR.scan's loop after the camera read.
+    카메라 읽기 이후 rasberryQR.scan 루프의 한 번의 실행입니다.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, gray)
+    key_test = False
+    for d in pyzbar.decode(gray):
+        key_test = keys.check(d.data.decode("utf-8"))
+    keys.refresh()
+    return gray, key_test
+
+
+def test_decode(benchmark, frames, grays):
+    """Benchmark pyzbar.decode over every frame variation."""
+    def decode_all():
+        return [pyzbar.decode(gray) for gray in grays]
+
+    results = benchmark(decode_all)
+    throughput(benchmark, len(grays))
+
+    payloads = [keycodec.encode_compact(json.loads(qr_info)) for _, qr_info in frames]
+    decoded = [(r[0].data.decode("utf-8"), payload) for r, payload in zip(results, payloads) if r]
+    benchmark.extra_info['decode_rate'] = len(decoded) / len(payloads)
+    assert all(text == payload for text, payload in decoded)
+    assert len(decoded) >= MIN_DECODE_RATE * len(payloads)
+
+
+@pytest.fixture(scope="module")
+def key_pairs(frames):
+    """Each frame's payload parsed as the door sees it, with its stored key."""
+    return [(keycodec.decode_payload(keycodec.encode_compact(json.loads(qr_info))),
+             json.loads(qr_info)) for _, qr_info in frames] * 50
+
+
+def test_validate_key(benchmark, key_pairs):
+    """Benchmark validate_key on parsed payloads against their stored keys."""
+    def validate_all():
+        return [rasberryQR.validate_key(scanned, stored) for scanned, stored in key_pairs]
+
+    assert all(benchmark(validate_all))
+    throughput(benchmark, len(key_pairs))
+
+
+def test_stored_key(benchmark, key_pairs):
+    """Benchmark StoredKey.validate on the keys of test_validate_key, as DoorKeys.check parses them."""
+    pairs = [(keycodec.decode_payload(keycodec.encode_compact(stored), epochs=True),
+              rasberryQR.StoredKey(stored)) for _, stored in key_pairs]
+
+    def validate_all():
+        return [compiled.validate(scanned) for scanned, compiled in pairs]
+
+    assert all(benchmark(validate_all))
+    throughput(benchmark, len(pairs))
+
+
+def test_loop_body(benchmark, door_keys):
+    """Benchmark the scan loop body: gray conversion, decode, check and refresh."""
+    keys, images = door_keys
+    gray = None
+
+    def scan_all():
+        nonlocal gray
+        accepted = 0
+        for img in images:
+            gray, key_test = loop_body(img, gray, keys)
+            accepted += key_test
+        return accepted
+
+    accepted = benchmark(scan_all)
+    throughput(benchmark, len(images))
+    benchmark.extra_info['decode_rate'] = accepted / len(images)
+    assert accepted >= MIN_DECODE_RATE * len(images)
@@ -0,0 +1,774 @@
+"""
+Door Daemon Module
+도어 데몬 모듈
+
+Runs the whole door in one asyncio process: Pub/Sub subscription, camera
+capture, QR decoding, lock actuation and metrics are cooperating tasks on
+one event loop, so there are no scanner subprocesses and no busy loops.
+Blocking camera reads and decoding run in executor threads; the lock hold is
+an asyncio timer instead of a sleeping thread. SIGINT or SIGTERM cancels
+every task, locks the door and releases the camera.
+도어 전체를 하나의 asyncio 프로세스로 실행합니다. Pub/Sub 구독, 카메라 캡처,
+QR 디코딩, 잠금 장치 구동, 지표 수집이 하나의 이벤트 루프에서 협력하는 태스크로
+동작하므로 스캐너 하위 프로세스나 바쁜 대기 루프가 없습니다. 차단되는 카메라
+읽기와 디코딩은 실행기 스레드에서 실행되며, 잠금 유지는 잠자는 스레드 대신
+asyncio 타이머입니다. SIGINT 또는 SIGTERM은 모든 태스크를 취소하고 도어를 잠근
+뒤 카메라를 해제합니다.
+
+Several doors can share one Pi: list them in cfg.doors, each with its own
+camera, lock pin and key directory. They share one decoder pool and one
+Pub/Sub client.
+여러 도어가 하나의 라즈베리파이를 공유할 수 있습니다. cfg.doors에 각자의
+카메라, 잠금 핀, 키 디렉터리와 함께 나열하면 하나의 디코더 풀과 하나의 Pub/Sub
+클라이언트를 공유합니다.
+
+Usage / 사용법:
+    python3 doord.py
+    python3 doord.py --metrics-interval 30 --no-subscribe
+    python3 doord.py --decode-workers 2
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import signal
+import time
+from collections import deque
+import config as cfg
+import actuator
+import audit
+import keysync
+import preroll
+import profiler
+import rasberryQR
+import revocation
+import startup
+import sub
+
+# Imported on first use, as in rasberryQR.py
+# rasberryQR.py와 같이 처음 사용할 때 임포트됨
+cv2 = startup.lazy_import("cv2")
+pyzbar = startup.lazy_import("pyzbar.pyzbar")
+pubsub_v1 = startup.lazy_import("google.cloud.pubsub_v1")
+
+# Minimum seconds between two unlocks
+# 두 잠금 해제 사이의 최소 간격 (초)
+UNLOCK_INTERVAL = 60
+
+log = rasberryQR.log
+
+
+def percentile(samples, pct):
+    """
+    Return the pct-th percentile of samples, or 0.0 if there are none.
+    샘플의 pct 백분위수를 반환하며, 샘플이 없으면 0.0을 반환합니다.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def decode_frame(img):
+    """
+    Decode every QR code in a camera frame.
+    카메라 프레임의 모든 QR 코드를 디코딩합니다.
+
+    Args:
+        img (numpy.ndarray): BGR frame from the camera
+                            카메라의 BGR 프레임
+
+    Returns:
+        list: Decoded QR code texts
+             디코딩된 QR 코드 텍스트
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return [d.data.decode("utf-8") for d in pyzbar.decode(gray)]
+
+
+class AsyncLock:
+    """
+    Lock pin driven from the event loop.
+    이벤트 루프에서 구동되는 잠금 핀입니다.
+
+    Like actuator.DoorActuator, an unlock during an open hold extends it
+    instead of toggling the pin again.
+    actuator.DoorActuator처럼, 열린 유지 구간 중의 잠금 해제는 핀을 다시
+    토글하지 않고 구간을 연장합니다.
+
+    Attributes:
+        latencies (deque): Recent scan-to-pin latencies in seconds
+                          최근 스캔-핀 지연 시간 (초)
+        unlock_count (int): Number of times the pin was raised
+                           핀이 HIGH로 설정된 횟수
+        coalesced_count (int): Unlocks merged into an open hold
+                              열린 유지 구간에 병합된 잠금 해제 수
+    """
+
+    def __init__(self, pin=actuator.LOCK_PIN, gpio=None, history=1000):
+        """
+        Initialize AsyncLock instance.
+        AsyncLock 인스턴스를 초기화합니다.
+
+        Args:
+            pin (int): BCM pin number (defaults to 17)
+                      BCM 핀 번호 (기본값: 17)
+            gpio (module): GPIO backend (defaults to the configured one)
+                          GPIO 백엔드 (기본값: 설정된 백엔드)
+            history (int): Number of latency samples to keep
+                          보관할 지연 시간 샘플 수
+        """
+        self.pin = pin
+        self.gpio = gpio if gpio is not None else actuator.GPIO
+        self.latencies = deque(maxlen=history)
+        self.unlock_count = 0
+        self.coalesced_count = 0
+        self._deadline = None
+        self._issued_at = None
+        self._wake = asyncio.Event()
+
+    def unlock(self, hold_seconds, issued_at=None):
+        """
+        Open the door for hold_seconds, or extend the current hold.
+        도어를 hold_seconds 동안 열거나 현재 유지 구간을 연장합니다.
+
+        Args:
+            hold_seconds (float): How long the door stays unlocked
+                                 도어가 잠금 해제 상태로 유지되는 시간
+            issued_at (float): time.monotonic() of the scan that asked for it
+                              요청한 스캔의 time.monotonic() 값
+        """
+        now = time.monotonic()
+        if self._deadline is None:
+            self._deadline = now + hold_seconds
+            self._issued_at = now if issued_at is None else issued_at
+            self._wake.set()
+        else:
+            self.coalesced_count += 1
+            self._deadline = max(self._deadline, now + hold_seconds)
+
+    async def run(self):
+        """
+        Drive the pin until cancelled, then leave the door locked.
+        취소될 때까지 핀을 구동하고, 이후 도어를 잠긴 상태로 둡니다.
+        """
+        self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setup(self.pin, self.gpio.OUT)
+        self.gpio.output(self.pin, False)
+        try:
+            while True:
+                await self._wake.wait()
+                self._wake.clear()
+
+                self.gpio.output(self.pin, True)
+                self.latencies.append(time.monotonic() - self._issued_at)
+                self.unlock_count += 1
+
+                # Sleep until the (possibly extended) deadline passes
+                # (연장되었을 수 있는) 마감 시간이 지날 때까지 대기
+                while time.monotonic() < self._deadline:
+                    await asyncio.sleep(self._deadline - time.monotonic())
+
+                self.gpio.output(self.pin, False)
+                self._deadline = None
+        finally:
+            # Release only this door's pin; other doors may share the GPIO
+            # 이 도어의 핀만 해제, 다른 도어가 GPIO를 공유할 수 있음
+            self.gpio.output(self.pin, False)
+            self.gpio.cleanup(self.pin)
+
+    def stats(self):
+        """
+        Summarize actuation counters and latency.
+        작동 횟수와 지연 시간을 요약합니다.
+
+        Returns:
+            dict: unlocks, coalesced, scan_to_unlock_p50_ms, scan_to_unlock_p99_ms
+                 잠금 해제 수, 병합 수, 스캔-잠금 해제 p50/p99 지연 시간 (ms)
+        """
+        samples = list(self.latencies)
+        return {
+            'unlocks': self.unlock_count,
+            'coalesced': self.coalesced_count,
+            'scan_to_unlock_p50_ms': 1000 * percentile(samples, 50),
+            'scan_to_unlock_p99_ms': 1000 * percentile(samples, 99),
+        }
+
+
+class Door:
+    """
+    One entrance: a camera, its lock pin and the keys it accepts.
+    하나의 출입구: 카메라, 잠금 핀, 허용하는 키입니다.
+
+    Capture keeps only the newest frame; when decoding falls behind, older
+    frames are dropped rather than queued, so a scan is always judged on a
+    fresh frame.
+    캡처는 가장 최근 프레임만 유지합니다. 디코딩이 뒤처지면 오래된 프레임을
+    쌓지 않고 버리므로, 스캔은 항상 최신 프레임으로 판정됩니다.
+
+    Attributes:
+        door_id (str): ID of the door, matching the host's topic or door_id attribute
+                      도어 ID, 호스트의 토픽 또는 door_id 속성과 일치
+        keys (DoorKeys): Key sources the door accepts
+                        도어가 허용하는 키 소스
+        lock (AsyncLock): Lock pin driver
+                         잠금 핀 구동기
+        directory (str): Directory of the door's key files
+                        도어의 키 파일 디렉터리
+        subscription (str): Pub/Sub subscription carrying the door's messages
+                           도어의 메시지를 전달하는 Pub/Sub 구독
+        audit (AuditStream): Upstream stream of unlocks and rejections, or None
+                            잠금 해제와 거부의 상위 스트림, 없으면 None
+        preroll (PrerollBuffer): Ring of recent frames for snapshots, or None
+                                스냅샷용 최근 프레임 링, 없으면 None
+        frames (int): Frames captured
+                     캡처된 프레임 수
+        dropped (int): Frames replaced before they were decoded
+                      디코딩 전에 교체된 프레임 수
+        codes (int): QR codes decoded
+                    디코딩된 QR 코드 수
+        rejected (int): QR codes that did not open the door
+                       도어를 열지 못한 QR 코드 수
+        messages (int): Pub/Sub messages handled
+                       처리된 Pub/Sub 메시지 수
+    """
+
+    def __init__(self, door_id, keys, camera, lock, directory=".", subscription=None,
+                 hold_seconds=rasberryQR.UNLOCK_SECONDS, audit_stream=None, frames=None,
+                 unlock_interval=UNLOCK_INTERVAL):
+        """
+        Initialize Door instance.
+        Door 인스턴스를 초기화합니다.
+
+        Args:
+            door_id (str): ID of the door
+                          도어 ID
+            keys (DoorKeys): Key sources the door accepts
+                            도어가 허용하는 키 소스
+            camera (cv2.VideoCapture): Camera to read frames from
+                                      프레임을 읽을 카메라
+            lock (AsyncLock): Lock pin driver
+                             잠금 핀 구동기
+            directory (str): Directory of the door's key files (defaults to ".")
+                            도어의 키 파일 디렉터리 (기본값: ".")
+            subscription (str): Pub/Sub subscription name, or None
+                               Pub/Sub 구독 이름, 없으면 None
+            hold_seconds (float): How long a valid scan keeps the door open
+                                 유효한 스캔 후 도어가 열려 있는 시간
+            audit_stream (AuditStream): Stream for unlocks and rejections (optional)
+                                       잠금 해제와 거부를 위한 스트림 (선택 사항)
+            frames (PrerollBuffer): Ring of recent frames for snapshots (optional)
+                                   스냅샷용 최근 프레임 링 (선택 사항)
+            unlock_interval (float): Minimum seconds between two unlocks (defaults to 60)
+                                    두 잠금 해제 사이의 최소 간격 (초) (기본값: 60)
+        """
+        self.door_id = door_id
+        self.keys = keys
+        self.camera = camera
+        self.lock = lock
+        self.directory = directory
+        self.subscription = subscription
+        self.hold_seconds = hold_seconds
+        self.audit = audit_stream
+        self.preroll = frames
+        self.unlock_interval = unlock_interval
+
+        self.frames = 0
+        self.dropped = 0
+        self.codes = 0
+        self.rejected = 0
+        self.messages = 0
+        self.decode_latencies = deque(maxlen=1000)
+
+        self._frame = None
+        self._last_unlock = None
+
+        # One thread owns the camera so a blocked read never holds up another door
+        # 카메라는 스레드 하나가 소유하여 차단된 읽기가 다른 도어를 막지 않음
+        self._camera_pool = concurrent.futures.ThreadPoolExecutor(
+            1, thread_name_prefix=f"camera-{door_id}")
+
+    @classmethod
+    def from_config(cls, entry, secret=None, subscription=None, publisher=None):
+        """
+        Build a door from one entry of cfg.doors.
+        cfg.doors의 항목 하나로 도어를 생성합니다.
+
+        Args:
+            entry (dict): door_id, camera (device index, defaults to 0), pin
+                          (defaults to 17), directory (defaults to door_id)
+                          and subscription (defaults to the shared one)
+                         door_id, camera (장치 번호, 기본값: 0), pin (기본값: 17),
+                         directory (기본값: door_id), subscription (기본값: 공유 구독)
+            secret (bytes): Secret for signed keys (optional)
+                           서명된 키를 위한 비밀 키 (선택 사항)
+            subscription (str): Shared subscription name
+                               공유 구독 이름
+            publisher (PublisherClient): Client shared by the doors' audit streams
+                                        도어들의 감사 스트림이 공유하는 클라이언트
+
+        Returns:
+            Door: The configured door
+                 설정된 도어
+        """
+        door_id = entry['door_id']
+        directory = entry.get('directory', door_id)
+        os.makedirs(directory, exist_ok=True)
+        keys = rasberryQR.DoorKeys(
+            secret, door_id,
+            key_path=os.path.join(directory, "keyinfo.json"),
+            keyring_path=os.path.join(directory, keysync.KEYRING_PATH),
+            revocation_path=os.path.join(directory, revocation.REVOCATION_PATH),
+        )
+        audit_stream = rasberryQR.open_audit(
+            door_id, os.path.join(directory, audit.SPOOL_PATH), publisher)
+        frames = rasberryQR.open_preroll(os.path.join(directory, preroll.SNAPSHOT_DIR))
+        return cls(door_id, keys, cv2.VideoCapture(entry.get('camera', 0)),
+                   AsyncLock(entry.get('pin', actuator.LOCK_PIN)), directory,
+                   entry.get('subscription', subscription), audit_stream=audit_stream,
+                   frames=frames)
+
+    async def capture(self, ready):
+        """
+        Keep the newest frame and queue the door for decoding.
+        가장 최근 프레임을 유지하고 도어를 디코딩 대기열에 넣습니다.
+
+        Args:
+            ready (asyncio.Queue): Doors with a frame waiting, each at most once
+                                  프레임이 대기 중인 도어, 각 도어는 최대 한 번
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            ret, img = await loop.run_in_executor(self._camera_pool, self._read)
+            if not ret:
+                await asyncio.sleep(0.01)
+                continue
+
+            self.frames += 1
+            startup.mark(startup.FIRST_FRAME)
+            if self._frame is not None:
+                self.dropped += 1
+            else:
+                ready.put_nowait(self)
+            self._frame = (time.monotonic(), img)
+
+    def _read(self):
+        """
+        Read a frame on the camera thread and copy it into the pre-roll ring.
+        카메라 스레드에서 프레임을 읽고 프리롤 링에 복사합니다.
+        """
+        ret, img = self.camera.read()
+        if ret and self.preroll is not None:
+            self.preroll.push(img)
+        return ret, img
+
+    def take_frame(self):
+        """
+        Hand the waiting frame to the decoder.
+        대기 중인 프레임을 디코더에 넘깁니다.
+        """
+        frame, self._frame = self._frame, None
+        return frame
+
+    def judge(self, codes, captured_at):
+        """
+        Validate the codes of one frame and unlock on a valid scan.
+        프레임 하나의 코드를 검증하고 유효한 스캔이면 잠금을 해제합니다.
+
+        Args:
+            codes (list): Decoded QR code texts
+                         디코딩된 QR 코드 텍스트
+            captured_at (float): time.monotonic() when the frame was read
+                                프레임을 읽은 time.monotonic() 값
+        """
+        self.decode_latencies.append(time.monotonic() - captured_at)
+
+        # The last code in the frame decides, as in rasberryQR.scan
+        # rasberryQR.scan과 같이 프레임의 마지막 코드가 결과를 결정
+        key_test = False
+        passwd = None
+        for barcode_data in codes:
+            self.codes += 1
+            key_test = self.keys.check(barcode_data)
+            passwd = self.keys.last_passwd
+            if not key_test:
+                self.reject(passwd)
+
+        now = time.monotonic()
+        if key_test and (self._last_unlock is None or now - self._last_unlock > self.unlock_interval):
+            log.info(f"Door unlocked: {self.door_id}")
+            self.lock.unlock(self.hold_seconds, issued_at=captured_at)
+            self._last_unlock = now
+            if self.audit is not None:
+                self.audit.record(audit.UNLOCK, passwd)
+            if self.preroll is not None:
+                self.preroll.trigger(audit.UNLOCK)
+
+    def reject(self, passwd=None):
+        """
+        Count a rejected scan and record it on the audit stream.
+        거부된 스캔을 세고 감사 스트림에 기록합니다.
+
+        Args:
+            passwd (str): Password of the rejected key, if it was read
+                         읽혔다면 거부된 키의 비밀번호
+        """
+        self.rejected += 1
+        if self.audit is not None:
+            self.audit.record(audit.REJECT, passwd)
+        if self.preroll is not None:
+            self.preroll.trigger(audit.REJECT)
+
+    def close(self):
+        """
+        Release the camera and its thread.
+        카메라와 그 스레드를 해제합니다.
+        """
+        # Release the camera first so a blocked read returns
+        # 차단된 읽기가 반환되도록 카메라를 먼저 해제
+        self.camera.release()
+        self._camera_pool.shutdown()
+
+        # Send what is buffered, or spool it for the next start
+        # 버퍼된 내용을 전송하거나 다음 시작을 위해 스풀에 저장
+        if self.audit is not None:
+            self.audit.close()
+        if self.preroll is not None:
+            self.preroll.writer.stop()
+
+    def stats(self):
+        """
+        Summarize capture, decode, message and actuation metrics.
+        캡처, 디코딩, 메시지, 구동 지표를 요약합니다.
+
+        Returns:
+            dict: Counters plus decode and scan-to-unlock latency percentiles
+                 카운터와 디코딩 및 스캔-잠금 해제 지연 시간 백분위수
+        """
+        samples = list(self.decode_latencies)
+        stats = {
+            'frames': self.frames,
+            'dropped': self.dropped,
+            'codes': self.codes,
+            'rejected': self.rejected,
+            'messages': self.messages,
+            'decode_p50_ms': 1000 * percentile(samples, 50),
+            'decode_p99_ms': 1000 * percentile(samples, 99),
+        }
+        stats.update(self.lock.stats())
+        return stats
+
+
+class DoorDaemon:
+    """
+    Doors on one Pi: capture, decode, actuation, subscription and metrics tasks.
+    하나의 라즈베리파이에 있는 도어들: 캡처, 디코딩, 구동, 구독, 지표 태스크입니다.
+
+    Every door has its own capture task and lock, but all doors share one
+    decoder pool and one Pub/Sub client. Doors with a waiting frame queue up
+    once each and are decoded in turn, so a busy entrance gets no more
+    decodes than any other door with a frame ready.
+    각 도어는 자체 캡처 태스크와 잠금 장치를 가지지만, 모든 도어가 하나의 디코더
+    풀과 하나의 Pub/Sub 클라이언트를 공유합니다. 프레임이 대기 중인 도어는 각각 한
+    번씩 줄을 서서 차례로 디코딩되므로, 바쁜 출입구도 프레임이 준비된 다른 도어보다
+    더 많이 디코딩되지 않습니다.
+
+    Attributes:
+        doors (dict): door_id -> Door
+                     door_id -> Door
+        decode_workers (int): Frames decoded at the same time
+                             동시에 디코딩되는 프레임 수
+        unrouted (int): Messages that matched no door
+                       어떤 도어와도 맞지 않은 메시지 수
+    """
+
+    def __init__(self, doors, decode_workers=None, metrics_interval=60.0, refresh_interval=1.0):
+        """
+        Initialize DoorDaemon instance.
+        DoorDaemon 인스턴스를 초기화합니다.
+
+        Args:
+            doors (list): Doors to run
+                         실행할 도어
+            decode_workers (int): Decoder threads (defaults to one per door,
+                                  up to the number of CPUs)
+                                 디코더 스레드 수 (기본값: 도어당 하나, 최대 CPU 수)
+            metrics_interval (float): Seconds between metrics log lines
+                                     지표 로그 사이의 간격 (초)
+            refresh_interval (float): Seconds between key file checks
+                                     키 파일 확인 사이의 간격 (초)
+        """
+        self.doors = {door.door_id: door for door in doors}
+        self.decode_workers = decode_workers or min(len(self.doors), os.cpu_count() or 1)
+        self.metrics_interval = metrics_interval
+        self.refresh_interval = refresh_interval
+        self.unrouted = 0
+
+        self._stop = None
+        self._decode_pool = concurrent.futures.ThreadPoolExecutor(
+            self.decode_workers, thread_name_prefix="decode")
+
+    async def decode(self, ready):
+        """
+        Decode waiting frames door by door on the shared decoder pool.
+        대기 중인 프레임을 공유 디코더 풀에서 도어별로 차례로 디코딩합니다.
+
+        Args:
+            ready (asyncio.Queue): Doors with a frame waiting
+                                  프레임이 대기 중인 도어
+        """
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.decode_workers)
+        pending = set()
+
+        async def decode_one(door, captured_at, img):
+            try:
+                codes = await loop.run_in_executor(self._decode_pool, decode_frame, img)
+                door.judge(codes, captured_at)
+            except Exception:
+                # A frame that fails to decode or judge never opens the door
+                # 디코딩이나 판정에 실패한 프레임은 문을 열지 않음
+                log.exception(f"Frame rejected for {door.door_id}")
+                door.reject()
+            finally:
+                slots.release()
+
+        try:
+            while True:
+                door = await ready.get()
+                await slots.acquire()
+                captured_at, img = door.take_frame()
+                task = asyncio.create_task(decode_one(door, captured_at, img))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def route(self, message, subscription):
+        """
+        Find the door a message is for.
+        메시지가 향하는 도어를 찾습니다.
+
+        Messages on a shared topic carry a door_id attribute; on a door's own
+        subscription the door is known from the subscription.
+        공유 토픽의 메시지는 door_id 속성을 가지며, 도어 전용 구독에서는 구독으로
+        도어를 알 수 있습니다.
+
+        Returns:
+            Door: The addressed door, or None
+                 대상 도어, 없으면 None
+        """
+        door_id = (message.attributes or {}).get('door_id')
+        if door_id is not None:
+            return self.doors.get(door_id)
+        candidates = [door for door in self.doors.values() if door.subscription == subscription]
+        return candidates[0] if len(candidates) == 1 else None
+
+    async def subscribe(self, project_id):
+        """
+        Store keys, keyring updates and revocation lists from Pub/Sub.
+        Pub/Sub에서 받은 키, 키링 갱신, 폐기 목록을 저장합니다.
+
+        Every distinct subscription of the doors is pulled by one client.
+        Messages arrive on the subscriber's threads and are handed to the
+        event loop; each is stored off-loop in its door's directory,
+        acknowledged and then applied to that door's keys at once.
+        도어들의 서로 다른 구독을 하나의 클라이언트가 가져옵니다. 메시지는 구독자
+        스레드에서 도착하여 이벤트 루프로 전달되며, 각 메시지는 루프 밖에서 해당
+        도어의 디렉터리에 저장되고 확인된 뒤 즉시 그 도어의 키에 반영됩니다.
+        """
+        names = sorted({door.subscription for door in self.doors.values() if door.subscription})
+        if not names:
+            return
+
+        loop = asyncio.get_running_loop()
+        inbox = asyncio.Queue()
+        client = pubsub_v1.SubscriberClient()
+        futures = []
+        for name in names:
+            path = client.subscription_path(project_id, name)
+            futures.append(client.subscribe(path, callback=lambda message, name=name:
+                                            loop.call_soon_threadsafe(inbox.put_nowait, (name, message))))
+            log.info(f"Listening for messages on {path}")
+
+        try:
+            while True:
+                name, message = await inbox.get()
+                door = self.route(message, name)
+                if door is None:
+                    self.unrouted += 1
+                    log.error(f"Message {message.message_id} matches no door")
+                    message.ack()
+                    continue
+
+                try:
+                    kind = await loop.run_in_executor(None, sub.handle_message, message.data,
+                                                      door.directory)
+                except ValueError as e:
+                    # Malformed: redelivery would fail the same way, so drop it
+                    # 형식 오류: 다시 전달되어도 같은 방식으로 실패하므로 버림
+                    log.error(f"Dropped malformed message {message.message_id} "
+                              f"for {door.door_id}: {e}")
+                    message.ack()
+                    continue
+                except Exception:
+                    # Anything else (e.g. a full disk) may pass on redelivery
+                    # 그 외 오류 (예: 디스크 가득 참)는 다시 전달되면 성공할 수 있음
+                    log.exception(f"Could not store message {message.message_id} "
+                                  f"for {door.door_id}")
+                    message.nack()
+                    continue
+                message.ack()
+                door.messages += 1
+                if door.keys.refresh():
+                    log.info(f"New key loaded for {door.door_id} ({kind})")
+        finally:
+            for future in futures:
+                future.cancel()
+            client.close()
+
+    async def watch(self):
+        """
+        Reload key files written by other tools, such as sub.py.
+        sub.py 같은 다른 도구가 쓴 키 파일을 다시 읽습니다.
+        """
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            for door in self.doors.values():
+                if door.keys.refresh():
+                    log.info(f"New key loaded for {door.door_id}")
+
+    async def report(self):
+        """
+        Log every door's metrics periodically.
+        모든 도어의 지표를 주기적으로 기록합니다.
+        """
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            for door_id, stats in self.stats().items():
+                log.info(f"Door stats {door_id}: {stats}")
+
+    def stats(self):
+        """
+        Summarize metrics per door.
+        도어별 지표를 요약합니다.
+
+        Returns:
+            dict: door_id -> Door.stats()
+                 door_id -> Door.stats()
+        """
+        return {door_id: door.stats() for door_id, door in self.doors.items()}
+
+    def stop(self):
+        """
+        Ask run() to cancel every task and return.
+        run()에 모든 태스크를 취소하고 반환하도록 요청합니다.
+        """
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self, project_id=None):
+        """
+        Run every task until stop() is called or one of them fails.
+        stop()이 호출되거나 태스크 하나가 실패할 때까지 모든 태스크를 실행합니다.
+
+        Args:
+            project_id (str): Google Cloud project ID, or None to run without
+                              Pub/Sub
+                             Google Cloud 프로젝트 ID, Pub/Sub 없이 실행하려면 None
+
+        Raises:
+            Exception: The error of a task that failed
+                      실패한 태스크의 오류
+        """
+        ready = asyncio.Queue()
+        self._stop = asyncio.Event()
+        coros = [self.decode(ready), self.watch(), self.report()]
+        for door in self.doors.values():
+            coros += [door.lock.run(), door.capture(ready)]
+        if project_id is not None:
+            coros.append(self.subscribe(project_id))
+        tasks = [asyncio.create_task(coro) for coro in coros]
+        stopper = asyncio.create_task(self._stop.wait())
+
+        try:
+            done, _ = await asyncio.wait(tasks + [stopper], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks + [stopper]:
+                task.cancel()
+            await asyncio.gather(*tasks, stopper, return_exceptions=True)
+            for door in self.doors.values():
+                door.close()
+            self._decode_pool.shutdown()
+
+        for task in done:
+            if task is not stopper and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+
+
+def configured_doors(secret=None):
+    """
+    Build the doors listed in config.py.
+    config.py에 나열된 도어를 생성합니다.
+
+    Without cfg.doors the Pi runs one door on camera 0 and GPIO 17, with its
+    key files in the working directory, as rasberryQR.py does.
+    cfg.doors가 없으면 rasberryQR.py처럼 카메라 0과 GPIO 17에 도어 하나를 실행하며,
+    키 파일은 작업 디렉터리에 있습니다.
+
+    Returns:
+        list: Door instances
+             Door 인스턴스
+    """
+    subscription = getattr(cfg, 'subscription_name', None)
+    entries = getattr(cfg, 'doors', None)
+    if not entries:
+        door_id = getattr(cfg, 'door_id', None)
+        return [Door(door_id, rasberryQR.DoorKeys(secret, door_id), cv2.VideoCapture(0),
+                     AsyncLock(), subscription=subscription,
+                     audit_stream=rasberryQR.open_audit(door_id),
+                     frames=rasberryQR.open_preroll())]
+
+    publisher = pubsub_v1.PublisherClient() if getattr(cfg, 'audit_topic', None) else None
+    return [Door.from_config(entry, secret, subscription, publisher) for entry in entries]
+
+
+async def main(subscribe=True, metrics_interval=60.0, decode_workers=None):
+    """
+    Run the door daemon until SIGINT or SIGTERM.
+    SIGINT 또는 SIGTERM까지 도어 데몬을 실행합니다.
+    """
+    daemon = DoorDaemon(configured_doors(rasberryQR.load_secret()), decode_workers,
+                        metrics_interval=metrics_interval)
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, daemon.stop)
+
+    log.info(f"Door daemon started for {', '.join(map(str, daemon.doors))}")
+    try:
+        await daemon.run(cfg.project_id if subscribe else None)
+    finally:
+        log.info(f"Door daemon stopped: {daemon.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--metrics-interval", type=float, default=60.0,
+                        help="Seconds between metrics log lines")
+    parser.add_argument("--decode-workers", type=int, default=None,
+                        help="Decoder threads shared by all doors")
+    parser.add_argument("--no-subscribe", action="store_true",
+                        help="Only scan; leave Pub/Sub to sub.py")
+    profiler.add_argument(parser)
+    startup.add_argument(parser, "the first camera frame of any door")
+    args = parser.parse_args()
+
+    profiler.install("doord", args.profile)
+    if args.startup is not None:
+        startup.report_at(startup.FIRST_FRAME, args.startup, log.info)
+
+    asyncio.run(main(not args.no_subscribe, args.metrics_interval, args.decode_workers))
@@ -2,50 +2,39 @@
 Door Lock Control Module
 도어락 제어 모듈
 
-Direct GPIO control for testing door lock mechanism.
-도어락 메커니즘 테스트를 위한 직접 GPIO 제어입니다.
+Sends a test unlock command to the door actuator service.
+도어 액추에이터 서비스에 테스트 잠금 해제 명령을 보냅니다.
 """
 
-import RPi.GPIO as GPIO
-import time
+import actuator
 
-# Set GPIO mode to BCM (Broadcom SOC channel numbering)
-# GPIO 모드를 BCM으로 설정 (Broadcom SOC 채널 번호 방식)
-GPIO.setmode(GPIO.BCM)
 
-# Configure GPIO pin 17 as output for door lock control
-# 도어락 제어를 위해 GPIO 핀 17을 출력으로 설정
-GPIO.setup(17, GPIO.OUT)
+def dooropen(hold_seconds=10):
+    """
+    Open door lock for 10 seconds without holding the caller.
+    호출자를 붙잡지 않고 도어락을 10초간 엽니다.
 
+    The pin is driven by the resident actuator service when it is running,
+    otherwise by an in-process actuator.
+    상주 액추에이터 서비스가 실행 중이면 서비스가 핀을 구동하고,
+    그렇지 않으면 프로세스 내 액추에이터가 구동합니다.
 
-def dooropen():
-    """
-    Open door lock for 10 seconds.
-    도어락을 10초간 엽니다.
+    Args:
+        hold_seconds (float): How long the door stays unlocked
+                             도어가 잠금 해제 상태로 유지되는 시간
 
     Returns:
         int: 0 on successful completion
             성공적으로 완료되면 0 반환
     """
-    # Set GPIO 17 to HIGH to unlock door
-    # GPIO 17을 HIGH로 설정하여 도어 잠금 해제
-    GPIO.output(17, True)
-
-    # Keep door unlocked for 10 seconds
-    # 도어를 10초간 잠금 해제 상태로 유지
-    time.sleep(10)
-
-    # Set GPIO 17 to LOW to lock door
-    # GPIO 17을 LOW로 설정하여 도어 잠금
-    GPIO.output(17, False)
-
-    # Clean up GPIO settings
-    # GPIO 설정 정리
-    GPIO.cleanup()
-
+    actuator.request_unlock(hold_seconds)
     return 0
 
 
 if __name__ == "__main__":
     print("door opened!")
     dooropen()
+
+    # Let a fallback actuator finish the hold before exiting
+    # 종료 전에 대체 액추에이터가 유지 시간을 마치도록 대기
+    actuator.shutdown_local()
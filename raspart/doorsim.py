@@ -0,0 +1,446 @@
+"""
+Door Load Simulator
+도어 부하 시뮬레이터
+
+Runs the whole key path in one process: the host issues keys, the keys go
+through an in-process Pub/Sub stand-in (localpubsub.py), and simulated doors
+receive them and unlock for them. Each door is a real doord.Door with a
+replay camera and a simgpio lock pin. Every round, each door gets a new key
+and the simulator presents it to that door's camera. It then reports:
+하나의 프로세스에서 키 경로 전체를 실행합니다. 호스트가 키를 발급하면 키가
+프로세스 내 Pub/Sub 대체 모듈(localpubsub.py)을 거쳐 시뮬레이션된 도어에 전달되고,
+도어는 그 키에 대해 잠금을 해제합니다. 각 도어는 재생 카메라와 simgpio 잠금 핀을
+가진 실제 doord.Door입니다. 매 라운드마다 각 도어에 새 키가 발급되고 시뮬레이터가
+그 키를 도어의 카메라에 제시한 뒤, 다음을 보고합니다:
+
+    - issuance throughput: keys rendered and published per second
+      발급 처리량: 초당 렌더링 및 게시된 키 수
+    - key propagation: publish to acknowledged by the door
+      키 전파: 게시부터 도어의 확인까지
+    - scan to unlock: first presented frame to lock pin high
+      스캔-잠금 해제: 첫 제시 프레임부터 잠금 핀 HIGH까지
+
+Keys are issued as testpart.provision() issues them, but without email.
+Presentations are synthetic camera frames from synthframe.py, so doors decode
+with the real pyzbar.
+키는 testpart.provision()과 같이 발급되지만 이메일은 보내지 않습니다. 제시는
+synthframe.py의 합성 카메라 프레임이므로 도어는 실제 pyzbar로 디코딩합니다.
+
+Usage / 사용법:
+    python3 doorsim.py --doors 8 --rounds 5
+    python3 doorsim.py --doors 32 --keys-per-door 10 --decode-workers 4
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Issuance runs the host's modules; the lock pins are simulated
+# 발급은 호스트의 모듈을 실행하며, 잠금 핀은 시뮬레이션됨
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'hostpart'))
+os.environ.setdefault("DOORLENS_GPIO", "simgpio")
+
+import doord
+import keycodec
+import keysync
+import localpubsub
+import pub
+import rasberryQR
+import revocation
+import simgpio
+import synthframe
+import testpart
+
+# Simulated Pub/Sub names, never created on Google Cloud
+# 시뮬레이션된 Pub/Sub 이름, Google Cloud에는 생성되지 않음
+PROJECT_ID = "doorlens-sim"
+TOPIC_NAME = "doorlens-sim-keys"
+SUBSCRIPTION_NAME = "doorlens-sim-doors"
+
+# Distinct frames in one presentation, cycled while it lasts
+# 한 번의 제시에 포함된 서로 다른 프레임 수, 제시 동안 순환
+PRESENTATION_FRAMES = 12
+
+# Seconds a door may take to load a published key
+# 도어가 게시된 키를 불러오는 데 허용되는 시간 (초)
+PROPAGATION_TIMEOUT = 10.0
+
+# How often waiting presentations check the lock pins
+# 대기 중인 제시가 잠금 핀을 확인하는 주기
+POLL_SECONDS = 0.002
+
+
+def key_frames(key_png, payload):
+    """
+    Composite a rendered key into the frames of one presentation.
+    렌더링된 키를 한 번의 제시에 사용할 프레임으로 합성합니다.
+    """
+    return synthframe.key_variants(key_png, PRESENTATION_FRAMES)
+
+
+def idle_frame(size=synthframe.FRAME_SIZE):
+    """
+    Return an empty entrance: a gray frame with no QR code.
+    빈 출입구를 반환합니다: QR 코드가 없는 회색 프레임입니다.
+    """
+    return np.full(size + (3,), 100, dtype=np.uint8)
+
+
+class ReplayCamera:
+    """
+    cv2.VideoCapture stand-in that replays frames at a fixed rate.
+    고정된 속도로 프레임을 재생하는 cv2.VideoCapture 대체 객체입니다.
+
+    The camera shows the idle frame until present() is called, then cycles
+    through the presented frames until withdraw() is called or the
+    presentation times out.
+    카메라는 present()가 호출될 때까지 대기 프레임을 보여주고, 이후 withdraw()가
+    호출되거나 제시 시간이 끝날 때까지 제시된 프레임을 순환합니다.
+
+    Attributes:
+        presented_at (float): time.monotonic() when the first presented frame
+                              was read, or None
+                             첫 제시 프레임을 읽은 time.monotonic() 값, 없으면 None
+    """
+
+    def __init__(self, idle, fps=30.0):
+        """
+        Initialize ReplayCamera instance.
+        ReplayCamera 인스턴스를 초기화합니다.
+
+        Args:
+            idle: Frame shown between presentations
+                 제시 사이에 보여주는 프레임
+            fps (float): Frames per second (defaults to 30)
+                        초당 프레임 수 (기본값: 30)
+        """
+        self.idle = idle
+        self.interval = 1.0 / fps
+        self.presented_at = None
+        self._frames = None
+        self._seconds = None
+        self._next = time.monotonic()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def present(self, frames, seconds):
+        """
+        Show frames for at most seconds, starting with the next read.
+        다음 읽기부터 최대 seconds 동안 프레임을 보여줍니다.
+        """
+        with self._lock:
+            self._frames = itertools.cycle(frames)
+            self._seconds = seconds
+            self.presented_at = None
+
+    def withdraw(self):
+        """
+        Go back to the idle frame, like a visitor walking in.
+        방문자가 들어간 것처럼 대기 프레임으로 돌아갑니다.
+        """
+        with self._lock:
+            self._frames = None
+
+    def read(self):
+        """
+        Wait for the next frame time and return (True, frame).
+        다음 프레임 시각까지 기다린 뒤 (True, 프레임)을 반환합니다.
+        """
+        if self._released:
+            return False, None
+        delay = self._next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next = max(self._next + self.interval, time.monotonic())
+
+        with self._lock:
+            if self._frames is None:
+                return True, self.idle
+            now = time.monotonic()
+            if self.presented_at is None:
+                self.presented_at = now
+            elif now - self.presented_at >= self._seconds:
+                self._frames = None
+                return True, self.idle
+            return True, next(self._frames)
+
+    def release(self):
+        self._released = True
+
+
+def summarize(samples):
+    """
+    Summarize latency samples in milliseconds.
+    지연 시간 샘플을 밀리초 단위로 요약합니다.
+
+    Returns:
+        dict: count, p50_ms, p90_ms, p99_ms and max_ms
+             개수, p50/p90/p99/최대 지연 시간 (ms)
+    """
+    return {
+        'count': len(samples),
+        'p50_ms': 1000 * doord.percentile(samples, 50),
+        'p90_ms': 1000 * doord.percentile(samples, 90),
+        'p99_ms': 1000 * doord.percentile(samples, 99),
+        'max_ms': 1000 * max(samples, default=0.0),
+    }
+
+
+class Simulation:
+    """
+    Issuance, Pub/Sub and N doors under one DoorDaemon.
+    발급, Pub/Sub, 그리고 하나의 DoorDaemon 아래의 N개 도어입니다.
+
+    Attributes:
+        doors (list): Simulated doors, each on lock pin = its index
+                     시뮬레이션된 도어, 각각 자신의 인덱스를 잠금 핀으로 사용
+        broker (Broker): Pub/Sub stand-in between host and doors
+                        호스트와 도어 사이의 Pub/Sub 대체 객체
+        issued (int): Keys issued
+                     발급된 키 수
+        issue_seconds (float): Time spent rendering and publishing keys
+                              키 렌더링 및 게시에 걸린 시간
+        scan_to_unlock (list): Seconds from presentation to pin high
+                              제시부터 핀 HIGH까지의 초
+        missed (int): Presentations that did not unlock in time
+                     제시 시간 안에 잠금 해제되지 않은 제시 수
+    """
+
+    def __init__(self, door_count, directory, rounds=5, keys_per_door=1, workers=None,
+                 decode_workers=None, fps=30.0, present_seconds=3.0, hold_seconds=0.2,
+                 render=key_frames, idle=None):
+        """
+        Initialize Simulation instance.
+        Simulation 인스턴스를 초기화합니다.
+
+        Args:
+            door_count (int): Number of simulated doors
+                             시뮬레이션할 도어 수
+            directory (str): Directory for the doors' key files
+                            도어 키 파일을 위한 디렉터리
+            rounds (int): Issue-and-present rounds (defaults to 5)
+                         발급 및 제시 라운드 수 (기본값: 5)
+            keys_per_door (int): Keys issued per door each round; the last one
+                                 is presented (defaults to 1)
+                                라운드마다 도어당 발급할 키 수, 마지막 키가 제시됨
+                                (기본값: 1)
+            workers (int): Render processes (defaults to CPU count)
+                          렌더링 프로세스 수 (기본값: CPU 수)
+            decode_workers (int): Decoder threads shared by the doors
+                                 도어들이 공유하는 디코더 스레드 수
+            fps (float): Frame rate of each camera (defaults to 30)
+                        각 카메라의 프레임 속도 (기본값: 30)
+            present_seconds (float): How long a key is held up before giving up
+                                    포기하기 전까지 키를 제시하는 시간
+            hold_seconds (float): How long an unlock keeps the door open
+                                 잠금 해제 후 도어가 열려 있는 시간
+            render (callable): Turns (key_png, payload) into presented frames
+                              (key_png, payload)를 제시할 프레임으로 변환하는 함수
+            idle: Frame shown between presentations (defaults to idle_frame())
+                 제시 사이에 보여주는 프레임 (기본값: idle_frame())
+        """
+        self.rounds = rounds
+        self.keys_per_door = keys_per_door
+        self.workers = workers or os.cpu_count() or 1
+        self.present_seconds = present_seconds
+        self.render = render
+        idle = idle_frame() if idle is None else idle
+
+        self.doors = []
+        for pin in range(door_count):
+            door_id = f"sim-door-{pin}"
+            door_dir = os.path.join(directory, door_id)
+            os.makedirs(door_dir, exist_ok=True)
+            keys = rasberryQR.DoorKeys(
+                door_id=door_id,
+                key_path=os.path.join(door_dir, "keyinfo.json"),
+                keyring_path=os.path.join(door_dir, keysync.KEYRING_PATH),
+                revocation_path=os.path.join(door_dir, revocation.REVOCATION_PATH),
+            )
+            # Every round unlocks again, so no minimum interval between unlocks
+            # 매 라운드마다 다시 잠금 해제하므로 잠금 해제 사이 최소 간격 없음
+            self.doors.append(doord.Door(door_id, keys, ReplayCamera(idle, fps),
+                                         doord.AsyncLock(pin, gpio=simgpio), door_dir,
+                                         SUBSCRIPTION_NAME, hold_seconds, unlock_interval=0))
+        self.daemon = doord.DoorDaemon(self.doors, decode_workers, metrics_interval=3600.0)
+
+        self.broker = localpubsub.Broker()
+        self.broker.create_subscription(
+            localpubsub.SubscriberClient.subscription_path(PROJECT_ID, SUBSCRIPTION_NAME),
+            localpubsub.PublisherClient.topic_path(PROJECT_ID, TOPIC_NAME))
+
+        self.issued = 0
+        self.issue_seconds = 0.0
+        self.scan_to_unlock = []
+        self.missed = 0
+
+    def issue(self, pool):
+        """
+        Render keys for every door and fan them out on the shared topic.
+        모든 도어의 키를 렌더링하고 공유 토픽으로 전송합니다.
+
+        Returns:
+            dict: door_id -> (key_png, payload, passwd) of the door's newest key
+                 door_id -> 도어의 최신 키의 (key_png, payload, passwd)
+        """
+        started = time.monotonic()
+        messages = []
+        newest = {}
+        for door in self.doors:
+            door_key = testpart.DoorKey(door.door_id)
+            for _, key_png, qr_info in door_key.create_keys(self.keys_per_door, self.workers,
+                                                            pool=pool):
+                messages.append((door.door_id, bytes(qr_info, 'utf-8')))
+                info = json.loads(qr_info)
+                newest[door.door_id] = (key_png, keycodec.encode_compact(info), info['passwd'])
+
+        published, failed = pub.fan_out(PROJECT_ID, messages, TOPIC_NAME)
+        if failed:
+            raise RuntimeError(f"Publishing failed for {len(failed)} doors: {failed}")
+        self.issued += sum(published.values())
+        self.issue_seconds += time.monotonic() - started
+        return newest
+
+    async def loaded(self, door, passwd):
+        """
+        Wait until a door has loaded the key with passwd.
+        도어가 passwd의 키를 불러올 때까지 대기합니다.
+
+        Raises:
+            TimeoutError: If the key does not arrive in PROPAGATION_TIMEOUT
+                         PROPAGATION_TIMEOUT 안에 키가 도착하지 않을 경우
+        """
+        deadline = time.monotonic() + PROPAGATION_TIMEOUT
+        while (door.keys.stored or {}).get('passwd') != passwd:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{door.door_id} did not load its key")
+            await asyncio.sleep(POLL_SECONDS)
+
+    async def present(self, door, key_png, payload):
+        """
+        Hold a key up to a door's camera and time the unlock.
+        도어의 카메라에 키를 제시하고 잠금 해제 시간을 측정합니다.
+
+        The presentation ends when the pin goes high or present_seconds pass;
+        the round waits for the door to lock again so the next unlock is a
+        new pulse.
+        제시는 핀이 HIGH가 되거나 present_seconds가 지나면 끝나며, 다음 잠금 해제가
+        새 펄스가 되도록 라운드는 도어가 다시 잠길 때까지 기다립니다.
+        """
+        camera = door.camera
+        camera.present(self.render(key_png, payload), self.present_seconds)
+        deadline = time.monotonic() + self.present_seconds + 1.0
+
+        pulse = None
+        while pulse is None and time.monotonic() < deadline:
+            await asyncio.sleep(POLL_SECONDS)
+            if camera.presented_at is not None:
+                pulse = next((p for p in simgpio.pulses(door.lock.pin)
+                              if p[0] >= camera.presented_at), None)
+        camera.withdraw()
+
+        if pulse is None:
+            self.missed += 1
+            return
+        self.scan_to_unlock.append(pulse[0] - camera.presented_at)
+
+        while not any(rise == pulse[0] and fall is not None
+                      for rise, fall in simgpio.pulses(door.lock.pin)):
+            await asyncio.sleep(POLL_SECONDS)
+
+    async def run(self):
+        """
+        Run every round with the doors' daemon in the background.
+        도어 데몬을 백그라운드에서 실행하며 모든 라운드를 실행합니다.
+
+        Raises:
+            Exception: The daemon's error, if it failed
+                      데몬이 실패한 경우 그 오류
+        """
+        loop = asyncio.get_running_loop()
+        with localpubsub.install(self.broker), ProcessPoolExecutor(self.workers) as pool:
+            daemon = asyncio.create_task(self.daemon.run(PROJECT_ID))
+            try:
+                for round_number in range(self.rounds):
+                    newest = await loop.run_in_executor(None, self.issue, pool)
+                    await asyncio.gather(*(self.loaded(door, newest[door.door_id][2])
+                                           for door in self.doors))
+                    await asyncio.gather(*(self.present(door, *newest[door.door_id][:2])
+                                           for door in self.doors))
+                    if daemon.done():
+                        break
+            finally:
+                self.daemon.stop()
+                await daemon
+
+    def report(self):
+        """
+        Summarize issuance, propagation and scan-to-unlock results.
+        발급, 전파, 스캔-잠금 해제 결과를 요약합니다.
+
+        Returns:
+            dict: issuance, propagation, scan_to_unlock and doors
+                 발급, 전파, 스캔-잠금 해제, 도어별 결과
+        """
+        return {
+            'issuance': {
+                'keys': self.issued,
+                'seconds': self.issue_seconds,
+                'keys_per_second': self.issued / self.issue_seconds if self.issue_seconds else 0.0,
+            },
+            'propagation': summarize(self.broker.ack_latencies),
+            'scan_to_unlock': dict(summarize(self.scan_to_unlock), missed=self.missed),
+            'doors': self.daemon.stats(),
+        }
+
+
+def print_report(report):
+    """
+    Print a simulation report.
+    시뮬레이션 보고서를 출력합니다.
+    """
+    issuance = report['issuance']
+    print(f"Issuance: {issuance['keys']} keys in {issuance['seconds']:.2f}s "
+          f"({issuance['keys_per_second']:.1f} keys/s)")
+    for name, title in (('propagation', "Key propagation"), ('scan_to_unlock', "Scan to unlock")):
+        stats = report[name]
+        line = (f"{title}: n={stats['count']} p50={stats['p50_ms']:.1f}ms "
+                f"p90={stats['p90_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms "
+                f"max={stats['max_ms']:.1f}ms")
+        if 'missed' in stats:
+            line += f" missed={stats['missed']}"
+        print(line)
+    for door_id, stats in report['doors'].items():
+        print(f"  {door_id}: frames={stats['frames']} dropped={stats['dropped']} "
+              f"codes={stats['codes']} rejected={stats['rejected']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doors", type=int, default=4, help="Simulated doors")
+    parser.add_argument("--rounds", type=int, default=5, help="Issue-and-present rounds")
+    parser.add_argument("--keys-per-door", type=int, default=1,
+                        help="Keys issued per door each round")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes")
+    parser.add_argument("--decode-workers", type=int, default=None,
+                        help="Decoder threads shared by all doors")
+    parser.add_argument("--fps", type=float, default=30.0, help="Camera frame rate")
+    parser.add_argument("--present-seconds", type=float, default=3.0,
+                        help="Seconds a key is presented before giving up")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="doorsim-") as directory:
+        simulation = Simulation(args.doors, directory, args.rounds, args.keys_per_door,
+                                args.workers, args.decode_workers, args.fps,
+                                args.present_seconds)
+        asyncio.run(simulation.run())
+        print_report(simulation.report())
@@ -0,0 +1,183 @@
+"""
+Memory Watchdog Module
+메모리 감시 모듈
+
+Guards the long-running scanner against slow memory growth. The watchdog
+samples the process RSS each interval and reports its growth rate. With
+tracing on, it also compares tracemalloc snapshots and reports the
+allocation sites that grew the most. Once RSS goes over the memory budget,
+check() asks the scanner to restart its engine in place.
+장시간 실행되는 스캐너를 느린 메모리 증가로부터 보호합니다. 감시기는 매 간격마다
+프로세스 RSS를 측정하여 증가율을 보고하며, 추적을 켜면 tracemalloc 스냅샷도
+비교하여 가장 많이 증가한 할당 위치를 보고합니다. RSS가 메모리 예산을 넘으면
+check()가 스캐너에 엔진을 제자리에서 다시 시작하도록 요청합니다.
+
+Tracing slows every allocation, so it is only on with --memwatch; the RSS
+budget alone costs one file read per interval.
+추적은 모든 할당을 느리게 하므로 --memwatch를 사용할 때만 켜지며, RSS 예산만
+사용하면 간격마다 파일을 한 번 읽는 비용만 듭니다.
+"""
+
+import os
+import time
+import tracemalloc
+
+MB = 1024 * 1024
+
+
+def rss_bytes():
+    """
+    Read the resident set size of this process.
+    이 프로세스의 상주 메모리 크기를 읽습니다.
+
+    Returns:
+        int: RSS in bytes, or None where /proc is not available
+            바이트 단위 RSS, /proc을 사용할 수 없으면 None
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MemoryWatchdog:
+    """
+    Periodic memory report and budget check.
+    주기적인 메모리 보고 및 예산 확인입니다.
+
+    Attributes:
+        budget (int): RSS budget in bytes, or None for reports only
+                     바이트 단위 RSS 예산, 보고만 할 경우 None
+        interval (float): Seconds between checks
+                         확인 사이의 초
+        trace (bool): Whether allocation sites are traced with tracemalloc
+                     tracemalloc으로 할당 위치를 추적하는지 여부
+        restarts (int): Restarts requested since memory was last under budget
+                       마지막으로 예산 이하였던 이후 요청된 재시작 수
+    """
+
+    def __init__(self, budget=None, interval=60.0, trace=False, top=10, report=print):
+        """
+        Initialize MemoryWatchdog instance.
+        MemoryWatchdog 인스턴스를 초기화합니다.
+
+        Args:
+            budget (int): RSS budget in bytes (optional)
+                         바이트 단위 RSS 예산 (선택 사항)
+            interval (float): Seconds between checks (defaults to 60)
+                             확인 사이의 초 (기본값: 60)
+            trace (bool): Trace allocation sites with tracemalloc (defaults to False)
+                         tracemalloc으로 할당 위치 추적 (기본값: False)
+            top (int): Allocation sites per report (defaults to 10)
+                      보고당 할당 위치 수 (기본값: 10)
+            report (callable): Receives each report line (defaults to print)
+                              각 보고 줄을 받는 함수 (기본값: print)
+        """
+        self.budget = budget
+        self.interval = interval
+        self.trace = trace
+        self.top = top
+        self.report = report
+        self.restarts = 0
+
+        self._started = False
+        self._snapshot = None
+        self._rss = None
+        self._checked = None
+        self._due = None
+
+    def start(self):
+        """
+        Start tracing (if enabled) and take the baseline measurement.
+        (사용하는 경우) 추적을 시작하고 기준 측정을 수행합니다.
+        """
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        self._baseline()
+        return self
+
+    def _baseline(self):
+        """
+        Record the measurement later checks are compared with.
+        이후 확인과 비교할 측정값을 기록합니다.
+        """
+        self._snapshot = self._take_snapshot()
+        self._rss = rss_bytes()
+        self._checked = time.monotonic()
+        self._due = self._checked + self.interval
+
+    def _take_snapshot(self):
+        """
+        Take a tracemalloc snapshot without the tracer's own allocations.
+        추적기 자신의 할당을 제외한 tracemalloc 스냅샷을 찍습니다.
+        """
+        if not tracemalloc.is_tracing():
+            return None
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    def check(self, now=None):
+        """
+        Report memory and check the budget once the interval has passed.
+        간격이 지나면 메모리를 보고하고 예산을 확인합니다.
+
+        Between intervals this is a single clock comparison, so it can be
+        called on every frame.
+        간격 사이에는 시계 비교 한 번뿐이므로 매 프레임마다 호출할 수 있습니다.
+
+        Args:
+            now (float): time.monotonic() value (defaults to now)
+                        time.monotonic() 값 (기본값: 현재)
+
+        Returns:
+            bool: True if RSS is over budget and the engine should restart
+                 RSS가 예산을 넘어 엔진을 다시 시작해야 하면 True
+        """
+        now = time.monotonic() if now is None else now
+        if now < self._due:
+            return False
+
+        elapsed = max(now - self._checked, 1e-9)
+        rss = rss_bytes()
+        if rss is not None and self._rss is not None:
+            rate = (rss - self._rss) / elapsed * 3600 / MB
+            self.report(f"Memory: RSS {rss / MB:.1f} MB ({rate:+.2f} MB/h)")
+
+        snapshot = self._take_snapshot()
+        if snapshot is not None and self._snapshot is not None:
+            for stat in snapshot.compare_to(self._snapshot, 'lineno')[:self.top]:
+                frame = stat.traceback[0]
+                self.report(f"Memory: {os.path.basename(frame.filename)}:{frame.lineno} "
+                            f"{stat.size / 1024:.1f} KiB in {stat.count} blocks "
+                            f"({stat.size_diff / elapsed * 3600 / 1024:+.1f} KiB/h)")
+
+        self._snapshot = snapshot
+        self._rss = rss
+        self._checked = now
+        self._due = now + self.interval
+
+        if self.budget is None or rss is None or rss <= self.budget:
+            self.restarts = 0
+            return False
+        self.report(f"Memory: RSS {rss / MB:.1f} MB over budget of {self.budget / MB:.1f} MB")
+        self.restarts += 1
+        return True
+
+    def restarted(self):
+        """
+        Take a new baseline after the engine restarted.
+        엔진이 다시 시작된 후 새 기준을 측정합니다.
+        """
+        self._baseline()
+
+    def stop(self):
+        """
+        Stop tracing if this watchdog started it.
+        이 감시기가 추적을 시작했다면 중지합니다.
+        """
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+        self._snapshot = None
@@ -0,0 +1,291 @@
+"""
+Pre-roll Snapshot Module
+프리롤 스냅샷 모듈
+
+Keeps the last few camera frames in a fixed, preallocated ring so the
+frames around an unlock or a rejected scan can be saved for incident
+review. The scan loop only copies each frame into the ring; on an event the
+ring waits for a few more frames, then one bulk copy freezes the window into
+the writer's buffer and a background thread JPEG-encodes and writes it.
+While the writer is still busy, new snapshots are dropped instead of
+stalling capture.
+마지막 몇 개의 카메라 프레임을 미리 할당된 고정 링에 보관하여, 잠금 해제나 거부된
+스캔 전후의 프레임을 사고 검토용으로 저장할 수 있게 합니다. 스캔 루프는 각
+프레임을 링에 복사하기만 하며, 이벤트가 발생하면 링은 몇 프레임을 더 기다린 뒤
+한 번의 일괄 복사로 구간을 작성기의 버퍼에 고정하고, 백그라운드 스레드가 JPEG로
+인코딩하여 기록합니다. 작성기가 아직 바쁘면 캡처를 멈추는 대신 새 스냅샷을
+버립니다.
+
+Memory is fixed at two buffers of `size` frames: the ring and the frozen copy.
+메모리는 `size` 프레임짜리 버퍼 두 개(링과 고정된 복사본)로 고정됩니다.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+import startup
+
+# Imported on first use, so a scanner without snapshot_dir loads neither
+# 처음 사용할 때 임포트되므로 snapshot_dir이 없는 스캐너는 둘 다 불러오지 않음
+cv2 = startup.lazy_import("cv2")
+np = startup.lazy_import("numpy")
+
+SNAPSHOT_DIR = "snapshots"
+
+
+class SnapshotWriter:
+    """
+    Background JPEG writer with a single frozen frame buffer.
+    하나의 고정 프레임 버퍼를 가진 백그라운드 JPEG 작성기입니다.
+
+    Attributes:
+        directory (str): Directory snapshots are written under
+                        스냅샷이 기록되는 디렉터리
+        written (int): Snapshots written
+                      기록된 스냅샷 수
+        dropped (int): Snapshots dropped because the writer was busy
+                      작성기가 바빠서 버려진 스냅샷 수
+        errors (int): Snapshots that failed to write
+                     기록에 실패한 스냅샷 수
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR, quality=80):
+        """
+        Initialize SnapshotWriter instance.
+        SnapshotWriter 인스턴스를 초기화합니다.
+
+        Args:
+            directory (str): Directory snapshots are written under
+                            스냅샷이 기록되는 디렉터리
+            quality (int): JPEG quality, 0-100 (defaults to 80)
+                          JPEG 품질, 0-100 (기본값: 80)
+        """
+        self.directory = directory
+        self.quality = quality
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self._frames = None
+        self._times = None
+        self._count = 0
+        self._label = None
+        self._busy = False
+        self._running = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, frames, times, order, label):
+        """
+        Freeze a window of ring frames for writing, unless the writer is busy.
+        작성기가 바쁘지 않으면 링 프레임 구간을 기록용으로 고정합니다.
+
+        Args:
+            frames (numpy.ndarray): Ring buffer of frames
+                                   프레임 링 버퍼
+            times (numpy.ndarray): Capture time of each ring slot
+                                  각 링 슬롯의 캡처 시간
+            order (numpy.ndarray): Ring slots, oldest first
+                                  링 슬롯, 오래된 것부터
+            label (str): Event the snapshot belongs to
+                        스냅샷이 속한 이벤트
+
+        Returns:
+            bool: False if the snapshot was dropped
+                 스냅샷이 버려졌으면 False
+        """
+        with self._cond:
+            if self._busy:
+                self.dropped += 1
+                return False
+            self._busy = True
+
+        # Allocated once; reallocated only if the camera resolution changes
+        # 한 번만 할당되며, 카메라 해상도가 바뀔 때만 다시 할당됨
+        if self._frames is None or self._frames.shape != frames.shape:
+            self._frames = np.empty_like(frames)
+            self._times = np.empty_like(times)
+        np.take(frames, order, axis=0, out=self._frames[:len(order)])
+        np.take(times, order, out=self._times[:len(order)])
+
+        with self._cond:
+            self._count = len(order)
+            self._label = label
+            self._cond.notify()
+        return True
+
+    def _write(self):
+        """
+        Encode and write the frozen frames as one snapshot directory.
+        고정된 프레임을 하나의 스냅샷 디렉터리로 인코딩하여 기록합니다.
+        """
+        name = datetime.fromtimestamp(self._times[self._count - 1]).strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(self.directory, f"{name}-{self._label}")
+        os.makedirs(path, exist_ok=True)
+
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        for i in range(self._count):
+            ok, jpeg = cv2.imencode(".jpg", self._frames[i], params)
+            if ok:
+                with open(os.path.join(path, f"{i:03d}.jpg"), 'wb') as f:
+                    f.write(jpeg.tobytes())
+        self.written += 1
+
+    def start(self):
+        """
+        Start the writer thread.
+        작성기 스레드를 시작합니다.
+        """
+        self._running = True
+
+        def run():
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._label is not None or not self._running)
+                    if self._label is None:
+                        break
+                try:
+                    self._write()
+                except Exception as e:
+                    # A full disk or unwritable directory loses this snapshot
+                    # only; the thread keeps serving later ones
+                    # 디스크 부족이나 기록할 수 없는 디렉터리는 이 스냅샷만
+                    # 잃으며, 스레드는 이후 스냅샷을 계속 처리함
+                    self.errors += 1
+                    print(f"Snapshot {self._label} failed: {e!r}")
+                finally:
+                    with self._cond:
+                        self._label = None
+                        self._busy = False
+                        self._cond.notify_all()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        return self
+
+    def wait_idle(self, timeout=None):
+        """
+        Block until no snapshot is being written.
+        기록 중인 스냅샷이 없을 때까지 대기합니다.
+
+        Returns:
+            bool: True if idle, False on timeout
+                 유휴 상태이면 True, 시간 초과 시 False
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._busy, timeout)
+
+    def stop(self):
+        """
+        Finish the snapshot in progress and stop the thread.
+        진행 중인 스냅샷을 마치고 스레드를 중지합니다.
+        """
+        if self._thread is not None:
+            self.wait_idle()
+            with self._cond:
+                self._running = False
+                self._cond.notify_all()
+            self._thread.join()
+            self._thread = None
+
+
+class PrerollBuffer:
+    """
+    Fixed ring of the most recent camera frames.
+    가장 최근 카메라 프레임의 고정 링입니다.
+
+    push() copies a frame into the next preallocated slot. trigger() marks an
+    event; after post_frames more frames the ring hands its window (up to
+    size frames, oldest first) to the writer. Events during a pending
+    snapshot are merged into it.
+    push()는 프레임을 미리 할당된 다음 슬롯에 복사합니다. trigger()는 이벤트를
+    표시하며, post_frames개의 프레임이 더 들어오면 링은 구간(최대 size개 프레임,
+    오래된 것부터)을 작성기에 넘깁니다. 대기 중인 스냅샷 동안의 이벤트는 그
+    스냅샷에 병합됩니다.
+
+    Attributes:
+        size (int): Frames kept in the ring
+                   링에 보관되는 프레임 수
+        post_frames (int): Frames captured after an event
+                          이벤트 후 캡처되는 프레임 수
+        writer (SnapshotWriter): Writer snapshots are handed to
+                                스냅샷을 넘겨받는 작성기
+    """
+
+    def __init__(self, writer, size=30, post_frames=10):
+        """
+        Initialize PrerollBuffer instance.
+        PrerollBuffer 인스턴스를 초기화합니다.
+
+        Args:
+            writer (SnapshotWriter): Started writer
+                                    시작된 작성기
+            size (int): Frames kept in the ring (defaults to 30)
+                       링에 보관되는 프레임 수 (기본값: 30)
+            post_frames (int): Frames captured after an event (defaults to 10)
+                              이벤트 후 캡처되는 프레임 수 (기본값: 10)
+        """
+        self.writer = writer
+        self.size = size
+        self.post_frames = min(post_frames, size - 1)
+
+        self._frames = None
+        self._times = np.zeros(size)
+        self._next = 0
+        self._filled = 0
+        self._pending = None
+        self._countdown = 0
+        self._lock = threading.Lock()
+
+    def push(self, img):
+        """
+        Copy a frame into the ring.
+        프레임을 링에 복사합니다.
+
+        Args:
+            img (numpy.ndarray): Camera frame
+                                카메라 프레임
+        """
+        with self._lock:
+            if self._frames is None or self._frames.shape[1:] != img.shape:
+                # First frame or new resolution: allocate the ring once
+                # 첫 프레임 또는 새 해상도: 링을 한 번 할당
+                self._frames = np.empty((self.size,) + img.shape, dtype=img.dtype)
+                self._next = self._filled = 0
+
+            np.copyto(self._frames[self._next], img)
+            self._times[self._next] = time.time()
+            self._next = (self._next + 1) % self.size
+            self._filled = min(self._filled + 1, self.size)
+
+            if self._pending is None:
+                return
+            self._countdown -= 1
+            if self._countdown == 0:
+                self._submit()
+
+    def _submit(self):
+        """
+        Hand the ring's frames, oldest first, to the writer.
+        링의 프레임을 오래된 것부터 작성기에 넘깁니다.
+        """
+        label, self._pending = self._pending, None
+        order = (np.arange(self._filled) + self._next - self._filled) % self.size
+        self.writer.submit(self._frames, self._times, order, label)
+
+    def trigger(self, event):
+        """
+        Save the frames around an event.
+        이벤트 전후의 프레임을 저장합니다.
+
+        Args:
+            event (str): Event name used in the snapshot directory name
+                        스냅샷 디렉터리 이름에 쓰이는 이벤트 이름
+        """
+        with self._lock:
+            if self._pending is not None:
+                return
+            self._pending, self._countdown = event, self.post_frames
+            if self._countdown == 0 and self._filled:
+                self._submit()
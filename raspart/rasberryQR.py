@@ -6,20 +6,41 @@ Scans QR codes via camera and validates against stored key.
 카메라를 통해 QR 코드를 스캔하고 저장된 키와 대조하여 검증합니다.
 """
 
-import pyzbar.pyzbar as pyzbar
-import cv2
+import argparse
+import calendar
+import concurrent.futures
+import gc
+import hmac
 import json
 import os
 import logger
+import keycodec
+import keysync
+import memwatch
+import preroll
+import profiler
+import revocation
+import startup
 import sys
-from datetime import datetime, timedelta
-import RPi.GPIO as GPIO
+import threading
 import time
+from datetime import datetime, timedelta
+import actuator
+import audit
+import config as cfg
+
+# Imported on first use: the camera thread loads cv2 while keys are read
+# 처음 사용할 때 임포트됨: 키를 읽는 동안 카메라 스레드가 cv2를 불러옴
+cv2 = startup.lazy_import("cv2")
+pyzbar = startup.lazy_import("pyzbar.pyzbar")
 
-# Configure GPIO for door lock control
-# 도어락 제어를 위한 GPIO 설정
-GPIO.setmode(GPIO.BCM)  # Use BCM pin numbering / BCM 핀 번호 사용
-GPIO.setup(17, GPIO.OUT)  # GPIO 17 as output / GPIO 17을 출력으로 설정
+# Seconds the door stays unlocked after a valid scan
+# 유효한 스캔 후 도어가 잠금 해제 상태로 유지되는 시간 (초)
+UNLOCK_SECONDS = 5
+
+# In-place engine restarts allowed while memory stays over budget
+# 메모리가 예산을 계속 넘는 동안 허용되는 제자리 엔진 재시작 횟수
+MAX_RESTARTS = 3
 
 # Initialize logger
 # 로거 초기화
@@ -53,7 +74,29 @@ def read_key(key_path):
     return exist_key
 
 
-def validate_key(scanned_key, stored_key):
+def is_revoked(scanned_key, revoked):
+    """
+    Check a scanned key against the revocation list.
+    스캔된 키를 폐기 목록과 대조하여 검사합니다.
+
+    Args:
+        scanned_key (dict): Decoded QR code data
+                           디코딩된 QR 코드 데이터
+        revoked (RevocationList): Revoked keys, or None if there is no list
+                                 폐기된 키, 목록이 없으면 None
+
+    Returns:
+        bool: True if the key has been revoked
+             키가 폐기되었으면 True
+    """
+    passwd = scanned_key.get('passwd')
+    if revoked is not None and isinstance(passwd, str) and passwd in revoked:
+        log.error("Key has been revoked")
+        return True
+    return False
+
+
+def validate_key(scanned_key, stored_key, revoked=None):
     """
     Validate scanned QR code against stored key.
     스캔된 QR 코드를 저장된 키와 대조하여 검증합니다.
@@ -63,11 +106,15 @@ def validate_key(scanned_key, stored_key):
                            카메라에서 스캔한 QR 코드 데이터
         stored_key (dict): Valid key data from keyinfo.json
                           keyinfo.json의 유효한 키 데이터
+        revoked (RevocationList): Revoked keys to reject (optional)
+                                 거부할 폐기된 키 (선택 사항)
 
     Returns:
         bool: True if all fields match, False otherwise
              모든 필드가 일치하면 True, 그렇지 않으면 False
     """
+    if is_revoked(scanned_key, revoked):
+        return False
     for key, value in stored_key.items():
         if scanned_key.get(key) != value:
             log.error(
@@ -77,131 +124,720 @@ def validate_key(scanned_key, stored_key):
     return True
 
 
+class StoredKey:
+    """
+    Stored key compiled once, when keyinfo.json is loaded, for checking scans.
+    keyinfo.json을 불러올 때 한 번 컴파일되어 스캔 검사에 쓰이는 저장된 키입니다.
+
+    validate() accepts the keys validate_key() accepts against the dictionary
+    it was built from, without walking that dictionary per scan: fields are
+    checked in a fixed order (door, password, window), the password is
+    compared in constant time with hmac.compare_digest, and the window is
+    kept as the integer seconds of keycodec.to_epoch(). A scanned window may
+    also be given in those seconds, as keycodec.decode_payload(text, epochs=True) leaves it,
+    which saves formatting it as text on every scan.
+    validate()는 원본 딕셔너리에 대해 validate_key()가 허용하는 키를 허용하지만,
+    스캔마다 딕셔너리를 순회하지 않습니다: 필드는 고정된 순서(도어, 비밀번호, 유효
+    기간)로 검사하고, 비밀번호는 hmac.compare_digest로 상수 시간 비교하며, 유효
+    기간은 keycodec.to_epoch()의 정수 초로 보관합니다. 스캔된 유효 기간은
+    keycodec.decode_payload(text, epochs=True)가 남기는 것처럼 그 초로도 줄 수
+    있으며, 이렇게 하면 스캔마다 텍스트로 변환하는 비용이 줄어듭니다.
+
+    Attributes:
+        door_id (str): Door ID
+                      도어 ID
+        passwd_text (str): Password as written in keyinfo.json
+                          keyinfo.json에 쓰인 그대로의 비밀번호
+        passwd (bytes): Password as UTF-8 bytes
+                       UTF-8 바이트로 된 비밀번호
+        start (int): Start of the validity window, in keycodec.to_epoch() seconds
+                    유효 기간 시작 (keycodec.to_epoch()의 초)
+        end (int): End of the validity window, in keycodec.to_epoch() seconds
+                  유효 기간 종료 (keycodec.to_epoch()의 초)
+        start_text (str): Start as written in keyinfo.json
+                         keyinfo.json에 쓰인 그대로의 시작 시간
+        end_text (str): End as written in keyinfo.json
+                       keyinfo.json에 쓰인 그대로의 종료 시간
+        extra (tuple): (field, value) pairs of any other stored fields
+                      그 외 저장된 필드의 (필드, 값) 쌍
+    """
+
+    # Fields with their own check; any others are compared as in validate_key
+    # 자체 검사가 있는 필드, 그 외 필드는 validate_key처럼 비교
+    FIELDS = ('doorID', 'passwd', 'start', 'end')
+
+    def __init__(self, stored_key):
+        """
+        Compile a stored key.
+        저장된 키를 컴파일합니다.
+
+        Args:
+            stored_key (dict): Valid key data from keyinfo.json
+                              keyinfo.json의 유효한 키 데이터
+
+        Raises:
+            KeyError: If a field is missing
+                     필드가 없을 경우
+            ValueError: If start or end is not in keycodec.TIME_FORMAT
+                       start 또는 end가 keycodec.TIME_FORMAT 형식이 아닐 경우
+        """
+        self.door_id = sys.intern(stored_key['doorID'])
+        self.passwd_text = stored_key['passwd']
+        self.passwd = self.passwd_text.encode('utf-8')
+
+        # Both forms of the window: epoch seconds for compact payloads and
+        # valid(), text for JSON keys
+        # 유효 기간의 두 형태: 간결한 페이로드와 valid()를 위한 에포크 초, JSON
+        # 키를 위한 텍스트
+        self.start_text = sys.intern(stored_key['start'])
+        self.end_text = sys.intern(stored_key['end'])
+        self.start = keycodec.to_epoch(self.start_text)
+        self.end = keycodec.to_epoch(self.end_text)
+        self.extra = tuple((field, value) for field, value in stored_key.items()
+                           if field not in self.FIELDS)
+
+    def valid(self, now=None):
+        """
+        Return True if now is inside the validity window.
+        현재 시간이 유효 기간 내이면 True를 반환합니다.
+
+        Args:
+            now (datetime): Current time (defaults to now)
+                           현재 시간 (기본값: 현재)
+        """
+        # Wall-clock seconds, as the window is kept (see keycodec.to_epoch)
+        # 유효 기간과 같은 벽시계 초 (keycodec.to_epoch 참고)
+        if now is None:
+            now = keycodec.wall_clock()
+        else:
+            now = calendar.timegm(now.timetuple()) + now.microsecond / 1e6
+        return self.start < now < self.end
+
+    def validate(self, scanned_key, revoked=None):
+        """
+        Validate a scanned QR code against this key.
+        스캔된 QR 코드를 이 키와 대조하여 검증합니다.
+
+        Args:
+            scanned_key (dict): QR code data scanned from camera
+                               카메라에서 스캔한 QR 코드 데이터
+            revoked (RevocationList): Revoked keys to reject (optional)
+                                     거부할 폐기된 키 (선택 사항)
+
+        Returns:
+            bool: True if all fields match, False otherwise
+                 모든 필드가 일치하면 True, 그렇지 않으면 False
+        """
+        get = scanned_key.get
+        if revoked is not None and is_revoked(scanned_key, revoked):
+            return False
+
+        door_id = get('doorID')
+        if door_id != self.door_id:
+            log.error(f"Key mismatch - Field: doorID, Expected: {self.door_id}, Got: {door_id}")
+            return False
+
+        # The password is never logged, and its comparison takes the same
+        # time however much of it matches. Text is compared as is, which
+        # skips encoding it per scan; compare_digest only takes ASCII text,
+        # so anything else falls back to UTF-8 bytes, and non-text fails.
+        # 비밀번호는 로그에 남기지 않으며, 비교 시간은 일치하는 길이와 무관함.
+        # 텍스트는 그대로 비교하여 스캔마다 인코딩하지 않음. compare_digest는
+        # ASCII 텍스트만 받으므로 그 외는 UTF-8 바이트로 비교하고, 텍스트가
+        # 아니면 실패함
+        passwd = get('passwd')
+        try:
+            matched = hmac.compare_digest(passwd, self.passwd_text)
+        except TypeError:
+            matched = (isinstance(passwd, str)
+                       and hmac.compare_digest(passwd.encode('utf-8'), self.passwd))
+        if not matched:
+            log.error("Key mismatch - Field: passwd")
+            return False
+
+        # Compact payloads decoded with epochs=True carry the window as
+        # integers; JSON keys carry it as text
+        # epochs=True로 디코딩한 간결한 페이로드는 유효 기간을 정수로, JSON 키는
+        # 텍스트로 가짐
+        start, end = get('start'), get('end')
+        if start != self.start and start != self.start_text:
+            log.error(f"Key mismatch - Field: start, Expected: {self.start_text}, Got: {start}")
+            return False
+        if end != self.end and end != self.end_text:
+            log.error(f"Key mismatch - Field: end, Expected: {self.end_text}, Got: {end}")
+            return False
+        for field, value in self.extra:
+            if get(field) != value:
+                log.error(f"Key mismatch - Field: {field}, Expected: {value}, Got: {get(field)}")
+                return False
+        return True
+
+
+def load_secret():
+    """
+    Read the secret shared with the host for signed keys.
+    서명된 키를 위해 호스트와 공유하는 비밀 키를 읽습니다.
+
+    Returns:
+        bytes: door_secret from config.py, or None if signed keys are off
+              config.py의 door_secret, 서명된 키를 사용하지 않으면 None
+    """
+    secret = getattr(cfg, 'door_secret', None)
+    return secret.encode('utf-8') if secret else None
+
+
+def validate_signed(barcode_data, secret, door_id, revoked=None):
+    """
+    Verify a signed QR code locally, without a stored key.
+    저장된 키 없이 서명된 QR 코드를 로컬에서 검증합니다.
+
+    Args:
+        barcode_data (str): Decoded QR code text
+                           디코딩된 QR 코드 텍스트
+        secret (bytes): Secret shared with the host
+                       호스트와 공유하는 비밀 키
+        door_id (str): ID of this door
+                      이 도어의 ID
+        revoked (RevocationList): Revoked keys to reject (optional)
+                                 거부할 폐기된 키 (선택 사항)
+
+    Returns:
+        dict: The verified key if signature, door and validity window all
+              match and it is not revoked, otherwise None
+             서명, 도어, 유효 기간이 모두 일치하고 폐기되지 않았으면 검증된 키,
+             그렇지 않으면 None
+    """
+    try:
+        key = keycodec.verify_signed(barcode_data, secret, door_id)
+    except ValueError as e:
+        log.error(f"Signed key rejected: {e}")
+        return None
+    return None if is_revoked(key, revoked) else key
+
+
+def load_keyring(path=keysync.KEYRING_PATH):
+    """
+    Read the synced keyring, if this door receives keyring deltas.
+    이 도어가 키링 델타를 받는 경우 동기화된 키링을 읽습니다.
+
+    Returns:
+        Keyring: Keyring from keyring.json, or None if there is none
+                keyring.json의 키링, 없으면 None
+    """
+    if not os.path.isfile(path):
+        return None
+    return keysync.Keyring.load(path)
+
+
+def validate_keyring(scanned_key, keyring, revoked=None):
+    """
+    Check a scanned key against the synced keyring.
+    스캔된 키를 동기화된 키링과 대조하여 검사합니다.
+
+    Args:
+        scanned_key (dict): Decoded QR code data
+                           디코딩된 QR 코드 데이터
+        keyring (Keyring): Keys synced from the host
+                          호스트에서 동기화된 키
+        revoked (RevocationList): Revoked keys to reject (optional)
+                                 거부할 폐기된 키 (선택 사항)
+
+    Returns:
+        bool: True if the key is for this door and inside its window
+             이 도어의 키이고 유효 기간 내이면 True
+    """
+    if scanned_key.get('doorID') != keyring.door_id:
+        log.error(f"Key for another door: {scanned_key.get('doorID')}")
+        return False
+    if not keyring.valid(scanned_key.get('passwd')):
+        log.error("Key not in keyring or outside its window")
+        return False
+    return not is_revoked(scanned_key, revoked)
+
+
+def load_revocations(path=revocation.REVOCATION_PATH):
+    """
+    Read the revocation list, if the host has sent one.
+    호스트가 폐기 목록을 보낸 경우 이를 읽습니다.
+
+    Returns:
+        RevocationList: List from revoked.bin, or None if there is none
+                       revoked.bin의 목록, 없으면 None
+    """
+    if not os.path.isfile(path):
+        return None
+    return revocation.RevocationList.load(path)
+
+
+def open_audit(door_id, spool_path=audit.SPOOL_PATH, publisher=None):
+    """
+    Start the upstream audit stream, if audit_topic is configured.
+    audit_topic이 설정된 경우 상위 감사 스트림을 시작합니다.
+
+    Returns:
+        AuditStream: Started stream, or None if auditing is off
+                    시작된 스트림, 감사를 사용하지 않으면 None
+    """
+    topic = getattr(cfg, 'audit_topic', None)
+    if not topic:
+        return None
+    return audit.open_stream(cfg.project_id, topic, door_id, spool_path, publisher)
+
+
+class DoorKeys:
+    """
+    Every key source this door accepts, reloaded when its file changes.
+    이 도어가 허용하는 모든 키 소스이며, 파일이 바뀌면 다시 읽습니다.
+
+    Sources are the stored key (keyinfo.json), signed keys (door_secret),
+    the synced keyring (keyring.json) and the revocation list (revoked.bin).
+    소스는 저장된 키(keyinfo.json), 서명된 키(door_secret), 동기화된
+    키링(keyring.json), 폐기 목록(revoked.bin)입니다.
+
+    Attributes:
+        stored (dict): Stored key, or None
+                      저장된 키, 없으면 None
+        compiled (StoredKey): Stored key compiled for validation, or None
+                             검증을 위해 컴파일된 저장된 키, 없으면 None
+        last_passwd (str): Password of the last checked code, if it had one
+                          마지막으로 검사한 코드의 비밀번호, 있는 경우
+        keyring (Keyring): Synced keyring, or None
+                          동기화된 키링, 없으면 None
+        revoked (RevocationList): Revocation list, or None
+                                 폐기 목록, 없으면 None
+    """
+
+    def __init__(self, secret=None, door_id=None, key_path="keyinfo.json",
+                 keyring_path=keysync.KEYRING_PATH, revocation_path=revocation.REVOCATION_PATH):
+        """
+        Initialize DoorKeys instance and load every source that exists.
+        DoorKeys 인스턴스를 초기화하고 존재하는 모든 소스를 불러옵니다.
+
+        Args:
+            secret (bytes): Secret for signed keys (optional)
+                           서명된 키를 위한 비밀 키 (선택 사항)
+            door_id (str): ID of this door
+                          이 도어의 ID
+        """
+        self.secret = secret
+        self.door_id = door_id
+        self.key_path = key_path
+        self.keyring_path = keyring_path
+        self.revocation_path = revocation_path
+
+        self.stored = None
+        self.compiled = None
+        self.last_passwd = None
+        self.keyring = None
+        self.revoked = None
+        self._mtimes = {}
+        self.refresh()
+
+    def _changed(self, path):
+        """
+        Return True once each time the file at path is written or removed.
+        path의 파일이 쓰이거나 삭제될 때마다 한 번 True를 반환합니다.
+        """
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        if self._mtimes.get(path, 0) == mtime:
+            return False
+        self._mtimes[path] = mtime
+        return True
+
+    def refresh(self):
+        """
+        Reload the sources whose files changed since the last call.
+        마지막 호출 이후 파일이 바뀐 소스를 다시 읽습니다.
+
+        Returns:
+            bool: True if the stored key changed
+                 저장된 키가 바뀌었으면 True
+        """
+        if self._changed(self.keyring_path):
+            self.keyring = load_keyring(self.keyring_path)
+        if self._changed(self.revocation_path):
+            self.revoked = load_revocations(self.revocation_path)
+        if not self._changed(self.key_path):
+            return False
+
+        previous = self.stored
+        try:
+            with open(self.key_path, 'r') as f:
+                stored = json.load(f)
+            self.compiled = StoredKey(stored)
+            self.stored = stored
+        except FileNotFoundError:
+            self.stored, self.compiled = None, None
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # sub.py replaces the file atomically, so this is a bad key, not a
+            # partial write; keep its mtime and read it again once it is rewritten
+            # sub.py가 파일을 원자적으로 교체하므로 쓰는 도중이 아니라 잘못된 키임,
+            # mtime을 유지하고 파일이 다시 쓰이면 다시 읽음
+            log.error(f"Unreadable key file: {self.key_path}")
+            return False
+        return (previous or {}).get('passwd') != (self.stored or {}).get('passwd')
+
+    def stored_valid(self, now=None):
+        """
+        Return True if the stored key is inside its validity window.
+        저장된 키가 유효 기간 내이면 True를 반환합니다.
+        """
+        return self.compiled is not None and self.compiled.valid(now)
+
+    def accepting(self, now=None):
+        """
+        Return True while any key source can open the door.
+        어떤 키 소스라도 도어를 열 수 있는 동안 True를 반환합니다.
+        """
+        return self.stored_valid(now) or self.secret is not None or self.keyring is not None
+
+    def check(self, barcode_data, now=None):
+        """
+        Validate one decoded QR code against every key source.
+        디코딩된 QR 코드 하나를 모든 키 소스와 대조하여 검증합니다.
+
+        Args:
+            barcode_data (str): Decoded QR code text
+                               디코딩된 QR 코드 텍스트
+            now (datetime): Current time (defaults to now)
+                           현재 시간 (기본값: 현재)
+
+        Returns:
+            bool: True if the code opens the door
+                 코드로 도어를 열 수 있으면 True
+        """
+        self.last_passwd = None
+        if self.secret is not None and keycodec.is_signed(barcode_data):
+            # Signed key: verify locally with the shared secret
+            # 서명된 키: 공유 비밀 키로 로컬 검증
+            key = validate_signed(barcode_data, self.secret, self.door_id, self.revoked)
+            self.last_passwd = key['passwd'] if key else None
+            return key is not None
+
+        try:
+            # Parse QR code data (compact or JSON format)
+            # QR 코드 데이터 파싱 (간결한 형식 또는 JSON 형식)
+            read_key_data = keycodec.decode_payload(barcode_data, epochs=True)
+        except ValueError:
+            log.error(f"Invalid QR code format: {barcode_data}")
+            return False
+        self.last_passwd = read_key_data.get('passwd')
+
+        # Keys in the synced keyring carry their own window
+        # 동기화된 키링의 키는 자체 유효 기간을 가짐
+        if self.keyring is not None and read_key_data.get('passwd') in self.keyring.keys:
+            return validate_keyring(read_key_data, self.keyring, self.revoked)
+
+        if not self.stored_valid(now):
+            log.error("Unsigned key scanned with no valid stored key")
+            return False
+
+        # Pre-minted keys take their window from the activation message
+        # 미리 발급된 키는 활성화 메시지에서 유효 기간을 가져옴
+        if keycodec.is_unbound(read_key_data):
+            read_key_data['start'] = self.compiled.start
+            read_key_data['end'] = self.compiled.end
+
+        # Validate scanned key against the compiled stored key
+        # 스캔한 키를 컴파일된 저장된 키와 대조하여 검증
+        return self.compiled.validate(read_key_data, self.revoked)
+
+
 def unlock_door():
     """
-    Unlock door by setting GPIO 17 to HIGH for 5 seconds.
-    GPIO 17을 5초간 HIGH로 설정하여 도어를 잠금 해제합니다.
+    Unlock door for 5 seconds via the actuator service.
+    액추에이터 서비스를 통해 도어를 5초간 잠금 해제합니다.
+
+    Returns as soon as the command is handed off; the actuator holds the pin.
+    명령이 전달되는 즉시 반환되며, 핀 유지는 액추에이터가 담당합니다.
     """
     log.info("Door unlocked")
     print("doorOpen")
+    actuator.request_unlock(UNLOCK_SECONDS)
 
-    # Set GPIO 17 to HIGH to unlock
-    # GPIO 17을 HIGH로 설정하여 잠금 해제
-    GPIO.output(17, True)
 
-    # Keep door unlocked for 5 seconds
-    # 도어를 5초간 잠금 해제 상태로 유지
-    time.sleep(5)
+def open_preroll(directory=None):
+    """
+    Start pre-roll snapshots, if snapshot_dir is configured.
+    snapshot_dir이 설정된 경우 프리롤 스냅샷을 시작합니다.
 
-    # Set GPIO 17 to LOW to lock
-    # GPIO 17을 LOW로 설정하여 잠금
-    GPIO.output(17, False)
+    Args:
+        directory (str): Snapshot directory (defaults to snapshot_dir)
+                        스냅샷 디렉터리 (기본값: snapshot_dir)
+
+    Returns:
+        PrerollBuffer: Frame ring with a started writer, or None if off
+                      작성기가 시작된 프레임 링, 사용하지 않으면 None
+    """
+    snapshot_dir = getattr(cfg, 'snapshot_dir', None)
+    if not snapshot_dir:
+        return None
+    writer = preroll.SnapshotWriter(directory or snapshot_dir).start()
+    return preroll.PrerollBuffer(writer, getattr(cfg, 'preroll_frames', 30))
 
 
-def cleanup_and_exit():
+def open_watchdog(trace_interval=None):
     """
-    Clean up resources and exit the program.
-    리소스를 정리하고 프로그램을 종료합니다.
+    Create the memory watchdog, if memory_budget_mb or tracing is set.
+    memory_budget_mb 또는 추적이 설정된 경우 메모리 감시기를 생성합니다.
+
+    Args:
+        trace_interval (float): Seconds between traced reports (--memwatch)
+                               추적 보고 사이의 초 (--memwatch)
+
+    Returns:
+        MemoryWatchdog: Watchdog reporting to logs.txt, or None if off
+                       logs.txt에 보고하는 감시기, 사용하지 않으면 None
+    """
+    budget_mb = getattr(cfg, 'memory_budget_mb', None)
+    if not budget_mb and not trace_interval:
+        return None
+    return memwatch.MemoryWatchdog(budget_mb * memwatch.MB if budget_mb else None,
+                                   trace_interval or 60.0, trace=bool(trace_interval),
+                                   report=log.info)
+
+
+def open_camera(index=0):
+    """
+    Open the camera on a background thread.
+    백그라운드 스레드에서 카메라를 엽니다.
+
+    Importing cv2 and opening the device are the slowest part of a start,
+    so they run while the scanner loads its keys and opens the audit stream.
+    cv2 임포트와 장치 열기는 시작에서 가장 느린 부분이므로, 스캐너가 키를 읽고
+    감사 스트림을 여는 동안 실행됩니다.
+
+    Args:
+        index (int): Camera device index (defaults to 0)
+                    카메라 장치 번호 (기본값: 0)
+
+    Returns:
+        concurrent.futures.Future: Resolves to the cv2.VideoCapture
+                                  cv2.VideoCapture로 완료되는 future
+    """
+    future = concurrent.futures.Future()
+
+    def run():
+        try:
+            future.set_result(cv2.VideoCapture(index))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="camera-open", daemon=True).start()
+    return future
+
+
+def release_engine(cap, audit_stream=None, frames=None):
+    """
+    Release the camera and everything opened with it.
+    카메라와 함께 열린 모든 것을 해제합니다.
+
+    Args:
+        cap (cv2.VideoCapture): Camera to release
+                               해제할 카메라
+        audit_stream (AuditStream): Audit stream to flush (optional)
+                                   내보낼 감사 스트림 (선택 사항)
+        frames (PrerollBuffer): Pre-roll ring whose writer to finish (optional)
+                               작성기를 마무리할 프리롤 링 (선택 사항)
     """
+    if audit_stream is not None:
+        audit_stream.close()
+    if frames is not None:
+        frames.writer.stop()
     cap.release()
     cv2.destroyAllWindows()
-    GPIO.cleanup()
+
+
+def cleanup_and_exit(watchdog=None):
+    """
+    Clean up resources and exit the program.
+    리소스를 정리하고 프로그램을 종료합니다.
+
+    Args:
+        watchdog (MemoryWatchdog): Watchdog to stop (optional)
+                                  중지할 감시기 (선택 사항)
+    """
+    if watchdog is not None:
+        watchdog.stop()
+    actuator.shutdown_local()
     log.info("QR scanner terminated")
     sys.exit()
 
 
-# Initialize camera
-# 카메라 초기화
-cap = cv2.VideoCapture(0)
-
-# Read initial key information
-# 초기 키 정보 읽기
-exist_key = read_key("keyinfo.json")
-pre_pass = exist_key["passwd"]  # Store initial password to detect key changes
-                                # 키 변경을 감지하기 위해 초기 비밀번호 저장
-
-# Parse start and end times
-# 시작 및 종료 시간 파싱
-starttime = datetime.strptime(exist_key['start'], "%Y-%m-%d, %H:%M:%S")
-endtime = datetime.strptime(exist_key['end'], "%Y-%m-%d, %H:%M:%S")
-now = datetime.now()
-
-# Initialize state variables
-# 상태 변수 초기화
-key_test = False
-pre_time = now - timedelta(minutes=10)  # Initialize to allow first unlock
-                                        # 첫 번째 잠금 해제를 허용하도록 초기화
-
-# Main scanning loop - runs while key is valid
-# 메인 스캔 루프 - 키가 유효한 동안 실행
-while starttime < now and endtime > now:
-    # Capture frame from camera
-    # 카메라에서 프레임 캡처
-    ret, img = cap.read()
-
-    if not ret:
-        # Skip if frame capture failed
-        # 프레임 캡처 실패 시 건너뛰기
-        continue
-
-    # Convert to grayscale for better QR code detection
-    # 더 나은 QR 코드 감지를 위해 그레이스케일로 변환
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-    # Decode QR codes in the frame
-    # 프레임에서 QR 코드 디코딩
-    decoded = pyzbar.decode(gray)
-
-    # Process each detected QR code
-    # 감지된 각 QR 코드 처리
-    for d in decoded:
-        x, y, w, h = d.rect  # QR code bounding box / QR 코드 경계 상자
-
-        # Decode QR data from bytes to string
-        # QR 데이터를 바이트에서 문자열로 디코딩
-        barcode_data = d.data.decode("utf-8")
-        barcode_type = d.type
+def scan(watchdog=None):
+    """
+    Run the scanner engine: camera, keys, audit stream and pre-roll ring.
+    스캐너 엔진(카메라, 키, 감사 스트림, 프리롤 링)을 실행합니다.
 
-        try:
-            # Parse QR code data as JSON
-            # QR 코드 데이터를 JSON으로 파싱
-            read_key_data = json.loads(barcode_data)
+    The engine is released on return, so a restart starts from fresh
+    objects and buffers.
+    반환 시 엔진이 해제되므로, 재시작은 새 객체와 버퍼로 시작합니다.
 
-            # Validate scanned key against stored key
-            # 스캔한 키를 저장된 키와 대조하여 검증
-            key_test = validate_key(read_key_data, exist_key)
+    Args:
+        watchdog (MemoryWatchdog): Memory watchdog checked every frame (optional)
+                                  매 프레임마다 확인하는 메모리 감시기 (선택 사항)
 
-        except json.JSONDecodeError:
-            # Invalid QR code format
-            # 잘못된 QR 코드 형식
-            log.error(f"Invalid QR code format: {barcode_data}")
+    Returns:
+        bool: True if the watchdog asked for a restart, False once no key
+             can open the door any more
+             감시기가 재시작을 요청하면 True, 더 이상 도어를 열 수 있는 키가
+             없으면 False
+    """
+    # Initialize camera, in the background while the rest is set up
+    # 나머지를 준비하는 동안 백그라운드에서 카메라 초기화
+    camera = open_camera(0)
+
+    # Signed keys need only the shared secret, not a stored key
+    # 서명된 키는 저장된 키 없이 공유 비밀 키만 필요
+    keys = DoorKeys(load_secret(), getattr(cfg, 'door_id', None))
+    if keys.stored is None and not keys.accepting():
+        read_key("keyinfo.json")
+
+    # Unlocks and rejections go upstream when audit_topic is set
+    # audit_topic이 설정되면 잠금 해제와 거부를 상위로 전송
+    audit_stream = open_audit(keys.door_id)
+
+    # Frames around unlocks and rejections are saved when snapshot_dir is set
+    # snapshot_dir이 설정되면 잠금 해제와 거부 전후의 프레임을 저장
+    frames = open_preroll()
+
+    # Initialize state variables
+    # 상태 변수 초기화
+    now = datetime.now()
+    key_test = False
+    pre_time = now - timedelta(minutes=10)  # Initialize to allow first unlock
+                                            # 첫 번째 잠금 해제를 허용하도록 초기화
+
+    # Frame and grayscale buffers are reused while the resolution is unchanged
+    # 해상도가 바뀌지 않는 동안 프레임 및 그레이스케일 버퍼를 재사용
+    img = gray = None
+    cap = camera.result()
+
+    try:
+        # Main scanning loop - runs while stored key is valid or signed or synced keys are accepted
+        # 메인 스캔 루프 - 저장된 키가 유효하거나 서명된 키 또는 동기화된 키를 허용하는 동안 실행
+        while keys.accepting(now):
+            # Capture frame from camera into the previous frame's buffer
+            # 이전 프레임의 버퍼에 카메라 프레임 캡처
+            ret, frame = cap.read(img)
+
+            if not ret:
+                # Skip if frame capture failed
+                # 프레임 캡처 실패 시 건너뛰기
+                now = datetime.now()
+                continue
+            img = frame
+            startup.mark(startup.FIRST_FRAME)
+
+            if frames is not None:
+                frames.push(img)
+
+            # Convert to grayscale for better QR code detection
+            # 더 나은 QR 코드 감지를 위해 그레이스케일로 변환
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, gray)
+
+            # Validate each detected QR code; the last one decides
+            # 감지된 각 QR 코드 검증, 마지막 코드가 결과를 결정
+            for d in pyzbar.decode(gray):
+                key_test = keys.check(d.data.decode("utf-8"), now)
+                if not key_test:
+                    if audit_stream is not None:
+                        audit_stream.record(audit.REJECT, keys.last_passwd)
+                    if frames is not None:
+                        frames.trigger(audit.REJECT)
+
+            # Check if key is valid and rate limit not exceeded
+            # Rate limit: max 1 unlock per minute
+            # 키가 유효하고 속도 제한을 초과하지 않았는지 확인
+            # 속도 제한: 분당 최대 1회 잠금 해제
+            if key_test and (datetime.now() - pre_time) > timedelta(minutes=1):
+                unlock_door()
+                if audit_stream is not None:
+                    audit_stream.record(audit.UNLOCK, keys.last_passwd)
+                if frames is not None:
+                    frames.trigger(audit.UNLOCK)
+                pre_time = datetime.now()  # Update last unlock time / 마지막 잠금 해제 시간 업데이트
             key_test = False
 
-    # Check if key is valid and rate limit not exceeded
-    # Rate limit: max 1 unlock per minute
-    # 키가 유효하고 속도 제한을 초과하지 않았는지 확인
-    # 속도 제한: 분당 최대 1회 잠금 해제
-    if key_test and (datetime.now() - pre_time) > timedelta(minutes=1):
-        unlock_door()
-        key_test = False
-        pre_time = datetime.now()  # Update last unlock time / 마지막 잠금 해제 시간 업데이트
-    else:
-        key_test = False
-
-    # Check if key has been updated (password changed)
-    # 키가 업데이트되었는지 확인 (비밀번호 변경됨)
-    exist_key = read_key("keyinfo.json")
-    if exist_key['passwd'] != pre_pass:
-        # Exit if new key has been issued
-        # 새 키가 발급된 경우 종료
-        log.info("New key detected, restarting scanner")
-        cleanup_and_exit()
-
-    # Update current time for loop condition check
-    # 루프 조건 확인을 위해 현재 시간 업데이트
-    now = datetime.now()
+            # Pick up keys, keyrings and revocations written by sub.py
+            # sub.py가 쓴 키, 키링, 폐기 목록을 반영
+            if keys.refresh():
+                log.info("New key loaded")
 
-# Key expired, clean up and exit
-# 키가 만료됨, 정리 후 종료
-log.info("Key expired")
-cleanup_and_exit()
+            # Restart the engine once memory goes over budget
+            # 메모리가 예산을 넘으면 엔진을 다시 시작
+            if watchdog is not None and watchdog.check():
+                return True
+
+            # Update current time for loop condition check
+            # 루프 조건 확인을 위해 현재 시간 업데이트
+            now = datetime.now()
+
+        # Key expired
+        # 키가 만료됨
+        log.info("Key expired")
+        return False
+    finally:
+        release_engine(cap, audit_stream, frames)
+
+
+def main(watchdog=None):
+    """
+    Scan and validate QR codes until no key can open the door any more.
+    더 이상 도어를 열 수 있는 키가 없을 때까지 QR 코드를 스캔하고 검증합니다.
+
+    With door_secret configured the scanner also accepts signed keys and
+    keeps running without keyinfo.json. The same holds for a synced
+    keyring.json. Every key file is reloaded when sub.py updates it, so a
+    new key replaces the old one without restarting the scanner.
+    door_secret이 설정되어 있으면 서명된 키도 허용하며 keyinfo.json 없이도
+    계속 실행됩니다. 동기화된 keyring.json도 마찬가지입니다. 모든 키 파일은
+    sub.py가 갱신할 때 다시 읽으므로, 새 키는 스캐너를 다시 시작하지 않고 기존
+    키를 대체합니다.
+
+    With a watchdog, the engine is restarted in place when memory goes over
+    budget. If memory is still over budget after MAX_RESTARTS restarts in a
+    row, the scanner exits instead.
+    감시기가 있으면 메모리가 예산을 넘을 때 엔진을 제자리에서 다시 시작합니다.
+    연속 MAX_RESTARTS번 재시작한 후에도 메모리가 예산을 넘으면 대신 스캐너가
+    종료됩니다.
+
+    Args:
+        watchdog (MemoryWatchdog): Memory watchdog (optional)
+                                  메모리 감시기 (선택 사항)
+    """
+    if watchdog is not None:
+        watchdog.start()
+
+    while scan(watchdog):
+        if watchdog.restarts > MAX_RESTARTS:
+            log.error("Memory still over budget after restarting the scanner engine")
+            break
+        gc.collect()
+        log.warning("Scanner engine restarted")
+        watchdog.restarted()
+
+    cleanup_and_exit(watchdog)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="QR code door scanner")
+    profiler.add_argument(parser)
+    parser.add_argument("--memwatch", type=float, nargs='?', const=60.0, default=None,
+                        metavar="SECONDS",
+                        help="Trace allocations and log the top growing sites every SECONDS (default 60)")
+    startup.add_argument(parser, "the first camera frame")
+    args = parser.parse_args()
+
+    # SIGUSR1 starts or stops a profile of the scan loop
+    # SIGUSR1은 스캔 루프의 프로파일을 시작하거나 중지
+    profiler.install("rasberryQR", args.profile)
+
+    # Time-to-first-frame and the imports it waited for go to logs.txt
+    # 첫 프레임까지의 시간과 그동안 기다린 임포트를 logs.txt에 기록
+    if args.startup is not None:
+        startup.report_at(startup.FIRST_FRAME, args.startup, log.info)
+    main(open_watchdog(args.memwatch))
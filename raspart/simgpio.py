@@ -0,0 +1,153 @@
+"""
+Simulated GPIO Backend Module
+시뮬레이션 GPIO 백엔드 모듈
+
+Drop-in stand-in for the parts of RPi.GPIO used by DoorLens. Every pin
+change is recorded with a time.monotonic() timestamp so actuation timing can
+be measured on machines without GPIO hardware.
+DoorLens가 사용하는 RPi.GPIO 기능을 대신하는 모듈입니다. 모든 핀 변화가
+time.monotonic() 타임스탬프와 함께 기록되어 GPIO 하드웨어가 없는 장비에서도
+작동 시간을 측정할 수 있습니다.
+
+Select it with gpio_backend = "simgpio" in config.py or DOORLENS_GPIO=simgpio.
+config.py의 gpio_backend = "simgpio" 또는 DOORLENS_GPIO=simgpio로 선택합니다.
+"""
+
+import threading
+import time
+
+# Constants mirrored from RPi.GPIO
+# RPi.GPIO에서 가져온 상수
+BCM = 11
+BOARD = 10
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+
+# Shared pin state, guarded by one condition
+# 하나의 조건 변수로 보호되는 공유 핀 상태
+_cond = threading.Condition()
+_mode = None
+_levels = {}
+
+# Recorded (timestamp, pin, level) transitions
+# 기록된 (타임스탬프, 핀, 레벨) 전환
+transitions = []
+
+
+def setmode(mode):
+    """
+    Set the pin numbering mode.
+    핀 번호 지정 방식을 설정합니다.
+    """
+    global _mode
+    _mode = mode
+
+
+def setwarnings(flag):
+    """
+    Accepted for API compatibility; has no effect.
+    API 호환성을 위해 받으며 아무 효과가 없습니다.
+    """
+
+
+def setup(pin, direction, initial=LOW):
+    """
+    Configure a pin and record its initial level.
+    핀을 설정하고 초기 레벨을 기록합니다.
+
+    Raises:
+        RuntimeError: If setmode() has not been called
+                     setmode()가 호출되지 않았을 경우
+    """
+    if _mode is None:
+        raise RuntimeError("Please set pin numbering mode using GPIO.setmode")
+    with _cond:
+        _levels[pin] = int(bool(initial))
+
+
+def output(pin, value):
+    """
+    Drive a pin, recording a transition when the level changes.
+    핀을 구동하고 레벨이 바뀌면 전환을 기록합니다.
+
+    Raises:
+        RuntimeError: If the pin was not set up
+                     핀이 설정되지 않았을 경우
+    """
+    level = int(bool(value))
+    with _cond:
+        if pin not in _levels:
+            raise RuntimeError("The GPIO channel has not been set up as an OUTPUT")
+        if _levels[pin] != level:
+            transitions.append((time.monotonic(), pin, level))
+            _levels[pin] = level
+            _cond.notify_all()
+
+
+def input(pin):
+    """
+    Return the current level of a pin.
+    핀의 현재 레벨을 반환합니다.
+    """
+    with _cond:
+        return _levels[pin]
+
+
+def cleanup(pin=None):
+    """
+    Release one pin or all pins. Recorded transitions are kept.
+    핀 하나 또는 전체를 해제합니다. 기록된 전환은 유지됩니다.
+    """
+    global _mode
+    with _cond:
+        if pin is None:
+            _levels.clear()
+            _mode = None
+        else:
+            _levels.pop(pin, None)
+
+
+def reset():
+    """
+    Clear all pin state and recorded transitions.
+    모든 핀 상태와 기록된 전환을 지웁니다.
+    """
+    cleanup()
+    with _cond:
+        transitions.clear()
+
+
+def wait_for(pin, level, timeout=None):
+    """
+    Block until a pin reaches a level.
+    핀이 특정 레벨에 도달할 때까지 대기합니다.
+
+    Returns:
+        bool: True if reached, False on timeout
+             도달하면 True, 시간 초과 시 False
+    """
+    with _cond:
+        return _cond.wait_for(lambda: _levels.get(pin) == int(bool(level)), timeout)
+
+
+def pulses(pin):
+    """
+    Pair rising and falling edges of a pin into pulses.
+    핀의 상승 및 하강 에지를 펄스로 묶습니다.
+
+    Returns:
+        list: (rise_time, fall_time) tuples; fall_time is None while HIGH
+             (상승 시각, 하강 시각) 튜플 목록, HIGH 상태이면 하강 시각은 None
+    """
+    result = []
+    with _cond:
+        for stamp, changed_pin, level in transitions:
+            if changed_pin != pin:
+                continue
+            if level == HIGH:
+                result.append([stamp, None])
+            elif result and result[-1][1] is None:
+                result[-1][1] = stamp
+    return [tuple(p) for p in result]
@@ -18,17 +18,240 @@
 Google Cloud Pub/Sub Subscriber Module
 Google Cloud Pub/Sub 구독자 모듈
 
-Listens for new QR code keys and launches the QR scanner.
-새로운 QR 코드 키를 수신하고 QR 스캐너를 실행합니다.
+Listens for new QR code keys and keeps the QR scanner running. Keyring deltas
+and snapshots (keysync.py) update keyring.json instead; a gap in the delta
+sequence triggers a resync request to the host. Revocation lists
+(revocation.py) are saved to revoked.bin.
+새로운 QR 코드 키를 수신하고 QR 스캐너가 실행 중이도록 유지합니다. 키링 델타와 스냅샷
+(keysync.py)은 대신 keyring.json을 갱신하며, 델타 순서에 누락이 있으면 호스트에
+재동기화를 요청합니다. 폐기 목록(revocation.py)은 revoked.bin에 저장됩니다.
 """
 
 import argparse
 import config as cfg
+import json
 import os
-from google.cloud import pubsub_v1
+import subprocess
+import sys
+import threading
+import time
+import keysync
+import logger
+import profiler
+import revocation
+import startup
 
+# Imported on first use, so doord.py --no-subscribe never loads it
+# 처음 사용할 때 임포트되므로 doord.py --no-subscribe는 불러오지 않음
+pubsub_v1 = startup.lazy_import("google.cloud.pubsub_v1")
 
-def sub(project_id, subscription_name):
+# Seconds before the same resync request is sent again
+# 같은 재동기화 요청을 다시 보내기 전 대기 시간 (초)
+RESYNC_RETRY_SECONDS = 30
+
+# door_id -> (have_seq, time) of the door's latest resync request
+# door_id -> 도어의 최근 재동기화 요청 (have_seq, 시간)
+_resync_sent = {}
+
+# (client class, publisher) shared by every resync request, created on
+# first use; a swapped class (localpubsub.install()) gets its own client
+# 모든 재동기화 요청이 공유하는 (클라이언트 클래스, 게시자), 처음 사용할 때
+# 생성되며, 클래스가 바뀌면(localpubsub.install()) 새 클라이언트를 만듦
+_publisher = None
+_resync_lock = threading.Lock()
+
+log = logger.logger(log_path="./logs.txt")
+
+# Scanner process started by launch_scanner()
+# launch_scanner()가 시작한 스캐너 프로세스
+_scanner = None
+
+
+def request_resync(door_id, have_seq):
+    """
+    Ask the host for the changes after have_seq.
+    have_seq 이후의 변경 사항을 호스트에 요청합니다.
+
+    Requests for the same sequence number are sent at most once per
+    RESYNC_RETRY_SECONDS, since every delta after a gap reports it again.
+    Only each door's latest request is remembered.
+    누락 이후의 모든 델타가 같은 누락을 다시 알리므로, 같은 순서 번호에 대한
+    요청은 RESYNC_RETRY_SECONDS마다 최대 한 번만 전송합니다. 도어마다 최근 요청만
+    기억합니다.
+    """
+    global _publisher
+
+    now = time.monotonic()
+    with _resync_lock:
+        last_seq, last_sent = _resync_sent.get(door_id, (None, -RESYNC_RETRY_SECONDS))
+        if last_seq == have_seq and now - last_sent < RESYNC_RETRY_SECONDS:
+            return False
+        _resync_sent[door_id] = (have_seq, now)
+        client_class = pubsub_v1.PublisherClient
+        if _publisher is None or _publisher[0] is not client_class:
+            _publisher = client_class, client_class()
+        publisher = _publisher[1]
+
+    topic_path = publisher.topic_path(cfg.project_id, cfg.resync_topic)
+    publisher.publish(topic_path, data=keysync.encode_resync(door_id, have_seq)).result()
+    log.info(f"Requested resync of {door_id} from seq {have_seq}")
+    return True
+
+
+def apply_sync(data, path=keysync.KEYRING_PATH, resync=request_resync):
+    """
+    Apply a keyring delta or snapshot to the stored keyring.
+    키링 델타 또는 스냅샷을 저장된 키링에 적용합니다.
+
+    Args:
+        data (bytes): Pub/Sub message data
+                     Pub/Sub 메시지 데이터
+        path (str): Keyring file (defaults to "keyring.json")
+                   키링 파일 (기본값: "keyring.json")
+        resync (callable): resync(door_id, have_seq) asks the host to catch up
+                          resync(door_id, have_seq)는 호스트에 따라잡기를 요청
+
+    Returns:
+        str: keysync.APPLIED, DUPLICATE or GAP, or None if data is not a
+             keyring message
+            keysync.APPLIED, DUPLICATE 또는 GAP, 키링 메시지가 아니면 None
+    """
+    update = keysync.decode_message(data)
+    if update is None or update['kind'] == 'resync':
+        return None
+
+    keyring = keysync.Keyring.load(path, update['door'])
+    result = keyring.apply(update)
+    if result == keysync.APPLIED:
+        keyring.prune()
+        keyring.save(path)
+    elif result == keysync.GAP:
+        resync(keyring.door_id, keyring.seq)
+    return result
+
+
+def save_revocations(data, path=revocation.REVOCATION_PATH):
+    """
+    Save a revocation list from the host.
+    호스트에서 받은 폐기 목록을 저장합니다.
+
+    The file is replaced atomically so the scanner never reads half a list.
+    스캐너가 절반만 쓰인 목록을 읽지 않도록 파일을 원자적으로 교체합니다.
+
+    Args:
+        data (bytes): Pub/Sub message data
+                     Pub/Sub 메시지 데이터
+        path (str): Revocation list file (defaults to "revoked.bin")
+                   폐기 목록 파일 (기본값: "revoked.bin")
+
+    Returns:
+        bool: True if data was a revocation list and was saved
+             데이터가 폐기 목록이고 저장되었으면 True
+
+    Raises:
+        ValueError: If the revocation list is malformed
+                   폐기 목록 형식이 잘못된 경우
+    """
+    if not revocation.is_revocation_list(data):
+        return False
+    revocation.RevocationList(data)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def save_key(data, path="keyinfo.json"):
+    """
+    Save a plain key message as the stored key.
+    일반 키 메시지를 저장된 키로 저장합니다.
+
+    The file is replaced atomically so the scanner never reads half a key.
+    스캐너가 절반만 쓰인 키를 읽지 않도록 파일을 원자적으로 교체합니다.
+
+    Raises:
+        ValueError: If data is not a JSON key with a text doorID and passwd
+                   데이터가 텍스트 doorID와 passwd를 가진 JSON 키가 아닐 경우
+    """
+    try:
+        text = data.decode("utf-8")
+        key = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"Key is not JSON text: {e}") from None
+    if not (isinstance(key, dict) and isinstance(key.get('doorID'), str)
+            and isinstance(key.get('passwd'), str)):
+        raise ValueError("Key needs a text doorID and passwd")
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def handle_message(data, directory="."):
+    """
+    Store one message from the host where the scanner will find it.
+    호스트에서 받은 메시지 하나를 스캐너가 찾을 수 있는 곳에 저장합니다.
+
+    Args:
+        data (bytes): Pub/Sub message data
+                     Pub/Sub 메시지 데이터
+        directory (str): Directory holding the door's key files
+                        도어의 키 파일이 있는 디렉터리
+
+    Returns:
+        str: "revocation", "keyring" or "key" for what was stored
+            저장된 내용에 따라 "revocation", "keyring" 또는 "key"
+
+    Raises:
+        ValueError: If the message is malformed; redelivering it will not help
+                   메시지 형식이 잘못된 경우, 다시 전달되어도 소용없음
+    """
+    # Revocation lists replace revoked.bin
+    # 폐기 목록은 revoked.bin을 교체
+    if save_revocations(data, os.path.join(directory, revocation.REVOCATION_PATH)):
+        return "revocation"
+
+    # Keyring deltas and snapshots update keyring.json
+    # 키링 델타와 스냅샷은 keyring.json을 갱신
+    if apply_sync(data, os.path.join(directory, keysync.KEYRING_PATH)) is not None:
+        return "keyring"
+
+    # Anything else is a single key for keyinfo.json
+    # 그 외는 keyinfo.json용 단일 키
+    save_key(data, os.path.join(directory, "keyinfo.json"))
+    return "key"
+
+
+def launch_scanner(args=()):
+    """
+    Start rasberryQR.py unless it is already running.
+    rasberryQR.py가 실행 중이 아니면 시작합니다.
+
+    The scanner reloads keyinfo.json itself, so later keys need no new
+    process; it is started again only after it exits on key expiry.
+    스캐너가 keyinfo.json을 직접 다시 읽으므로 이후 키에는 새 프로세스가 필요
+    없으며, 키 만료로 종료된 후에만 다시 시작됩니다.
+
+    Args:
+        args (list): Extra command line arguments for the scanner
+                    스캐너에 전달할 추가 명령줄 인자
+
+    Returns:
+        bool: True if a scanner was started
+             스캐너를 시작했으면 True
+    """
+    global _scanner
+
+    if _scanner is not None and _scanner.poll() is None:
+        return False
+    _scanner = subprocess.Popen([sys.executable, "./rasberryQR.py", *args])
+    return True
+
+
+def sub(project_id, subscription_name, scanner_args=()):
     """
     Receives messages from a Pub/Sub subscription.
     Pub/Sub 구독에서 메시지를 수신합니다.
@@ -38,18 +261,20 @@ def sub(project_id, subscription_name):
                          Google Cloud 프로젝트 ID
         subscription_name (str): Pub/Sub subscription name
                                 Pub/Sub 구독 이름
+        scanner_args (list): Extra command line arguments for the scanner
+                            스캐너에 전달할 추가 명령줄 인자
 
     Process:
     1. Listen for messages on the subscription
     2. When message received, save key to keyinfo.json
     3. Acknowledge the message
-    4. Launch rasberryQR.py to start scanning
+    4. Start rasberryQR.py if it is not running yet
 
     처리 과정:
     1. 구독에서 메시지 수신 대기
     2. 메시지 수신 시 키를 keyinfo.json에 저장
     3. 메시지 확인
-    4. rasberryQR.py를 실행하여 스캔 시작
+    4. rasberryQR.py가 실행 중이 아니면 시작
     """
     # Initialize a Subscriber client
     # Subscriber 클라이언트 초기화
@@ -77,25 +302,29 @@ def sub(project_id, subscription_name):
             )
         )
 
-        # Decode message data from bytes to string
-        # 메시지 데이터를 바이트에서 문자열로 디코딩
-        keystring = message.data.decode("utf-8")
-
-        # Save key information to JSON file
-        # 키 정보를 JSON 파일에 저장
-        with open("keyinfo.json", 'w') as f:
-            f.write(keystring)
+        # Revocation lists, keyring updates and keys all land in files
+        # that the running scanner reloads
+        # 폐기 목록, 키링 갱신, 키는 모두 실행 중인 스캐너가 다시 읽는 파일에 저장됨
+        try:
+            kind = handle_message(message.data)
+        except ValueError as e:
+            # A malformed message would fail the same way on every delivery
+            # 잘못된 메시지는 전달될 때마다 같은 방식으로 실패함
+            log.error(f"Dropped malformed message {message.message_id}: {e}")
+            message.ack()
+            return
 
         # Acknowledge the message (confirms receipt to Pub/Sub)
         # Unacknowledged messages will be redelivered
         # 메시지 확인 (Pub/Sub에 수신 확인)
         # 확인되지 않은 메시지는 재전송됩니다
         message.ack()
-        print("Acknowledged message {}\n".format(message.message_id))
+        print("Acknowledged {} message {}\n".format(kind, message.message_id))
 
-        # Launch QR scanner to start validating codes
-        # QR 스캐너를 실행하여 코드 검증 시작
-        os.system("python3 ./rasberryQR.py")
+        # Make sure a scanner is validating codes for the new key
+        # 새 키에 대해 코드를 검증하는 스캐너가 실행 중인지 확인
+        if kind == "key":
+            launch_scanner(scanner_args)
 
     # Start streaming subscription
     # 스트리밍 구독 시작
@@ -122,6 +351,23 @@ def sub(project_id, subscription_name):
 
 
 if __name__ == "__main__":
-    # Use config values instead of command line arguments
-    # 명령줄 인자 대신 config 값 사용
-    sub(cfg.project_id, cfg.subscription_name)
+    parser = argparse.ArgumentParser(description="Door key subscriber")
+    profiler.add_argument(parser)
+    startup.add_argument(parser, "the scanner's first camera frame")
+    args = parser.parse_args()
+
+    # --profile covers this process and the scanner it starts; SIGUSR1
+    # toggles each process separately
+    # --profile은 이 프로세스와 시작하는 스캐너 모두에 적용되며, SIGUSR1은 각
+    # 프로세스를 따로 전환
+    profiler.install("sub", args.profile)
+    scanner_args = ["--profile", str(args.profile)] if args.profile else []
+
+    # Every scanner start reports its own time-to-first-frame
+    # 스캐너가 시작될 때마다 자체 첫 프레임까지의 시간을 보고
+    if args.startup is not None:
+        scanner_args += ["--startup", str(args.startup)]
+
+    # Project and subscription still come from config values
+    # 프로젝트와 구독은 여전히 config 값에서 가져옴
+    sub(cfg.project_id, cfg.subscription_name, scanner_args)
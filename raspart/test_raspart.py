@@ -7,9 +7,12 @@ QR 코드 스캔, 검증 및 도어 제어 모듈에 대한 테스트입니다.
 """
 
 import unittest
+import asyncio
 import json
 import os
 import tempfile
+import threading
+import time
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock, call
 import sys
@@ -168,37 +171,157 @@ class TestKeyValidation(unittest.TestCase):
         result = rasberryQR.validate_key(scanned_key, stored_key)
         self.assertFalse(result)
 
+    def test_validate_compact_payload(self):
+        """Test validation of a key scanned in compact format."""
+        import rasberryQR
 
-class TestDoorControl(unittest.TestCase):
+        stored_key = {
+            'doorID': 'test-door',
+            'passwd': '65a1b2c3d4e5f60718293a4b',
+            'start': '2025-01-01, 10:00:00',
+            'end': '2025-01-01, 10:10:00'
+        }
+
+        payload = rasberryQR.keycodec.encode_compact(stored_key)
+        scanned_key = rasberryQR.keycodec.decode_payload(payload)
+
+        self.assertTrue(rasberryQR.validate_key(scanned_key, stored_key))
+
+    def test_stored_key_matches_validate_key(self):
+        """Test that the compiled stored key agrees with validate_key."""
+        import rasberryQR
+
+        stored_key = {
+            'doorID': 'test-door',
+            'passwd': '65a1b2c3d4e5f60718293a4b',
+            'start': '2025-01-01, 10:00:00',
+            'end': '2025-01-01, 10:10:00',
+            'floor': 3
+        }
+        compiled = rasberryQR.StoredKey(stored_key)
+
+        scans = [dict(stored_key)]
+        for field, value in [('doorID', 'wrong-door'), ('passwd', '65a1b2c3d4e5f60718293a4c'),
+                             ('passwd', None), ('passwd', 17), ('passwd', '비밀번호'),
+                             ('start', '2025-01-01, 10:00:01'),
+                             ('end', None), ('floor', 4)]:
+            scans.append(dict(stored_key, **{field: value}))
+        scans.append({k: v for k, v in stored_key.items() if k != 'floor'})
+
+        for scanned_key in scans:
+            self.assertEqual(compiled.validate(scanned_key),
+                             rasberryQR.validate_key(scanned_key, stored_key), scanned_key)
+        self.assertTrue(compiled.validate(scans[0]))
+
+        # Compact payloads may keep the window in epoch seconds
+        # 간결한 페이로드는 유효 기간을 에포크 초로 유지할 수 있음
+        payload = rasberryQR.keycodec.encode_compact(stored_key)
+        scanned_key = dict(rasberryQR.keycodec.decode_payload(payload, epochs=True), floor=3)
+        self.assertIsInstance(scanned_key['start'], int)
+        self.assertTrue(compiled.validate(scanned_key))
+        self.assertFalse(compiled.validate(dict(scanned_key, end=scanned_key['end'] + 1)))
+
+        # A non-text password is rejected before the revocation lookup
+        # 텍스트가 아닌 비밀번호는 폐기 조회 전에 거부됨
+        import revocation
+        revoked = revocation.RevocationList(revocation.build(['other-pass']))
+        for passwd in [5, ['x'], None]:
+            self.assertFalse(compiled.validate(dict(stored_key, passwd=passwd), revoked))
+        self.assertTrue(compiled.validate(scans[0], revoked))
+
+        # Non-ASCII passwords are compared as UTF-8 bytes
+        # ASCII가 아닌 비밀번호는 UTF-8 바이트로 비교됨
+        unicode_key = rasberryQR.StoredKey(dict(stored_key, passwd='비밀번호'))
+        self.assertTrue(unicode_key.validate(dict(stored_key, passwd='비밀번호')))
+        self.assertFalse(unicode_key.validate(dict(stored_key, passwd='비밀번호2')))
+        self.assertFalse(unicode_key.validate(scans[0]))
+
+        self.assertTrue(compiled.valid(datetime(2025, 1, 1, 10, 5)))
+        self.assertFalse(compiled.valid(datetime(2025, 1, 1, 10, 10, 1)))
+
+
+class TestPreMintedKeys(unittest.TestCase):
     """
-    Test cases for door lock control.
-    도어락 제어에 대한 테스트 케이스입니다.
+    Test cases for pre-minted keys activated by the stored key.
+    저장된 키로 활성화되는 미리 발급된 키에 대한 테스트 케이스입니다.
     """
 
-    @patch('rasberryQR.GPIO')
-    @patch('rasberryQR.time.sleep')
-    def test_unlock_door_sets_gpio_high(self, mock_sleep, mock_gpio):
-        """Test that unlock_door sets GPIO 17 to HIGH."""
+    def test_unbound_key_takes_stored_window(self):
+        """Test that a window-less key validates against the activation."""
         import rasberryQR
 
-        rasberryQR.unlock_door()
+        stored_key = {
+            'doorID': 'test-door',
+            'passwd': '65a1b2c3d4e5f60718293a4b',
+            'start': '2025-01-01, 10:00:00',
+            'end': '2025-01-01, 10:10:00'
+        }
+
+        payload = rasberryQR.keycodec.encode_unbound('test-door', stored_key['passwd'])
+        scanned_key = rasberryQR.keycodec.decode_payload(payload)
+
+        self.assertTrue(rasberryQR.keycodec.is_unbound(scanned_key))
+        self.assertFalse(rasberryQR.validate_key(scanned_key, stored_key))
+
+        scanned_key['start'] = stored_key['start']
+        scanned_key['end'] = stored_key['end']
+        self.assertTrue(rasberryQR.validate_key(scanned_key, stored_key))
+
+
+class TestSignedKeyValidation(unittest.TestCase):
+    """
+    Test cases for locally verified signed keys.
+    로컬에서 검증되는 서명된 키에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        """Set up test fixtures."""
+        now = datetime.now()
+        self.key_info = {
+            'doorID': 'test-door',
+            'passwd': '65a1b2c3d4e5f60718293a4b',
+            'start': (now - timedelta(minutes=5)).strftime("%Y-%m-%d, %H:%M:%S"),
+            'end': (now + timedelta(minutes=5)).strftime("%Y-%m-%d, %H:%M:%S")
+        }
+
+    def test_valid_signed_key(self):
+        """Test that a signed key for this door is accepted."""
+        import rasberryQR
 
-        # Verify GPIO was set to True (HIGH) then False (LOW)
-        # GPIO가 True(HIGH)로 설정된 후 False(LOW)로 설정되었는지 확인
-        calls = [call(17, True), call(17, False)]
-        mock_gpio.output.assert_has_calls(calls)
+        payload = rasberryQR.keycodec.encode_signed(self.key_info, b'secret')
+        self.assertTrue(rasberryQR.validate_signed(payload, b'secret', 'test-door'))
 
-    @patch('rasberryQR.GPIO')
-    @patch('rasberryQR.time.sleep')
-    def test_unlock_door_waits_5_seconds(self, mock_sleep, mock_gpio):
-        """Test that unlock_door waits 5 seconds."""
+    def test_signed_key_for_other_door(self):
+        """Test that a signed key for another door is rejected."""
+        import rasberryQR
+
+        payload = rasberryQR.keycodec.encode_signed(self.key_info, b'secret')
+        self.assertFalse(rasberryQR.validate_signed(payload, b'secret', 'other-door'))
+
+    def test_signed_key_with_wrong_secret(self):
+        """Test that a key signed with another secret is rejected."""
+        import rasberryQR
+
+        payload = rasberryQR.keycodec.encode_signed(self.key_info, b'forged')
+        self.assertFalse(rasberryQR.validate_signed(payload, b'secret', 'test-door'))
+
+
+class TestDoorControl(unittest.TestCase):
+    """
+    Test cases for door lock control.
+    도어락 제어에 대한 테스트 케이스입니다.
+    """
+
+    @patch('rasberryQR.actuator.request_unlock')
+    def test_unlock_door_requests_5_second_hold(self, mock_request):
+        """Test that unlock_door hands a 5 second hold to the actuator."""
         import rasberryQR
 
         rasberryQR.unlock_door()
 
-        # Verify sleep was called with 5 seconds
-        # 5초로 sleep이 호출되었는지 확인
-        mock_sleep.assert_called_once_with(5)
+        # Verify the hold was delegated instead of slept inline
+        # 유지 시간이 직접 sleep되지 않고 위임되었는지 확인
+        mock_request.assert_called_once_with(5)
 
 
 class TestDoorLock(unittest.TestCase):
@@ -207,32 +330,161 @@ class TestDoorLock(unittest.TestCase):
     doorlock 모듈에 대한 테스트 케이스입니다.
     """
 
-    @patch('doorlock.GPIO')
-    @patch('doorlock.time.sleep')
-    def test_dooropen_sets_gpio_high_for_10_seconds(self, mock_sleep, mock_gpio):
-        """Test that dooropen activates GPIO for 10 seconds."""
+    @patch('doorlock.actuator.request_unlock')
+    def test_dooropen_requests_10_second_hold(self, mock_request):
+        """Test that dooropen requests a 10 second hold."""
         import doorlock
 
         result = doorlock.dooropen()
 
-        # Verify GPIO was set HIGH then LOW
-        # GPIO가 HIGH로 설정된 후 LOW로 설정되었는지 확인
-        calls = [call(17, True), call(17, False)]
-        mock_gpio.output.assert_has_calls(calls)
-
-        # Verify 10 second sleep
-        # 10초 sleep 확인
-        mock_sleep.assert_called_once_with(10)
-
-        # Verify cleanup was called
-        # cleanup이 호출되었는지 확인
-        mock_gpio.cleanup.assert_called_once()
+        # Verify 10 second hold request
+        # 10초 유지 요청 확인
+        mock_request.assert_called_once_with(10)
 
         # Verify return value
         # 반환값 확인
         self.assertEqual(result, 0)
 
 
+class TestDoorActuator(unittest.TestCase):
+    """
+    Test cases for the long-lived door actuator.
+    상주 도어 액추에이터에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        """Set up test fixtures."""
+        import actuator
+        self.gpio = MagicMock()
+        self.door = actuator.DoorActuator(gpio=self.gpio).start()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.door.stop()
+
+    def test_pin_setup_happens_once(self):
+        """Test that the pin is configured once, not per unlock."""
+        self.door.unlock(0.01)
+        self.door.wait_idle(timeout=1)
+        self.door.unlock(0.01)
+        self.door.wait_idle(timeout=1)
+
+        self.gpio.setup.assert_called_once_with(17, self.gpio.OUT)
+        self.gpio.cleanup.assert_not_called()
+
+    def test_unlock_raises_then_releases_pin(self):
+        """Test that an unlock raises the pin and locks after the hold."""
+        self.door.unlock(0.01)
+        self.assertTrue(self.door.wait_idle(timeout=1))
+
+        # Initial LOW from start(), then HIGH and LOW
+        # start()의 초기 LOW 이후 HIGH, LOW
+        calls = [call(17, False), call(17, True), call(17, False)]
+        self.assertEqual(self.gpio.output.call_args_list, calls)
+
+    def test_overlapping_holds_are_coalesced(self):
+        """Test that overlapping unlocks extend one hold."""
+        self.door.unlock(0.2)
+        self.door.unlock(0.2)
+        self.door.unlock(0.2)
+        self.assertTrue(self.door.wait_idle(timeout=2))
+
+        stats = self.door.stats()
+        self.assertEqual(stats['unlocks'], 1)
+        self.assertEqual(stats['coalesced'], 2)
+        self.assertEqual(self.gpio.output.call_args_list.count(call(17, True)), 1)
+
+    def test_latency_is_recorded(self):
+        """Test that command-to-pin latency is reported."""
+        self.door.unlock(0.01)
+        self.door.wait_idle(timeout=1)
+
+        stats = self.door.stats()
+        self.assertEqual(len(self.door.latencies), 1)
+        self.assertGreaterEqual(stats['latency_max_ms'], 0.0)
+
+    def test_invalid_holds_are_rejected_and_long_ones_capped(self):
+        """Test that bad holds never reach the worker and long holds are clamped."""
+        import actuator
+        for hold in (float('inf'), float('nan'), 0, -1, 'x'):
+            with self.assertRaises(ValueError):
+                self.door.unlock(hold)
+        self.assertEqual(actuator.clamp_hold(1e12, max_hold=30), 30)
+
+        self.door.max_hold = 0.01
+        self.door.unlock(1e12)
+        self.assertTrue(self.door.wait_idle(timeout=1))
+        self.assertTrue(self.door._thread.is_alive())
+
+    def test_worker_failure_leaves_pin_low(self):
+        """Test that an error in the worker drives the pin LOW before it exits."""
+        self.door.latencies = MagicMock()
+        self.door.latencies.append.side_effect = RuntimeError("boom")
+        with patch('threading.excepthook'):
+            self.door.unlock(10)
+            self.door._thread.join(timeout=1)
+
+        self.assertFalse(self.door._thread.is_alive())
+        self.assertEqual(self.gpio.output.call_args_list[-1], call(17, False))
+        self.door._thread = None
+
+
+class TestSimulatedGPIO(unittest.TestCase):
+    """
+    Timing tests for the actuator on the simulated GPIO backend.
+    시뮬레이션 GPIO 백엔드에서의 액추에이터 타이밍 테스트입니다.
+    """
+
+    def setUp(self):
+        """Set up test fixtures."""
+        import actuator
+        import simgpio
+        self.gpio = simgpio
+        self.gpio.reset()
+        self.door = actuator.DoorActuator(gpio=self.gpio).start()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        self.door.stop()
+        self.gpio.reset()
+
+    def test_load_gpio_by_name(self):
+        """Test that the backend can be selected by configuration."""
+        import actuator
+        with patch.dict(os.environ, {'DOORLENS_GPIO': 'simgpio'}):
+            self.assertIs(actuator.load_gpio(), self.gpio)
+
+    def test_unlock_latency(self):
+        """Test that the pin rises promptly after an unlock command."""
+        issued = time.monotonic()
+        self.door.unlock(0.05)
+        self.assertTrue(self.gpio.wait_for(17, self.gpio.HIGH, timeout=1))
+
+        rise, _ = self.gpio.pulses(17)[0]
+        self.assertLess(rise - issued, 0.05)
+
+    def test_hold_duration(self):
+        """Test that the pin stays HIGH for the requested hold."""
+        self.door.unlock(0.1)
+        self.door.wait_idle(timeout=2)
+
+        rise, fall = self.gpio.pulses(17)[0]
+        self.assertGreaterEqual(fall - rise, 0.1)
+        self.assertLess(fall - rise, 0.2)
+
+    def test_coalesced_hold_is_one_pulse(self):
+        """Test that overlapping unlocks produce one extended pulse."""
+        self.door.unlock(0.1)
+        time.sleep(0.05)
+        self.door.unlock(0.1)
+        self.door.wait_idle(timeout=2)
+
+        pulses = self.gpio.pulses(17)
+        self.assertEqual(len(pulses), 1)
+        rise, fall = pulses[0]
+        self.assertGreaterEqual(fall - rise, 0.15)
+
+
 class TestSubIntegration(unittest.TestCase):
     """
     Integration tests for Pub/Sub subscriber.
@@ -255,6 +507,628 @@ class TestSubIntegration(unittest.TestCase):
         # 클라이언트 생성만 확인
 
 
+class TestKeyringSync(unittest.TestCase):
+    """
+    Test cases for applying keyring deltas at the door.
+    도어에서 키링 델타를 적용하는 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        import keysync
+        self.keysync = keysync
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'keyring.json')
+        self.now = int(time.time())
+        self.resyncs = []
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.test_dir)
+
+    def apply(self, data):
+        import sub
+        return sub.apply_sync(data, self.path,
+                              resync=lambda door_id, seq: self.resyncs.append((door_id, seq)))
+
+    def test_deltas_update_keyring_file(self):
+        """Test that in-order deltas are applied and saved."""
+        window = (self.now - 60, self.now + 600)
+        self.assertEqual(self.apply(self.keysync.encode_delta('door_a', 1, [('p1',) + window])),
+                         self.keysync.APPLIED)
+        self.assertEqual(self.apply(self.keysync.encode_delta('door_a', 2, [('p2',) + window])),
+                         self.keysync.APPLIED)
+
+        ring = self.keysync.Keyring.load(self.path)
+        self.assertEqual((ring.seq, sorted(ring.keys)), (2, ['p1', 'p2']))
+        self.assertEqual(self.resyncs, [])
+
+    def test_gap_requests_resync_and_snapshot_recovers(self):
+        """Test that a missing delta triggers a resync that a snapshot resolves."""
+        window = (self.now - 60, self.now + 600)
+        self.apply(self.keysync.encode_delta('door_a', 1, [('p1',) + window]))
+
+        self.assertEqual(self.apply(self.keysync.encode_delta('door_a', 3, [('p3',) + window])),
+                         self.keysync.GAP)
+        self.assertEqual(self.resyncs, [('door_a', 1)])
+
+        snapshot = self.keysync.encode_snapshot('door_a', 3, {'p1': window, 'p3': window})
+        self.assertEqual(self.apply(snapshot), self.keysync.APPLIED)
+        self.assertEqual(self.keysync.Keyring.load(self.path).seq, 3)
+
+    def test_plain_key_is_not_a_keyring_message(self):
+        """Test that legacy full-key messages are left to the keyinfo.json path."""
+        self.assertIsNone(self.apply(b'{"doorID": "door_a", "passwd": "p"}'))
+        self.assertFalse(os.path.exists(self.path))
+
+    @patch('sub.pubsub_v1.PublisherClient')
+    def test_resync_requests_are_rate_limited(self, mock_publisher):
+        """Test that the same resync request is not repeated for every delta."""
+        import sub
+        sub._resync_sent.clear()
+        sub._publisher = None
+        self.addCleanup(setattr, sub, '_publisher', None)
+        with patch('sub.cfg') as mock_cfg:
+            mock_cfg.resync_topic = 'resync'
+            self.assertTrue(sub.request_resync('door_a', 5))
+            self.assertFalse(sub.request_resync('door_a', 5))
+            self.assertTrue(sub.request_resync('door_a', 7))
+        self.assertEqual(mock_publisher.return_value.publish.call_count, 2)
+
+        # One client for every request, and one remembered request per door
+        # 모든 요청에 하나의 클라이언트, 도어당 하나의 기억된 요청
+        mock_publisher.assert_called_once_with()
+        self.assertEqual(list(sub._resync_sent), ['door_a'])
+        self.assertEqual(sub._resync_sent['door_a'][0], 7)
+
+    def test_scanner_checks_keyring(self):
+        """Test that rasberryQR validates keys against the keyring."""
+        import rasberryQR
+        ring = self.keysync.Keyring('door_a', 1, {'p1': (self.now - 60, self.now + 600),
+                                                  'old': (self.now - 600, self.now - 60)})
+
+        self.assertTrue(rasberryQR.validate_keyring({'doorID': 'door_a', 'passwd': 'p1'}, ring))
+        self.assertFalse(rasberryQR.validate_keyring({'doorID': 'door_b', 'passwd': 'p1'}, ring))
+        self.assertFalse(rasberryQR.validate_keyring({'doorID': 'door_a', 'passwd': 'old'}, ring))
+        self.assertFalse(rasberryQR.validate_keyring({'doorID': 'door_a', 'passwd': 'x'}, ring))
+
+
+class TestRevocationList(unittest.TestCase):
+    """
+    Test cases for the revocation list at the door.
+    도어의 폐기 목록에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        import revocation
+        self.revocation = revocation
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'revoked.bin')
+        self.key = {'doorID': 'door_a', 'passwd': 'revoked-pass',
+                    'start': '2024-01-01, 00:00:00', 'end': '2099-01-01, 00:00:00'}
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.test_dir)
+
+    def test_sub_saves_revocation_list(self):
+        """Test that sub.py saves a revocation list and ignores other messages."""
+        import sub
+        blob = self.revocation.build(['revoked-pass'])
+
+        self.assertTrue(sub.save_revocations(blob, self.path))
+        self.assertIn('revoked-pass', self.revocation.RevocationList.load(self.path))
+        self.assertFalse(sub.save_revocations(b'{"doorID": "door_a"}', self.path))
+        with self.assertRaises(ValueError):
+            sub.save_revocations(blob[:-1], self.path)
+
+    def test_revoked_key_is_rejected(self):
+        """Test that validate_key rejects a revoked key that otherwise matches."""
+        import rasberryQR
+        revoked = self.revocation.RevocationList(self.revocation.build(['revoked-pass']))
+
+        self.assertTrue(rasberryQR.validate_key(dict(self.key), self.key))
+        self.assertFalse(rasberryQR.validate_key(dict(self.key), self.key, revoked))
+
+    def test_revoked_signed_key_is_rejected(self):
+        """Test that a signed key is rejected once revoked."""
+        import rasberryQR
+        now = datetime.now()
+        key = dict(self.key, start=(now - timedelta(minutes=5)).strftime("%Y-%m-%d, %H:%M:%S"),
+                   end=(now + timedelta(minutes=5)).strftime("%Y-%m-%d, %H:%M:%S"))
+        payload = rasberryQR.keycodec.encode_signed(key, b'secret')
+        revoked = self.revocation.RevocationList(self.revocation.build(['revoked-pass']))
+
+        self.assertTrue(rasberryQR.validate_signed(payload, b'secret', 'door_a',
+                                                   self.revocation.RevocationList(
+                                                       self.revocation.build([]))))
+        self.assertFalse(rasberryQR.validate_signed(payload, b'secret', 'door_a', revoked))
+
+
+class TestDoorKeys(unittest.TestCase):
+    """
+    Test cases for the scanner's reloadable key sources.
+    스캐너의 다시 읽을 수 있는 키 소스에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        import rasberryQR
+        self.test_dir = tempfile.mkdtemp()
+        self.key_path = os.path.join(self.test_dir, 'keyinfo.json')
+        self.keys = rasberryQR.DoorKeys(
+            key_path=self.key_path,
+            keyring_path=os.path.join(self.test_dir, 'keyring.json'),
+            revocation_path=os.path.join(self.test_dir, 'revoked.bin'),
+        )
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.test_dir)
+
+    def write_key(self, passwd):
+        import sub
+        now = datetime.now()
+        key = {'doorID': 'door_a', 'passwd': passwd,
+               'start': (now - timedelta(minutes=5)).strftime("%Y-%m-%d, %H:%M:%S"),
+               'end': (now + timedelta(minutes=5)).strftime("%Y-%m-%d, %H:%M:%S")}
+        sub.save_key(json.dumps(key).encode('utf-8'), self.key_path)
+        # Make sure the new file has a different mtime from the old one
+        # 새 파일이 이전 파일과 다른 mtime을 갖도록 보장
+        os.utime(self.key_path, (time.time(), time.time() + len(passwd)))
+        return json.dumps(key)
+
+    def test_new_key_replaces_old_without_restart(self):
+        """Test that a rewritten keyinfo.json is picked up by refresh()."""
+        self.assertFalse(self.keys.accepting())
+        first = self.write_key('first')
+        self.assertTrue(self.keys.refresh())
+        self.assertTrue(self.keys.check(first))
+
+        second = self.write_key('second-key')
+        self.assertTrue(self.keys.refresh())
+        self.assertFalse(self.keys.refresh())
+        self.assertTrue(self.keys.check(second))
+        self.assertFalse(self.keys.check(first))
+
+    def test_unreadable_key_file_is_read_once_per_write(self):
+        """Test that a bad keyinfo.json is logged once, not on every refresh."""
+        import rasberryQR
+        with open(self.key_path, 'w') as f:
+            f.write('{"doorID": ')
+        with patch.object(rasberryQR.log, 'error') as mock_error:
+            for _ in range(5):
+                self.assertFalse(self.keys.refresh())
+        self.assertEqual(mock_error.call_count, 1)
+
+        first = self.write_key('first')
+        self.assertTrue(self.keys.refresh())
+        self.assertTrue(self.keys.check(first))
+
+    def test_invalid_code_is_rejected(self):
+        """Test that unreadable codes are rejected instead of raising."""
+        self.write_key('first')
+        self.keys.refresh()
+        self.assertFalse(self.keys.check('not a key'))
+
+    def test_non_text_passwords_are_rejected(self):
+        """Test that codes with a non-str passwd are rejected with every source loaded."""
+        import keysync
+        import revocation
+        import rasberryQR
+        with open(os.path.join(self.test_dir, 'revoked.bin'), 'wb') as f:
+            f.write(revocation.build(['revoked-pass']))
+        now = int(time.time())
+        keysync.Keyring('door_a', 1, {'p1': (now - 60, now + 600)}).save(
+            os.path.join(self.test_dir, 'keyring.json'))
+        self.write_key('first')
+        self.keys.refresh()
+
+        for passwd in [5, ["x"], {"a": 1}, None, 1.5, True]:
+            code = json.dumps({'doorID': 'door_a', 'passwd': passwd})
+            self.assertFalse(self.keys.check(code), code)
+        self.assertFalse(rasberryQR.is_revoked({'passwd': 5}, self.keys.revoked))
+        self.assertNotIn(["x"], self.keys.revoked)
+
+    def test_handle_message_routes_by_kind(self):
+        """Test that sub.py stores each message kind in its own file."""
+        import sub
+        with patch('sub.save_key') as mock_save_key, \
+                patch('sub.save_revocations', return_value=False), \
+                patch('sub.apply_sync', return_value=None):
+            self.assertEqual(sub.handle_message(b'{"passwd": "p"}'), 'key')
+            mock_save_key.assert_called_once_with(b'{"passwd": "p"}', './keyinfo.json')
+        with patch('sub.save_revocations', side_effect=ValueError("truncated")):
+            with self.assertRaises(ValueError):
+                sub.handle_message(b'DLRV')
+
+    def test_malformed_messages_raise_value_error(self):
+        """Test that sub.py rejects malformed messages with ValueError and stores nothing."""
+        import sub
+        import zlib
+        for data in [b'\xff\xfe', zlib.compress(b'[]'), zlib.compress(b'{"a":1}'),
+                     b'[1, 2]', b'{"doorID": "door_a", "passwd": 5}']:
+            with self.assertRaises(ValueError, msg=data):
+                sub.handle_message(data, self.test_dir)
+        self.assertFalse(os.path.exists(self.key_path))
+
+
+class TestDoorDaemon(unittest.TestCase):
+    """
+    Test cases for the asyncio door daemon.
+    asyncio 도어 데몬에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        import simgpio
+        self.gpio = simgpio
+        self.gpio.reset()
+
+    def make_door(self, door_id='door_a', pin=17, subscription=None, frame_seconds=0.002):
+        import doord
+        camera = MagicMock()
+
+        def read():
+            time.sleep(frame_seconds)
+            return True, door_id
+        camera.read.side_effect = read
+
+        keys = MagicMock()
+        keys.check.return_value = True
+        keys.refresh.return_value = False
+        lock = doord.AsyncLock(pin=pin, gpio=self.gpio)
+        return doord.Door(door_id, keys, camera, lock, subscription=subscription,
+                          hold_seconds=0.05)
+
+    def make_daemon(self, doors, decode_workers=None):
+        import doord
+        return doord.DoorDaemon(doors, decode_workers, metrics_interval=0.01,
+                                refresh_interval=0.01)
+
+    async def run_until(self, daemon, condition, project_id=None, timeout=2.0):
+        task = asyncio.create_task(daemon.run(project_id))
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        daemon.stop()
+        await task
+
+    @patch('doord.decode_frame', return_value=['code'])
+    def test_valid_scan_unlocks_once_and_stops_cleanly(self, mock_decode):
+        """Test that scans unlock the door once per interval and stop leaves it locked."""
+        door = self.make_door()
+        daemon = self.make_daemon([door])
+        asyncio.run(self.run_until(daemon, lambda: door.frames > 20))
+
+        stats = daemon.stats()['door_a']
+        self.assertEqual(stats['unlocks'], 1)
+        self.assertGreater(stats['codes'], 1)
+        self.assertEqual(self.gpio.transitions[-1][2], 0)
+        door.camera.release.assert_called_once()
+
+    def test_busy_door_does_not_starve_others(self):
+        """Test that doors with frames waiting share the decoder in turn."""
+        import doord
+        busy = self.make_door('busy', pin=17, frame_seconds=0.0005)
+        quiet = self.make_door('quiet', pin=27, frame_seconds=0.01)
+        daemon = self.make_daemon([busy, quiet], decode_workers=1)
+
+        def slow_decode(img):
+            time.sleep(0.005)
+            return ['code']
+
+        with patch('doord.decode_frame', side_effect=slow_decode):
+            asyncio.run(self.run_until(daemon, lambda: quiet.codes >= 20))
+
+        # The quiet door's frames were decoded, while the busy door's surplus was dropped
+        # 조용한 도어의 프레임은 디코딩되고, 바쁜 도어의 초과분은 버려짐
+        self.assertGreaterEqual(quiet.codes, 20)
+        self.assertLessEqual(busy.codes, 2 * quiet.codes + 2)
+        self.assertGreater(busy.dropped, 0)
+        self.assertEqual(daemon.stats()['quiet']['unlocks'], 1)
+
+    @patch('doord.decode_frame', side_effect=[['bad'], ['good']] + [[]] * 1000)
+    def test_unlocks_and_rejections_are_audited(self, mock_decode):
+        """Test that the door records rejections and unlocks on its audit stream."""
+        door = self.make_door()
+        door.audit = MagicMock()
+        door.keys.check.side_effect = [False, True]
+        type(door.keys).last_passwd = property(
+            lambda keys: 'bad-pass' if door.keys.check.call_count == 1 else 'good-pass')
+        daemon = self.make_daemon([door])
+        asyncio.run(self.run_until(daemon, lambda: door.lock.unlock_count == 1))
+
+        self.assertEqual(door.audit.record.call_args_list,
+                         [call('reject', 'bad-pass'), call('unlock', 'good-pass')])
+        door.audit.close.assert_called_once()
+
+    @patch('doord.decode_frame', return_value=['code'])
+    def test_judge_errors_are_logged_and_rejected(self, mock_decode):
+        """Test that a crash while judging a frame is logged and counted as rejected."""
+        door = self.make_door()
+        door.audit = MagicMock()
+        door.keys.check.side_effect = TypeError("unhashable type: 'list'")
+        daemon = self.make_daemon([door])
+        with patch('doord.log') as mock_log:
+            asyncio.run(self.run_until(daemon, lambda: door.rejected >= 2))
+
+        self.assertGreaterEqual(door.rejected, 2)
+        self.assertEqual(door.lock.unlock_count, 0)
+        mock_log.exception.assert_called()
+        self.assertEqual(door.audit.record.call_args_list[0], call('reject', None))
+
+    @patch('doord.sub.handle_message', return_value='key')
+    @patch('doord.pubsub_v1.SubscriberClient')
+    @patch('doord.decode_frame', return_value=[])
+    def test_messages_are_routed_stored_and_applied(self, mock_decode, mock_client, mock_handle):
+        """Test that shared-topic messages reach their door and are acked."""
+        lobby = self.make_door('lobby', pin=17, subscription='site-sub')
+        garage = self.make_door('garage', pin=27, subscription='site-sub')
+        garage.directory = 'garage'
+        daemon = self.make_daemon([lobby, garage])
+        messages = [MagicMock(data=b'{"passwd": "p"}', attributes={'door_id': 'garage'}),
+                    MagicMock(data=b'{"passwd": "q"}', attributes={})]
+
+        def deliver(path, callback):
+            for message in messages:
+                threading.Thread(target=callback, args=(message,)).start()
+            return MagicMock()
+        mock_client.return_value.subscribe.side_effect = deliver
+
+        asyncio.run(self.run_until(daemon, lambda: daemon.unrouted == 1 and garage.messages == 1,
+                                   project_id='project'))
+
+        mock_handle.assert_called_once_with(b'{"passwd": "p"}', 'garage')
+        self.assertEqual(mock_client.return_value.subscribe.call_count, 1)
+        for message in messages:
+            message.ack.assert_called_once()
+        mock_client.return_value.close.assert_called_once()
+
+    @patch('doord.pubsub_v1.SubscriberClient')
+    @patch('doord.decode_frame', return_value=[])
+    def test_bad_messages_do_not_stop_the_daemon(self, mock_decode, mock_client):
+        """Test that malformed messages are acked and failing ones nacked, then the loop goes on."""
+        door = self.make_door('lobby', subscription='lobby-sub')
+        daemon = self.make_daemon([door])
+        messages = [MagicMock(data=b'bad', attributes={}), MagicMock(data=b'disk', attributes={}),
+                    MagicMock(data=b'good', attributes={})]
+        outcomes = {b'bad': ValueError("malformed"), b'disk': OSError("disk full"), b'good': 'key'}
+
+        def handle(data, directory):
+            if isinstance(outcomes[data], Exception):
+                raise outcomes[data]
+            return outcomes[data]
+
+        def deliver(path, callback):
+            for message in messages:
+                callback(message)
+            return MagicMock()
+        mock_client.return_value.subscribe.side_effect = deliver
+
+        with patch('doord.sub.handle_message', side_effect=handle), patch('doord.log'):
+            asyncio.run(self.run_until(daemon, lambda: door.messages == 1, project_id='project'))
+
+        self.assertEqual(door.messages, 1)
+        messages[0].ack.assert_called_once()
+        messages[1].nack.assert_called_once()
+        messages[1].ack.assert_not_called()
+        messages[2].ack.assert_called_once()
+
+
+class TestPreroll(unittest.TestCase):
+    """
+    Test cases for the pre-roll snapshot ring.
+    프리롤 스냅샷 링에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        import numpy as np
+        import preroll
+        self.np = np
+        self.preroll = preroll
+        self.test_dir = tempfile.mkdtemp()
+        # cv2 is mocked; encode each frame as its first pixel value
+        # cv2는 모의 객체이므로 각 프레임을 첫 픽셀 값으로 인코딩
+        self.encode = patch.object(preroll.cv2, 'imencode',
+                                   side_effect=lambda ext, img, params: (True, np.array([img[0, 0]], dtype=np.uint8)))
+        self.encode.start()
+        self.writer = preroll.SnapshotWriter(self.test_dir).start()
+
+    def tearDown(self):
+        import shutil
+        self.writer.stop()
+        self.encode.stop()
+        shutil.rmtree(self.test_dir)
+
+    def frame(self, value):
+        return self.np.full((4, 4), value, dtype=self.np.uint8)
+
+    def snapshots(self):
+        return sorted(os.listdir(self.test_dir))
+
+    def written_values(self, name):
+        path = os.path.join(self.test_dir, name)
+        values = []
+        for jpg in sorted(os.listdir(path)):
+            with open(os.path.join(path, jpg), 'rb') as f:
+                values.append(f.read()[0])
+        return values
+
+    def test_snapshot_holds_frames_before_and_after_event(self):
+        """Test that a snapshot holds the last frames in order, including post-roll."""
+        ring = self.preroll.PrerollBuffer(self.writer, size=5, post_frames=2)
+        for value in range(8):
+            ring.push(self.frame(value))
+        ring.trigger('unlock')
+        ring.push(self.frame(8))
+        self.assertEqual(self.snapshots(), [])
+        ring.push(self.frame(9))
+        self.assertTrue(self.writer.wait_idle(5))
+
+        names = self.snapshots()
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].endswith('-unlock'))
+        self.assertEqual(self.written_values(names[0]), [5, 6, 7, 8, 9])
+
+    def test_frame_is_copied_into_ring(self):
+        """Test that later changes to a camera frame do not alter the ring."""
+        ring = self.preroll.PrerollBuffer(self.writer, size=3, post_frames=0)
+        img = self.frame(1)
+        ring.push(img)
+        img[:] = 99
+        ring.trigger('reject')
+        self.assertTrue(self.writer.wait_idle(5))
+
+        self.assertEqual(self.written_values(self.snapshots()[0]), [1])
+
+    def test_events_merge_while_pending(self):
+        """Test that events before the post-roll ends join the pending snapshot."""
+        ring = self.preroll.PrerollBuffer(self.writer, size=4, post_frames=2)
+        ring.push(self.frame(0))
+        ring.trigger('reject')
+        ring.push(self.frame(1))
+        ring.trigger('unlock')
+        ring.push(self.frame(2))
+        self.assertTrue(self.writer.wait_idle(5))
+
+        names = self.snapshots()
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].endswith('-reject'))
+
+    def test_busy_writer_drops_snapshot(self):
+        """Test that a snapshot is dropped rather than waiting for a busy writer."""
+        release = threading.Event()
+        write = self.writer._write
+        self.writer._write = lambda: (release.wait(5), write())
+        ring = self.preroll.PrerollBuffer(self.writer, size=3, post_frames=0)
+        ring.push(self.frame(1))
+
+        ring.trigger('unlock')
+        ring.trigger('reject')
+        self.assertEqual(self.writer.dropped, 1)
+        release.set()
+        self.assertTrue(self.writer.wait_idle(5))
+        self.assertEqual(self.writer.written, 1)
+        self.assertEqual(len(self.snapshots()), 1)
+
+    def test_failed_write_keeps_writer_running(self):
+        """Test that a snapshot that fails to write does not stop later ones."""
+        ring = self.preroll.PrerollBuffer(self.writer, size=3, post_frames=0)
+        ring.push(self.frame(1))
+        with patch.object(self.preroll.os, 'makedirs', side_effect=OSError(28, 'No space left on device')), \
+                patch('builtins.print'):
+            ring.trigger('unlock')
+            self.assertTrue(self.writer.wait_idle(5))
+        self.assertEqual(self.writer.errors, 1)
+        self.assertEqual(self.snapshots(), [])
+
+        ring.trigger('reject')
+        self.assertTrue(self.writer.wait_idle(5))
+        self.assertEqual(self.writer.written, 1)
+        self.assertEqual(len(self.snapshots()), 1)
+
+
+class TestMemoryWatchdog(unittest.TestCase):
+    """
+    Test cases for the scanner memory watchdog.
+    스캐너 메모리 감시기에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        import memwatch
+        self.memwatch = memwatch
+        self.lines = []
+
+    def watchdog(self, **kwargs):
+        return self.memwatch.MemoryWatchdog(interval=60.0, report=self.lines.append, **kwargs).start()
+
+    def test_check_is_quiet_between_intervals(self):
+        """Test that nothing is measured before the interval passes."""
+        watchdog = self.watchdog(budget=1)
+        self.assertFalse(watchdog.check())
+        self.assertEqual(self.lines, [])
+
+    def test_traced_report_names_growing_site(self):
+        """Test that a traced report lists the allocation site that grew."""
+        watchdog = self.watchdog(trace=True)
+        try:
+            retained = [bytearray(1024) for _ in range(1000)]
+            self.assertFalse(watchdog.check(time.monotonic() + 60))
+        finally:
+            watchdog.stop()
+
+        self.assertTrue(any(line.startswith('Memory: RSS') for line in self.lines))
+        self.assertTrue(any('test_raspart.py' in line and 'KiB/h' in line for line in self.lines))
+        self.assertEqual(len(retained), 1000)
+
+    def test_over_budget_asks_for_restart(self):
+        """Test that going over budget asks for a restart and counts it."""
+        watchdog = self.watchdog(budget=1)
+        self.assertTrue(watchdog.check(time.monotonic() + 60))
+        self.assertEqual(watchdog.restarts, 1)
+
+        watchdog.budget = 1 << 60
+        self.assertFalse(watchdog.check(time.monotonic() + 120))
+        self.assertEqual(watchdog.restarts, 0)
+
+    @patch('rasberryQR.cleanup_and_exit')
+    @patch('rasberryQR.scan')
+    def test_scanner_restarts_engine_in_place(self, mock_scan, mock_exit):
+        """Test that the scanner restarts its engine until memory recovers."""
+        import rasberryQR
+        watchdog = Mock(restarts=1)
+        mock_scan.side_effect = [True, True, False]
+
+        rasberryQR.main(watchdog)
+        self.assertEqual(mock_scan.call_count, 3)
+        self.assertEqual(watchdog.restarted.call_count, 2)
+        mock_exit.assert_called_once_with(watchdog)
+
+    @patch('rasberryQR.cleanup_and_exit')
+    @patch('rasberryQR.scan')
+    def test_scanner_exits_when_restarts_do_not_help(self, mock_scan, mock_exit):
+        """Test that the scanner gives up once restarts do not bring memory down."""
+        import rasberryQR
+        watchdog = Mock(restarts=rasberryQR.MAX_RESTARTS + 1)
+        mock_scan.return_value = True
+
+        rasberryQR.main(watchdog)
+        self.assertEqual(mock_scan.call_count, 1)
+        watchdog.restarted.assert_not_called()
+        mock_exit.assert_called_once_with(watchdog)
+
+
+class TestDoorSimulator(unittest.TestCase):
+    """
+    Test cases for the end-to-end door load simulator.
+    종단 간 도어 부하 시뮬레이터에 대한 테스트 케이스입니다.
+    """
+
+    def setUp(self):
+        import simgpio
+        simgpio.reset()
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.test_dir)
+
+    @patch('doord.decode_frame', side_effect=lambda img: [] if img == 'idle' else [img])
+    def test_keys_propagate_and_unlock_every_door(self, mock_decode):
+        """Test that each round's issued key reaches its door and its presentation unlocks it."""
+        import doorsim
+        simulation = doorsim.Simulation(2, self.test_dir, rounds=2, workers=1, fps=200.0,
+                                        present_seconds=1.0, hold_seconds=0.02,
+                                        render=lambda key_png, payload: [payload], idle='idle')
+        asyncio.run(simulation.run())
+        report = simulation.report()
+
+        self.assertEqual(report['issuance']['keys'], 4)
+        self.assertEqual(report['propagation']['count'], 4)
+        self.assertEqual((report['scan_to_unlock']['count'], report['scan_to_unlock']['missed']),
+                         (4, 0))
+        self.assertTrue(all(stats['unlocks'] == 2 and stats['rejected'] == 0
+                            for stats in report['doors'].values()))
+
+
 class TestTimeValidation(unittest.TestCase):
     """
     Test cases for time-based key validation.